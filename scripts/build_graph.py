@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+Build graph for the reference pipeline
+
+The reference pipeline (scrape_all_versions -> parse_all_versions ->
+markdown -> convert_to_pdf -> combined reference) is declared here as a graph
+of tasks with file-level inputs and outputs:
+
+    scrape:<v>    -> <v>/table_of_contents.html
+    parse:<v>     table_of_contents.html -> organized_content.json
+    markdown:<v>  organized_content.json -> README.md, categories/
+    pdf:<v>       README.md -> pine_script_<v>_reference.pdf
+    summary       every organized_content.json -> OVERALL_SUMMARY.md
+    combined      every README.md -> combined_reference.md
+    combined-pdf  combined_reference.md -> combined_reference.pdf
+    site          every organized_content.json (+ signatures.sqlite) -> site/
+
+Dependencies follow from the files: a task depends on the tasks producing its
+inputs. The scripts implementing a stage are inputs too, so editing a stage
+reruns it. A task is skipped when the content hash of its inputs matches the
+last successful run and its outputs are unchanged. Hashes are cached by
+(mtime, size), so a no-op rebuild only stats files. Scrape tasks have no
+inputs; they run when their output is missing or with --rescrape.
+
+Tasks run in a process pool as soon as their dependencies finish. Each task
+logs to .cache/build_logs/<task>.log. The report lists every task's status
+and time and the critical path, the chain of dependent tasks that bounds the
+wall time.
+
+Usage:
+    python scripts/build_graph.py                      # everything except PDFs and the site
+    python scripts/build_graph.py pdf combined-pdf site  # stage names or task names
+    python scripts/build_graph.py markdown:v6 --force markdown:v6
+    python scripts/build_graph.py --versions v5 v6 --rescrape --jobs 4
+    python scripts/build_graph.py --list
+    python scripts/build_graph.py --dry-run
+"""
+
+import argparse
+import contextlib
+import hashlib
+import importlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS_DIR = os.path.join(ROOT, "scripts")
+STATE_PATH = os.path.join(ROOT, ".cache", "build_graph.json")
+LOG_DIR = os.path.join(ROOT, ".cache", "build_logs")
+REFERENCES = "pine_script_references"
+VERSIONS = ("v3", "v4", "v5", "v6")
+DEFAULT_STAGES = ("scrape", "parse", "markdown", "summary", "combined")
+
+
+class Task:
+    """One node: an action (module, function, args) with declared input and output paths"""
+
+    def __init__(self, name, action, args=(), inputs=(), outputs=(), code=()):
+        self.name = name
+        self.stage = name.split(":", 1)[0]
+        self.action = action
+        self.args = tuple(args)
+        self.inputs = list(inputs) + [f"scripts/{module}.py" for module in code]
+        self.outputs = list(outputs)
+        self.deps = set()
+
+    @property
+    def source(self):
+        return not self.inputs
+
+
+def pipeline(versions=VERSIONS):
+    """The reference pipeline's tasks"""
+    tasks = []
+    readmes = []
+    for version in versions:
+        base = f"{REFERENCES}/{version}"
+        toc, organized, readme = f"{base}/table_of_contents.html", f"{base}/organized_content.json", f"{base}/README.md"
+        readmes.append(readme)
+        tasks += [
+            Task(f"scrape:{version}", ("build_graph", "scrape"), [version], outputs=[toc]),
+            Task(f"parse:{version}", ("build_graph", "parse"), [version], [toc], [organized],
+                 code=["build_graph", "parse_all_versions"]),
+            Task(f"markdown:{version}", ("build_graph", "markdown"), [version], [organized],
+                 [readme, f"{base}/categories"], code=["build_graph", "parse_all_versions", "reference_emitters"]),
+            Task(f"pdf:{version}", ("build_graph", "pdf"), [readme, f"{base}/pine_script_{version}_reference.pdf"],
+                 [readme], [f"{base}/pine_script_{version}_reference.pdf"], code=["build_graph", "convert_to_pdf"]),
+        ]
+    tasks += [
+        Task("summary", ("build_graph", "summary"), [list(versions)],
+             [f"{REFERENCES}/{version}/organized_content.json" for version in versions],
+             [f"{REFERENCES}/OVERALL_SUMMARY.md"], code=["build_graph", "parse_all_versions"]),
+        Task("combined", ("build_graph", "combined"), (), readmes, [f"{REFERENCES}/combined_reference.md"],
+             code=["build_graph", "convert_to_pdf"]),
+        Task("combined-pdf", ("build_graph", "pdf"),
+             [f"{REFERENCES}/combined_reference.md", f"{REFERENCES}/combined_reference.pdf"],
+             [f"{REFERENCES}/combined_reference.md"], [f"{REFERENCES}/combined_reference.pdf"],
+             code=["build_graph", "convert_to_pdf"]),
+        Task("site", ("build_graph", "site"), [list(versions)],
+             [f"{REFERENCES}/{version}/organized_content.json" for version in versions]
+             + [path for path in (f"{REFERENCES}/{version}/signatures.sqlite" for version in versions)
+                if os.path.exists(os.path.join(ROOT, path))],
+             [f"{REFERENCES}/site"], code=["build_graph", "reference_site", "reference_emitters"]),
+    ]
+    return tasks
+
+
+# Actions (run in worker processes with the repository root as working directory)
+
+def scrape(version):
+    import scrape_all_versions
+    scrape_all_versions.scrape_all_versions_toc([version])
+
+
+def parse(version):
+    import parse_all_versions
+    if not parse_all_versions.parse_pine_script_toc_version(version, markdown=False):
+        raise RuntimeError(f"could not parse {version}")
+
+
+def markdown(version):
+    import parse_all_versions
+    with open(f"{REFERENCES}/{version}/organized_content.json", encoding="utf-8") as f:
+        parse_all_versions.create_markdown_organization(json.load(f), version)
+
+
+def summary(versions):
+    import parse_all_versions
+    counts = {}
+    for version in versions:
+        with open(f"{REFERENCES}/{version}/organized_content.json", encoding="utf-8") as f:
+            content = json.load(f)
+        counts[version] = {"categories": len(content["categories"]), "total_items": len(content["all_items"])}
+    parse_all_versions.write_overall_summary(counts)
+
+
+def combined():
+    import convert_to_pdf
+    convert_to_pdf.create_combined_reference(pdf=False)
+
+
+def site(versions):
+    import reference_site
+    reference_site.build(versions)
+
+
+def pdf(markdown_file, pdf_file):
+    import convert_to_pdf
+    if not convert_to_pdf.convert_md_to_pdf(markdown_file, pdf_file):
+        raise RuntimeError(f"no PDF converter could convert {markdown_file}")
+
+
+def _run(name, action, args):
+    """Worker entry point: run one action with its output captured in the task log"""
+    os.chdir(ROOT)
+    if SCRIPTS_DIR not in sys.path:
+        sys.path.insert(0, SCRIPTS_DIR)
+    os.makedirs(LOG_DIR, exist_ok=True)
+    start = time.perf_counter()
+    with open(os.path.join(LOG_DIR, name.replace(":", "_") + ".log"), "w", encoding="utf-8") as log:
+        with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+            module, function = action
+            getattr(importlib.import_module(module), function)(*args)
+    return time.perf_counter() - start
+
+
+class Hasher:
+    """Content hashes of files and directories, cached by (mtime, size)"""
+
+    def __init__(self, cache):
+        self.cache = cache      # path -> [mtime_ns, size, sha256]
+
+    def file(self, path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        cached = self.cache.get(path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        self.cache[path] = [stat.st_mtime_ns, stat.st_size, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def __call__(self, path):
+        full = os.path.join(ROOT, path)
+        if not os.path.isdir(full):
+            return self.file(full)
+        digest = hashlib.sha256()
+        for directory, subdirs, files in sorted(os.walk(full)):
+            subdirs.sort()
+            for name in sorted(files):
+                child = os.path.join(directory, name)
+                digest.update(f"{os.path.relpath(child, full)}\0{self.file(child)}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+
+class Executor:
+    """Runs a task graph in dependency order, in parallel, skipping up-to-date tasks"""
+
+    def __init__(self, tasks, state_path=STATE_PATH, jobs=None):
+        self.tasks = {task.name: task for task in tasks}
+        self.state_path = state_path
+        self.jobs = jobs or os.cpu_count() or 1
+        producers = {}
+        for task in tasks:
+            for output in task.outputs:
+                if output in producers:
+                    raise ValueError(f"{output} is produced by both {producers[output]} and {task.name}")
+                producers[output] = task.name
+        for task in tasks:
+            task.deps = {producers[path] for path in task.inputs if path in producers} - {task.name}
+        self._check_cycles()
+        self.state = {"files": {}, "tasks": {}}
+        if state_path and os.path.exists(state_path):
+            with open(state_path, encoding="utf-8") as f:
+                self.state = json.load(f)
+        self.hash = Hasher(self.state["files"])
+
+    def _check_cycles(self):
+        visiting, done = set(), set()
+
+        def visit(name, chain):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"dependency cycle: {' -> '.join(chain + [name])}")
+            visiting.add(name)
+            for dep in self.tasks[name].deps:
+                visit(dep, chain + [name])
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.tasks:
+            visit(name, [])
+
+    def select(self, targets):
+        """Task names matching `targets` (task or stage names) plus everything they depend on"""
+        wanted = set()
+        for target in targets:
+            matches = [name for name, task in self.tasks.items() if target in (name, task.stage)]
+            if not matches:
+                raise KeyError(f"no task or stage {target!r} (stages: {', '.join(sorted({t.stage for t in self.tasks.values()}))})")
+            wanted.update(matches)
+        stack = list(wanted)
+        while stack:
+            for dep in self.tasks[stack.pop()].deps:
+                if dep not in wanted:
+                    wanted.add(dep)
+                    stack.append(dep)
+        return wanted
+
+    def signature(self, task):
+        inputs = [(path, self.hash(path)) for path in task.inputs]
+        return hashlib.sha256(json.dumps([task.action, task.args, inputs]).encode("utf-8")).hexdigest()
+
+    def up_to_date(self, task, force):
+        """None if `task` can be skipped, else the reason it has to run"""
+        if task.name in force:
+            return "forced"
+        missing = [path for path in task.inputs if self.hash(path) is None]
+        if missing:
+            return f"missing input {missing[0]}"
+        outputs = {path: self.hash(path) for path in task.outputs}
+        if any(digest is None for digest in outputs.values()):
+            return "missing output"
+        if task.source:
+            return None
+        previous = self.state["tasks"].get(task.name)
+        if previous is None:
+            return "never built"
+        if previous["signature"] != self.signature(task):
+            return "inputs changed"
+        if previous["outputs"] != outputs:
+            return "outputs changed"
+        return None
+
+    def _record(self, task):
+        outputs = {path: self.hash(path) for path in task.outputs}
+        missing = [path for path, digest in outputs.items() if digest is None]
+        if missing:
+            raise RuntimeError(f"did not produce {missing[0]}")
+        self.state["tasks"][task.name] = {"signature": self.signature(task), "outputs": outputs}
+
+    def save(self):
+        if not self.state_path:
+            return
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        partial = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(partial, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(partial, self.state_path)
+
+    def run(self, targets, force=(), dry_run=False):
+        """Build `targets`; returns {task name: (status, seconds, detail)}"""
+        selected = self.select(targets)
+        force = self.select(force) & selected if force else set()
+        results = {}
+        pending = set(selected)
+        running = {}
+        pool = None
+        start = time.perf_counter()
+        try:
+            while pending or running:
+                for name in sorted(pending):
+                    task = self.tasks[name]
+                    if any(dep in pending or dep in running for dep in task.deps & selected):
+                        continue
+                    pending.discard(name)
+                    failed = [dep for dep in task.deps & selected if results[dep][0] in ("failed", "blocked")]
+                    if failed:
+                        results[name] = ("blocked", 0.0, f"{failed[0]} {results[failed[0]][0]}")
+                        continue
+                    reason = self.up_to_date(task, force)
+                    if dry_run and reason is None:
+                        upstream = [dep for dep in task.deps & selected if results[dep][0] == "would run"]
+                        reason = f"after {upstream[0]}" if upstream else None
+                    if reason is None:
+                        results[name] = ("up to date", 0.0, "")
+                        continue
+                    if dry_run:
+                        results[name] = ("would run", 0.0, reason)
+                        continue
+                    if pool is None:
+                        pool = ProcessPoolExecutor(max_workers=self.jobs)
+                    running[name] = (pool.submit(_run, name, task.action, task.args), reason)
+                if not running:
+                    continue
+                done, _ = wait([future for future, _ in running.values()], return_when=FIRST_COMPLETED)
+                for name in [name for name, (future, _) in running.items() if future in done]:
+                    future, reason = running.pop(name)
+                    try:
+                        elapsed = future.result()
+                        self._record(self.tasks[name])
+                        results[name] = ("built", elapsed, reason)
+                    except Exception as e:
+                        results[name] = ("failed", 0.0, f"{type(e).__name__}: {e}")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            if not dry_run:
+                self.save()
+        self.wall = time.perf_counter() - start
+        return results
+
+    def critical_path(self, results):
+        """(seconds, [task names]) of the longest chain of dependent task times"""
+        best = {}
+
+        def longest(name):
+            if name not in best:
+                chains = [longest(dep) for dep in self.tasks[name].deps if dep in results]
+                before = max(chains, default=(0.0, []))
+                best[name] = (before[0] + results[name][1], before[1] + [name])
+            return best[name]
+
+        return max((longest(name) for name in results), default=(0.0, []))
+
+
+def report(executor, results):
+    order = sorted(results, key=lambda name: (-results[name][1], name))
+    for name in order:
+        status, elapsed, detail = results[name]
+        timing = f"{elapsed:7.2f}s" if status == "built" else " " * 8
+        print(f"  {name:<16} {status:<11} {timing}  {detail}")
+        if status == "failed":
+            log = os.path.join(LOG_DIR, name.replace(":", "_") + ".log")
+            if os.path.exists(log):
+                for line in open(log, encoding="utf-8").read().splitlines()[-3:]:
+                    print(f"      | {line}")
+    total, chain = executor.critical_path(results)
+    work = sum(elapsed for _, elapsed, _ in results.values())
+    counts = {}
+    for status, _, _ in results.values():
+        counts[status] = counts.get(status, 0) + 1
+    print(", ".join(f"{count} {status}" for status, count in sorted(counts.items())) + f" in {executor.wall:.2f}s")
+    if work:
+        print(f"Critical path {total:.2f}s: {' -> '.join(name for name in chain if results[name][0] == 'built')}")
+        print(f"Task time {work:.2f}s over {executor.wall:.2f}s wall ({work / executor.wall:.1f}x parallelism)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build graph for the reference pipeline")
+    parser.add_argument("targets", nargs="*", help=f"Tasks or stages to build (default: {' '.join(DEFAULT_STAGES)})")
+    parser.add_argument("--versions", nargs="+", default=list(VERSIONS), help="Reference versions (default: v3-v6)")
+    parser.add_argument("--force", nargs="+", default=[], metavar="TASK", help="Rebuild these tasks or stages anyway")
+    parser.add_argument("--rescrape", action="store_true", help="Scrape again even if pages are present")
+    parser.add_argument("--jobs", type=int, help="Parallel tasks (default: CPU count)")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would run and why")
+    parser.add_argument("--list", action="store_true", help="List tasks with their inputs and outputs")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    executor = Executor(pipeline(args.versions), jobs=args.jobs)
+    if args.list:
+        for task in executor.tasks.values():
+            deps = f" (after {', '.join(sorted(task.deps))})" if task.deps else ""
+            print(f"{task.name}{deps}\n    in:  {', '.join(task.inputs) or '-'}\n    out: {', '.join(task.outputs)}")
+        return
+    force = list(args.force) + (["scrape"] if args.rescrape else [])
+    try:
+        results = executor.run(args.targets or DEFAULT_STAGES, force, args.dry_run)
+    except KeyError as e:
+        print(f"Error: {e.args[0]}")
+        sys.exit(1)
+    report(executor, results)
+    if any(status in ("failed", "blocked") for status, _, _ in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
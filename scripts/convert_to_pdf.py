@@ -90,7 +90,7 @@ def convert_all_references_to_pdf():
                 pdf_path = os.path.join(pdf_categories_dir, pdf_filename)
                 convert_md_to_pdf(md_path, pdf_path)
 
-def create_combined_reference():
+def create_combined_reference(pdf=True):
     """
     Create a combined reference document
     """
@@ -117,8 +117,9 @@ def create_combined_reference():
     print(f"Created combined reference at {combined_file}")
     
     # Try to convert to PDF
-    pdf_file = "pine_script_references/combined_reference.pdf"
-    convert_md_to_pdf(combined_file, pdf_file)
+    if pdf:
+        pdf_file = "pine_script_references/combined_reference.pdf"
+        convert_md_to_pdf(combined_file, pdf_file)
 
 if __name__ == "__main__":
     print("Pine Script Reference PDF Converter")
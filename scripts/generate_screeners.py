@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Screener code generator
+
+Renders a multi-symbol screener template (by default
+templates/gold_standard_screener_template.pine) once for every
+market × ticker list × screen number combination. A list with more active
+tickers than fit on one screen is split over screens 1, 2, ... (30 active
+symbols per screen by default, as in the ticker files).
+
+The template is compiled a single time into a render plan: a flat list of
+literal text chunks and slots. Slots are the `{{PLACEHOLDER}}` markers, the
+ticker literal of every `sNN = input.symbol(...)` line and the `true`/`false`
+of every `uNN = input.bool(...)` enable flag. Rendering a combination is then
+just a join over the plan, with the template's own quoting and spacing kept.
+
+Ticker lists come from `tickers/<market>/*.txt` (one symbol per line). Bare
+symbols get the market's exchange prefix (`NSE:` for india, none for us);
+dummy `CRYPTO:BTCUSD` entries are dropped and unused slots are filled with
+disabled dummies again. Files are only rewritten when their content changes,
+and screen files a shrunken list no longer fills are deleted. `--dry-run`
+reports both without touching the output directory.
+
+Usage:
+    python scripts/generate_screeners.py
+    python scripts/generate_screeners.py --market india --list popular_30_active
+    python scripts/generate_screeners.py --market us --list all_tickers      # 264 tickers -> 9 screens
+    python scripts/generate_screeners.py --template templates/kurutoga_screener_template.pine --name KURU
+"""
+
+import argparse
+import os
+import re
+import sys
+
+from ticker_universe import DUMMY_TICKER, qualify
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TEMPLATE = os.path.join(ROOT, "templates", "gold_standard_screener_template.pine")
+TICKERS_DIR = os.path.join(ROOT, "tickers")
+OUTPUT_DIR = os.path.join(ROOT, "screeners", "generated")
+
+ACTIVE_PER_SCREEN = 30
+
+PLACEHOLDER_RE = re.compile(r"\{\{(\w+)\}\}")
+SYMBOL_RE = re.compile(r"^(s(\d+)\s*=\s*input\.symbol\(\s*)([\"'])(.*?)\3(.*)$")
+ENABLE_RE = re.compile(r"^(u(\d+)\s*=\s*input\.bool\(\s*)(true|false)(.*)$")
+
+
+class RenderPlan:
+    """A template compiled into literal chunks and (kind, key) slots"""
+
+    def __init__(self, path):
+        self.path = path
+        self.items = []
+        self.placeholders = set()
+        self.symbol_slots = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                self._compile_line(line)
+        self._merge()
+
+    def _literal(self, text):
+        if text:
+            self.items.append(text)
+
+    def _compile_line(self, line):
+        body = line.rstrip("\n")
+        newline = line[len(body):]
+        match = SYMBOL_RE.match(body)
+        if match:
+            index = int(match.group(2))
+            quote = match.group(3)
+            self._text(match.group(1) + quote)
+            self.items.append(("symbol", index))
+            self._text(quote + match.group(5) + newline)
+            self.symbol_slots = max(self.symbol_slots, index)
+            return
+        match = ENABLE_RE.match(body)
+        if match:
+            self._text(match.group(1))
+            self.items.append(("enabled", int(match.group(2))))
+            self._text(match.group(4) + newline)
+            return
+        self._text(line)
+
+    def _text(self, text):
+        """Literal text, split around any {{PLACEHOLDER}} markers"""
+        position = 0
+        for match in PLACEHOLDER_RE.finditer(text):
+            self._literal(text[position:match.start()])
+            self.items.append(("placeholder", match.group(1)))
+            self.placeholders.add(match.group(1))
+            position = match.end()
+        self._literal(text[position:])
+
+    def _merge(self):
+        merged = []
+        for item in self.items:
+            if isinstance(item, str) and merged and isinstance(merged[-1], str):
+                merged[-1] += item
+            else:
+                merged.append(item)
+        self.items = merged
+
+    def render(self, values, symbols, enabled):
+        """Render with placeholder `values` and per-slot `symbols`/`enabled` lists (1-based slots)"""
+        parts = []
+        for item in self.items:
+            if isinstance(item, str):
+                parts.append(item)
+                continue
+            kind, key = item
+            if kind == "placeholder":
+                if key not in values:
+                    raise KeyError(f"no value for placeholder {{{{{key}}}}}")
+                parts.append(str(values[key]))
+            elif kind == "symbol":
+                parts.append(symbols[key - 1])
+            else:
+                parts.append("true" if enabled[key - 1] else "false")
+        return "".join(parts)
+
+
+def load_ticker_list(path):
+    """Symbols from a one-per-line ticker .txt file"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith(("#", "//"))]
+
+
+def active_tickers(tickers, market):
+    """Qualified symbols of a list without its dummy padding"""
+    symbols = [qualify(ticker, market) for ticker in tickers]
+    return [symbol for symbol in symbols if symbol != DUMMY_TICKER]
+
+
+def screen_slots(active, slots):
+    """Symbols and enable flags for one screen of `slots` template slots"""
+    padding = slots - len(active)
+    return active + [DUMMY_TICKER] * padding, [True] * len(active) + [False] * padding
+
+
+def discover_lists(tickers_dir, markets=None, lists=None):
+    """(market, list name, path) for every ticker list; all_tickers.txt only when asked for"""
+    found = []
+    for market in sorted(os.listdir(tickers_dir)):
+        market_dir = os.path.join(tickers_dir, market)
+        if not os.path.isdir(market_dir) or (markets and market not in markets):
+            continue
+        for filename in sorted(os.listdir(market_dir)):
+            name, ext = os.path.splitext(filename)
+            if ext != ".txt" or (lists and name not in lists) or (not lists and name == "all_tickers"):
+                continue
+            found.append((market, name, os.path.join(market_dir, filename)))
+    return found
+
+
+def write_if_changed(path, content, dry_run=False):
+    """Write `content` unless the file already holds exactly that; returns True if it differs (and was written)"""
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+    if dry_run:
+        return True
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(content)
+    return True
+
+
+def remove_stale_screens(directory, list_name, screens, dry_run=False):
+    """Delete `<list_name>_screenN.pine` files with N > `screens`; returns their paths"""
+    if not os.path.isdir(directory):
+        return []
+    pattern = re.compile(re.escape(list_name) + r"_screen(\d+)\.pine$")
+    removed = []
+    for filename in sorted(os.listdir(directory)):
+        match = pattern.match(filename)
+        if match and int(match.group(1)) > screens:
+            path = os.path.join(directory, filename)
+            if not dry_run:
+                os.remove(path)
+            removed.append(path)
+    return removed
+
+
+def generate(plan, ticker_lists, name, output_dir, per_screen=ACTIVE_PER_SCREEN, extra=None, dry_run=False):
+    """Render every list × screen combination; returns (written, unchanged, removed, errors)"""
+    written, unchanged, removed, errors = [], [], [], []
+    for market, list_name, path in ticker_lists:
+        active = active_tickers(load_ticker_list(path), market)
+        try:
+            result = render_screens(plan, active, market, list_name, name, output_dir, per_screen, extra, dry_run)
+        except KeyError as e:
+            errors.append(f"{path}: {e.args[0]}")
+            continue
+        written.extend(result[0])
+        unchanged.extend(result[1])
+        removed.extend(result[2])
+    return written, unchanged, removed, errors
+
+
+def render_screens(plan, active, market, list_name, name, output_dir, per_screen=ACTIVE_PER_SCREEN, extra=None,
+                   dry_run=False):
+    """Render one list of qualified `active` symbols over screens 1..N; returns (written, unchanged, removed)"""
+    per_screen = min(per_screen, plan.symbol_slots)
+    screens = max(1, -(-len(active) // per_screen))
+    rendered = []
+    for screen in range(1, screens + 1):
+        chunk = active[(screen - 1) * per_screen:screen * per_screen]
+        symbols, enabled = screen_slots(chunk, plan.symbol_slots)
+        values = dict(extra or {}, SCRIPT_NAME=name, SCREEN_NUMBER=screen)
+        content = plan.render(values, symbols, enabled)
+        rendered.append((os.path.join(output_dir, market, f"{list_name}_screen{screen}.pine"), content))
+    written, unchanged = [], []
+    for target, content in rendered:
+        if write_if_changed(target, content, dry_run):
+            written.append(target)
+        else:
+            unchanged.append(target)
+    removed = remove_stale_screens(os.path.join(output_dir, market), list_name, screens, dry_run)
+    return written, unchanged, removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render screener templates for every ticker list")
+    parser.add_argument("--template", default=DEFAULT_TEMPLATE, help="Screener template (default: gold standard)")
+    parser.add_argument("--tickers", default=TICKERS_DIR, help="Ticker directory with <market>/*.txt lists")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="Output directory (default: screeners/generated)")
+    parser.add_argument("--market", action="append", help="Only this market (repeatable)")
+    parser.add_argument("--list", action="append", help="Only this list name, e.g. popular_30_active (repeatable)")
+    parser.add_argument("--per-screen", type=int, default=ACTIVE_PER_SCREEN,
+                        help="Active symbols per screen (default: 30, capped at the template's slots)")
+    parser.add_argument("--name", default="Screener", help="Value for {{SCRIPT_NAME}}")
+    parser.add_argument("--set", action="append", metavar="PLACEHOLDER=VALUE", help="Value for another placeholder")
+    parser.add_argument("--dry-run", action="store_true", help="List the files that would change, without writing")
+    args = parser.parse_args()
+
+    plan = RenderPlan(args.template)
+    if not plan.symbol_slots:
+        print(f"{args.template}: no sNN = input.symbol(...) lines found")
+        sys.exit(1)
+    extra = dict(pair.split("=", 1) for pair in args.set or [])
+    ticker_lists = discover_lists(args.tickers, args.market, args.list)
+    print(f"Template: {os.path.relpath(args.template, ROOT)} ({plan.symbol_slots} symbol slots, "
+          f"placeholders: {', '.join(sorted(plan.placeholders)) or 'none'})")
+    print(f"Rendering {len(ticker_lists)} ticker lists")
+
+    written, unchanged, removed, errors = generate(plan, ticker_lists, args.name, args.output, args.per_screen,
+                                                   extra, args.dry_run)
+    for path in written:
+        print(f"  {'would write' if args.dry_run else 'wrote'} {os.path.relpath(path, ROOT)}")
+    for path in removed:
+        print(f"  {'would remove' if args.dry_run else 'removed'} {os.path.relpath(path, ROOT)}")
+    print(f"{len(written)} written, {len(unchanged)} unchanged, {len(removed)} removed, {len(errors)} errors")
+    for error in errors:
+        print(f"  error: {error}")
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Shared indicator cache
+
+A content-keyed store for computed indicator columns (`ta.ema(close, 20)`,
+`ta.atr(14)`, ...), shared by every script, symbol and parameter set that runs
+in one process. Keys are built by the engines from the function name, its
+scalar arguments and the identity of its source series; a source read
+straight from the bars is identified by the bar series name plus
+`data_fingerprint()` of the OHLCV data, so the same indicator on the same
+symbol hits the cache no matter which template or input set asks for it.
+
+Both engines consult it: VectorEngine and pine_backtest/pine_optimize take it
+as `cache=`, and the bar-by-bar Runtime replays cached columns for `ta.*`
+calls on bar series that run on every bar (and records the ones it computes).
+
+Columns are held in memory up to a byte budget and evicted least recently
+used first. With a spill directory, evicted columns are written there as
+`.npy` files (named by a hash of the key and TA_VERSION, a digest of the ta
+implementation) and read back on a later miss, so a spill directory can also
+carry indicators across runs and processes.
+
+Usage:
+    python scripts/indicator_cache.py --benchmark
+    python scripts/indicator_cache.py --benchmark --symbols 20 --bars 20000 --budget 16 --spill /tmp/ta_cache
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import ohlcv
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET = 256 * 1024 * 1024
+# Sources of the code that computes cached columns: the vector ta.* functions and the bar-by-bar states
+TA_SOURCES = ("pine_ta.py", "pine_runtime.py")
+
+
+def _ta_digest():
+    digest = hashlib.sha1()
+    for name in TA_SOURCES:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+# Part of every spill file name, so spilled columns never outlive a change to the ta implementation
+TA_VERSION = _ta_digest()
+
+BENCHMARK_SCRIPTS = ("atr_retracement_ema_signals.pine", "atr_retracement_ema_strategy.pine",
+                     "templates/kurutoga_screener_template.pine")
+
+
+def _nbytes(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        return 8 * len(value) + 56
+    return sys.getsizeof(value)
+
+
+class IndicatorCache:
+    """Byte-budgeted LRU cache of indicator columns with optional on-disk spill"""
+
+    def __init__(self, max_bytes=DEFAULT_BUDGET, spill_dir=None):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.entries = OrderedDict()    # key -> column
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self.spills = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def _spill_path(self, key):
+        digest = hashlib.sha1(repr((TA_VERSION, key)).encode("utf-8")).hexdigest()
+        return os.path.join(self.spill_dir, digest + ".npy")
+
+    def get(self, key, default=None):
+        """Cached column for `key` (memory first, then the spill directory)"""
+        column = self.entries.get(key)
+        if column is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return column
+        if self.spill_dir:
+            path = self._spill_path(key)
+            if os.path.exists(path):
+                try:
+                    column = np.load(path)
+                except (OSError, ValueError):
+                    column = None
+                if column is not None:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    self._store(key, column, spill=False)
+                    return column
+        self.misses += 1
+        return default
+
+    def __setitem__(self, key, column):
+        self._store(key, column, spill=True)
+
+    def _store(self, key, column, spill):
+        size = _nbytes(column)
+        if key in self.entries:
+            self.bytes -= _nbytes(self.entries.pop(key))
+        if size > self.max_bytes:
+            if spill:
+                self._spill(key, column)
+            return
+        self.entries[key] = column
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            old_key, old_column = self.entries.popitem(last=False)
+            self.bytes -= _nbytes(old_column)
+            self.evictions += 1
+            self._spill(old_key, old_column)
+
+    def _spill(self, key, column):
+        if not self.spill_dir or not isinstance(column, np.ndarray) or column.dtype == object:
+            return
+        path = self._spill_path(key)
+        if os.path.exists(path):
+            return
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, "wb") as f:
+            np.save(f, column)
+        os.replace(partial, path)
+        self.spills += 1
+
+    def __contains__(self, key):
+        return key in self.entries or bool(self.spill_dir and os.path.exists(self._spill_path(key)))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        """Counters for reporting"""
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "evictions": self.evictions,
+            "spills": self.spills,
+            "hit_rate": self.hit_rate,
+        }
+
+    def summary(self):
+        stats = self.stats()
+        return (f"{stats['entries']} columns, {stats['bytes'] / 1e6:.1f} MB, hit rate {stats['hit_rate']:.0%} "
+                f"({stats['hits']} hits incl. {stats['disk_hits']} from disk, {stats['misses']} misses, "
+                f"{stats['evictions']} evicted, {stats['spills']} spilled)")
+
+
+def benchmark(symbols, bars, budget, spill_dir=None, paths=BENCHMARK_SCRIPTS):
+    """Run several scripts on the same symbols with and without a shared cache"""
+    import pine_parser as ast
+    from pine_runtime import Runtime, same_bars_security
+
+    scripts = []
+    for name in paths:
+        source = open(os.path.join(ROOT, name), encoding="utf-8").read().replace("{{SCRIPT_NAME}}", "Bench").replace("{{SCREEN_NUMBER}}", "1")
+        scripts.append((name, ast.parse(source)))
+    datasets = [ohlcv.synthetic(bars, seed=index) for index in range(symbols)]
+    print(f"Benchmark: {len(scripts)} scripts x {symbols} symbols x {bars:,} bars")
+
+    def run_all(cache):
+        start = time.perf_counter()
+        for data in datasets:
+            for _, script in scripts:
+                Runtime(script, record=False, cache=cache, security=same_bars_security).run(data)
+        return time.perf_counter() - start
+
+    plain = run_all(None)
+    cache = IndicatorCache(budget, spill_dir)
+    cold = run_all(cache)
+    cold_stats = cache.stats()
+    warm = run_all(cache)
+    print(f"  no cache:   {plain:.2f} s")
+    print(f"  cold cache: {cold:.2f} s (hit rate {cold_stats['hit_rate']:.0%}: indicators shared between scripts)")
+    print(f"  warm cache: {warm:.2f} s")
+    print(f"  {cache.summary()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared indicator cache statistics and benchmark")
+    parser.add_argument("--benchmark", action="store_true", help="Run the ATR and Kurutoga scripts on synthetic symbols")
+    parser.add_argument("--symbols", type=int, default=10, help="Synthetic symbols (default: 10)")
+    parser.add_argument("--bars", type=int, default=20_000, help="Bars per symbol (default: 20000)")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET / 2 ** 20, help="Memory budget in MB (default: 256)")
+    parser.add_argument("--spill", help="Directory for columns evicted from memory")
+    args = parser.parse_args()
+
+    if not args.benchmark:
+        parser.print_help()
+        return
+    benchmark(args.symbols, args.bars, int(args.budget * 2 ** 20), args.spill)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+OHLCV data helpers for local Pine Script execution
+
+Price history is passed around as a plain dict of equally long NumPy
+columns: `time` (int64, epoch milliseconds), `open`, `high`, `low`,
+`close` and `volume` (float64).
+"""
+
+import csv
+import os
+import sys
+
+import numpy as np
+
+COLUMNS = ("time", "open", "high", "low", "close", "volume")
+PRICE_COLUMNS = ("open", "high", "low", "close", "volume")
+
+# Accepted header spellings for each column
+_ALIASES = {
+    "time": ("time", "timestamp", "date", "datetime"),
+    "open": ("open", "o"),
+    "high": ("high", "h"),
+    "low": ("low", "l"),
+    "close": ("close", "c", "adj close"),
+    "volume": ("volume", "vol", "v"),
+}
+
+
+def _parse_time(value):
+    """Parse an epoch (seconds or milliseconds) or ISO date into epoch milliseconds"""
+    value = value.strip()
+    try:
+        number = float(value)
+        return int(number * 1000) if number < 1e11 else int(number)
+    except ValueError:
+        pass
+    stamp = np.datetime64(value.replace(" ", "T").rstrip("Z"), "ms")
+    return int(stamp.astype("int64"))
+
+
+def _column_map(header):
+    lowered = [name.strip().lower() for name in header]
+    mapping = {}
+    for column, aliases in _ALIASES.items():
+        for alias in aliases:
+            if alias in lowered:
+                mapping[column] = lowered.index(alias)
+                break
+    missing = [column for column in ("open", "high", "low", "close") if column not in mapping]
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(missing)}")
+    return mapping
+
+
+def load_csv(path):
+    """Load an OHLCV CSV file with a header row into a dict of columns"""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        mapping = _column_map(header)
+        rows = [row for row in reader if row]
+
+    data = {}
+    if "time" in mapping:
+        index = mapping["time"]
+        data["time"] = np.fromiter((_parse_time(row[index]) for row in rows), dtype=np.int64, count=len(rows))
+    else:
+        data["time"] = np.arange(len(rows), dtype=np.int64)
+    for column in PRICE_COLUMNS:
+        if column in mapping:
+            index = mapping[column]
+            data[column] = np.array([float(row[index]) if row[index] else np.nan for row in rows], dtype=np.float64)
+        else:
+            data[column] = np.zeros(len(rows), dtype=np.float64)
+    return data
+
+
+def load_parquet(path):
+    """Load an OHLCV Parquet file (requires pandas with a Parquet engine)"""
+    import pandas as pd
+
+    frame = pd.read_parquet(path)
+    frame.columns = [str(name).lower() for name in frame.columns]
+    data = {}
+    if "time" in frame.columns:
+        times = frame["time"]
+        if np.issubdtype(times.dtype, np.datetime64):
+            data["time"] = times.values.astype("datetime64[ms]").astype(np.int64)
+        else:
+            data["time"] = times.to_numpy(dtype=np.int64)
+    else:
+        data["time"] = np.arange(len(frame), dtype=np.int64)
+    for column in PRICE_COLUMNS:
+        data[column] = frame[column].to_numpy(dtype=np.float64) if column in frame.columns else np.zeros(len(frame))
+    return data
+
+
+def load(path):
+    """Load OHLCV data from a .csv or .parquet file or an ohlcv_store series directory"""
+    if os.path.isdir(path):
+        import ohlcv_store
+
+        if not ohlcv_store.is_series_dir(path):
+            raise ValueError(f"{path} is not an ohlcv_store <symbol>/<timeframe> directory")
+        return ohlcv_store.read_dir(path)
+    if path.lower().endswith((".parquet", ".pq")):
+        return load_parquet(path)
+    return load_csv(path)
+
+
+def synthetic(bars, seed=0, start_price=100.0, interval_ms=60_000):
+    """Generate a reproducible random-walk OHLCV series for tests and benchmarks"""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0, 0.002, bars)
+    close = start_price * np.exp(np.cumsum(returns))
+    open_ = np.concatenate(([start_price], close[:-1]))
+    spread = np.abs(rng.normal(0.0, 0.0015, bars)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.integers(100, 10_000, bars).astype(np.float64)
+    time = np.arange(bars, dtype=np.int64) * interval_ms + 1_600_000_000_000
+    return {"time": time, "open": open_, "high": high, "low": low, "close": close, "volume": volume}
+
+
+def bar_count(data):
+    """Number of bars in an OHLCV dict"""
+    return len(data["close"])
+
+
+def write_csv(data, path):
+    """Write an OHLCV dict to CSV"""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for row in zip(*(data[column] for column in COLUMNS)):
+            writer.writerow([int(row[0])] + [repr(float(value)) for value in row[1:]])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python scripts/ohlcv.py <bars> <output.csv>   # write a synthetic series")
+        sys.exit(1)
+    write_csv(synthetic(int(sys.argv[1])), sys.argv[2])
+    print(f"Wrote {sys.argv[1]} synthetic bars to {sys.argv[2]}")
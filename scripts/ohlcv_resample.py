@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Multi-timeframe resampling with request.security alignment
+
+Aggregates lower-timeframe OHLCV (usually 1-minute bars from ohlcv_store.py)
+into any Pine timeframe string: seconds (`"30S"`), minutes (`"5"`, `"60"`,
+`"240"`), days (`"D"`, `"3D"`), weeks (`"W"`) and months (`"M"`, `"3M"`).
+Bars are grouped by calendar bucket (shifted by the exchange's UTC offset, so
+daily bars follow the local trading day; weeks start on Monday) and reduced
+with NumPy `reduceat`, one pass per column. A resampled bar's time is the time
+of its first source bar and its `close_time` the end of its last one.
+
+Resampled series are mapped back onto a chart the way `request.security`
+does on historical bars:
+
+    lookahead_off  chart bar i sees the last higher-timeframe bar that has
+                   closed by the end of bar i (a daily value appears on the
+                   last intraday bar of that day)
+    lookahead_on   chart bar i sees the higher-timeframe bar containing it,
+                   including its final values (the well-known future leak)
+
+`gaps_on` leaves na on every chart bar except the one where a new
+higher-timeframe value arrives. Resampled series are cached per source,
+timeframe and offset with LRU eviction.
+
+Usage:
+    python scripts/ohlcv_resample.py --data prices/AAPL_1m.csv --timeframe D --output aapl_daily.csv
+    python scripts/ohlcv_resample.py --store data/ohlcv --symbol NSE:ABB --timeframe 60 --utc-offset 330
+    python scripts/ohlcv_resample.py --benchmark 3
+"""
+
+import argparse
+import re
+import sys
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import ohlcv
+
+MINUTE_MS = 60_000
+DAY_MS = 86_400_000
+WEEK_MS = 7 * DAY_MS
+EPOCH_MONDAY_MS = 4 * DAY_MS      # 1970-01-01 was a Thursday; the next Monday is day 4
+CACHE_ENTRIES = 32
+
+TIMEFRAME_RE = re.compile(r"^(\d*)([SDWM]?)$")
+
+
+def parse_timeframe(timeframe):
+    """(unit, count) for a Pine timeframe string; unit is 'S', 'min', 'D', 'W' or 'M'"""
+    match = TIMEFRAME_RE.match(str(timeframe).strip().upper())
+    if not match or not (match.group(1) or match.group(2)):
+        raise ValueError(f"not a Pine timeframe: {timeframe!r}")
+    count = int(match.group(1) or 1)
+    if count <= 0:
+        raise ValueError(f"not a Pine timeframe: {timeframe!r}")
+    return match.group(2) or "min", count
+
+
+def timeframe_ms(timeframe):
+    """Nominal bar length in milliseconds (months count as 30 days)"""
+    unit, count = parse_timeframe(timeframe)
+    return count * {"S": 1000, "min": MINUTE_MS, "D": DAY_MS, "W": WEEK_MS, "M": 30 * DAY_MS}[unit]
+
+
+def bar_period_ms(times):
+    """Typical spacing of a bar series (median of the first differences)"""
+    if len(times) < 2:
+        return MINUTE_MS
+    return int(np.median(np.diff(np.asarray(times[:10_000], dtype=np.int64))))
+
+
+def bucket_ids(times, timeframe, utc_offset_ms=0):
+    """Non-decreasing bucket number of every bar for `timeframe`"""
+    unit, count = parse_timeframe(timeframe)
+    local = np.asarray(times, dtype=np.int64) + utc_offset_ms
+    if unit == "M":
+        months = local.astype("datetime64[ms]").astype("datetime64[M]").astype(np.int64)
+        return months // count
+    if unit == "W":
+        return (local - EPOCH_MONDAY_MS) // (WEEK_MS * count)
+    return local // (count * {"S": 1000, "min": MINUTE_MS, "D": DAY_MS}[unit])
+
+
+def resample(data, timeframe, utc_offset_ms=0, source_period_ms=None):
+    """Aggregate an OHLCV dict into `timeframe` bars (plus a `close_time` column)"""
+    times = np.asarray(data["time"], dtype=np.int64)
+    if not len(times):
+        empty = {name: np.zeros(0, dtype=np.asarray(data[name]).dtype) for name in ohlcv.COLUMNS}
+        empty["close_time"] = np.zeros(0, dtype=np.int64)
+        return empty
+    ids = bucket_ids(times, timeframe, utc_offset_ms)
+    starts = np.flatnonzero(np.concatenate(([True], ids[1:] != ids[:-1])))
+    ends = np.append(starts[1:], len(times)) - 1
+    period = source_period_ms if source_period_ms is not None else bar_period_ms(times)
+    result = {
+        "time": times[starts],
+        "open": np.asarray(data["open"], dtype=np.float64)[starts],
+        "high": np.maximum.reduceat(np.asarray(data["high"], dtype=np.float64), starts),
+        "low": np.minimum.reduceat(np.asarray(data["low"], dtype=np.float64), starts),
+        "close": np.asarray(data["close"], dtype=np.float64)[ends],
+        "volume": np.add.reduceat(np.asarray(data["volume"], dtype=np.float64), starts),
+        "close_time": times[ends] + period,
+    }
+    return result
+
+
+def align(htf, chart_times, chart_period_ms=None, lookahead=False, gaps=False):
+    """Index of the higher-timeframe bar each chart bar sees (-1 = na), per request.security semantics"""
+    chart_times = np.asarray(chart_times, dtype=np.int64)
+    if lookahead:
+        index = np.searchsorted(htf["time"], chart_times, side="right") - 1
+    else:
+        period = chart_period_ms if chart_period_ms is not None else bar_period_ms(chart_times)
+        index = np.searchsorted(htf["close_time"], chart_times + period, side="right") - 1
+    if gaps and len(index):
+        repeated = np.concatenate(([False], index[1:] == index[:-1]))
+        index = np.where(repeated, -1, index)
+    return index
+
+
+def take(htf, index, columns=ohlcv.PRICE_COLUMNS):
+    """Higher-timeframe columns gathered at `index`, with NaN where the index is -1"""
+    missing = index < 0
+    safe = np.where(missing, 0, index)
+    aligned = {}
+    for name in columns:
+        values = np.asarray(htf[name], dtype=np.float64)
+        aligned[name] = np.where(missing, np.nan, values[safe] if len(values) else np.nan)
+    return aligned
+
+
+def security(data, chart_times, timeframe, lookahead=False, gaps=False, utc_offset_ms=0, resampler=None):
+    """OHLCV of `data` at `timeframe`, aligned to `chart_times` like request.security(..., close/open/...)"""
+    htf = resampler.get(data, timeframe, utc_offset_ms) if resampler else resample(data, timeframe, utc_offset_ms)
+    return take(htf, align(htf, chart_times, lookahead=lookahead, gaps=gaps))
+
+
+class Resampler:
+    """Resampled series cached per (source, timeframe, offset) with LRU eviction"""
+
+    def __init__(self, store=None, entries=CACHE_ENTRIES):
+        self.store = store
+        self.entries = entries
+        self.cache = OrderedDict()
+        self.hits = self.misses = 0
+
+    def _source_key(self, data):
+        # Store series are append-only memory maps, so (file, bars, first and last time) identifies them;
+        # in-memory arrays by id(), which stays unique because each cache entry keeps its source alive
+        close, times = data["close"], data["time"]
+        origin = getattr(close, "filename", None) or id(close)
+        return (origin, len(times), int(times[0]) if len(times) else None, int(times[-1]) if len(times) else None)
+
+    def get(self, data, timeframe, utc_offset_ms=0):
+        """Resampled `data` (an OHLCV dict) at `timeframe`, from the cache when possible"""
+        key = (self._source_key(data), str(timeframe).upper(), utc_offset_ms)
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key][1]
+        self.misses += 1
+        result = resample(data, timeframe, utc_offset_ms)
+        self.cache[key] = (data["close"], result)
+        if len(self.cache) > self.entries:
+            self.cache.popitem(last=False)
+        return result
+
+    def symbol(self, symbol, timeframe, source_timeframe="1", utc_offset_ms=0, start=None, end=None):
+        """Resample a stored symbol (needs a Store)"""
+        if self.store is None:
+            raise ValueError("Resampler has no ohlcv_store.Store")
+        return self.get(self.store.read(symbol, source_timeframe, start, end), timeframe, utc_offset_ms)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def benchmark(years=3, timeframes=("5", "60", "240", "D", "W", "M")):
+    """Time resampling and alignment on `years` of synthetic 24/7 minute bars"""
+    bars = int(years * 365 * 24 * 60)
+    data = ohlcv.synthetic(bars)
+    print(f"Benchmark: {bars:,} one-minute bars ({years} years)")
+    resampler = Resampler()
+    for timeframe in timeframes:
+        start = time.perf_counter()
+        htf = resampler.get(data, timeframe)
+        resampled = time.perf_counter() - start
+        start = time.perf_counter()
+        for lookahead in (False, True):
+            take(htf, align(htf, data["time"], MINUTE_MS, lookahead=lookahead), ("close",))
+        aligned = time.perf_counter() - start
+        start = time.perf_counter()
+        resampler.get(data, timeframe)
+        cached = time.perf_counter() - start
+        print(f"  {timeframe:>4}: {len(htf['time']):>9,} bars  resample {resampled * 1000:7.1f} ms "
+              f"({bars / resampled / 1e6:5.1f}M bars/s)  align x2 {aligned * 1000:7.1f} ms  "
+              f"cached {cached * 1e6:5.1f} us")
+    print(f"  cache hit rate: {resampler.hit_rate:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resample OHLCV data to a Pine timeframe")
+    parser.add_argument("--data", help="OHLCV CSV/Parquet file or ohlcv_store series directory")
+    parser.add_argument("--store", help="ohlcv_store directory (with --symbol)")
+    parser.add_argument("--symbol", help="Stored symbol to resample, e.g. NSE:ABB")
+    parser.add_argument("--source", default="1", help="Stored timeframe to resample from (default: 1)")
+    parser.add_argument("--timeframe", help="Target Pine timeframe, e.g. 5, 60, D, W, M")
+    parser.add_argument("--utc-offset", type=int, default=0, metavar="MINUTES",
+                        help="Exchange UTC offset for day/week/month boundaries (e.g. 330 for NSE)")
+    parser.add_argument("--output", help="Write the resampled bars to this CSV")
+    parser.add_argument("--benchmark", type=float, nargs="?", const=3, metavar="YEARS",
+                        help="Time resampling on synthetic minute data (default: 3 years)")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+        return
+    if not args.timeframe or not (args.data or (args.store and args.symbol)):
+        parser.error("--timeframe and either --data or --store/--symbol are required")
+
+    try:
+        if args.data:
+            source = ohlcv.load(args.data)
+        else:
+            import ohlcv_store
+            source = ohlcv_store.Store(args.store).read(args.symbol, args.source)
+        result = resample(source, args.timeframe, args.utc_offset * MINUTE_MS)
+    except (KeyError, ValueError, OSError) as e:
+        print(f"Error: {e.args[0] if isinstance(e, KeyError) else e}")
+        sys.exit(1)
+
+    print(f"{len(source['time']):,} bars -> {len(result['time']):,} {args.timeframe} bars")
+    if args.output:
+        ohlcv.write_csv(result, args.output)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
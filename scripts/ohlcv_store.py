@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Columnar OHLCV store
+
+Keeps price history for local execution and backtests in plain column files
+so nothing has to re-parse CSVs on every run. Every symbol (keyed by its
+exchange-prefixed name, e.g. `NSE:ABB` or `AAPL`) and timeframe gets its own
+directory of contiguous little-endian column files:
+
+    data/ohlcv/NSE_ABB/1D/time.i8     int64 epoch milliseconds, ascending
+    data/ohlcv/NSE_ABB/1D/open.f8     float64 (high, low, close and volume alike)
+
+Reads memory-map the files straight into NumPy arrays (no copy, no parse), and
+time ranges are cut by binary search on the time column. Ingestion is
+append-only: bars at or before the last stored time are skipped, so
+re-importing an overlapping file only adds the new tail. The time column is
+written last, so an interrupted append never exposes a partial bar.
+
+The bulk importer converts CSV/Parquet files (named after their symbol, as in
+screener_sim.py) on all cores; every symbol is written by one worker.
+A `<store>/<SYMBOL>/<TF>` directory can be passed wherever an OHLCV file is
+accepted (`--data`), since ohlcv.load() reads it through this module.
+
+Usage:
+    python scripts/ohlcv_store.py --import prices/us/*.csv --timeframe 1D
+    python scripts/ohlcv_store.py --list
+    python scripts/ohlcv_store.py --read NSE:ABB --timeframe 1D --start 2024-01-01 --end 2024-06-30
+    python scripts/pine_backtest.py strategy.pine --data data/ohlcv/AAPL/1D
+    python scripts/ohlcv_store.py --benchmark 100 --bars 100000
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import ohlcv
+from ticker_universe import filename_symbol, symbol_filename
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_STORE = os.path.join(ROOT, "data", "ohlcv")
+
+COLUMN_TYPES = {"time": np.dtype("<i8"), "open": np.dtype("<f8"), "high": np.dtype("<f8"),
+                "low": np.dtype("<f8"), "close": np.dtype("<f8"), "volume": np.dtype("<f8")}
+EXTENSIONS = {"time": ".i8", "open": ".f8", "high": ".f8", "low": ".f8", "close": ".f8", "volume": ".f8"}
+IMPORT_EXTENSIONS = (".csv", ".parquet", ".pq")
+
+# Bar spacing (milliseconds) -> Pine timeframe string, used when importing without --timeframe
+TIMEFRAMES = [(60_000, "1"), (300_000, "5"), (900_000, "15"), (1_800_000, "30"), (3_600_000, "60"),
+              (14_400_000, "240"), (86_400_000, "1D"), (604_800_000, "1W"), (2_592_000_000, "1M")]
+
+
+def column_path(directory, name):
+    return os.path.join(directory, name + EXTENSIONS[name])
+
+
+def is_series_dir(path):
+    """True if `path` is a symbol/timeframe directory of the store"""
+    return os.path.isfile(column_path(path, "time"))
+
+
+def stored_bars(directory):
+    """Complete bars in a series directory (the time column is the commit marker)"""
+    try:
+        return os.path.getsize(column_path(directory, "time")) // COLUMN_TYPES["time"].itemsize
+    except OSError:
+        return 0
+
+
+def read_dir(directory, start=None, end=None):
+    """Memory-mapped OHLCV columns of a series directory, optionally cut to [start, end] epoch ms"""
+    count = stored_bars(directory)
+    data = {}
+    for name, dtype in COLUMN_TYPES.items():
+        path = column_path(directory, name)
+        if count and os.path.exists(path):
+            data[name] = np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+        else:
+            data[name] = np.zeros(count, dtype=dtype)
+    if start is None and end is None:
+        return data
+    first = 0 if start is None else int(np.searchsorted(data["time"], start, side="left"))
+    last = count if end is None else int(np.searchsorted(data["time"], end, side="right"))
+    return {name: column[first:last] for name, column in data.items()}
+
+
+def append_dir(directory, data):
+    """Append bars newer than the stored ones to a series directory; returns the number appended"""
+    times = np.asarray(data["time"], dtype=np.int64)
+    order = np.argsort(times, kind="stable")
+    times = times[order]
+    keep = np.ones(len(times), dtype=bool)
+    keep[1:] = times[1:] != times[:-1]
+    count = stored_bars(directory)
+    if count:
+        with open(column_path(directory, "time"), "rb") as f:
+            f.seek((count - 1) * COLUMN_TYPES["time"].itemsize)
+            last = int(np.frombuffer(f.read(COLUMN_TYPES["time"].itemsize), dtype=COLUMN_TYPES["time"])[0])
+        keep &= times > last
+    rows = order[keep]
+    if not len(rows):
+        return 0
+    os.makedirs(directory, exist_ok=True)
+    offset = count * 8
+    for name, dtype in COLUMN_TYPES.items():
+        if name == "time":
+            continue
+        values = np.asarray(data[name], dtype=dtype)[rows] if name in data else np.zeros(len(rows), dtype=dtype)
+        _write_at(column_path(directory, name), offset, values)
+    _write_at(column_path(directory, "time"), offset, times[keep].astype(COLUMN_TYPES["time"]))
+    return len(rows)
+
+
+def _write_at(path, offset, values):
+    # Truncating first drops any tail left behind by an interrupted append
+    with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+        f.truncate(offset)
+        f.seek(offset)
+        f.write(values.tobytes())
+
+
+def infer_timeframe(times):
+    """Pine timeframe string closest to the median bar spacing"""
+    if len(times) < 2:
+        return "1D"
+    spacing = float(np.median(np.diff(np.asarray(times[:10_000], dtype=np.int64))))
+    return min(TIMEFRAMES, key=lambda item: abs(np.log(item[0] / max(spacing, 1.0))))[1]
+
+
+class Store:
+    """OHLCV series on disk, keyed by (symbol, timeframe)"""
+
+    def __init__(self, root=DEFAULT_STORE):
+        self.root = root
+        self._mapped = {}       # series directory -> (bars, memory-mapped columns)
+
+    def path(self, symbol, timeframe):
+        return os.path.join(self.root, symbol_filename(symbol), timeframe)
+
+    def symbols(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(filename_symbol(name) for name in os.listdir(self.root)
+                      if os.path.isdir(os.path.join(self.root, name)))
+
+    def timeframes(self, symbol):
+        directory = os.path.join(self.root, symbol_filename(symbol))
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name for name in os.listdir(directory) if is_series_dir(os.path.join(directory, name)))
+
+    def bars(self, symbol, timeframe):
+        return stored_bars(self.path(symbol, timeframe))
+
+    def append(self, symbol, timeframe, data):
+        """Append new bars; returns the number of bars actually added"""
+        return append_dir(self.path(symbol, timeframe), data)
+
+    def read(self, symbol, timeframe, start=None, end=None):
+        """Zero-copy columns for a symbol and timeframe; `start`/`end` are epoch ms or date strings"""
+        directory = self.path(symbol, timeframe)
+        count = stored_bars(directory)
+        mapped = self._mapped.get(directory)
+        if mapped is None or mapped[0] != count:
+            if not is_series_dir(directory):
+                raise KeyError(f"no {timeframe} data for {symbol} in {self.root}")
+            mapped = self._mapped[directory] = (count, read_dir(directory))
+        data = mapped[1]
+        if start is None and end is None:
+            return dict(data)
+        times = data["time"]
+        first = 0 if start is None else int(np.searchsorted(times, _as_time(start), side="left"))
+        last = count if end is None else int(np.searchsorted(times, _as_time(end), side="right"))
+        return {name: column[first:last] for name, column in data.items()}
+
+    def span(self, symbol, timeframe):
+        """(first time, last time, bars) of a stored series"""
+        data = self.read(symbol, timeframe)
+        if not len(data["time"]):
+            return None, None, 0
+        return int(data["time"][0]), int(data["time"][-1]), len(data["time"])
+
+
+def _as_time(value):
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    return ohlcv._parse_time(str(value))
+
+
+def _import_file(root, path, timeframe):
+    symbol = filename_symbol(os.path.splitext(os.path.basename(path))[0])
+    try:
+        data = ohlcv.load(path)
+    except (OSError, ValueError) as e:
+        return symbol, None, 0, str(e)
+    timeframe = timeframe or infer_timeframe(data["time"])
+    return symbol, timeframe, Store(root).append(symbol, timeframe, data), None
+
+
+def import_files(paths, root=DEFAULT_STORE, timeframe=None, jobs=None):
+    """Import OHLCV files on all cores; yields (symbol, timeframe, bars appended, error)"""
+    by_symbol = {}
+    for path in paths:
+        by_symbol.setdefault(os.path.splitext(os.path.basename(path))[0], []).append(path)
+    # Files of the same symbol are imported one after another (in path order) so appends never race
+    groups = [sorted(group) for group in by_symbol.values()]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for results in pool.map(_import_group, [(root, group, timeframe) for group in groups]):
+            yield from results
+
+
+def _import_group(args):
+    root, paths, timeframe = args
+    return [_import_file(root, path, timeframe) for path in paths]
+
+
+def collect_files(paths):
+    """Data files from a mix of files and directories"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if name.lower().endswith(IMPORT_EXTENSIONS))
+        else:
+            found.append(path)
+    return found
+
+
+def _format_time(value):
+    return str(np.datetime64(int(value), "ms")).replace("T", " ")
+
+
+def benchmark(symbols, bars, jobs=None):
+    """Time a bulk CSV import and memory-mapped range reads"""
+    workdir = tempfile.mkdtemp(prefix="ohlcv_store_")
+    try:
+        source = os.path.join(workdir, "csv")
+        os.makedirs(source)
+        for index in range(symbols):
+            ohlcv.write_csv(ohlcv.synthetic(bars, seed=index), os.path.join(source, f"SYM{index:04d}.csv"))
+        store = Store(os.path.join(workdir, "store"))
+        start = time.perf_counter()
+        added = sum(result[2] for result in import_files(collect_files([source]), store.root, "1", jobs))
+        elapsed = time.perf_counter() - start
+        print(f"  import: {symbols} files, {added:,} bars in {elapsed:.2f} s ({added / elapsed:,.0f} bars/s)")
+
+        start = time.perf_counter()
+        for index in range(symbols):
+            ohlcv.load(os.path.join(source, f"SYM{index:04d}.csv"))
+        csv_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        total = 0.0
+        for index in range(symbols):
+            data = store.read(f"SYM{index:04d}", "1")
+            total += float(data["close"].sum())
+        read_elapsed = time.perf_counter() - start
+        print(f"  full read + sum(close): {read_elapsed * 1000:.1f} ms vs CSV parse {csv_elapsed * 1000:.1f} ms "
+              f"({csv_elapsed / read_elapsed:,.0f}x)")
+
+        rng = np.random.default_rng(0)
+        first, last, _ = store.span("SYM0000", "1")
+        queries = 10_000
+        starts = rng.integers(first, last, queries)
+        start = time.perf_counter()
+        for query in range(queries):
+            store.read(f"SYM{query % symbols:04d}", "1", int(starts[query]), int(starts[query]) + 3_600_000)
+        sliced = time.perf_counter() - start
+        print(f"  {queries:,} time-range slices: {sliced * 1000:.1f} ms ({sliced / queries * 1e6:.1f} us/slice)")
+    finally:
+        shutil.rmtree(workdir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar, memory-mapped OHLCV store")
+    parser.add_argument("--store", default=DEFAULT_STORE, help="Store directory (default: data/ohlcv)")
+    parser.add_argument("--import", dest="imports", nargs="+", metavar="PATH",
+                        help="CSV/Parquet files or directories to append (file name = symbol, NSE_ABB.csv -> NSE:ABB)")
+    parser.add_argument("--timeframe", help="Timeframe for --import/--read, e.g. 1, 60, 1D (default: inferred)")
+    parser.add_argument("--jobs", type=int, help="Worker processes for --import (default: CPU count)")
+    parser.add_argument("--list", action="store_true", help="List stored symbols, timeframes and ranges")
+    parser.add_argument("--read", metavar="SYMBOL", help="Print (or --output) a stored series")
+    parser.add_argument("--start", help="Range start for --read (epoch or date)")
+    parser.add_argument("--end", help="Range end for --read (epoch or date)")
+    parser.add_argument("--output", help="Write the --read range to this CSV")
+    parser.add_argument("--benchmark", type=int, nargs="?", const=100, metavar="SYMBOLS",
+                        help="Time import and reads on synthetic files (default: 100)")
+    parser.add_argument("--bars", type=int, default=100_000, help="Bars per synthetic file for --benchmark")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(f"Benchmark: {args.benchmark} symbols x {args.bars:,} bars")
+        benchmark(args.benchmark, args.bars, args.jobs)
+        return
+
+    store = Store(args.store)
+    if args.imports:
+        files = collect_files(args.imports)
+        added = errors = 0
+        for symbol, timeframe, count, error in import_files(files, store.root, args.timeframe, args.jobs):
+            if error:
+                errors += 1
+                print(f"  error: {symbol}: {error}")
+            else:
+                added += count
+        print(f"Imported {len(files)} files: {added:,} new bars, {errors} errors")
+    elif args.list:
+        for symbol in store.symbols():
+            for timeframe in store.timeframes(symbol):
+                first, last, bars = store.span(symbol, timeframe)
+                span = f"{_format_time(first)} .. {_format_time(last)}" if bars else "empty"
+                print(f"  {symbol:<20} {timeframe:>4} {bars:>10,} bars  {span}")
+    elif args.read:
+        timeframes = [args.timeframe] if args.timeframe else store.timeframes(args.read)
+        if not timeframes:
+            print(f"No data for {args.read} in {store.root}")
+            sys.exit(1)
+        try:
+            data = store.read(args.read, timeframes[0], args.start, args.end)
+        except KeyError as e:
+            print(e.args[0])
+            sys.exit(1)
+        if args.output:
+            ohlcv.write_csv(data, args.output)
+            print(f"Wrote {len(data['time']):,} bars to {args.output}")
+        else:
+            print(f"{args.read} {timeframes[0]}: {len(data['time']):,} bars")
+            for row in zip(*(data[name][:5] for name in ohlcv.COLUMNS)):
+                print("  " + _format_time(row[0]) + "  " + "  ".join(f"{value:.6g}" for value in row[1:]))
+    else:
+        parser.error("nothing to do: use --import, --list, --read or --benchmark")
+
+
+if __name__ == "__main__":
+    main()
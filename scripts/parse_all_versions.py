@@ -1,10 +1,13 @@
-import re
 import json
 import os
-from bs4 import BeautifulSoup
 
-def parse_pine_script_toc_version(version):
+import reference_emitters
+
+VERSIONS = ["v3", "v4", "v5", "v6"]
+
+def parse_pine_script_toc_version(version, markdown=True):
     """Parse the Pine Script table of contents for a specific version and create a proper organization"""
+    from bs4 import BeautifulSoup
     
     # Read the table of contents file
     toc_file = f"pine_script_references/{version}/table_of_contents.html"
@@ -71,7 +74,8 @@ def parse_pine_script_toc_version(version):
     print(f"  Total items: {len(organized_content['all_items'])}")
     
     # Create markdown organization
-    create_markdown_organization(organized_content, version)
+    if markdown:
+        create_markdown_organization(organized_content, version)
     
     return organized_content
 
@@ -88,126 +92,15 @@ def determine_item_type(name):
     else:
         return "variable"
 
-def create_markdown_organization(organized_content, version):
-    """Create a markdown organization of the content"""
-    base_dir = f"pine_script_references/{version}"
-    
-    # Create categories directory
-    categories_dir = os.path.join(base_dir, "categories")
-    os.makedirs(categories_dir, exist_ok=True)
-    
-    # Create markdown files for each category
-    for category_name, items in organized_content["categories"].items():
-        # Create a safe filename
-        safe_filename = re.sub(r'[^\w\s-]', '', category_name).strip().lower()
-        safe_filename = re.sub(r'[-\s]+', '_', safe_filename) + ".md"
-        
-        filepath = os.path.join(categories_dir, safe_filename)
-        
-        # Create markdown content
-        markdown_content = f"# {category_name}\n\n"
-        
-        # Group items by type
-        functions = [item for item in items if item["type"] == "function"]
-        variables = [item for item in items if item["type"] == "variable"]
-        properties = [item for item in items if item["type"] == "property"]
-        constants = [item for item in items if item["type"] == "constant"]
-        
-        if functions:
-            markdown_content += "## Functions\n\n"
-            for func in functions:
-                markdown_content += f"- `{func['name']}`\n"
-            markdown_content += "\n"
-        
-        if variables:
-            markdown_content += "## Variables\n\n"
-            for var in variables:
-                markdown_content += f"- `{var['name']}`\n"
-            markdown_content += "\n"
-        
-        if properties:
-            markdown_content += "## Properties\n\n"
-            for prop in properties:
-                markdown_content += f"- `{prop['name']}`\n"
-            markdown_content += "\n"
-        
-        if constants:
-            markdown_content += "## Constants\n\n"
-            for const in constants:
-                markdown_content += f"- `{const['name']}`\n"
-            markdown_content += "\n"
-        
-        # Write to file
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.write(markdown_content)
-    
-    print(f"  Created {len(organized_content['categories'])} markdown files in {categories_dir}")
-    
-    # Create main README
-    create_main_readme(organized_content, base_dir, version)
-
-def create_main_readme(organized_content, base_dir, version):
-    """Create a main README file"""
-    readme_path = os.path.join(base_dir, "README.md")
-    
-    content = f"# Pine Script {version} Reference Manual\n\n"
-    content += f"This is an organized reference for Pine Script {version} functions, variables, and constants.\n\n"
-    
-    # Table of contents
-    content += "## Categories\n\n"
-    
-    for category_name, items in organized_content["categories"].items():
-        # Create a safe filename for linking
-        safe_filename = re.sub(r'[^\w\s-]', '', category_name).strip().lower()
-        safe_filename = re.sub(r'[-\s]+', '_', safe_filename) + ".md"
-        
-        content += f"- [{category_name}](categories/{safe_filename})\n"
-        
-        # Brief summary of items in category
-        functions = len([item for item in items if item["type"] == "function"])
-        variables = len([item for item in items if item["type"] == "variable"])
-        properties = len([item for item in items if item["type"] == "property"])
-        constants = len([item for item in items if item["type"] == "constant"])
-        
-        summary_parts = []
-        if functions > 0:
-            summary_parts.append(f"{functions} functions")
-        if variables > 0:
-            summary_parts.append(f"{variables} variables")
-        if properties > 0:
-            summary_parts.append(f"{properties} properties")
-        if constants > 0:
-            summary_parts.append(f"{constants} constants")
-        
-        if summary_parts:
-            content += f"  - {', '.join(summary_parts)}\n"
-    
-    content += "\n## Total Items\n\n"
-    total_items = len(organized_content["all_items"])
-    content += f"- **Total items:** {total_items}\n\n"
-    
-    # Type breakdown
-    type_counts = {}
-    for item in organized_content["all_items"]:
-        item_type = item["type"]
-        type_counts[item_type] = type_counts.get(item_type, 0) + 1
-    
-    content += "### By Type\n\n"
-    for item_type, count in sorted(type_counts.items()):
-        content += f"- **{item_type.capitalize()}s:** {count}\n"
-    
-    with open(readme_path, "w", encoding="utf-8") as f:
-        f.write(content)
-    
-    print(f"  Created main README at {readme_path}")
+def create_markdown_organization(organized_content, version, formats=("markdown",)):
+    """Write the category files and README (plus any other formats) in one pass over the items"""
+    reference_emitters.emit(organized_content, version, formats)
 
 def parse_all_versions():
     """Parse table of contents for all Pine Script versions"""
-    versions = ["v3", "v4", "v5", "v6"]
-    
     summary = {}
     
-    for version in versions:
+    for version in VERSIONS:
         print(f"Parsing Pine Script {version}...")
         organized_content = parse_pine_script_toc_version(version)
         
@@ -217,14 +110,17 @@ def parse_all_versions():
                 "total_items": len(organized_content["all_items"])
             }
     
-    # Create overall summary
+    write_overall_summary(summary)
+
+def write_overall_summary(summary):
+    """Write OVERALL_SUMMARY.md from per-version category and item counts"""
     with open("pine_script_references/OVERALL_SUMMARY.md", "w", encoding="utf-8") as f:
         f.write("# Pine Script References - Overall Summary\n\n")
         
         f.write("| Version | Categories | Total Items |\n")
         f.write("|---------|------------|-------------|\n")
         
-        for version in ["v3", "v4", "v5", "v6"]:
+        for version in VERSIONS:
             if version in summary:
                 cats = summary[version]["categories"]
                 items = summary[version]["total_items"]
@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""
+Persistent parsed-AST cache shared by the Pine tools
+
+Every tool that reads .pine files (engines, backtester, screener simulator,
+repaint and budget checks, template catalog) goes through
+pine_parser.parse() / parse_file(), which look scripts up here first. Parsed
+scripts are stored in .cache/pine_ast/:
+
+- records are pickled Script trees (or the syntax error a source raised)
+  appended to a pack file, which is memory-mapped and unpickled from in
+  place
+- records are keyed by a hash of the source and PARSER_VERSION (a digest
+  of pine_parser.py itself, so any parser edit invalidates them); a cache
+  written by another parser version is discarded on open
+- the index also remembers each file's (mtime, size) and key, so a repeat
+  run over unchanged files is a stat and a load, without reading or
+  hashing the source (the warm-start path); a touched but unchanged file is
+  still a hit by hash
+- the pack is bounded (MAX_BYTES): least recently used records are evicted
+  and the pack is compacted once half of it is dead
+
+The index is written at exit, merged under a file lock with what other
+processes wrote meanwhile. Hits and misses are counted per process and in
+total. Set PINE_AST_CACHE=0 to bypass the cache, or PINE_AST_CACHE_STATS=1
+to print the hit rate when a tool exits.
+
+Usage:
+    python scripts/pine_ast_cache.py --warm                 # every .pine file in the repository
+    python scripts/pine_ast_cache.py --warm templates screeners
+    python scripts/pine_ast_cache.py --stats
+    python scripts/pine_ast_cache.py --clear
+    python scripts/pine_ast_cache.py --benchmark
+"""
+
+import argparse
+import atexit
+import fcntl
+import glob
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+
+import pine_parser as ast
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(ROOT, ".cache", "pine_ast")
+MAX_BYTES = 64 << 20
+FORMAT = 2
+INDEX = "index.json"
+LOCK = "lock"
+COUNTERS = ("stat_hits", "hash_hits", "misses")
+
+
+def _empty_index(pack=1):
+    return {"format": FORMAT, "parser": ast.PARSER_VERSION, "pack": pack,
+            "entries": {}, "paths": {}, "totals": dict.fromkeys(COUNTERS + ("evicted",), 0)}
+
+
+class ASTCache:
+    """Content-addressed store of parsed scripts in a memory-mapped pack file"""
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.index = self._read_index()
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.added = set()
+        self.dirty = False
+        self._map = None
+        self._map_file = None
+
+    # Files
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _pack_path(self, pack):
+        return self._path(f"pack-{pack}.bin")
+
+    def _read_index(self):
+        try:
+            with open(self._path(INDEX), encoding="utf-8") as f:
+                index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return _empty_index()
+        if index.get("format") != FORMAT or index.get("parser") != ast.PARSER_VERSION:
+            return _empty_index(index.get("pack", 0) + 1)
+        return index
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def _view(self, offset, length):
+        """Bytes of a record, remapping the pack when it grew, was replaced or was recreated"""
+        path = self._pack_path(self.index["pack"])
+        stat = os.stat(path)
+        identity = (path, stat.st_dev, stat.st_ino)
+        if self._map is None or self._map_file != identity or offset + length > len(self._map):
+            self.close()
+            with open(path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._map_file = identity
+        return memoryview(self._map)[offset:offset + length]
+
+    # Records
+
+    @staticmethod
+    def key(data):
+        """Cache key of source bytes for the current parser version"""
+        return hashlib.sha1(ast.PARSER_VERSION.encode() + b"\0" + data).hexdigest()
+
+    def get(self, key):
+        """(found, script or PineSyntaxError) for a key"""
+        entry = self.index["entries"].get(key)
+        if entry is None:
+            return False, None
+        try:
+            with self._view(entry[0], entry[1]) as view:
+                stored, kind, value = pickle.loads(view)
+            if stored != key:
+                raise ValueError(f"record at {entry[0]} belongs to {stored}")
+        except (OSError, ValueError, TypeError, EOFError, pickle.UnpicklingError, AttributeError):
+            del self.index["entries"][key]
+            self.dirty = True
+            return False, None
+        entry[2] = time.time()
+        self.dirty = True
+        return True, (ast.PineSyntaxError(*value) if kind == "error" else value)
+
+    def put(self, key, value):
+        """Append a parsed script (or its PineSyntaxError), tagged with its key, to the current pack"""
+        if isinstance(value, ast.PineSyntaxError):
+            record = (key, "error", (str(value).split(": ", 1)[-1] if value.line else str(value), value.line))
+        else:
+            record = (key, "script", value)
+        data = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(self._path(LOCK), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            disk = self._read_index()
+            if disk["pack"] != self.index["pack"]:
+                # Another process compacted (or cleared) the pack: our offsets point into a deleted file
+                self.close()
+                self.index = disk
+                self.added = set()
+            fd = os.open(self._pack_path(self.index["pack"]), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+                offset = os.lseek(fd, 0, os.SEEK_CUR) - len(data)
+            finally:
+                os.close(fd)
+        self.index["entries"][key] = [offset, len(data), time.time()]
+        self.added.add(key)
+        self.dirty = True
+
+    def _lookup(self, key, parse):
+        found, value = self.get(key)
+        if not found:
+            self.counts["misses"] += 1
+            try:
+                value = parse()
+            except ast.PineSyntaxError as e:
+                value = e
+            self.put(key, value)
+        return found, value
+
+    @staticmethod
+    def _result(value):
+        if isinstance(value, ast.PineSyntaxError):
+            raise value
+        return value
+
+    def parse(self, source):
+        """Parsed Script for source text"""
+        found, value = self._lookup(self.key(source.encode("utf-8")), lambda: ast.parse(source, cache=False))
+        if found:
+            self.counts["hash_hits"] += 1
+        return self._result(value)
+
+    def parse_file(self, path):
+        """Parsed Script for a file; unchanged files are found by (mtime, size) alone"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        stamp = [stat.st_mtime_ns, stat.st_size]
+        known = self.index["paths"].get(path)
+        if known and known[:2] == stamp:
+            found, value = self.get(known[2])
+            if found:
+                self.counts["stat_hits"] += 1
+                return self._result(value)
+        with open(path, "rb") as f:
+            data = f.read()
+        key = self.key(data)
+        found, value = self._lookup(key, lambda: ast.parse(data.decode("utf-8"), cache=False))
+        if found:
+            self.counts["hash_hits"] += 1
+        self.index["paths"][path] = stamp + [key]
+        self.dirty = True
+        return self._result(value)
+
+    # Persistence
+
+    def size(self):
+        return sum(entry[1] for entry in self.index["entries"].values())
+
+    def _evict(self, index):
+        """Drop least recently used records until the live size is under the bound"""
+        entries = index["entries"]
+        live = sum(entry[1] for entry in entries.values())
+        if live <= self.max_bytes:
+            return 0
+        evicted = 0
+        for key in sorted(entries, key=lambda key: entries[key][2]):
+            if live <= self.max_bytes * 0.8:
+                break
+            live -= entries.pop(key)[1]
+            evicted += 1
+        index["paths"] = {path: known for path, known in index["paths"].items() if known[2] in entries}
+        return evicted
+
+    def _compact(self, index):
+        """Rewrite the pack without dead records once they take half of it"""
+        old = self._pack_path(index["pack"])
+        live = sum(entry[1] for entry in index["entries"].values())
+        if not os.path.exists(old) or os.path.getsize(old) <= 2 * max(live, 1 << 16):
+            return
+        new_pack = index["pack"] + 1
+        with open(old, "rb") as source, open(self._pack_path(new_pack) + ".tmp", "wb") as target:
+            for entry in sorted(index["entries"].values()):
+                source.seek(entry[0])
+                data = source.read(entry[1])
+                entry[0] = target.tell()
+                target.write(data)
+        os.replace(self._pack_path(new_pack) + ".tmp", self._pack_path(new_pack))
+        index["pack"] = new_pack
+        os.remove(old)
+
+    def save(self):
+        """Merge this process's changes into the on-disk index, evict and compact; returns records evicted"""
+        if not self.dirty and not any(self.counts.values()):
+            return 0
+        with open(self._path(LOCK), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            disk = self._read_index()
+            if disk["pack"] == self.index["pack"]:
+                for key, entry in self.index["entries"].items():
+                    known = disk["entries"].get(key)
+                    if key in self.added or (known and known[:2] == entry[:2]):
+                        disk["entries"][key] = [entry[0], entry[1], max(entry[2], known[2] if known else 0)]
+                disk["paths"].update({path: known for path, known in self.index["paths"].items()
+                                      if known[2] in disk["entries"]})
+            for name in COUNTERS:
+                disk["totals"][name] += self.counts[name]
+            evicted = self._evict(disk)
+            disk["totals"]["evicted"] += evicted
+            self.close()
+            self._compact(disk)
+            with open(self._path(INDEX + ".tmp"), "w", encoding="utf-8") as f:
+                json.dump(disk, f)
+            os.replace(self._path(INDEX + ".tmp"), self._path(INDEX))
+            for name in os.listdir(self.directory):
+                if name.startswith("pack-") and name != f"pack-{disk['pack']}.bin":
+                    os.remove(self._path(name))
+        self.index = disk
+        self.added = set()
+        self.dirty = False
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        return evicted
+
+    def clear(self):
+        self.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+        self.index = _empty_index()
+        self.added = set()
+        self.dirty = False
+
+
+def hit_rate(counts):
+    """Share of lookups answered from the cache"""
+    hits = counts["stat_hits"] + counts["hash_hits"]
+    total = hits + counts["misses"]
+    return hits / total if total else 0.0
+
+
+def describe(counts):
+    total = counts["stat_hits"] + counts["hash_hits"] + counts["misses"]
+    return (f"{total} lookups, {counts['stat_hits']} stat hits, {counts['hash_hits']} hash hits, "
+            f"{counts['misses']} misses ({hit_rate(counts):.0%} hit rate)")
+
+
+_default = None
+
+
+def default_cache():
+    """The process-wide cache, or None when disabled or not writable"""
+    global _default
+    if _default is None:
+        if os.environ.get("PINE_AST_CACHE", "1") == "0":
+            _default = False
+        else:
+            try:
+                _default = ASTCache()
+            except OSError:
+                _default = False
+            else:
+                atexit.register(_at_exit, _default)
+    return _default or None
+
+
+def _at_exit(cache):
+    counts = dict(cache.counts)
+    try:
+        cache.save()
+    except OSError:
+        pass
+    if os.environ.get("PINE_AST_CACHE_STATS") == "1" and any(counts.values()):
+        print(f"AST cache: {describe(counts)}", file=sys.stderr)
+
+
+def parse(source):
+    """pine_parser.parse() through the shared cache"""
+    cache = default_cache()
+    return cache.parse(source) if cache else ast.parse(source, cache=False)
+
+
+def parse_file(path):
+    """pine_parser.parse_file() through the shared cache"""
+    cache = default_cache()
+    return cache.parse_file(path) if cache else ast.parse_file(path, cache=False)
+
+
+def pine_files(paths=None):
+    """Every .pine file under the given files or directories (default: the repository)"""
+    found = []
+    for path in paths or [ROOT]:
+        if os.path.isdir(path):
+            found += glob.glob(os.path.join(path, "**", "*.pine"), recursive=True)
+        elif path.endswith(".pine"):
+            found.append(path)
+    return sorted(set(found))
+
+
+def warm(cache, files):
+    """Parse files into the cache; returns the number that failed to parse"""
+    failed = 0
+    for path in files:
+        try:
+            cache.parse_file(path)
+        except ast.PineSyntaxError:
+            failed += 1
+    return failed
+
+
+def benchmark(files, rounds=5):
+    """Cold, warm, touched and edited runs over the files, plus eviction under a small bound"""
+    with tempfile.TemporaryDirectory() as tmp:
+        copies = []
+        for number, path in enumerate(files):
+            copy = os.path.join(tmp, "src", f"{number}_{os.path.basename(path)}")
+            os.makedirs(os.path.dirname(copy), exist_ok=True)
+            shutil.copy(path, copy)
+            copies.append(copy)
+        size = sum(os.path.getsize(path) for path in copies)
+        print(f"{len(copies)} .pine files, {size / 1024:.0f} KB")
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for path in copies:
+                try:
+                    ast.parse_file(path, cache=False)
+                except ast.PineSyntaxError:
+                    pass
+        uncached = (time.perf_counter() - start) / rounds
+        print(f"{'run':<28} {'time':>9} {'vs parse':>9}  lookups")
+        print(f"{'no cache':<28} {uncached * 1000:>7.1f}ms {1:>8.1f}x")
+
+        directory = os.path.join(tmp, "cache")
+
+        def run(label):
+            cache = ASTCache(directory)
+            start = time.perf_counter()
+            warm(cache, copies)
+            elapsed = time.perf_counter() - start
+            counts = dict(cache.counts)
+            cache.save()
+            cache.close()
+            print(f"{label:<28} {elapsed * 1000:>7.1f}ms {uncached / elapsed:>8.1f}x  {describe(counts)}")
+
+        run("cold (empty cache)")
+        run("warm (new process)")
+        for path in copies:
+            os.utime(path)
+        run("touched, content unchanged")
+        with open(copies[0], "a", encoding="utf-8") as f:
+            f.write("\n// edited\n")
+        run("one file edited")
+        cache = ASTCache(directory)
+        print(f"Cache: {len(cache.index['entries'])} records, {cache.size() / 1024:.0f} KB "
+              f"({cache.size() / size:.1f}x the source)")
+        cache.close()
+
+        bound = cache.size() // 2
+        small = os.path.join(tmp, "small")
+        for label in ("bounded cold", "bounded warm"):
+            cache = ASTCache(small, max_bytes=bound)
+            warm(cache, copies)
+            counts = dict(cache.counts)
+            evicted = cache.save()
+            print(f"{label} ({bound / 1024:.0f} KB bound): {describe(counts)}, {evicted} evicted, "
+                  f"{cache.size() / 1024:.0f} KB kept")
+            cache.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Persistent parsed-AST cache for .pine files")
+    parser.add_argument("--warm", nargs="*", metavar="PATH", help="Parse these files or directories (default: repository)")
+    parser.add_argument("--stats", action="store_true", help="Show size and hit rates")
+    parser.add_argument("--clear", action="store_true", help="Delete the cache")
+    parser.add_argument("--max-mb", type=float, default=MAX_BYTES / (1 << 20), help="Size bound in MB (default: 64)")
+    parser.add_argument("--benchmark", action="store_true", help="Cold, warm and incremental timings on the repository's .pine files")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(pine_files(args.warm))
+        return
+    if args.warm is None and not (args.stats or args.clear):
+        parser.print_help()
+        return
+    cache = ASTCache(max_bytes=int(args.max_mb * (1 << 20)))
+    if args.clear:
+        cache.clear()
+        print(f"Cleared {cache.directory}")
+    if args.warm is not None:
+        files = pine_files(args.warm)
+        start = time.perf_counter()
+        failed = warm(cache, files)
+        print(f"Warmed {len(files)} files in {(time.perf_counter() - start) * 1000:.0f} ms "
+              f"({failed} with syntax errors): {describe(cache.counts)}")
+        cache.save()
+    if args.stats:
+        totals = cache.index["totals"]
+        print(f"{cache.directory}: {len(cache.index['entries'])} records, {cache.size() / 1024:.0f} KB "
+              f"of {cache.max_bytes / (1 << 20):.0f} MB, {len(cache.index['paths'])} files known, "
+              f"parser version {cache.index['parser']}")
+        print(f"All runs: {describe(totals)}, {totals['evicted']} evicted")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
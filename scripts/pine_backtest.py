@@ -0,0 +1,759 @@
+#!/usr/bin/env python3
+"""
+Local strategy backtester for Pine Script strategies
+
+Runs a `strategy()` script over CSV/Parquet OHLCV data and simulates the
+broker the way TradingView does by default:
+
+- Market orders placed on a bar are filled at the next bar's open
+  (`process_orders_on_close=true` fills them at the same bar's close)
+- `strategy.entry` reverses an opposite position and respects `pyramiding`;
+  `strategy.order` nets against the position; `strategy.close`,
+  `strategy.close_all`, `strategy.exit` (stop/limit/profit/loss) and
+  `strategy.cancel` are supported, with FIFO trade closing
+- Quantity follows `default_qty_type`/`default_qty_value` unless `qty` is
+  given; `margin_long`/`margin_short` trigger margin calls that liquidate
+  part of the position when equity falls below the required margin
+- Commission (`percent`, `cash_per_contract`, `cash_per_order`) and
+  slippage in ticks are applied to every fill
+
+Scripts that only *place* orders get their order signals from the vectorized
+engine, so the Python loop only visits bars where something happens. Scripts
+that read `strategy.position_size` and friends run bar by bar with the
+broker attached. Trades are kept in growable NumPy arrays and the equity
+curve is rebuilt from the fills in one vectorized pass.
+
+Usage:
+    python scripts/pine_backtest.py atr_retracement_ema_strategy.pine --data prices.csv
+    python scripts/pine_backtest.py --trades trades.csv --equity equity.csv
+    python scripts/pine_backtest.py --benchmark --bars 5000000   # built-in EMA cross strategy
+"""
+
+import argparse
+import csv
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+import ohlcv
+import pine_parser as ast
+from pine_runtime import Runtime
+from pine_vector_engine import (
+    STRATEGY_CONSTANTS, PineEvalError, VectorEngine, VectorizationError, _parse_overrides, literal_value,
+)
+
+# strategy.* values a script can read while it runs
+STATE_NAMES = {
+    "position_size", "position_avg_price", "position_entry_name", "equity",
+    "netprofit", "openprofit", "grossprofit", "grossloss", "closedtrades",
+    "opentrades", "wintrades", "losstrades", "eventrades", "initial_capital",
+    "max_drawdown",
+}
+
+DEFAULT_SETTINGS = {
+    "initial_capital": 1_000_000.0,
+    "default_qty_type": "fixed",
+    "default_qty_value": 1.0,
+    "pyramiding": 1,
+    "margin_long": 100.0,
+    "margin_short": 100.0,
+    "commission_type": "percent",
+    "commission_value": 0.0,
+    "slippage": 0,
+    "process_orders_on_close": False,
+    "mintick": 0.01,
+}
+
+# Always-in-the-market EMA cross used by --benchmark (the ATR strategy rarely trades)
+BENCHMARK_STRATEGY = """//@version=5
+strategy("EMA Cross Benchmark", overlay=true, commission_type=strategy.commission.percent, commission_value=0.05)
+fastLength = input.int(9, "Fast Length")
+slowLength = input.int(21, "Slow Length")
+fast = ta.ema(close, fastLength)
+slow = ta.ema(close, slowLength)
+if ta.crossover(fast, slow)
+    strategy.entry("Long", strategy.long)
+if ta.crossunder(fast, slow)
+    strategy.entry("Short", strategy.short)
+"""
+
+_SCAN_CHUNK = 256
+_SCAN_CHUNK_MAX = 65536
+
+
+class TradeLog:
+    """Closed trades in parallel NumPy arrays that double in size when full"""
+
+    FIELDS = (
+        ("entry_bar", np.int64), ("exit_bar", np.int64),
+        ("entry_price", np.float64), ("exit_price", np.float64),
+        ("qty", np.float64), ("pnl", np.float64), ("commission", np.float64),
+        ("entry_id", np.int32), ("exit_id", np.int32),
+    )
+
+    def __init__(self, capacity=1024):
+        self.count = 0
+        self.capacity = capacity
+        self.arrays = {name: np.zeros(capacity, dtype=dtype) for name, dtype in self.FIELDS}
+        self.names = []          # interned order ids
+        self._ids = {}
+
+    def intern(self, name):
+        name = "" if name is None else str(name)
+        if name not in self._ids:
+            self._ids[name] = len(self.names)
+            self.names.append(name)
+        return self._ids[name]
+
+    def append(self, entry_bar, exit_bar, entry_price, exit_price, qty, pnl, commission, entry_id, exit_id):
+        if self.count == self.capacity:
+            self.capacity *= 2
+            for name, array in self.arrays.items():
+                grown = np.zeros(self.capacity, dtype=array.dtype)
+                grown[:self.count] = array[:self.count]
+                self.arrays[name] = grown
+        i = self.count
+        a = self.arrays
+        a["entry_bar"][i] = entry_bar
+        a["exit_bar"][i] = exit_bar
+        a["entry_price"][i] = entry_price
+        a["exit_price"][i] = exit_price
+        a["qty"][i] = qty
+        a["pnl"][i] = pnl
+        a["commission"][i] = commission
+        a["entry_id"][i] = self.intern(entry_id)
+        a["exit_id"][i] = self.intern(exit_id)
+        self.count += 1
+
+    def column(self, name):
+        return self.arrays[name][:self.count]
+
+
+class Broker:
+    """Simulated broker: queues orders, fills them and keeps positions and trades"""
+
+    def __init__(self, data, settings=None):
+        self.settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+        self.open = np.asarray(data["open"], dtype=np.float64)
+        self.high = np.asarray(data["high"], dtype=np.float64)
+        self.low = np.asarray(data["low"], dtype=np.float64)
+        self.close = np.asarray(data["close"], dtype=np.float64)
+        self.bars = len(self.close)
+        self.cash = float(self.settings["initial_capital"])
+        self.position = 0.0
+        self.cursor = -1
+        self.pending = []        # market orders waiting for the next open
+        self.resting = []        # stop/limit entries and exits
+        self.open_trades = []    # [entry_id, entry_bar, entry_price, qty (signed), commission]
+        self.trades = TradeLog()
+        self.fills = [[], [], [], []]   # bar, signed qty, price, commission
+        self.margin_calls = 0
+        self.slippage = float(self.settings["slippage"]) * float(self.settings["mintick"])
+
+    # -- order intake -----------------------------------------------------
+
+    def submit(self, order, bar=None):
+        """Accept an order placed at the close of `bar` (default: current bar)"""
+        bar = self.cursor if bar is None else bar
+        order = dict(order, placed=bar)
+        action = order["action"]
+        if action in ("cancel", "cancel_all"):
+            keep = (lambda o: False) if action == "cancel_all" else (lambda o: o.get("id") != order.get("id"))
+            self.pending = [o for o in self.pending if keep(o)]
+            self.resting = [o for o in self.resting if keep(o)]
+            return
+        if action == "exit":
+            self.resting = [o for o in self.resting if not (o["action"] == "exit" and o.get("id") == order.get("id"))]
+            self.resting.append(order)
+            return
+        if action in ("entry", "order") and (_given(order.get("limit")) or _given(order.get("stop"))):
+            self.resting = [o for o in self.resting if o.get("id") != order.get("id") or o["action"] == "exit"]
+            order["qty"] = self._order_qty(order, bar)
+            self.resting.append(order)
+            return
+        if action in ("entry", "order"):
+            order["qty"] = self._order_qty(order, bar)
+        if self.settings["process_orders_on_close"]:
+            self._execute(order, self.close[bar], bar)
+        else:
+            self.pending.append(order)
+
+    def _order_qty(self, order, bar):
+        qty = order.get("qty")
+        if _given(qty):
+            return float(qty)
+        kind = self.settings["default_qty_type"]
+        value = float(self.settings["default_qty_value"])
+        price = self.close[bar]
+        if kind == "cash":
+            return value / price
+        if kind == "percent_of_equity":
+            return self.equity_at(price) * value / 100.0 / price
+        return value
+
+    # -- time -------------------------------------------------------------
+
+    def advance(self, to):
+        """Process every bar up to and including `to`: fills, exits and margin calls"""
+        while self.cursor < to:
+            bar = self.cursor + 1
+            if self.pending:
+                orders, self.pending = self.pending, []
+                for order in orders:
+                    self._execute(order, self._slipped(self.open[bar], order), bar)
+            if not self.resting and self._margin_level() is None:
+                self.cursor = to
+                return
+            hit = self._scan(bar, to)
+            if hit < 0:
+                self.cursor = to
+                return
+            self._trigger(hit)
+            self.cursor = hit
+
+    def finish(self):
+        self.advance(self.bars - 1)
+
+    def _margin_level(self):
+        """Price at which the open position triggers a margin call, as (column, op, level)
+
+        Equity at the bar's worst price is linear in that price, so the margin
+        test reduces to a threshold on the low (longs) or the high (shorts).
+        """
+        if self.position == 0:
+            return None
+        cash = self.cash
+        if self.position > 0:
+            rate = self.settings["margin_long"] / 100.0
+            # cash + q*w < q*w*rate  <=>  q*(1 - rate)*w < -cash
+            slope = self.position * (1.0 - rate)
+            if rate <= 0 or slope == 0:
+                return None if cash >= 0 or rate <= 0 else (self.low, ">=", -np.inf)
+            return (self.low, "<=" if slope > 0 else ">=", -cash / slope)
+        rate = self.settings["margin_short"] / 100.0
+        if rate <= 0:
+            return None
+        # cash - q*w < q*w*rate  <=>  w > cash / (q*(1 + rate))
+        return (self.high, ">", cash / (-self.position * (1.0 + rate)))
+
+    def _levels(self, order):
+        """Stop and limit prices of a resting order given the current position"""
+        stop, limit = order.get("stop"), order.get("limit")
+        stop = _at(stop, order["placed"])
+        limit = _at(limit, order["placed"])
+        if order["action"] == "exit":
+            size = self._exit_size(order)
+            if size == 0:
+                return None, None, 0.0
+            entry = self._average_price(order.get("from_entry"))
+            tick = float(self.settings["mintick"])
+            long = size > 0
+            if not _given(limit) and _given(order.get("profit")):
+                limit = entry + (1 if long else -1) * float(order["profit"]) * tick
+            if not _given(stop) and _given(order.get("loss")):
+                stop = entry - (1 if long else -1) * float(order["loss"]) * tick
+            return (stop if _given(stop) else None), (limit if _given(limit) else None), -size
+        direction = 1.0 if order.get("direction") == "long" else -1.0
+        return (stop if _given(stop) else None), (limit if _given(limit) else None), direction * order["qty"]
+
+    def _scan(self, start, to):
+        """First bar in [start, to] where a resting order or a margin call triggers, else -1"""
+        conditions = []
+        for order in self.resting:
+            stop, limit, qty = self._levels(order)
+            if qty > 0:
+                if stop is not None:
+                    conditions.append((self.high, ">=", stop))
+                if limit is not None:
+                    conditions.append((self.low, "<=", limit))
+            elif qty < 0:
+                if stop is not None:
+                    conditions.append((self.low, "<=", stop))
+                if limit is not None:
+                    conditions.append((self.high, ">=", limit))
+        margin = self._margin_level()
+        if margin is not None:
+            conditions.append(margin)
+        if not conditions:
+            return -1
+
+        position = start
+        chunk = _SCAN_CHUNK
+        while position <= to:
+            end = min(to + 1, position + chunk)
+            hit = np.zeros(end - position, dtype=bool)
+            for column, op, level in conditions:
+                window = column[position:end]
+                if op == ">=":
+                    hit |= window >= level
+                elif op == ">":
+                    hit |= window > level
+                else:
+                    hit |= window <= level
+            found = np.flatnonzero(hit)
+            if len(found):
+                return position + int(found[0])
+            position = end
+            chunk = min(chunk * 2, _SCAN_CHUNK_MAX)
+        return -1
+
+    def _trigger(self, bar):
+        """Fill whatever resting orders trigger on `bar`, then check margin"""
+        o, h, l = self.open[bar], self.high[bar], self.low[bar]
+        triggered = []
+        for order in self.resting:
+            stop, limit, qty = self._levels(order)
+            if qty == 0:
+                continue
+            candidates = []
+            if qty > 0:
+                if stop is not None and h >= stop:
+                    candidates.append(max(o, stop))
+                if limit is not None and l <= limit:
+                    candidates.append(min(o, limit))
+            else:
+                if stop is not None and l <= stop:
+                    candidates.append(min(o, stop))
+                if limit is not None and h >= limit:
+                    candidates.append(max(o, limit))
+            if candidates:
+                # The level nearer the open is assumed to be reached first
+                price = min(candidates, key=lambda level: abs(level - o))
+                triggered.append((order, price))
+        for order, price in triggered:
+            if order["action"] == "exit":
+                self._close(abs(self._exit_size(order)), price, bar, order.get("id"), order.get("from_entry"))
+            else:
+                self._execute(dict(order, limit=None, stop=None), price, bar)
+            if order in self.resting:
+                self.resting.remove(order)
+        self._margin_call(bar)
+        if self.position == 0:
+            self.resting = [order for order in self.resting if order["action"] != "exit"]
+
+    def _margin_call(self, bar):
+        if self.position == 0:
+            return
+        long = self.position > 0
+        rate = (self.settings["margin_long"] if long else self.settings["margin_short"]) / 100.0
+        worst = self.low[bar] if long else self.high[bar]
+        equity = self.cash + self.position * worst
+        required = abs(self.position) * worst * rate
+        if rate <= 0 or equity >= required:
+            return
+        # TradingView liquidates four times the amount needed to cover the loss
+        shortfall = (required - equity) / (worst * rate)
+        qty = min(abs(self.position), math.ceil(4 * shortfall))
+        self.margin_calls += 1
+        self._close(qty, worst, bar, "Margin call", None)
+
+    # -- fills ------------------------------------------------------------
+
+    def _slipped(self, price, order):
+        if not self.slippage:
+            return price
+        side = order.get("direction")
+        if order["action"] in ("close", "close_all"):
+            side = "short" if self.position > 0 else "long"
+        return price + self.slippage if side == "long" else price - self.slippage
+
+    def _commission(self, qty, price):
+        kind = self.settings["commission_type"]
+        value = float(self.settings["commission_value"])
+        if kind == "cash_per_contract":
+            return abs(qty) * value
+        if kind == "cash_per_order":
+            return value
+        return abs(qty) * price * value / 100.0
+
+    def _record_fill(self, bar, qty, price, commission):
+        self.cash -= qty * price + commission
+        self.position += qty
+        if abs(self.position) < 1e-12:
+            self.position = 0.0
+        fills = self.fills
+        fills[0].append(bar)
+        fills[1].append(qty)
+        fills[2].append(price)
+        fills[3].append(commission)
+
+    def _execute(self, order, price, bar):
+        action = order["action"]
+        if action == "close_all":
+            self._close(abs(self.position), price, bar, order.get("comment") or "Close all", None)
+        elif action == "close":
+            size = abs(self._entries_size(order.get("id")))
+            if _given(order.get("qty")):
+                size = min(size, float(order["qty"]))
+            self._close(size, price, bar, order.get("comment") or "Close " + str(order.get("id")), order.get("id"))
+        elif action == "entry":
+            direction = 1.0 if order.get("direction") == "long" else -1.0
+            if self.position * direction > 0:
+                if len(self.open_trades) >= int(self.settings["pyramiding"]):
+                    return
+            elif self.position != 0:
+                self._close(abs(self.position), price, bar, order.get("id"), None)
+            self._open(order.get("id"), direction * order["qty"], price, bar)
+        elif action == "order":
+            qty = (1.0 if order.get("direction") == "long" else -1.0) * order["qty"]
+            if self.position * qty < 0:
+                reduce = min(abs(qty), abs(self.position))
+                self._close(reduce, price, bar, order.get("id"), None)
+                qty += reduce if qty < 0 else -reduce
+            if qty:
+                self._open(order.get("id"), qty, price, bar)
+        if self.position == 0:
+            self.resting = [o for o in self.resting if o["action"] != "exit"]
+
+    def _open(self, entry_id, qty, price, bar):
+        commission = self._commission(qty, price)
+        self._record_fill(bar, qty, price, commission)
+        self.open_trades.append([entry_id, bar, price, qty, commission])
+
+    def _close(self, qty, price, bar, exit_id, entry_id):
+        """Close `qty` contracts FIFO, optionally only trades opened by `entry_id`"""
+        remaining = qty
+        kept = []
+        for trade in self.open_trades:
+            if remaining <= 1e-12 or (entry_id is not None and trade[0] != entry_id):
+                kept.append(trade)
+                continue
+            size = abs(trade[3])
+            part = min(size, remaining)
+            sign = 1.0 if trade[3] > 0 else -1.0
+            entry_commission = trade[4] * part / size
+            exit_commission = self._commission(part, price)
+            self._record_fill(bar, -sign * part, price, exit_commission)
+            pnl = sign * part * (price - trade[2]) - entry_commission - exit_commission
+            self.trades.append(trade[1], bar, trade[2], price, sign * part, pnl,
+                               entry_commission + exit_commission, trade[0], exit_id)
+            remaining -= part
+            if part < size:
+                trade[3] -= sign * part
+                trade[4] -= entry_commission
+                kept.append(trade)
+        self.open_trades = kept
+
+    # -- queries ----------------------------------------------------------
+
+    def _entries_size(self, entry_id):
+        return sum(trade[3] for trade in self.open_trades if entry_id is None or trade[0] == entry_id)
+
+    def _exit_size(self, order):
+        size = self._entries_size(order.get("from_entry"))
+        if _given(order.get("qty")):
+            size = math.copysign(min(abs(size), float(order["qty"])), size)
+        elif _given(order.get("qty_percent")):
+            size *= float(order["qty_percent"]) / 100.0
+        return size
+
+    def _average_price(self, entry_id=None):
+        trades = [trade for trade in self.open_trades if entry_id is None or trade[0] == entry_id]
+        size = sum(abs(trade[3]) for trade in trades)
+        if not size:
+            return np.nan
+        return sum(abs(trade[3]) * trade[2] for trade in trades) / size
+
+    def equity_at(self, price):
+        return self.cash + self.position * price
+
+    def value(self, name):
+        """Current value of `strategy.<name>` for scripts that read broker state"""
+        bar = max(self.cursor, 0)
+        pnl = self.trades.column("pnl")
+        if name == "position_size":
+            return self.position
+        if name == "position_avg_price":
+            return self._average_price()
+        if name == "position_entry_name":
+            return self.open_trades[0][0] if self.open_trades else ""
+        if name == "equity":
+            return self.equity_at(self.close[bar])
+        if name == "initial_capital":
+            return float(self.settings["initial_capital"])
+        if name == "openprofit":
+            return sum(trade[3] * (self.close[bar] - trade[2]) for trade in self.open_trades)
+        if name == "netprofit":
+            return float(pnl.sum())
+        if name == "grossprofit":
+            return float(pnl[pnl > 0].sum())
+        if name == "grossloss":
+            return float(-pnl[pnl < 0].sum())
+        if name == "closedtrades":
+            return self.trades.count
+        if name == "opentrades":
+            return len(self.open_trades)
+        if name == "wintrades":
+            return int(np.count_nonzero(pnl > 0))
+        if name == "losstrades":
+            return int(np.count_nonzero(pnl < 0))
+        if name == "eventrades":
+            return int(np.count_nonzero(pnl == 0))
+        raise PineEvalError(f"strategy.{name} is not supported by the backtester")
+
+    # -- results ----------------------------------------------------------
+
+    def equity_curve(self):
+        """Equity at every bar close, rebuilt from the fills"""
+        cash_flow = np.zeros(self.bars)
+        position_change = np.zeros(self.bars)
+        if self.fills[0]:
+            bars = np.asarray(self.fills[0], dtype=np.int64)
+            qty = np.asarray(self.fills[1])
+            price = np.asarray(self.fills[2])
+            commission = np.asarray(self.fills[3])
+            np.add.at(cash_flow, bars, -(qty * price + commission))
+            np.add.at(position_change, bars, qty)
+        cash = float(self.settings["initial_capital"]) + np.cumsum(cash_flow)
+        position = np.cumsum(position_change)
+        return cash + position * self.close
+
+
+def _given(value):
+    if value is None:
+        return False
+    if isinstance(value, np.ndarray):
+        return True
+    return not (isinstance(value, float) and value != value)
+
+
+def _at(value, bar):
+    if isinstance(value, np.ndarray):
+        return float(value[bar])
+    return value
+
+
+def strategy_settings(declaration):
+    """Broker settings from the keyword arguments of `strategy()`"""
+    settings = {}
+    for key in DEFAULT_SETTINGS:
+        if key in declaration and declaration[key] is not None:
+            value = declaration[key]
+            settings[key] = STRATEGY_CONSTANTS.get(value, value) if isinstance(value, str) else value
+    return settings
+
+
+def declaration_arguments(script):
+    """Literal keyword arguments of the script's `strategy()` call"""
+    for stmt in script.body:
+        if isinstance(stmt, ast.ExprStmt) and isinstance(stmt.value, ast.Call) and stmt.value.func == "strategy":
+            arguments = {}
+            for key, value in stmt.value.kwargs:
+                try:
+                    arguments[key] = literal_value(value)
+                except PineEvalError:
+                    continue
+            return arguments
+    return {}
+
+
+def reads_broker_state(script):
+    """True if the script reads strategy.* values while it runs"""
+    for node in ast.walk(script):
+        if isinstance(node, ast.Name) and node.id.startswith("strategy."):
+            if node.id.split(".", 1)[1] in STATE_NAMES:
+                return True
+    return False
+
+
+def statistics(broker, data):
+    """TradingView-style performance summary"""
+    equity = broker.equity_curve()
+    log = broker.trades
+    pnl = log.column("pnl")
+    initial = float(broker.settings["initial_capital"])
+    wins = pnl[pnl > 0]
+    losses = pnl[pnl < 0]
+    peak = np.maximum.accumulate(np.concatenate(([initial], equity)))[1:]
+    drawdown = peak - equity
+    worst = int(np.argmax(drawdown)) if len(drawdown) else 0
+    returns = np.diff(equity) / equity[:-1] if len(equity) > 1 else np.zeros(0)
+    sharpe = np.nan
+    if len(returns) > 1 and np.std(returns) > 0:
+        step = np.median(np.diff(data["time"])) if len(data["time"]) > 1 else 86_400_000
+        periods = 365.25 * 86_400_000 / max(float(step), 1.0)
+        sharpe = float(np.mean(returns) / np.std(returns) * math.sqrt(periods))
+    close = broker.close
+    return {
+        "net_profit": float(equity[-1] - initial) if len(equity) else 0.0,
+        "net_profit_pct": float((equity[-1] - initial) / initial * 100) if len(equity) else 0.0,
+        "closed_pnl": float(pnl.sum()),
+        "open_pnl": float(equity[-1] - initial - pnl.sum()) if len(equity) else 0.0,
+        "gross_profit": float(wins.sum()),
+        "gross_loss": float(-losses.sum()),
+        "profit_factor": float(wins.sum() / -losses.sum()) if len(losses) else np.inf if len(wins) else np.nan,
+        "total_trades": log.count,
+        "winning_trades": len(wins),
+        "losing_trades": len(losses),
+        "percent_profitable": float(len(wins) / log.count * 100) if log.count else np.nan,
+        "avg_trade": float(pnl.mean()) if log.count else np.nan,
+        "avg_win": float(wins.mean()) if len(wins) else np.nan,
+        "avg_loss": float(losses.mean()) if len(losses) else np.nan,
+        "largest_win": float(wins.max()) if len(wins) else np.nan,
+        "largest_loss": float(losses.min()) if len(losses) else np.nan,
+        "avg_bars_in_trade": float(np.mean(log.column("exit_bar") - log.column("entry_bar"))) if log.count else np.nan,
+        "max_drawdown": float(drawdown[worst]) if len(drawdown) else 0.0,
+        "max_drawdown_pct": float(drawdown[worst] / peak[worst] * 100) if len(drawdown) and peak[worst] else 0.0,
+        "buy_and_hold_pct": float((close[-1] - close[0]) / close[0] * 100) if len(close) else 0.0,
+        "sharpe": sharpe,
+        "commission": float(log.column("commission").sum()),
+        "margin_calls": broker.margin_calls,
+        "open_position": float(broker.position),
+    }
+
+
+def _replay_orders(broker, orders):
+    """Feed vector-engine order masks to the broker in bar order"""
+    bars, sites = [], []
+    for index, order in enumerate(orders):
+        fired = np.flatnonzero(order["when"])
+        bars.append(fired)
+        sites.append(np.full(len(fired), index, dtype=np.int64))
+    if not bars:
+        return
+    bars = np.concatenate(bars)
+    sites = np.concatenate(sites)
+    sequence = np.lexsort((sites, bars))
+    for bar, site in zip(bars[sequence].tolist(), sites[sequence].tolist()):
+        broker.advance(bar)
+        order = {key: _at(value, bar) for key, value in orders[site].items() if key != "when"}
+        broker.submit(order, bar)
+
+
+def backtest(script, data, inputs=None, settings=None, engine=None, cache=None):
+    """Run a strategy script and return a dict with stats, trades and the equity curve"""
+    if isinstance(script, str):
+        script = ast.parse_file(script) if os.path.exists(script) else ast.parse(script)
+    if engine is None:
+        engine = "runtime" if reads_broker_state(script) else "vector"
+
+    result = None
+    if engine == "vector":
+        try:
+            result = VectorEngine(script, inputs, cache=cache).run(data)
+        except VectorizationError:
+            engine = "runtime"
+    if engine == "vector":
+        broker = Broker(data, dict(strategy_settings(result["declaration"]), **(settings or {})))
+        _replay_orders(broker, result["orders"])
+    else:
+        broker = Broker(data, dict(strategy_settings(declaration_arguments(script)), **(settings or {})))
+        result = Runtime(script, inputs, record=False, broker=broker, cache=cache).run(data)
+    broker.finish()
+
+    log = broker.trades
+    trades = {name: log.column(name) for name, _ in TradeLog.FIELDS}
+    trades["entry_id"] = [log.names[i] for i in trades["entry_id"]]
+    trades["exit_id"] = [log.names[i] for i in trades["exit_id"]]
+    return {
+        "title": result.get("title"),
+        "engine": engine,
+        "settings": broker.settings,
+        "bars": broker.bars,
+        "equity": broker.equity_curve(),
+        "trades": trades,
+        "stats": statistics(broker, data),
+    }
+
+
+def write_trades(report, path, data=None):
+    trades = report["trades"]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["entry_id", "exit_id", "entry_bar", "exit_bar", "entry_time", "exit_time",
+                         "qty", "entry_price", "exit_price", "pnl", "commission"])
+        for i in range(len(trades["pnl"])):
+            entry_bar, exit_bar = int(trades["entry_bar"][i]), int(trades["exit_bar"][i])
+            writer.writerow([
+                trades["entry_id"][i], trades["exit_id"][i], entry_bar, exit_bar,
+                int(data["time"][entry_bar]) if data is not None else "",
+                int(data["time"][exit_bar]) if data is not None else "",
+                repr(float(trades["qty"][i])), repr(float(trades["entry_price"][i])),
+                repr(float(trades["exit_price"][i])), repr(float(trades["pnl"][i])),
+                repr(float(trades["commission"][i])),
+            ])
+
+
+def write_equity(report, path, data):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["time", "equity"])
+        for stamp, value in zip(data["time"].tolist(), report["equity"].tolist()):
+            writer.writerow([stamp, repr(value)])
+
+
+def print_report(report):
+    stats = report["stats"]
+    print(f"{report['title']}: {report['bars']:,} bars ({report['engine']} engine)")
+    print(f"  Net profit:        {stats['net_profit']:,.2f} ({stats['net_profit_pct']:.2f}%)")
+    print(f"  Gross profit/loss: {stats['gross_profit']:,.2f} / {stats['gross_loss']:,.2f}")
+    print(f"  Profit factor:     {stats['profit_factor']:.3f}")
+    print(f"  Trades:            {stats['total_trades']} ({stats['winning_trades']} won, "
+          f"{stats['losing_trades']} lost, {stats['percent_profitable']:.1f}% profitable)")
+    print(f"  Avg trade:         {stats['avg_trade']:,.2f}")
+    print(f"  Max drawdown:      {stats['max_drawdown']:,.2f} ({stats['max_drawdown_pct']:.2f}%)")
+    print(f"  Sharpe ratio:      {stats['sharpe']:.3f}")
+    print(f"  Buy & hold:        {stats['buy_and_hold_pct']:.2f}%")
+    print(f"  Commission paid:   {stats['commission']:,.2f}")
+    if stats["margin_calls"]:
+        print(f"  Margin calls:      {stats['margin_calls']}")
+
+
+def benchmark(bars, path=None):
+    """Time a backtest on synthetic data with both signal engines"""
+    data = ohlcv.synthetic(bars)
+    script = ast.parse_file(path) if path else ast.parse(BENCHMARK_STRATEGY)
+    print(f"Benchmark: {bars:,} synthetic bars")
+    for engine in ("vector", "runtime"):
+        start = time.perf_counter()
+        report = backtest(script, data, engine=engine)
+        elapsed = time.perf_counter() - start
+        print(f"  {engine:8} {elapsed:7.2f} s  {bars / elapsed:12,.0f} bars/s  "
+              f"{report['stats']['total_trades']:,} trades, net {report['stats']['net_profit']:,.2f}")
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Backtest a Pine Script strategy on local OHLCV data")
+    parser.add_argument("script", nargs="?", help="Strategy script (default: atr_retracement_ema_strategy.pine)")
+    parser.add_argument("--data", help="OHLCV CSV or Parquet file (default: synthetic random walk)")
+    parser.add_argument("--bars", type=int, default=100_000, help="Synthetic bars when no data is given")
+    parser.add_argument("--input", action="append", metavar="NAME=VALUE", help="Override an input by variable name or title")
+    parser.add_argument("--capital", type=float, help="Override initial_capital")
+    parser.add_argument("--commission", type=float, help="Override commission_value")
+    parser.add_argument("--engine", choices=["vector", "runtime"], help="Force the signal engine")
+    parser.add_argument("--trades", help="Write closed trades to this CSV")
+    parser.add_argument("--equity", help="Write the equity curve to this CSV")
+    parser.add_argument("--benchmark", action="store_true", help="Time a backtest on synthetic data")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.bars, args.script)
+        return
+    script = args.script or os.path.join(root, "atr_retracement_ema_strategy.pine")
+
+    data = ohlcv.load(args.data) if args.data else ohlcv.synthetic(args.bars)
+    settings = {}
+    if args.capital is not None:
+        settings["initial_capital"] = args.capital
+    if args.commission is not None:
+        settings["commission_value"] = args.commission
+    try:
+        report = backtest(script, data, _parse_overrides(args.input), settings, args.engine)
+    except PineEvalError as e:
+        print(f"{script}: {e}")
+        sys.exit(1)
+    print_report(report)
+    if args.trades:
+        write_trades(report, args.trades, data)
+        print(f"Trades written to {args.trades}")
+    if args.equity:
+        write_equity(report, args.equity, data)
+        print(f"Equity curve written to {args.equity}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""
+Pine Script formatter
+
+Rewrites .pine files into a single canonical layout built on the parser in
+pine_parser.py:
+
+- 4-space block indentation for every `if`/`for`/`while`/`switch`/`=>` body
+- long statements wrapped after commas or `and`/`or` only, with continuation
+  lines indented by a non-multiple of four (never `\\` or `+` line breaks)
+- runs of `sNN = input.symbol(...)` declarations aligned into columns
+- at most two consecutive blank lines, one trailing newline
+
+Formatting is idempotent: formatting already formatted code is a no-op.
+Top-level statements are parsed and written one at a time, so large
+generated screeners format in linear time and constant extra memory.
+
+Usage:
+    python scripts/pine_formatter.py file.pine [dir ...]     # rewrite in place
+    python scripts/pine_formatter.py --check templates/       # pre-commit check
+    python scripts/pine_formatter.py - < in.pine > out.pine   # stream stdin
+    python scripts/pine_formatter.py --self-test              # idempotence cases
+"""
+
+import argparse
+import difflib
+import io
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pine_parser as ast
+from pine_parser import BINARY_PRECEDENCE, PineSyntaxError
+
+DEFAULT_LINE_LENGTH = 120
+INDENT = "    "
+CONTINUATION = "  "
+MAX_BLANK_LINES = 2
+
+
+class _Break:
+    """A place where a line may be wrapped; `text` is used when it is not"""
+
+    __slots__ = ("depth", "text")
+
+    def __init__(self, depth, text=" "):
+        self.depth = depth
+        self.text = text
+
+
+# ---------------------------------------------------------------------------
+# Expressions
+# ---------------------------------------------------------------------------
+
+def _precedence(node):
+    if node.parens:
+        return 100
+    if isinstance(node, ast.Ternary):
+        return 0
+    if isinstance(node, ast.BinOp):
+        return BINARY_PRECEDENCE[node.op]
+    if isinstance(node, ast.UnaryOp):
+        return 7
+    if isinstance(node, ast.Num) and node.value < 0:
+        return 7
+    return 100
+
+
+def _starts_with_sign(node):
+    """True if `node` is written starting with a `+` or `-`"""
+    if node.parens:
+        return False
+    if isinstance(node, ast.UnaryOp):
+        return node.op in ("+", "-")
+    return isinstance(node, ast.Num) and node.raw.startswith(("+", "-"))
+
+
+def _emit(node, out, depth):
+    if node.parens:
+        out.append("(")
+        _emit_bare(node, out, depth + 1)
+        out.append(")")
+    else:
+        _emit_bare(node, out, depth)
+
+
+def _emit_wrapped(node, out, depth, needs_parens):
+    if needs_parens and not node.parens:
+        out.append("(")
+        _emit_bare(node, out, depth + 1)
+        out.append(")")
+    else:
+        _emit(node, out, depth)
+
+
+def _emit_bare(node, out, depth):
+    if isinstance(node, (ast.Num, ast.Str)):
+        out.append(node.raw)
+    elif isinstance(node, ast.Bool):
+        out.append("true" if node.value else "false")
+    elif isinstance(node, ast.Na):
+        out.append("na")
+    elif isinstance(node, ast.Color):
+        out.append(node.value)
+    elif isinstance(node, ast.Placeholder):
+        out.append("{{" + node.name + "}}")
+    elif isinstance(node, ast.Name):
+        out.append(node.id)
+    elif isinstance(node, ast.Call):
+        out.append(node.func)
+        if node.type_args:
+            out.append("<" + ", ".join(node.type_args) + ">")
+        out.append("(")
+        items = [(None, arg) for arg in node.args] + list(node.kwargs)
+        for index, (keyword, value) in enumerate(items):
+            if index:
+                out.append(",")
+                out.append(_Break(depth + 1))
+            if keyword is not None:
+                out.append(f"{keyword} = ")
+            _emit(value, out, depth + 1)
+        out.append(")")
+    elif isinstance(node, ast.Index):
+        _emit_wrapped(node.value, out, depth, _precedence(node.value) < 100)
+        out.append("[")
+        _emit(node.offset, out, depth + 1)
+        out.append("]")
+    elif isinstance(node, ast.UnaryOp):
+        out.append("not " if node.op == "not" else node.op)
+        if node.op != "not" and _starts_with_sign(node.operand):
+            out.append(" ")     # `- -a`, never `--a`
+        _emit_wrapped(node.operand, out, depth, _precedence(node.operand) < 7)
+    elif isinstance(node, ast.BinOp):
+        precedence = BINARY_PRECEDENCE[node.op]
+        _emit_wrapped(node.left, out, depth, _precedence(node.left) < precedence)
+        if node.op in ("and", "or"):
+            out.append(f" {node.op}")
+            out.append(_Break(depth))
+        else:
+            out.append(f" {node.op} ")
+        _emit_wrapped(node.right, out, depth, _precedence(node.right) <= precedence)
+    elif isinstance(node, ast.Ternary):
+        _emit_wrapped(node.test, out, depth, _precedence(node.test) == 0)
+        out.append(" ?")
+        out.append(_Break(depth))
+        _emit_wrapped(node.body, out, depth, _precedence(node.body) == 0)
+        out.append(" :")
+        out.append(_Break(depth))
+        _emit(node.orelse, out, depth)
+    elif isinstance(node, ast.Tuple):
+        out.append("[")
+        for index, elt in enumerate(node.elts):
+            if index:
+                out.append(",")
+                out.append(_Break(depth + 1))
+            _emit(elt, out, depth + 1)
+        out.append("]")
+    else:
+        raise TypeError(f"cannot format {type(node).__name__} as an expression")
+
+
+def format_expression(node):
+    """Render an expression on a single line"""
+    out = []
+    _emit(node, out, 0)
+    return "".join(part.text if isinstance(part, _Break) else part for part in out)
+
+
+def _fit(parts, indent, line_length):
+    """Join parts into lines no longer than `line_length` where possible"""
+    flat = "".join(part.text if isinstance(part, _Break) else part for part in parts)
+    if len(indent) + len(flat) <= line_length:
+        return [indent + flat]
+
+    depths = sorted({part.depth for part in parts if isinstance(part, _Break)})
+    best = [indent + flat]
+    for max_depth in depths:
+        lines = _fill(parts, indent, line_length, max_depth)
+        best = lines
+        if all(len(line) <= line_length for line in lines):
+            break
+    return best
+
+
+def _fill(parts, indent, line_length, max_depth):
+    """Greedily pack the segments between allowed breaks onto lines"""
+    segments = []
+    current = []
+    for part in parts:
+        if isinstance(part, _Break) and part.depth <= max_depth:
+            segments.append("".join(current))
+            current = []
+        elif isinstance(part, _Break):
+            current.append(part.text)
+        else:
+            current.append(part)
+    segments.append("".join(current))
+
+    continuation = indent + CONTINUATION
+    lines = []
+    line = indent + segments[0]
+    for segment in segments[1:]:
+        candidate = line + " " + segment
+        if len(candidate) > line_length and line.strip():
+            lines.append(line)
+            line = continuation + segment
+        else:
+            line = candidate
+    lines.append(line)
+    return lines
+
+
+# ---------------------------------------------------------------------------
+# Statements
+# ---------------------------------------------------------------------------
+
+class _Formatter:
+    def __init__(self, line_length=DEFAULT_LINE_LENGTH):
+        self.line_length = line_length
+
+    def format_body(self, statements, level):
+        """Yield formatted lines for a sequence of statements"""
+        indent = INDENT * level
+        blanks = 0
+        started = False
+        symbols = []
+        for stmt in statements:
+            if isinstance(stmt, ast.Blank):
+                blanks += 1
+                continue
+            if _is_symbol_input(stmt):
+                if symbols and blanks:
+                    yield from self._symbol_block(symbols, indent)
+                    symbols = []
+                if started:
+                    yield from [""] * min(blanks, MAX_BLANK_LINES)
+                blanks = 0
+                started = True
+                symbols.append(stmt)
+                continue
+            if symbols:
+                yield from self._symbol_block(symbols, indent)
+                symbols = []
+            if started:
+                yield from [""] * min(blanks, MAX_BLANK_LINES)
+            blanks = 0
+            started = True
+            yield from self.format_statement(stmt, level)
+        if symbols:
+            yield from self._symbol_block(symbols, indent)
+
+    def _symbol_block(self, statements, indent):
+        rows = []
+        for stmt in statements:
+            call = stmt.value
+            first = format_expression(call.args[0])
+            rest = [format_expression(arg) for arg in call.args[1:]]
+            rest += [f"{key} = {format_expression(value)}" for key, value in call.kwargs]
+            rows.append((stmt.target, first, rest))
+        target_width = max(len(row[0]) for row in rows)
+        first_width = max(len(row[1]) + 1 for row in rows if row[2]) if any(row[2] for row in rows) else 0
+        for target, first, rest in rows:
+            if rest:
+                text = f"{target.ljust(target_width)} = input.symbol({(first + ',').ljust(first_width)} {', '.join(rest)})"
+            else:
+                text = f"{target.ljust(target_width)} = input.symbol({first})"
+            yield indent + text
+
+    def format_statement(self, stmt, level):
+        indent = INDENT * level
+        if isinstance(stmt, ast.Comment):
+            raw = getattr(stmt, "raw", None) or "// " + stmt.text
+            yield indent + raw.rstrip()
+            return
+
+        comment = stmt.comment
+        if isinstance(stmt, ast.Assign):
+            head = []
+            if stmt.mode:
+                head.append(stmt.mode + " ")
+            if stmt.type:
+                head.append(stmt.type + " ")
+            head.append(f"{stmt.target} = ")
+            yield from self._with_value(head, stmt.value, level, comment)
+        elif isinstance(stmt, ast.Reassign):
+            yield from self._with_value([f"{stmt.target} {stmt.op} "], stmt.value, level, comment)
+        elif isinstance(stmt, ast.TupleAssign):
+            yield from self._with_value([f"[{', '.join(stmt.targets)}] = "], stmt.value, level, comment)
+        elif isinstance(stmt, ast.ExprStmt):
+            yield from self._with_value([], stmt.value, level, comment)
+        elif isinstance(stmt, ast.BLOCK_EXPRESSIONS):
+            yield from self._block_statement([], stmt, level, comment)
+        elif isinstance(stmt, ast.FunctionDef):
+            params = []
+            for name, type_, default in stmt.params:
+                text = f"{type_} {name}" if type_ else name
+                if default is not None:
+                    text += f" = {format_expression(default)}"
+                params.append(text)
+            header = [f"{stmt.name}({', '.join(params)}) =>"]
+            if stmt.inline:
+                header.append(" ")
+                _emit(stmt.body[0].value, header, 0)
+                yield from self._lines(header, indent, comment)
+            else:
+                yield from self._lines(header, indent, comment)
+                yield from self.format_body(stmt.body, level + 1)
+        elif isinstance(stmt, ast.Break):
+            yield from self._lines(["break"], indent, comment)
+        elif isinstance(stmt, ast.Continue):
+            yield from self._lines(["continue"], indent, comment)
+        else:
+            raise TypeError(f"cannot format {type(stmt).__name__}")
+
+    def _with_value(self, head, value, level, comment):
+        if isinstance(value, ast.BLOCK_EXPRESSIONS):
+            yield from self._block_statement(head, value, level, comment)
+            return
+        parts = list(head)
+        _emit(value, parts, 0)
+        yield from self._lines(parts, INDENT * level, comment)
+
+    def _block_statement(self, head, stmt, level, comment):
+        indent = INDENT * level
+        parts = list(head)
+        comment = comment or stmt.comment
+        if isinstance(stmt, ast.If):
+            parts.append("if ")
+            _emit(stmt.test, parts, 0)
+            yield from self._lines(parts, indent, comment)
+            yield from self.format_body(stmt.body, level + 1)
+            yield from self._else(stmt, level)
+        elif isinstance(stmt, ast.For):
+            parts.append(f"for {stmt.var} = ")
+            _emit(stmt.start, parts, 0)
+            parts.append(" to ")
+            _emit(stmt.end, parts, 0)
+            if stmt.step is not None:
+                parts.append(" by ")
+                _emit(stmt.step, parts, 0)
+            yield from self._lines(parts, indent, comment)
+            yield from self.format_body(stmt.body, level + 1)
+        elif isinstance(stmt, ast.ForIn):
+            targets = stmt.targets[0] if len(stmt.targets) == 1 else f"[{', '.join(stmt.targets)}]"
+            parts.append(f"for {targets} in ")
+            _emit(stmt.iterable, parts, 0)
+            yield from self._lines(parts, indent, comment)
+            yield from self.format_body(stmt.body, level + 1)
+        elif isinstance(stmt, ast.While):
+            parts.append("while ")
+            _emit(stmt.test, parts, 0)
+            yield from self._lines(parts, indent, comment)
+            yield from self.format_body(stmt.body, level + 1)
+        elif isinstance(stmt, ast.Switch):
+            parts.append("switch")
+            if stmt.subject is not None:
+                parts.append(" ")
+                _emit(stmt.subject, parts, 0)
+            yield from self._lines(parts, indent, comment)
+            case_indent = INDENT * (level + 1)
+            for condition, body in stmt.cases:
+                case = []
+                if condition is not None:
+                    _emit(condition, case, 0)
+                    case.append(" ")
+                case.append("=>")
+                code = ast.strip_trivia(body)
+                if len(body) == 1 and isinstance(code[0], ast.ExprStmt):
+                    case.append(" ")
+                    _emit(code[0].value, case, 0)
+                    yield from self._lines(case, case_indent, code[0].comment)
+                else:
+                    yield from self._lines(case, case_indent, None)
+                    yield from self.format_body(body, level + 2)
+
+    def _else(self, stmt, level):
+        indent = INDENT * level
+        if not stmt.orelse:
+            return
+        nested = stmt.orelse[0]
+        if len(stmt.orelse) == 1 and isinstance(nested, ast.If) and nested.is_elif:
+            parts = ["else if "]
+            _emit(nested.test, parts, 0)
+            yield from self._lines(parts, indent, nested.comment)
+            yield from self.format_body(nested.body, level + 1)
+            yield from self._else(nested, level)
+        else:
+            yield from self._lines(["else"], indent, stmt.else_comment)
+            yield from self.format_body(stmt.orelse, level + 1)
+
+    def _lines(self, parts, indent, comment):
+        lines = _fit(parts, indent, self.line_length)
+        if comment:
+            lines[-1] += "  // " + comment
+        yield from lines
+
+
+def _is_symbol_input(stmt):
+    return (
+        isinstance(stmt, ast.Assign) and stmt.mode is None and stmt.type is None
+        and stmt.comment is None and isinstance(stmt.value, ast.Call)
+        and stmt.value.func == "input.symbol" and stmt.value.args and not stmt.value.parens
+    )
+
+
+def format_stream(lines, line_length=DEFAULT_LINE_LENGTH):
+    """Yield formatted output lines for an iterable of source lines"""
+    formatter = _Formatter(line_length)
+    statements = ast.iter_statements(lines)
+    yield from formatter.format_body(statements, 0)
+
+
+def format_source(source, line_length=DEFAULT_LINE_LENGTH):
+    """Format Pine source text and return the result"""
+    out = io.StringIO()
+    for line in format_stream(source.splitlines(True), line_length):
+        out.write(line)
+        out.write("\n")
+    return out.getvalue()
+
+
+def format_file(path, check=False, diff=False, line_length=DEFAULT_LINE_LENGTH):
+    """Format one file; returns (path, status, detail)
+
+    status is "unchanged", "changed" (or "would change" in check mode) or
+    "error".
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            original = f.read()
+        formatted = format_source(original, line_length)
+    except (PineSyntaxError, UnicodeDecodeError, OSError) as e:
+        return path, "error", str(e)
+
+    if formatted == original:
+        return path, "unchanged", ""
+
+    detail = ""
+    if diff:
+        detail = "".join(difflib.unified_diff(
+            original.splitlines(True), formatted.splitlines(True),
+            fromfile=path, tofile=path,
+        ))
+    if check:
+        return path, "would change", detail
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(formatted)
+    return path, "changed", detail
+
+
+# Source -> canonical output; each output must also format to itself
+IDEMPOTENCE_CASES = {
+    "b = - - a\n": "b = - -a\n",
+    "b = - - - a\n": "b = - - -a\n",
+    "b = -(-a)\n": "b = -(-a)\n",
+    "b = - -1\n": "b = - -1\n",
+    "b = a - -b\n": "b = a - -b\n",
+    "b = not not c\n": "b = not not c\n",
+}
+
+
+def self_test():
+    """Format IDEMPOTENCE_CASES; returns the number of failures"""
+    failed = 0
+    for source, expected in IDEMPOTENCE_CASES.items():
+        once = format_source(source)
+        twice = format_source(once)
+        if once != expected or twice != once:
+            failed += 1
+            print(f"FAIL {source.strip()!r}: {once.strip()!r}, then {twice.strip()!r} (expected {expected.strip()!r})")
+    print(f"{len(IDEMPOTENCE_CASES) - failed}/{len(IDEMPOTENCE_CASES)} idempotence cases passed")
+    return failed
+
+
+def collect_files(paths):
+    """Expand directories into the .pine files they contain"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+                files.extend(os.path.join(root, name) for name in sorted(names) if name.endswith(".pine"))
+        else:
+            files.append(path)
+    return files
+
+
+def _format_file_task(args):
+    return format_file(*args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Format Pine Script files")
+    parser.add_argument("paths", nargs="*", help="Files or directories to format ('-' for stdin)")
+    parser.add_argument("--check", action="store_true", help="Report files that would change and exit 1")
+    parser.add_argument("--diff", action="store_true", help="Show a unified diff of the changes")
+    parser.add_argument("--line-length", type=int, default=DEFAULT_LINE_LENGTH, help="Maximum line length")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Number of worker processes")
+    parser.add_argument("--self-test", action="store_true", help="Check the formatter on IDEMPOTENCE_CASES")
+    args = parser.parse_args()
+
+    if args.self_test:
+        sys.exit(1 if self_test() else 0)
+    if not args.paths:
+        parser.error("no files or directories given")
+
+    if args.paths == ["-"]:
+        try:
+            for line in format_stream(sys.stdin, args.line_length):
+                sys.stdout.write(line + "\n")
+        except PineSyntaxError as e:
+            print(f"error: {e}", file=sys.stderr)
+            sys.exit(2)
+        return
+
+    files = collect_files(args.paths)
+    tasks = [(path, args.check, args.diff, args.line_length) for path in files]
+    if args.jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            results = list(pool.map(_format_file_task, tasks, chunksize=max(1, len(tasks) // (args.jobs * 4))))
+    else:
+        results = [_format_file_task(task) for task in tasks]
+
+    changed = errors = 0
+    for path, status, detail in results:
+        if status == "error":
+            errors += 1
+            print(f"error: {path}: {detail}", file=sys.stderr)
+        elif status != "unchanged":
+            changed += 1
+            print(f"{'would reformat' if args.check else 'reformatted'} {path}")
+            if detail:
+                print(detail, end="")
+
+    unchanged = len(results) - changed - errors
+    print(f"{changed} file(s) {'would be ' if args.check else ''}reformatted, "
+          f"{unchanged} unchanged, {errors} error(s)", file=sys.stderr)
+    if errors:
+        sys.exit(2)
+    if args.check and changed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Parallel parameter sweep for Pine Script strategies
+
+Finds the `input.int`/`input.float`/`input.bool` (and `options=`) declarations
+of a strategy statically, builds a grid or random search space from their
+defaults and `minval`/`maxval`/`step` bounds, and runs one backtest per
+combination on a process pool.
+
+- OHLCV columns are copied once into a shared-memory block; workers map
+  NumPy views onto it instead of receiving pickled arrays per task. The
+  block's data fingerprint is computed once too and handed to the workers
+  as the data's `key`, so no backtest re-hashes the columns
+- Each worker keeps an indicator_cache.IndicatorCache of indicator columns
+  keyed by how they were computed, so combinations that share e.g.
+  `ta.atr(14)` or `ta.ema(close, 34)` compute it once per worker (with either
+  engine)
+- Combinations are sent in chunks and results are ranked by a chosen metric
+
+Usage:
+    python scripts/pine_optimize.py atr_retracement_ema_strategy.pine --data prices.csv
+    python scripts/pine_optimize.py strategy.pine --param atrLength=7:28:7 --param emaLength=21,34,55
+    python scripts/pine_optimize.py strategy.pine --random 200 --metric sharpe --output sweep.csv
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import random
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import ohlcv
+import pine_parser as ast
+from indicator_cache import IndicatorCache
+from pine_backtest import BENCHMARK_STRATEGY, backtest
+from pine_vector_engine import PineEvalError, data_fingerprint, literal_value
+
+SWEEPABLE = ("input.int", "input.float", "input.bool", "input.string", "input")
+METRICS = ("net_profit", "net_profit_pct", "profit_factor", "sharpe", "percent_profitable",
+           "max_drawdown", "total_trades", "avg_trade")
+DEFAULT_STEPS = 5
+CACHE_BYTES = 64 * 1024 * 1024     # per worker
+CHUNK_SIZE = 8
+
+
+def find_inputs(script):
+    """Static description of every sweepable top-level input declaration"""
+    inputs = []
+    for stmt in script.body:
+        if not (isinstance(stmt, ast.Assign) and isinstance(stmt.value, ast.Call)):
+            continue
+        call = stmt.value
+        if call.func not in SWEEPABLE:
+            continue
+        kwargs = dict(call.kwargs)
+        spec = {"name": stmt.target, "func": call.func, "line": stmt.line}
+        try:
+            default = literal_value(call.args[0] if call.args else kwargs["defval"])
+            for key in ("minval", "maxval", "step"):
+                if key in kwargs:
+                    spec[key] = literal_value(kwargs[key])
+            if "options" in kwargs and isinstance(kwargs["options"], ast.Tuple):
+                spec["options"] = [literal_value(elt) for elt in kwargs["options"].elts]
+        except (PineEvalError, KeyError, IndexError):
+            continue
+        if "title" in kwargs and isinstance(kwargs["title"], ast.Str):
+            spec["title"] = kwargs["title"].value
+        elif len(call.args) > 1 and isinstance(call.args[1], ast.Str):
+            spec["title"] = call.args[1].value
+        if isinstance(default, bool):
+            spec["type"] = "bool"
+        elif isinstance(default, int) and call.func != "input.float":
+            spec["type"] = "int"
+        elif isinstance(default, (int, float)):
+            spec["type"] = "float"
+            default = float(default)
+        elif "options" in spec:
+            spec["type"] = "options"
+        else:
+            continue
+        spec["default"] = default
+        inputs.append(spec)
+    return inputs
+
+
+def default_values(spec, steps=DEFAULT_STEPS):
+    """Candidate values for one input: bounds if declared, otherwise half to double the default"""
+    kind = spec["type"]
+    if kind == "bool":
+        return [False, True]
+    if kind == "options":
+        return list(spec["options"])
+    default = spec["default"]
+    low = spec.get("minval")
+    high = spec.get("maxval")
+    if low is None or low < default / 2:
+        low = default / 2 if default > 0 else default - abs(default or 1)
+    if high is None:
+        high = default * 2 if default > 0 else default + abs(default or 1)
+    if kind == "int":
+        low, high = max(int(round(low)), int(spec.get("minval", low))), int(round(high))
+        values = sorted({int(round(v)) for v in np.linspace(low, high, steps)} | {int(default)})
+        return values
+    if "step" in spec and spec["step"]:
+        step = float(spec["step"])
+        count = int((high - low) / step) + 1
+        if count <= steps * 4:
+            return sorted({round(low + i * step, 10) for i in range(count)} | {default})
+    return sorted({round(float(v), 10) for v in np.linspace(low, high, steps)} | {default})
+
+
+def parse_param(text, spec):
+    """Values from `lo:hi:step` or `v1,v2,...` for the given input spec"""
+    convert = {"int": int, "float": float, "bool": lambda v: v.lower() == "true"}.get(spec["type"], str)
+    if ":" in text:
+        parts = [float(part) for part in text.split(":")]
+        low, high = parts[0], parts[1]
+        step = parts[2] if len(parts) > 2 else (1 if spec["type"] == "int" else (high - low) / (DEFAULT_STEPS - 1))
+        values = []
+        value = low
+        while value <= high + 1e-9:
+            values.append(convert(round(value, 10)))
+            value += step
+        return values
+    return [convert(part) for part in text.split(",")]
+
+
+def build_space(inputs, overrides=None, names=None, steps=DEFAULT_STEPS):
+    """Map of input name -> candidate values"""
+    overrides = overrides or {}
+    space = OrderedDict()
+    for spec in inputs:
+        if names and spec["name"] not in names and spec["name"] not in overrides:
+            continue
+        if spec["name"] in overrides:
+            space[spec["name"]] = parse_param(overrides[spec["name"]], spec)
+        else:
+            space[spec["name"]] = default_values(spec, steps)
+    return space
+
+
+def grid(space):
+    """Every combination of the space"""
+    names = list(space)
+    for values in itertools.product(*(space[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def sample(space, count, seed=0):
+    """`count` distinct random combinations (fewer if the grid is smaller)"""
+    rng = random.Random(seed)
+    names = list(space)
+    total = 1
+    for name in names:
+        total *= len(space[name])
+    if total <= count:
+        yield from grid(space)
+        return
+    seen = set()
+    while len(seen) < count:
+        combo = tuple(rng.choice(space[name]) for name in names)
+        if combo not in seen:
+            seen.add(combo)
+            yield dict(zip(names, combo))
+
+
+# ---------------------------------------------------------------------------
+# Shared OHLCV data
+# ---------------------------------------------------------------------------
+
+def share_data(data):
+    """Copy OHLCV columns into one shared-memory block; returns (block, layout)"""
+    columns = [(name, np.ascontiguousarray(data[name])) for name in ohlcv.COLUMNS]
+    size = sum(column.nbytes for _, column in columns)
+    block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    layout = []
+    offset = 0
+    for name, column in columns:
+        view = np.ndarray(column.shape, dtype=column.dtype, buffer=block.buf, offset=offset)
+        view[:] = column
+        layout.append((name, column.dtype.str, offset, len(column)))
+        offset += column.nbytes
+    return block, layout
+
+
+def attach_data(name, layout):
+    """Map NumPy views onto a shared-memory block created by share_data()"""
+    block = shared_memory.SharedMemory(name=name)
+    data = {}
+    for column, dtype, offset, length in layout:
+        data[column] = np.ndarray((length,), dtype=np.dtype(dtype), buffer=block.buf, offset=offset)
+        data[column].flags.writeable = False
+    return block, data
+
+
+_worker = {}
+
+
+def _init_worker(block_name, layout, fingerprint, source, settings):
+    block, data = attach_data(block_name, layout)
+    data["key"] = fingerprint
+    _worker.update(block=block, data=data, script=ast.parse(source), settings=settings,
+                   cache=IndicatorCache(CACHE_BYTES))
+
+
+def _run_chunk(combos):
+    cache = _worker["cache"]
+    hits, misses = cache.hits, cache.misses
+    results = []
+    for combo in combos:
+        try:
+            report = backtest(_worker["script"], _worker["data"], combo, _worker["settings"], cache=cache)
+            results.append((combo, report["stats"], report["engine"]))
+        except PineEvalError as e:
+            results.append((combo, {"error": str(e)}, None))
+    return results, cache.hits - hits, cache.misses - misses
+
+
+def sweep(source, data, combos, jobs=None, settings=None):
+    """Backtest every combination in parallel; returns (results, indicator cache hit rate)"""
+    combos = list(combos)
+    chunks = [combos[i:i + CHUNK_SIZE] for i in range(0, len(combos), CHUNK_SIZE)]
+    block, layout = share_data(data)
+    fingerprint = data_fingerprint(data)
+    results = []
+    hits = lookups = 0
+    try:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(block.name, layout, fingerprint, source, settings or {})) as pool:
+            for chunk_results, chunk_hits, chunk_misses in pool.map(_run_chunk, chunks):
+                results.extend(chunk_results)
+                hits += chunk_hits
+                lookups += chunk_hits + chunk_misses
+    finally:
+        block.close()
+        block.unlink()
+    return results, (hits / lookups if lookups else 0.0)
+
+
+def rank(results, metric):
+    """Sort results best-first by `metric` (max_drawdown is minimised)"""
+    def score(item):
+        value = item[1].get(metric)
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            return float("-inf")
+        return -value if metric == "max_drawdown" else value
+    return sorted(results, key=score, reverse=True)
+
+
+def write_results(results, path, names):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(list(names) + list(METRICS))
+        for combo, stats, _engine in results:
+            writer.writerow([combo[name] for name in names] + [stats.get(metric, "") for metric in METRICS])
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Sweep a strategy's inputs with parallel backtests")
+    parser.add_argument("script", nargs="?", default=os.path.join(root, "atr_retracement_ema_strategy.pine"),
+                        help="Strategy script (default: atr_retracement_ema_strategy.pine)")
+    parser.add_argument("--data", help="OHLCV CSV or Parquet file (default: synthetic random walk)")
+    parser.add_argument("--bars", type=int, default=100_000, help="Synthetic bars when no data is given")
+    parser.add_argument("--param", action="append", metavar="NAME=SPEC",
+                        help="Values for an input: lo:hi[:step] or v1,v2,... (repeatable)")
+    parser.add_argument("--only", help="Comma-separated inputs to sweep (others keep their defaults)")
+    parser.add_argument("--steps", type=int, default=DEFAULT_STEPS, help="Grid points per input without --param")
+    parser.add_argument("--random", type=int, metavar="N", help="Sample N random combinations instead of the full grid")
+    parser.add_argument("--seed", type=int, default=0, help="Random search seed")
+    parser.add_argument("--metric", choices=METRICS, default="net_profit", help="Ranking metric")
+    parser.add_argument("--top", type=int, default=10, help="Rows to print")
+    parser.add_argument("--jobs", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--output", help="Write every result to this CSV")
+    parser.add_argument("--list", action="store_true", help="Only list the inputs and their search values")
+    parser.add_argument("--benchmark", action="store_true", help="Sweep the built-in EMA cross strategy")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        source = BENCHMARK_STRATEGY
+    else:
+        with open(args.script, "r", encoding="utf-8") as f:
+            source = f.read()
+    script = ast.parse(source)
+    inputs = find_inputs(script)
+    overrides = dict(pair.split("=", 1) for pair in args.param or [])
+    names = set(args.only.split(",")) if args.only else None
+    space = build_space(inputs, overrides, names, args.steps)
+
+    print("Search space:")
+    for spec in inputs:
+        values = space.get(spec["name"])
+        label = ", ".join(str(v) for v in values) if values else f"fixed at {spec['default']}"
+        print(f"  {spec['name']:<22} {spec['type']:<7} {label}")
+    if args.list:
+        return
+    if not space:
+        print("No sweepable inputs found")
+        sys.exit(1)
+
+    combos = list(sample(space, args.random, args.seed) if args.random else grid(space))
+    data = ohlcv.load(args.data) if args.data else ohlcv.synthetic(args.bars)
+    print(f"Running {len(combos):,} backtests on {ohlcv.bar_count(data):,} bars...")
+    start = time.perf_counter()
+    results, hit_rate = sweep(source, data, combos, args.jobs)
+    elapsed = time.perf_counter() - start
+    print(f"Done in {elapsed:.1f} s ({len(combos) / elapsed:.1f} backtests/s, "
+          f"indicator cache hit rate {hit_rate:.0%})")
+
+    errors = [stats["error"] for _, stats, _ in results if "error" in stats]
+    if errors:
+        print(f"{len(errors)} combinations failed, first error: {errors[0]}")
+    ranked = rank([item for item in results if "error" not in item[1]], args.metric)
+    names = list(space)
+    print(f"\nTop {min(args.top, len(ranked))} by {args.metric}:")
+    header = "  ".join(f"{name:>12}" for name in names)
+    print(f"{header}  {'net_profit':>12}  {'trades':>7}  {'win%':>6}  {'pf':>6}  {'max_dd':>10}")
+    for combo, stats, _engine in ranked[:args.top]:
+        row = "  ".join(f"{combo[name]!s:>12}" for name in names)
+        print(f"{row}  {stats['net_profit']:>12,.2f}  {stats['total_trades']:>7}  "
+              f"{stats['percent_profitable']:>6.1f}  {stats['profit_factor']:>6.2f}  {stats['max_drawdown']:>10,.2f}")
+    if args.output:
+        write_results(ranked, args.output, names)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1060 @@
+#!/usr/bin/env python3
+"""
+Pine Script parser
+
+Turns Pine Script source into a small AST that the formatter, execution
+engines and analysis tools share. The parser understands the subset of
+Pine used throughout this repository: assignments (`=`, `:=`, `+=`),
+`var`/`varip` declarations, typed declarations, tuple destructuring,
+`=>` functions, `if`/`else if`/`else`, `for ... to ... by`, `for ... in`,
+`while`, `switch`, calls with keyword arguments, `x[n]` history references
+and template placeholders such as `{{SCRIPT_NAME}}`.
+
+Blocks are indentation based (4 spaces or a tab). A line indented by a
+number of spaces that is not a multiple of four, or a line inside open
+brackets, continues the previous line.
+"""
+
+import hashlib
+import re
+import sys
+
+
+def _source_digest():
+    with open(__file__, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:16]
+
+
+# Changes with every edit to this file, so cached parse trees never outlive a parser change
+PARSER_VERSION = _source_digest()
+
+KEYWORDS = {
+    "if", "else", "for", "to", "by", "in", "while", "switch", "var", "varip",
+    "and", "or", "not", "true", "false", "na", "break", "continue",
+}
+
+TYPE_NAMES = {
+    "int", "float", "bool", "string", "color", "line", "label", "box",
+    "table", "linefill", "polyline", "chart.point", "matrix", "map", "array",
+}
+
+QUALIFIERS = {"const", "input", "simple", "series"}
+
+ASSIGN_OPS = {"=", ":=", "+=", "-=", "*=", "/=", "%="}
+
+# Binary operator precedence, higher binds tighter
+BINARY_PRECEDENCE = {
+    "or": 1,
+    "and": 2,
+    "==": 3, "!=": 3,
+    "<": 4, ">": 4, "<=": 4, ">=": 4,
+    "+": 5, "-": 5,
+    "*": 6, "/": 6, "%": 6,
+}
+
+_TOKEN_RE = re.compile(r"""
+    (?P<space>[ \t]+)
+  | (?P<comment>//.*)
+  | (?P<placeholder>\{\{\s*[A-Za-z_][A-Za-z0-9_]*\s*\}\})
+  | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<color>\#[0-9A-Fa-f]{6}(?:[0-9A-Fa-f]{2})?\b)
+  | (?P<number>(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*)
+  | (?P<op>=>|:=|\+=|-=|\*=|/=|%=|==|!=|<=|>=|[-+*/%<>=?:,()\[\]])
+""", re.VERBOSE)
+
+
+class PineSyntaxError(Exception):
+    """Raised when Pine source cannot be parsed"""
+
+    def __init__(self, message, line=0):
+        self.line = line
+        super().__init__(f"line {line}: {message}" if line else message)
+
+
+# ---------------------------------------------------------------------------
+# AST
+# ---------------------------------------------------------------------------
+
+class Node:
+    """Base class for AST nodes; `_fields` lists the child attributes"""
+
+    _fields = ()
+
+    def __init__(self, *args, line=0, **kwargs):
+        for name, value in zip(self._fields, args):
+            setattr(self, name, value)
+        for name in self._fields[len(args):]:
+            setattr(self, name, kwargs.pop(name, None))
+        self.line = line
+        for name, value in kwargs.items():
+            setattr(self, name, value)
+
+    def __repr__(self):
+        parts = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({parts})"
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self._fields
+        )
+
+    __hash__ = object.__hash__
+
+
+class Expr(Node):
+    parens = False
+
+
+class Stmt(Node):
+    comment = None
+
+
+# Expressions
+class Num(Expr):
+    _fields = ("value", "raw")
+
+
+class Str(Expr):
+    _fields = ("value", "raw")
+
+
+class Bool(Expr):
+    _fields = ("value",)
+
+
+class Na(Expr):
+    _fields = ()
+
+
+class Color(Expr):
+    _fields = ("value",)
+
+
+class Placeholder(Expr):
+    _fields = ("name",)
+
+
+class Name(Expr):
+    _fields = ("id",)
+
+
+class Call(Expr):
+    _fields = ("func", "args", "kwargs", "type_args")
+
+
+class Index(Expr):
+    _fields = ("value", "offset")
+
+
+class UnaryOp(Expr):
+    _fields = ("op", "operand")
+
+
+class BinOp(Expr):
+    _fields = ("op", "left", "right")
+
+
+class Ternary(Expr):
+    _fields = ("test", "body", "orelse")
+
+
+class Tuple(Expr):
+    _fields = ("elts",)
+
+
+# Statements
+class Script(Node):
+    _fields = ("body", "version")
+
+
+class Comment(Stmt):
+    _fields = ("text",)
+
+
+class Blank(Stmt):
+    _fields = ()
+
+
+class Assign(Stmt):
+    """`[var] [type] target = value`; `mode` is None, 'var' or 'varip'"""
+
+    _fields = ("target", "value", "mode", "type")
+
+
+class TupleAssign(Stmt):
+    _fields = ("targets", "value")
+
+
+class Reassign(Stmt):
+    """`target := value` or compound `target += value`"""
+
+    _fields = ("target", "op", "value")
+
+
+class ExprStmt(Stmt):
+    _fields = ("value",)
+
+
+class If(Stmt):
+    _fields = ("test", "body", "orelse")
+    is_elif = False
+    else_comment = None
+
+
+class For(Stmt):
+    _fields = ("var", "start", "end", "step", "body")
+
+
+class ForIn(Stmt):
+    _fields = ("targets", "iterable", "body")
+
+
+class While(Stmt):
+    _fields = ("test", "body")
+
+
+class Switch(Stmt):
+    """`cases` is a list of (condition, body) pairs; condition None is the default"""
+
+    _fields = ("subject", "cases")
+
+
+class FunctionDef(Stmt):
+    """`params` is a list of (name, type, default) tuples"""
+
+    _fields = ("name", "params", "body")
+    inline = False
+
+
+class Break(Stmt):
+    _fields = ()
+
+
+class Continue(Stmt):
+    _fields = ()
+
+
+# Structural statements that may also appear as the value of an assignment
+BLOCK_EXPRESSIONS = (If, For, ForIn, While, Switch)
+
+
+def iter_child_nodes(node):
+    """Yield the direct child nodes of `node`"""
+    for name in node._fields:
+        yield from _iter_nodes(getattr(node, name))
+
+
+def _iter_nodes(value):
+    if isinstance(value, Node):
+        yield value
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _iter_nodes(item)
+
+
+def walk(node):
+    """Yield `node` and every node below it, depth first"""
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        yield current
+        children = list(iter_child_nodes(current))
+        stack.extend(reversed(children))
+
+
+def block_value(body):
+    """Return the expression a block evaluates to (its last expression statement)"""
+    for stmt in reversed(body):
+        if isinstance(stmt, (Comment, Blank)):
+            continue
+        if isinstance(stmt, ExprStmt):
+            return stmt.value
+        if isinstance(stmt, BLOCK_EXPRESSIONS):
+            return stmt
+        return None
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Lexing
+# ---------------------------------------------------------------------------
+
+class Token:
+    __slots__ = ("type", "value", "line")
+
+    def __init__(self, type, value, line):
+        self.type = type
+        self.value = value
+        self.line = line
+
+    def __repr__(self):
+        return f"Token({self.type}, {self.value!r}, {self.line})"
+
+
+class LogicalLine:
+    """One statement line after joining continuation lines"""
+
+    __slots__ = ("kind", "indent", "tokens", "comment", "line", "text")
+
+    def __init__(self, kind, indent, line, text=""):
+        self.kind = kind          # "code", "comment" or "blank"
+        self.indent = indent
+        self.tokens = []
+        self.comment = None
+        self.line = line
+        self.text = text
+
+    @property
+    def level(self):
+        return self.indent // 4
+
+    def starts_with(self, value):
+        return bool(self.tokens) and self.tokens[0].value == value
+
+
+def _measure_indent(text):
+    indent = 0
+    for char in text:
+        if char == " ":
+            indent += 1
+        elif char == "\t":
+            indent += 4
+        else:
+            break
+    return indent
+
+
+def _tokenize_segment(text, lineno):
+    """Tokenize one physical line; returns (tokens, comment, bracket_delta)"""
+    tokens = []
+    comment = None
+    depth = 0
+    pos = 0
+    length = len(text)
+    while pos < length:
+        match = _TOKEN_RE.match(text, pos)
+        if not match:
+            raise PineSyntaxError(f"unexpected character {text[pos]!r}", lineno)
+        kind = match.lastgroup
+        value = match.group()
+        pos = match.end()
+        if kind == "space":
+            continue
+        if kind == "comment":
+            comment = value[2:].strip() if not value.startswith("//@") else value[2:]
+            break
+        if kind == "name" and value in KEYWORDS:
+            kind = "keyword"
+        elif kind == "op":
+            if value in "([":
+                depth += 1
+            elif value in ")]":
+                depth -= 1
+        tokens.append(Token(kind, value, lineno))
+    return tokens, comment, depth
+
+
+def iter_logical_lines(lines):
+    """Join physical lines into logical lines, yielding them lazily"""
+    pending = None
+    depth = 0
+    lineno = 0
+    for raw in lines:
+        lineno += 1
+        text = raw.rstrip("\r\n")
+        stripped = text.strip()
+        indent = _measure_indent(text)
+
+        if pending is not None:
+            is_continuation = depth > 0 or (
+                stripped and indent % 4 != 0 and indent > pending.indent
+                and not stripped.startswith("//")
+            )
+            if is_continuation:
+                if stripped:
+                    tokens, comment, delta = _tokenize_segment(stripped, lineno)
+                    pending.tokens.extend(tokens)
+                    if comment:
+                        pending.comment = comment if not pending.comment else f"{pending.comment} {comment}"
+                    depth += delta
+                continue
+            yield pending
+            pending = None
+            depth = 0
+
+        if not stripped:
+            yield LogicalLine("blank", 0, lineno)
+            continue
+        if stripped.startswith("//"):
+            line = LogicalLine("comment", indent, lineno, stripped)
+            yield line
+            continue
+        pending = LogicalLine("code", indent, lineno, stripped)
+        tokens, comment, delta = _tokenize_segment(stripped, lineno)
+        pending.tokens = tokens
+        pending.comment = comment
+        depth = delta
+
+    if pending is not None:
+        if depth > 0:
+            raise PineSyntaxError("unclosed bracket", pending.line)
+        yield pending
+
+
+def _continues_statement(line):
+    """True when a line at the same level belongs to the preceding statement"""
+    return line.kind == "code" and line.starts_with("else")
+
+
+def iter_statement_groups(lines):
+    """Group logical lines into top-level statements without reading ahead
+
+    Each group holds one level-0 statement with its nested block lines, a
+    single top-level comment or a single blank line. Blank and comment
+    lines between a statement and its indented continuation are kept in
+    the statement group.
+    """
+    group = []
+    held = []
+    for line in iter_logical_lines(lines):
+        if line.kind == "code" and (line.level > 0 or _continues_statement(line)):
+            if group:
+                group.extend(held)
+                held = []
+                group.append(line)
+                continue
+        if line.kind != "code" and group:
+            if line.kind == "blank" or line.level > 0:
+                held.append(line)
+                continue
+        if group:
+            yield group
+            group = []
+        for extra in held:
+            yield [extra]
+        held = []
+        if line.kind == "code":
+            group = [line]
+        else:
+            yield [line]
+    if group:
+        yield group
+    for extra in held:
+        yield [extra]
+
+
+# ---------------------------------------------------------------------------
+# Expression parsing
+# ---------------------------------------------------------------------------
+
+class _TokenStream:
+    def __init__(self, tokens, line):
+        self.tokens = tokens
+        self.pos = 0
+        self.line = line
+
+    def peek(self, offset=0):
+        index = self.pos + offset
+        if index < len(self.tokens):
+            return self.tokens[index]
+        return None
+
+    def peek_value(self, offset=0):
+        token = self.peek(offset)
+        return token.value if token is not None else None
+
+    def next(self):
+        token = self.peek()
+        if token is None:
+            raise PineSyntaxError("unexpected end of line", self.line)
+        self.pos += 1
+        return token
+
+    def accept(self, value):
+        token = self.peek()
+        if token is not None and token.value == value and token.type != "string":
+            self.pos += 1
+            return token
+        return None
+
+    def expect(self, value):
+        token = self.accept(value)
+        if token is None:
+            found = self.peek_value()
+            raise PineSyntaxError(f"expected {value!r}, found {found!r}", self.line)
+        return token
+
+    def at_end(self):
+        return self.pos >= len(self.tokens)
+
+
+def _parse_expression(stream, min_precedence=0):
+    left = _parse_unary(stream)
+    while True:
+        token = stream.peek()
+        if token is None or token.type not in ("op", "keyword"):
+            break
+        op = token.value
+        if op == "?" and min_precedence == 0:
+            stream.next()
+            body = _parse_expression(stream)
+            stream.expect(":")
+            orelse = _parse_expression(stream)
+            left = Ternary(left, body, orelse, line=token.line)
+            continue
+        precedence = BINARY_PRECEDENCE.get(op)
+        if precedence is None or precedence <= min_precedence:
+            break
+        stream.next()
+        right = _parse_expression(stream, precedence)
+        left = BinOp(op, left, right, line=token.line)
+    return left
+
+
+def _parse_unary(stream):
+    token = stream.peek()
+    if token is not None and token.value in ("-", "+", "not") and token.type != "string":
+        stream.next()
+        operand = _parse_expression(stream, BINARY_PRECEDENCE["*"])
+        if token.value == "-" and isinstance(operand, Num) and not operand.parens:
+            # `- -1` keeps its space: `--1` would read as a single token
+            sign = "- " if operand.raw.startswith(("-", "+")) else "-"
+            return Num(-operand.value, sign + operand.raw, line=token.line)
+        return UnaryOp(token.value, operand, line=token.line)
+    return _parse_postfix(stream, _parse_atom(stream))
+
+
+def _parse_postfix(stream, node):
+    while True:
+        token = stream.peek()
+        if token is None or token.type != "op":
+            return node
+        if token.value == "[":
+            stream.next()
+            offset = _parse_expression(stream)
+            stream.expect("]")
+            node = Index(node, offset, line=token.line)
+        elif token.value == "(" and isinstance(node, Name) and not node.parens:
+            node = _parse_call(stream, node.id, [], token.line)
+        else:
+            return node
+
+
+def _parse_call(stream, func, type_args, line):
+    stream.expect("(")
+    args = []
+    kwargs = []
+    while not stream.accept(")"):
+        token = stream.peek()
+        following = stream.peek(1)
+        if (token is not None and token.type == "name" and following is not None
+                and following.value == "=" and following.type == "op"):
+            stream.pos += 2
+            kwargs.append((token.value, _parse_expression(stream)))
+        else:
+            if kwargs:
+                raise PineSyntaxError("positional argument after keyword argument", line)
+            args.append(_parse_expression(stream))
+        if not stream.accept(","):
+            stream.expect(")")
+            break
+    return Call(func, args, kwargs, type_args, line=line)
+
+
+def _try_type_args(stream):
+    """Parse `<type, type>` after a generic name such as `array.new`"""
+    if stream.peek_value() != "<":
+        return None
+    depth = 0
+    names = []
+    offset = 0
+    while True:
+        token = stream.peek(offset)
+        if token is None:
+            return None
+        if token.value == "<":
+            depth += 1
+        elif token.value == ">":
+            depth -= 1
+            if depth == 0:
+                break
+        elif token.type == "name":
+            names.append(token.value)
+        elif token.value != ",":
+            return None
+        offset += 1
+    if stream.peek_value(offset + 1) != "(":
+        return None
+    stream.pos += offset + 1
+    return names
+
+
+def _parse_atom(stream):
+    token = stream.next()
+    kind = token.type
+    value = token.value
+    if kind == "number":
+        if re.fullmatch(r"\d+", value):
+            return Num(int(value), value, line=token.line)
+        return Num(float(value), value, line=token.line)
+    if kind == "string":
+        return Str(_unescape(value[1:-1]), value, line=token.line)
+    if kind == "color":
+        return Color(value, line=token.line)
+    if kind == "placeholder":
+        return Placeholder(value[2:-2].strip(), line=token.line)
+    if kind == "keyword":
+        if value in ("true", "false"):
+            return Bool(value == "true", line=token.line)
+        if value == "na":
+            if stream.peek_value() == "(":
+                return _parse_call(stream, "na", [], token.line)
+            return Na(line=token.line)
+        raise PineSyntaxError(f"unexpected keyword {value!r}", token.line)
+    if kind == "name":
+        type_args = _try_type_args(stream)
+        if type_args is not None:
+            return _parse_call(stream, value, type_args, token.line)
+        return Name(value, line=token.line)
+    if value == "(":
+        inner = _parse_expression(stream)
+        stream.expect(")")
+        inner.parens = True
+        return inner
+    if value == "[":
+        elts = []
+        while not stream.accept("]"):
+            elts.append(_parse_expression(stream))
+            if not stream.accept(","):
+                stream.expect("]")
+                break
+        return Tuple(elts, line=token.line)
+    raise PineSyntaxError(f"unexpected token {value!r}", token.line)
+
+
+def _unescape(text):
+    return re.sub(r"\\(.)", lambda m: {"n": "\n", "t": "\t"}.get(m.group(1), m.group(1)), text)
+
+
+def parse_expression(text):
+    """Parse a single expression from source text"""
+    tokens, _comment, _depth = _tokenize_segment(text.strip(), 1)
+    stream = _TokenStream(tokens, 1)
+    node = _parse_expression(stream)
+    if not stream.at_end():
+        raise PineSyntaxError(f"unexpected token {stream.peek_value()!r}", 1)
+    return node
+
+
+# ---------------------------------------------------------------------------
+# Statement parsing
+# ---------------------------------------------------------------------------
+
+class _BlockParser:
+    def __init__(self, lines):
+        self.lines = lines
+        self.index = 0
+
+    def peek(self):
+        if self.index < len(self.lines):
+            return self.lines[self.index]
+        return None
+
+    def _belongs(self, line, level):
+        """True when the next non-blank line still belongs to a block at `level`"""
+        return line.kind != "blank" and (line.level >= level if line.kind == "comment" else line.indent >= level * 4)
+
+    def parse_block(self, level):
+        body = []
+        while True:
+            line = self.peek()
+            if line is None:
+                break
+            if line.kind == "blank":
+                # Keep blank lines only if the block continues after them
+                scan = self.index
+                while scan < len(self.lines) and self.lines[scan].kind == "blank":
+                    scan += 1
+                if level == 0 or (scan < len(self.lines) and self._belongs(self.lines[scan], level)):
+                    self.index += 1
+                    body.append(Blank(line=line.line))
+                    continue
+                break
+            if line.kind == "comment":
+                if level > 0 and line.level < level:
+                    break
+                self.index += 1
+                body.append(Comment(line.text[2:] if line.text.startswith("//@") else line.text[2:].strip(),
+                                    line=line.line, raw=line.text))
+                continue
+            if line.indent < level * 4:
+                break
+            if line.indent > level * 4 and body:
+                raise PineSyntaxError("unexpected indent", line.line)
+            self.index += 1
+            body.append(self.parse_statement(line, level))
+        return body
+
+    def parse_body(self, level, owner_line):
+        body = self.parse_block(level + 1)
+        if not any(not isinstance(stmt, (Comment, Blank)) for stmt in body):
+            raise PineSyntaxError("expected an indented block", owner_line.line)
+        return body
+
+    def parse_statement(self, line, level):
+        stream = _TokenStream(line.tokens, line.line)
+        stmt = self._parse_statement(stream, line, level)
+        if not stream.at_end():
+            raise PineSyntaxError(f"unexpected token {stream.peek_value()!r}", line.line)
+        if line.comment is not None:
+            stmt.comment = line.comment
+        return stmt
+
+    def _parse_statement(self, stream, line, level):
+        first = stream.peek()
+        value = first.value
+
+        if first.type == "keyword":
+            if value == "if":
+                return self._parse_if(stream, line, level)
+            if value == "for":
+                return self._parse_for(stream, line, level)
+            if value == "while":
+                stream.next()
+                test = _parse_expression(stream)
+                return While(test, self.parse_body(level, line), line=line.line)
+            if value == "switch":
+                return self._parse_switch(stream, line, level)
+            if value == "break":
+                stream.next()
+                return Break(line=line.line)
+            if value == "continue":
+                stream.next()
+                return Continue(line=line.line)
+            if value in ("var", "varip"):
+                stream.next()
+                return self._parse_declaration(stream, line, level, value)
+            if value == "else":
+                raise PineSyntaxError("'else' without matching 'if'", line.line)
+
+        if first.type == "name" and self._is_function_def(stream):
+            return self._parse_function_def(stream, line, level)
+
+        if value == "[" and self._is_tuple_assign(stream):
+            stream.next()
+            targets = []
+            while not stream.accept("]"):
+                targets.append(stream.next().value)
+                if not stream.accept(","):
+                    stream.expect("]")
+                    break
+            stream.expect("=")
+            return TupleAssign(targets, self._parse_value(stream, line, level), line=line.line)
+
+        declared = self._try_declared_type(stream)
+        if declared is not None:
+            return self._parse_declaration(stream, line, level, None, declared)
+
+        if first.type == "name":
+            operator = stream.peek_value(1)
+            if operator in ASSIGN_OPS and stream.peek(1).type == "op":
+                stream.pos += 2
+                rhs = self._parse_value(stream, line, level)
+                if operator == "=":
+                    return Assign(first.value, rhs, None, None, line=line.line)
+                return Reassign(first.value, operator, rhs, line=line.line)
+
+        expr = _parse_expression(stream)
+        return ExprStmt(expr, line=line.line)
+
+    def _parse_value(self, stream, line, level):
+        """Parse an assignment right-hand side, which may be a block expression"""
+        token = stream.peek()
+        if token is not None and token.type == "keyword":
+            if token.value == "if":
+                return self._parse_if(stream, line, level)
+            if token.value == "switch":
+                return self._parse_switch(stream, line, level)
+            if token.value == "for":
+                return self._parse_for(stream, line, level)
+            if token.value == "while":
+                stream.next()
+                test = _parse_expression(stream)
+                return While(test, self.parse_body(level, line), line=line.line)
+        return _parse_expression(stream)
+
+    def _try_declared_type(self, stream):
+        """Detect `type name =` (also `array<float> name =`) at the stream position"""
+        offset = 0
+        parts = []
+        while stream.peek_value(offset) in QUALIFIERS and stream.peek(offset).type == "name":
+            parts.append(stream.peek_value(offset))
+            offset += 1
+        token = stream.peek(offset)
+        if token is None or token.type != "name":
+            return None
+        type_text = token.value
+        offset += 1
+        if stream.peek_value(offset) == "<":
+            depth = 0
+            while True:
+                inner = stream.peek(offset)
+                if inner is None:
+                    return None
+                type_text += inner.value if inner.value != "," else ", "
+                if inner.value == "<":
+                    depth += 1
+                elif inner.value == ">":
+                    depth -= 1
+                    if depth == 0:
+                        break
+                offset += 1
+            offset += 1
+        target = stream.peek(offset)
+        following = stream.peek_value(offset + 1)
+        if target is None or target.type != "name" or following != "=":
+            return None
+        stream.pos += offset
+        return " ".join(parts + [type_text])
+
+    def _parse_declaration(self, stream, line, level, mode, declared=None):
+        if declared is None:
+            declared = self._try_declared_type(stream)
+        target = stream.next()
+        if target.type != "name":
+            raise PineSyntaxError(f"expected a variable name, found {target.value!r}", line.line)
+        stream.expect("=")
+        value = self._parse_value(stream, line, level)
+        return Assign(target.value, value, mode, declared, line=line.line)
+
+    def _is_function_def(self, stream):
+        if stream.peek_value(1) != "(":
+            return False
+        depth = 0
+        offset = 1
+        while True:
+            token = stream.peek(offset)
+            if token is None:
+                return False
+            if token.value == "(":
+                depth += 1
+            elif token.value == ")":
+                depth -= 1
+                if depth == 0:
+                    return stream.peek_value(offset + 1) == "=>"
+            offset += 1
+
+    def _is_tuple_assign(self, stream):
+        offset = 1
+        while True:
+            token = stream.peek(offset)
+            if token is None:
+                return False
+            if token.value == "]":
+                return stream.peek_value(offset + 1) == "="
+            if token.type != "name" and token.value != ",":
+                return False
+            offset += 1
+
+    def _parse_function_def(self, stream, line, level):
+        name = stream.next().value
+        stream.expect("(")
+        params = []
+        while not stream.accept(")"):
+            words = []
+            while stream.peek() is not None and stream.peek().type == "name":
+                words.append(stream.next().value)
+            if not words:
+                raise PineSyntaxError("expected a parameter name", line.line)
+            default = None
+            if stream.accept("="):
+                default = _parse_expression(stream)
+            params.append((words[-1], " ".join(words[:-1]) or None, default))
+            if not stream.accept(","):
+                stream.expect(")")
+                break
+        stream.expect("=>")
+        if stream.at_end():
+            body = self.parse_body(level, line)
+            return FunctionDef(name, params, body, line=line.line)
+        body = [ExprStmt(_parse_expression(stream), line=line.line)]
+        return FunctionDef(name, params, body, line=line.line, inline=True)
+
+    def _parse_if(self, stream, line, level):
+        stream.expect("if")
+        test = _parse_expression(stream)
+        if not stream.at_end():
+            raise PineSyntaxError(f"unexpected token {stream.peek_value()!r}", line.line)
+        body = self.parse_body(level, line)
+        node = If(test, body, [], line=line.line)
+        if line.comment is not None:
+            node.comment = line.comment
+            line.comment = None
+        next_line = self._next_code_line(level)
+        if next_line is not None and next_line.starts_with("else"):
+            self._consume_trivia_before(next_line)
+            self.index += 1
+            else_stream = _TokenStream(next_line.tokens, next_line.line)
+            else_stream.expect("else")
+            if else_stream.peek_value() == "if":
+                nested = self._parse_if(else_stream, next_line, level)
+                nested.is_elif = True
+                if next_line.comment is not None:
+                    nested.comment = next_line.comment
+                node.orelse = [nested]
+            else:
+                if not else_stream.at_end():
+                    raise PineSyntaxError("unexpected tokens after 'else'", next_line.line)
+                node.orelse = self.parse_body(level, next_line)
+                if next_line.comment is not None:
+                    node.else_comment = next_line.comment
+        return node
+
+    def _next_code_line(self, level):
+        scan = self.index
+        while scan < len(self.lines):
+            line = self.lines[scan]
+            if line.kind == "code":
+                return line if line.indent == level * 4 else None
+            if line.kind == "comment" and line.level < level:
+                return None
+            scan += 1
+        return None
+
+    def _consume_trivia_before(self, target):
+        while self.lines[self.index] is not target:
+            self.index += 1
+
+    def _parse_for(self, stream, line, level):
+        stream.expect("for")
+        if stream.peek_value() == "[":
+            stream.next()
+            targets = []
+            while not stream.accept("]"):
+                targets.append(stream.next().value)
+                if not stream.accept(","):
+                    stream.expect("]")
+                    break
+            stream.expect("in")
+            iterable = _parse_expression(stream)
+            return ForIn(targets, iterable, self.parse_body(level, line), line=line.line)
+        var = stream.next().value
+        if stream.accept("in"):
+            iterable = _parse_expression(stream)
+            return ForIn([var], iterable, self.parse_body(level, line), line=line.line)
+        stream.expect("=")
+        start = _parse_expression(stream)
+        stream.expect("to")
+        end = _parse_expression(stream)
+        step = None
+        if stream.accept("by"):
+            step = _parse_expression(stream)
+        return For(var, start, end, step, self.parse_body(level, line), line=line.line)
+
+    def _parse_switch(self, stream, line, level):
+        stream.expect("switch")
+        subject = None if stream.at_end() else _parse_expression(stream)
+        cases = []
+        for case_line in self._block_lines(level + 1):
+            case_stream = _TokenStream(case_line.tokens, case_line.line)
+            condition = None
+            if case_stream.peek_value() != "=>":
+                condition = _parse_expression(case_stream)
+            case_stream.expect("=>")
+            if case_stream.at_end():
+                body = self.parse_body(level + 1, case_line)
+            else:
+                body = [ExprStmt(_parse_expression(case_stream), line=case_line.line)]
+                body[0].comment = case_line.comment
+            cases.append((condition, body))
+        if not cases:
+            raise PineSyntaxError("switch without cases", line.line)
+        return Switch(subject, cases, line=line.line)
+
+    def _block_lines(self, level):
+        """Yield case lines at exactly `level`, skipping trivia"""
+        while True:
+            line = self.peek()
+            if line is None:
+                return
+            if line.kind != "code":
+                scan = self.index
+                while scan < len(self.lines) and self.lines[scan].kind != "code":
+                    scan += 1
+                if scan >= len(self.lines) or self.lines[scan].indent != level * 4:
+                    return
+                self.index = scan
+                continue
+            if line.indent != level * 4:
+                return
+            self.index += 1
+            yield line
+
+
+def parse_lines(lines):
+    """Parse a list of LogicalLine objects into statements"""
+    parser = _BlockParser(lines)
+    body = parser.parse_block(0)
+    if parser.index < len(lines):
+        raise PineSyntaxError("unexpected indent", lines[parser.index].line)
+    return body
+
+
+def iter_statements(lines):
+    """Parse an iterable of source lines, yielding top-level statements lazily"""
+    for group in iter_statement_groups(lines):
+        yield from parse_lines(group)
+
+
+def _detect_version(body):
+    for stmt in body:
+        if isinstance(stmt, Comment):
+            match = re.match(r"@version\s*=\s*(\d+)", stmt.text)
+            if match:
+                return int(match.group(1))
+    return None
+
+
+def parse(source, cache=True):
+    """Parse Pine source text (or an iterable of lines) into a Script node
+
+    Text is looked up in the shared on-disk AST cache (pine_ast_cache.py)
+    first; pass cache=False to always parse.
+    """
+    if cache and isinstance(source, str):
+        import pine_ast_cache
+        return pine_ast_cache.parse(source)
+    lines = source.splitlines(True) if isinstance(source, str) else source
+    body = list(iter_statements(lines))
+    return Script(body, _detect_version(body))
+
+
+def parse_file(path, cache=True):
+    """Parse a .pine file, through the shared AST cache unless cache=False"""
+    if cache:
+        import pine_ast_cache
+        return pine_ast_cache.parse_file(path)
+    with open(path, "r", encoding="utf-8") as f:
+        return parse(f)
+
+
+def strip_trivia(body):
+    """Return a body without Comment/Blank statements"""
+    return [stmt for stmt in body if not isinstance(stmt, (Comment, Blank))]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python scripts/pine_parser.py <file.pine> [...]")
+        sys.exit(1)
+    failed = False
+    for path in sys.argv[1:]:
+        try:
+            script = parse_file(path)
+            count = len(strip_trivia(script.body))
+            print(f"{path}: OK ({count} top-level statements, version {script.version})")
+        except PineSyntaxError as e:
+            print(f"{path}: {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
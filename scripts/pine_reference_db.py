@@ -0,0 +1,585 @@
+#!/usr/bin/env python3
+"""
+Function-signature database built from the saved Pine Script reference page
+
+scrape_pine_reference_selenium.py saves the reference body as
+pine_script_references/<version>/main_content.html, but only the table of
+contents reaches organized_content.json. This tool streams through that page
+and extracts every entry: its kind (taken from the anchor prefix, `fun_`,
+`var_`, `const_`, ... rather than guessed from the name), signature overloads,
+argument names, types, qualifiers and defaults, return type and qualifier,
+description, remarks, examples and "See also" links. The result goes into an
+indexed SQLite store next to the page (signatures.sqlite).
+
+The page is read in fixed-size chunks and split on the entry elements with a
+byte-level tag scanner, so memory is bounded by the largest single entry, not
+the page. Each stored entry keeps its byte offset, length and a hash of its
+HTML:
+
+- rebuilding after a new scrape re-extracts only entries whose HTML changed
+  and drops entries that disappeared
+- `--reparse NAME` re-extracts a single entry by seeking straight to it
+
+With `--snapshot`, the page is streamed out of a snapshot_store.py snapshot
+instead of the working copy.
+
+Usage:
+    python scripts/pine_reference_db.py --build
+    python scripts/pine_reference_db.py --build --version v5
+    python scripts/pine_reference_db.py --lookup ta.sma --lookup close
+    python scripts/pine_reference_db.py --reparse ta.sma
+    python scripts/pine_reference_db.py --build --snapshot v6 --db /tmp/v6_before.sqlite
+    python scripts/pine_reference_db.py --list function --qualifier simple
+    python scripts/pine_reference_db.py --benchmark
+"""
+
+import argparse
+import functools
+import hashlib
+import html
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from html.parser import HTMLParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REFERENCES_DIR = os.path.join(ROOT, "pine_script_references")
+CHUNK_SIZE = 64 * 1024
+
+KINDS = {
+    "fun": "function",
+    "var": "variable",
+    "const": "constant",
+    "kw": "keyword",
+    "op": "operator",
+    "type": "type",
+    "an": "annotation",
+}
+QUALIFIERS = ("const", "input", "simple", "series")
+TAG_RE = re.compile(rb"<(/?)([A-Za-z][A-Za-z0-9]*)\b([^>]*)>")
+ENTRY_ID_RE = re.compile(rb"""\bid=["']((?:%s)_[^"']*)["']""" % b"|".join(k.encode() for k in KINDS))
+VOID_TAGS = {b"area", b"br", b"col", b"embed", b"hr", b"img", b"input", b"link", b"meta", b"source", b"wbr"}
+BLOCK_TAGS = {"div", "p", "pre", "li", "ul", "ol", "table", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "section"}
+SYNTAX_RE = re.compile(r"^(?:method\s+)?(?P<name>[\w.<>]+)\((?P<params>.*)\)\s*(?:→|->)\s*(?P<returns>.+)$")
+ARGUMENT_RE = re.compile(r"^(?P<name>[\w.]+|\.\.\.)\s*\((?P<type>[^()]*(?:\([^()]*\)[^()]*)*)\)\s*(?P<description>.*)$", re.S)
+DEFAULT_RE = re.compile(r"\b(?:The )?default(?: value)? is (.+?)(?:\.(?:\s|$)|$)", re.I)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS entries (
+    id TEXT PRIMARY KEY, name TEXT, kind TEXT, type TEXT, qualifier TEXT,
+    description TEXT, returns TEXT, remarks TEXT, data TEXT,
+    hash TEXT, offset INTEGER, length INTEGER
+);
+CREATE TABLE IF NOT EXISTS arguments (
+    entry_id TEXT, position INTEGER, name TEXT, type TEXT, qualifier TEXT,
+    optional INTEGER, default_value TEXT, description TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_name ON entries(name);
+CREATE INDEX IF NOT EXISTS entries_kind ON entries(kind, qualifier);
+CREATE INDEX IF NOT EXISTS arguments_entry ON arguments(entry_id);
+CREATE INDEX IF NOT EXISTS arguments_name ON arguments(name);
+"""
+
+
+def page_path(version):
+    return os.path.join(REFERENCES_DIR, version, "main_content.html")
+
+
+def db_path(version):
+    return os.path.join(REFERENCES_DIR, version, "signatures.sqlite")
+
+
+def iter_entries(f, chunk_size=CHUNK_SIZE):
+    """(entry id, byte offset, raw HTML bytes) for every reference entry of a binary file, streamed"""
+    buffer = b""
+    base = 0            # file offset of buffer[0]
+    position = 0        # scan position within buffer
+    start = depth = None
+    entry_id = None
+    while True:
+        chunk = f.read(chunk_size)
+        buffer += chunk
+        while True:
+            match = TAG_RE.search(buffer, position)
+            if not match:
+                break
+            position = match.end()
+            closing, tag, attrs = match.group(1), match.group(2).lower(), match.group(3)
+            if tag in VOID_TAGS or attrs.endswith(b"/"):
+                continue
+            if start is None:
+                found = not closing and ENTRY_ID_RE.search(attrs)
+                if found:
+                    start, depth = match.start(), 1
+                    entry_id = html.unescape(found.group(1).decode("utf-8"))
+                continue
+            depth += -1 if closing else 1
+            if depth == 0:
+                yield entry_id, base + start, buffer[start:match.end()]
+                start = None
+        keep = position if start is None else start
+        base += keep
+        buffer = buffer[keep:]
+        position -= keep
+        if start is not None:
+            start = 0
+        if not chunk:
+            return
+
+
+class _BlockParser(HTMLParser):
+    """Flattens one entry's HTML into (role, text) blocks"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks = []
+        self.stack = []         # (tag, role, preformatted)
+        self.current = None
+
+    @staticmethod
+    def _role(attrs):
+        for name in (dict(attrs).get("class") or "").split():
+            if name.endswith("__sub-header"):
+                return "subheader"
+            if name.endswith("__header"):
+                return "header"
+            if "syntax" in name:
+                return "syntax"
+            if "example" in name:
+                return "example"
+            if "see-also" in name:
+                return "see_also"
+        return None
+
+    def _open_block(self):
+        role = self.stack[-1][1] if self.stack else None
+        preformatted = bool(self.stack and self.stack[-1][2])
+        self.current = [role, [], preformatted]
+        self.blocks.append(self.current)
+
+    def handle_starttag(self, tag, attrs):
+        role = self._role(attrs)
+        if tag == "br":
+            if self.current:
+                self.current[1].append("\n")
+            return
+        parent_role = self.stack[-1][1] if self.stack else None
+        parent_pre = bool(self.stack and self.stack[-1][2])
+        if tag in BLOCK_TAGS or role:
+            self.stack.append((tag, role or parent_role, parent_pre or tag == "pre"))
+            if tag in BLOCK_TAGS:
+                self._open_block()
+            elif self.current is None:
+                self._open_block()
+            if role and tag not in BLOCK_TAGS:
+                self.current[0] = role
+        elif tag == "a" and parent_role == "see_also":
+            self.stack.append((tag, parent_role, parent_pre))
+            self._open_block()
+        else:
+            self.stack.append((tag, parent_role, parent_pre))
+
+    def handle_endtag(self, tag):
+        for index in range(len(self.stack) - 1, -1, -1):
+            if self.stack[index][0] == tag:
+                closed = self.stack[index]
+                del self.stack[index:]
+                if closed[0] in BLOCK_TAGS or (closed[0] == "a" and closed[1] == "see_also"):
+                    self._open_block()
+                return
+
+    def handle_data(self, data):
+        if self.current is None:
+            self._open_block()
+        self.current[1].append(data)
+
+    def result(self):
+        blocks = []
+        for role, parts, preformatted in self.blocks:
+            text = "".join(parts)
+            text = text.strip("\n") if preformatted else " ".join(text.split())
+            if text.strip():
+                blocks.append((role, text))
+        return blocks
+
+
+def split_type(text):
+    """(qualifier, type) of a Pine type string such as 'series int/float'"""
+    words = (text or "").split(None, 1)
+    if words and words[0] in QUALIFIERS:
+        return words[0], words[1] if len(words) > 1 else ""
+    return None, (text or "").strip()
+
+
+def parse_syntax(line):
+    """Name, parameter names and return type of one syntax line, or None"""
+    match = SYNTAX_RE.match(" ".join(line.split()))
+    if not match:
+        return None
+    params, depth, current = [], 0, ""
+    for char in match.group("params"):
+        if char == "," and depth == 0:
+            params.append(current.strip())
+            current = ""
+            continue
+        depth += char in "(<[" and 1 or char in ")>]" and -1 or 0
+        current += char
+    if current.strip():
+        params.append(current.strip())
+    qualifier, type_ = split_type(match.group("returns").strip())
+    return {"name": match.group("name"), "params": params, "returns": match.group("returns").strip(),
+            "qualifier": qualifier, "type": type_}
+
+
+def parse_argument(text):
+    """Name, type, qualifier, default and description of an argument line, or None"""
+    match = ARGUMENT_RE.match(text)
+    if not match:
+        return None
+    qualifier, type_ = split_type(match.group("type").strip())
+    description = match.group("description").strip()
+    default = DEFAULT_RE.search(description)
+    return {"name": match.group("name"), "type": match.group("type").strip(), "qualifier": qualifier,
+            "base_type": type_, "optional": description.lower().startswith("optional") or default is not None,
+            "default": default.group(1).strip() if default else None, "description": description}
+
+
+def extract(entry_id, raw):
+    """Structured record for one entry from its raw HTML"""
+    parser = _BlockParser()
+    parser.feed(raw.decode("utf-8", "replace") if isinstance(raw, bytes) else raw)
+    parser.close()
+    prefix, _, name = entry_id.partition("_")
+    record = {"id": entry_id, "name": name, "kind": KINDS.get(prefix, prefix), "title": None,
+              "description": "", "syntax": [], "overloads": [], "arguments": [], "returns": "",
+              "type": None, "qualifier": None, "remarks": "", "examples": [], "see_also": []}
+    section = "description"
+    texts = {}
+    for role, text in parser.result():
+        if role == "header" and record["title"] is None:
+            record["title"] = text
+        elif role == "subheader":
+            section = text.lower()
+        elif role == "example" or section.startswith("example"):
+            if record["examples"] and role != "example":
+                record["examples"][-1] += "\n" + text
+            else:
+                record["examples"].append(text)
+        elif role == "see_also" or section.startswith("see also"):
+            record["see_also"].extend(item.strip() for item in text.split(",") if item.strip() not in ("", "•"))
+        elif role == "syntax" or section.startswith("syntax"):
+            for line in text.splitlines():
+                if line.strip():
+                    record["syntax"].append(" ".join(line.split()))
+        elif section.startswith(("argument", "parameter")):
+            argument = parse_argument(text)
+            if argument:
+                record["arguments"].append(argument)
+            elif record["arguments"]:
+                record["arguments"][-1]["description"] += " " + text
+        else:
+            texts.setdefault(section, []).append(text)
+    record["description"] = " ".join(texts.pop("description", []))
+    record["returns"] = " ".join(texts.pop("returns", []))
+    record["remarks"] = " ".join(texts.pop("remarks", []))
+    type_text = " ".join(texts.pop("type", []))
+    record["other"] = {section: " ".join(items) for section, items in texts.items()}
+    record["overloads"] = [overload for overload in map(parse_syntax, record["syntax"]) if overload]
+    if record["overloads"]:
+        record["qualifier"] = record["overloads"][0]["qualifier"]
+        record["type"] = record["overloads"][0]["type"]
+    elif type_text:
+        record["qualifier"], record["type"] = split_type(type_text)
+    return record
+
+
+class SignatureDB:
+    """SQLite store of extracted reference entries"""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def hashes(self):
+        return dict(self.conn.execute("SELECT id, hash FROM entries"))
+
+    def store(self, record, digest, offset, length):
+        """Insert or replace one entry and its arguments"""
+        self.conn.execute("DELETE FROM arguments WHERE entry_id = ?", (record["id"],))
+        self.conn.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (record["id"], record["name"], record["kind"], record["type"], record["qualifier"],
+             record["description"], record["returns"], record["remarks"], json.dumps(record, ensure_ascii=False),
+             digest, offset, length))
+        self.conn.executemany(
+            "INSERT INTO arguments VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(record["id"], position, arg["name"], arg["type"], arg["qualifier"], int(arg["optional"]),
+              arg["default"], arg["description"]) for position, arg in enumerate(record["arguments"])])
+
+    def locate(self, entry_id, offset, length):
+        self.conn.execute("UPDATE entries SET offset = ?, length = ? WHERE id = ?", (offset, length, entry_id))
+
+    def remove(self, ids):
+        for entry_id in ids:
+            self.conn.execute("DELETE FROM entries WHERE id = ?", (entry_id,))
+            self.conn.execute("DELETE FROM arguments WHERE entry_id = ?", (entry_id,))
+
+    def set_meta(self, **values):
+        self.conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [(k, str(v)) for k, v in values.items()])
+
+    def meta(self):
+        return dict(self.conn.execute("SELECT key, value FROM meta"))
+
+    def commit(self):
+        self.conn.commit()
+
+    def find(self, name):
+        """Records for a name (with or without a kind prefix or trailing '()')"""
+        name = name[:-2] if name.endswith("()") else name
+        rows = self.conn.execute("SELECT data FROM entries WHERE id = ? OR name = ? ORDER BY id", (name, name))
+        return [json.loads(row[0]) for row in rows]
+
+    def position(self, entry_id):
+        return self.conn.execute("SELECT offset, length FROM entries WHERE id = ?", (entry_id,)).fetchone()
+
+    def select(self, kind=None, qualifier=None):
+        query, args = "SELECT id, name, kind, qualifier, type FROM entries WHERE 1", []
+        if kind:
+            query += " AND kind = ?"
+            args.append(kind)
+        if qualifier:
+            query += " AND qualifier = ?"
+            args.append(qualifier)
+        return list(self.conn.execute(query + " ORDER BY name", args))
+
+    def counts(self):
+        return dict(self.conn.execute("SELECT kind, COUNT(*) FROM entries GROUP BY kind"))
+
+
+def _open(page):
+    """Binary stream for a page path or a zero-argument opener (e.g. a snapshot_store stream)"""
+    return page() if callable(page) else open(page, "rb")
+
+
+def build(db, page):
+    """Sync the store with a page, extracting only new or changed entries; returns counts"""
+    known = db.hashes()
+    seen = set()
+    counts = {"added": 0, "changed": 0, "unchanged": 0, "removed": 0}
+    with _open(page) as f:
+        for entry_id, offset, raw in iter_entries(f):
+            if entry_id in seen:
+                continue
+            seen.add(entry_id)
+            digest = hashlib.sha1(raw).hexdigest()
+            if known.get(entry_id) == digest:
+                db.locate(entry_id, offset, len(raw))
+                counts["unchanged"] += 1
+                continue
+            db.store(extract(entry_id, raw), digest, offset, len(raw))
+            counts["changed" if entry_id in known else "added"] += 1
+    removed = set(known) - seen
+    db.remove(removed)
+    counts["removed"] = len(removed)
+    if callable(page):
+        db.set_meta(source=getattr(page, "source", repr(page)))
+    else:
+        stat = os.stat(page)
+        db.set_meta(source=os.path.abspath(page), size=stat.st_size, mtime=stat.st_mtime)
+    db.commit()
+    return counts
+
+
+def reparse(db, page, entry_id):
+    """Re-extract one entry, seeking to its stored offset (scanning the page if it moved); returns its record"""
+    raw = None
+    located = db.position(entry_id)
+    with _open(page) as f:
+        if located:
+            f.seek(located[0])
+            head = f.read(located[1])
+            for found_id, offset, candidate in iter_entries(_Bytes(head)):
+                if found_id == entry_id and offset == 0:
+                    raw, start = candidate, located[0]
+                break
+        if raw is None:
+            f.seek(0)
+            for found_id, start, candidate in iter_entries(f):
+                if found_id == entry_id:
+                    raw = candidate
+                    break
+    if raw is None:
+        raise KeyError(f"{entry_id} not found in {getattr(page, 'source', page)}")
+    record = extract(entry_id, raw)
+    db.store(record, hashlib.sha1(raw).hexdigest(), start, len(raw))
+    db.commit()
+    return record
+
+
+class _Bytes:
+    """Minimal binary reader over an in-memory slice"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def read(self, size):
+        chunk, self.data = self.data[:size], self.data[size:]
+        return chunk
+
+
+def describe(record):
+    lines = [f"{record['name']} ({record['kind']}, {record['id']})"]
+    for overload in record["overloads"] or []:
+        lines.append(f"  {overload['name']}({', '.join(overload['params'])}) → {overload['returns']}")
+    if not record["overloads"] and record["type"]:
+        lines.append(f"  type: {' '.join(filter(None, (record['qualifier'], record['type'])))}")
+    for arg in record["arguments"]:
+        default = f" = {arg['default']}" if arg["default"] else ""
+        lines.append(f"    {arg['name']}: {arg['type']}{default}")
+    if record["description"]:
+        lines.append(f"  {record['description']}")
+    if record["returns"]:
+        lines.append(f"  Returns: {record['returns']}")
+    if record["remarks"]:
+        lines.append(f"  Remarks: {record['remarks']}")
+    return "\n".join(lines)
+
+
+def synthetic_page(version, repeat_text=6):
+    """A page in the reference's entry layout with one entry per table-of-contents anchor"""
+    toc = open(os.path.join(REFERENCES_DIR, version, "table_of_contents.html"), encoding="utf-8").read()
+    filler = "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor. " * repeat_text
+    parts = ['<div class="tv-script-reference__content-container">']
+    for href in re.findall(r'href="#([^"]+)"', toc):
+        entry_id = html.unescape(href)
+        prefix, _, name = entry_id.partition("_")
+        item = "tv-pine-reference-item"
+        escaped = html.escape(name)
+        parts.append(f'<div class="{item}" id="{html.escape(entry_id)}"><div class="{item}__header">{escaped}'
+                     f'{"()" if prefix == "fun" else ""}</div><div class="{item}__text tv-text">{filler}</div>')
+        if prefix == "fun":
+            parts.append(f'<div class="{item}__sub-header">Syntax</div><pre class="{item}__syntax">{escaped}'
+                         f'(source, length, title) → series float</pre><div class="{item}__sub-header">Arguments</div>')
+            for arg, kind in (("source", "series int/float"), ("length", "simple int"), ("title", "const string")):
+                parts.append(f'<div class="{item}__text tv-text"><span class="{item}__arg-name">{arg}</span> '
+                             f'({kind}) {filler[:120]} Optional. The default is na.</div>')
+            parts.append(f'<div class="{item}__sub-header">Example</div><div class="{item}__example"><pre>'
+                         f'//@version=6\nindicator("{escaped}")\nplot(close)</pre></div>'
+                         f'<div class="{item}__sub-header">Returns</div><div class="{item}__text">{filler[:200]}</div>')
+        elif prefix in ("var", "const"):
+            parts.append(f'<div class="{item}__sub-header">Type</div><div class="{item}__text">series float</div>')
+        parts.append(f'<div class="{item}__sub-header">Remarks</div><div class="{item}__text">{filler[:300]}</div>'
+                     f'<div class="{item}__sub-header">See also</div><div class="{item}__see-also">'
+                     f'<a href="#fun_ta.ema">ta.ema</a><a href="#var_close">close</a></div></div>')
+    parts.append("</div>")
+    return "".join(parts).encode("utf-8")
+
+
+def benchmark(version, path=None):
+    """Time and peak memory of a full extraction, a no-change rebuild and a single-entry reparse"""
+    cleanup = None
+    if path is None or not os.path.exists(path):
+        handle, path = tempfile.mkstemp(suffix=".html")
+        with os.fdopen(handle, "wb") as f:
+            f.write(synthetic_page(version))
+        cleanup = path
+        print(f"No saved main_content.html for {version}; using a synthetic page built from its table of contents")
+    size = os.path.getsize(path)
+    with tempfile.TemporaryDirectory() as directory:
+        tracemalloc.start()
+        scratch = SignatureDB(os.path.join(directory, "memory.sqlite"))
+        build(scratch, path)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        scratch.close()
+        db = SignatureDB(os.path.join(directory, "signatures.sqlite"))
+        start = time.perf_counter()
+        counts = build(db, path)
+        elapsed = time.perf_counter() - start
+        entries = sum(counts.values())
+        print(f"Page: {size / 1e6:.1f} MB, {entries} entries")
+        print(f"Full extraction: {elapsed:.2f} s ({entries / elapsed:,.0f} entries/s), "
+              f"peak Python memory {peak / 1e6:.2f} MB")
+        start = time.perf_counter()
+        build(db, path)
+        print(f"Rebuild with no changes: {time.perf_counter() - start:.2f} s")
+        entry_id = db.select(kind="function")[0][0] if db.select(kind="function") else db.select()[0][0]
+        start = time.perf_counter()
+        reparse(db, path, entry_id)
+        print(f"Reparse of {entry_id}: {(time.perf_counter() - start) * 1000:.2f} ms")
+        db.close()
+    if cleanup:
+        os.remove(cleanup)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Function-signature database from the saved reference page")
+    parser.add_argument("--version", default="v6", help="Reference version (default: v6)")
+    parser.add_argument("--page", help="Reference page (default: pine_script_references/<version>/main_content.html)")
+    parser.add_argument("--snapshot", help="Read main_content.html from a snapshot_store.py snapshot (id or label)")
+    parser.add_argument("--db", help="Store (default: pine_script_references/<version>/signatures.sqlite)")
+    parser.add_argument("--build", action="store_true", help="Extract the page into the store (changed entries only)")
+    parser.add_argument("--reparse", action="append", metavar="NAME", help="Re-extract one entry (repeatable)")
+    parser.add_argument("--lookup", action="append", metavar="NAME", help="Print an entry's signature (repeatable)")
+    parser.add_argument("--list", nargs="?", const="", metavar="KIND", help="List entries, optionally of one kind")
+    parser.add_argument("--qualifier", choices=QUALIFIERS, help="With --list: only this (return) qualifier")
+    parser.add_argument("--benchmark", action="store_true", help="Time and measure memory of a full extraction")
+    args = parser.parse_args()
+
+    page = args.page or page_path(args.version)
+    if args.benchmark:
+        benchmark(args.version, page)
+        return
+    if not (args.build or args.reparse or args.lookup or args.list is not None):
+        parser.print_help()
+        return
+    if args.snapshot:
+        from snapshot_store import SnapshotStore
+        store = SnapshotStore()
+        try:
+            snapshot_id = store.manifest(args.snapshot)["id"]
+        except KeyError as e:
+            print(f"Error: {e.args[0]}")
+            sys.exit(1)
+        page = functools.partial(store.open, snapshot_id, "main_content.html")
+        page.source = f"snapshot {snapshot_id}"
+    elif (args.build or args.reparse) and not os.path.exists(page):
+        print(f"Error: {page} not found; run scrape_pine_reference_selenium.py first")
+        sys.exit(1)
+
+    db = SignatureDB(args.db or db_path(args.version))
+    try:
+        if args.build:
+            start = time.perf_counter()
+            counts = build(db, page)
+            print(f"{getattr(page, 'source', page)}: {counts['added']} added, {counts['changed']} changed, {counts['unchanged']} unchanged, "
+                  f"{counts['removed']} removed ({time.perf_counter() - start:.2f} s)")
+        for name in args.reparse or []:
+            matches = db.find(name)
+            entry_id = matches[0]["id"] if matches else name
+            try:
+                print(describe(reparse(db, page, entry_id)))
+            except KeyError as e:
+                print(f"Error: {e.args[0]}")
+        for name in args.lookup or []:
+            records = db.find(name)
+            print("\n".join(map(describe, records)) if records else f"{name}: not in {db.path}")
+        if args.list is not None:
+            for entry_id, name, kind, qualifier, type_ in db.select(args.list or None, args.qualifier):
+                print(f"{name:<40} {kind:<10} {' '.join(filter(None, (qualifier, type_)))}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
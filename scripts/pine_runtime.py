@@ -0,0 +1,1938 @@
+#!/usr/bin/env python3
+"""
+Bar-by-bar Pine Script runtime
+
+Executes scripts that cannot be expressed as whole-column operations:
+`var` state, `barstate.*` checks, `:=` inside loops, arrays, tables and
+string building. The AST is compiled once into nested Python closures;
+running a bar only calls those closures, it never walks the tree.
+
+- Every variable gets a slot in one flat value list shared by the closures
+- Series history (`x[n]`) is kept in preallocated ring buffers sized from
+  the largest offset static analysis finds for each name (loop bounds and
+  inputs are resolved; unknown offsets fall back to `max_bars_back`)
+- Each `ta.*` call site owns an O(1) incremental state object (EMA/RMA
+  accumulators, rolling sums, monotonic deques for highest/lowest)
+- User functions are inlined per call site, so stateful built-ins inside
+  them keep separate state per call, as in Pine
+- `checkpoint()`/`rollback()` save and restore all per-bar state (slot
+  values, `ta.*` states, arrays; not `varip`), so an unconfirmed real-time
+  bar can be re-executed on every tick the way TradingView does
+- With an indicator_cache.IndicatorCache, `ta.*` calls on bar series that
+  run on every bar replay cached columns (shared with the vectorized engine)
+  and store the ones they compute
+
+Usage:
+    python scripts/pine_runtime.py atr_retracement_ema_strategy.pine --data prices.csv
+    python scripts/pine_runtime.py --benchmark --bars 1000000
+    python scripts/pine_runtime.py --check
+"""
+
+import argparse
+import math
+import os
+import re
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+import ohlcv
+import ohlcv_resample
+import pine_parser as ast
+from pine_vector_engine import (
+    BUILTIN_SOURCES, CONSTANT_NAMESPACES, IGNORED_CALLS, STRATEGY_CONSTANTS, PineEvalError,
+    data_fingerprint, resolve_input,
+)
+
+NA = float("nan")
+DEFAULT_MAX_BARS_BACK = 5000
+
+BAR_SERIES = ("open", "high", "low", "close", "volume", "time")
+DERIVED_SERIES = {
+    "hl2": lambda o, h, l, c: (h + l) / 2.0,
+    "hlc3": lambda o, h, l, c: (h + l + c) / 3.0,
+    "ohlc4": lambda o, h, l, c: (o + h + l + c) / 4.0,
+    "hlcc4": lambda o, h, l, c: (h + l + 2.0 * c) / 4.0,
+}
+
+_BREAK = "break"
+_CONTINUE = "continue"
+
+
+class PineRuntimeError(PineEvalError):
+    """Raised when a script fails while running"""
+
+
+def is_na(value):
+    return value is None or (value != value)
+
+
+def truth(value):
+    """Pine bool conversion: na and 0 are false"""
+    if value is True or value is False:
+        return value
+    if value is None or value != value:
+        return False
+    return bool(value)
+
+
+def _div(a, b):
+    try:
+        return a / b
+    except ZeroDivisionError:
+        return NA
+    except TypeError:
+        return NA
+
+
+def _mod(a, b):
+    try:
+        return math.fmod(a, b)
+    except (ZeroDivisionError, ValueError, TypeError):
+        return NA
+
+
+# ---------------------------------------------------------------------------
+# Incremental ta.* state
+# ---------------------------------------------------------------------------
+
+class SmaState:
+    """ta.sma over a ring buffer with a running sum"""
+
+    __slots__ = ("length", "buffer", "index", "count", "total", "nans")
+
+    def __init__(self, length):
+        self.length = int(length)
+        self.buffer = [0.0] * self.length
+        self.index = 0
+        self.count = 0
+        self.total = 0.0
+        self.nans = 0
+
+    def update(self, value):
+        slot = self.index
+        old = self.buffer[slot]
+        if self.count == self.length:
+            if old != old:
+                self.nans -= 1
+            else:
+                self.total -= old
+        else:
+            self.count += 1
+        self.buffer[slot] = value
+        if value != value:
+            self.nans += 1
+        else:
+            self.total += value
+        self.index = slot + 1 if slot + 1 < self.length else 0
+        if self.count < self.length or self.nans:
+            return NA
+        return self.total / self.length
+
+
+class RollingSumState(SmaState):
+    """math.sum over a ring buffer"""
+
+    __slots__ = ()
+
+    def update(self, value):
+        mean = SmaState.update(self, value)
+        return mean * self.length if mean == mean else NA
+
+
+class EmaState:
+    """ta.ema, seeded with the first non-na value"""
+
+    __slots__ = ("alpha", "value")
+
+    def __init__(self, length):
+        self.alpha = 2.0 / (float(length) + 1.0)
+        self.value = NA
+
+    def update(self, source):
+        if self.value != self.value:
+            if source == source:
+                self.value = float(source)
+            return self.value
+        self.value = self.alpha * source + (1.0 - self.alpha) * self.value
+        return self.value
+
+
+class RmaState:
+    """ta.rma, seeded with the SMA of `length` consecutive non-na values and reseeded after an na"""
+
+    __slots__ = ("length", "alpha", "value", "seed_total", "seed_count")
+
+    def __init__(self, length):
+        self.length = int(length)
+        self.alpha = 1.0 / self.length
+        self.value = NA
+        self.seed_total = 0.0
+        self.seed_count = 0
+
+    def update(self, source):
+        if source != source:
+            # TradingView: na(sum[1]) ? ta.sma(src, length) : ..., so an na restarts the seed
+            self.value = NA
+            self.seed_total = 0.0
+            self.seed_count = 0
+            return NA
+        if self.seed_count < self.length:
+            self.seed_total += source
+            self.seed_count += 1
+            if self.seed_count == self.length:
+                self.value = self.seed_total / self.length
+            return self.value
+        self.value = self.alpha * source + (1.0 - self.alpha) * self.value
+        return self.value
+
+
+class TrState:
+    """ta.tr from the bar's high/low and the previous close"""
+
+    __slots__ = ("handle_na", "prev_close")
+
+    def __init__(self, handle_na=True):
+        self.handle_na = handle_na
+        self.prev_close = NA
+
+    def update(self, high, low, close):
+        prev = self.prev_close
+        self.prev_close = close
+        if prev != prev:
+            return high - low if self.handle_na else NA
+        return max(high - low, abs(high - prev), abs(low - prev))
+
+
+class AtrState:
+    """ta.atr: RMA of the true range"""
+
+    __slots__ = ("tr", "rma")
+
+    def __init__(self, length):
+        self.tr = TrState(True)
+        self.rma = RmaState(length)
+
+    def update(self, high, low, close):
+        return self.rma.update(self.tr.update(high, low, close))
+
+
+class CrossState:
+    """ta.crossover / ta.crossunder / ta.cross from the previous pair of values"""
+
+    __slots__ = ("kind", "prev_a", "prev_b")
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.prev_a = NA
+        self.prev_b = NA
+
+    def update(self, a, b):
+        pa, pb = self.prev_a, self.prev_b
+        self.prev_a, self.prev_b = a, b
+        if self.kind == "crossover":
+            return a > b and pa <= pb
+        if self.kind == "crossunder":
+            return a < b and pa >= pb
+        return (a > b and pa <= pb) or (a < b and pa >= pb)
+
+
+class ExtremeState:
+    """ta.highest / ta.lowest with a monotonic deque (amortized O(1))"""
+
+    __slots__ = ("length", "highest", "window", "bar", "nan_bar")
+
+    def __init__(self, length, highest):
+        self.length = int(length)
+        self.highest = highest
+        self.window = deque()
+        self.bar = -1
+        self.nan_bar = -1
+
+    def update(self, value):
+        self.bar += 1
+        bar = self.bar
+        window = self.window
+        if value != value:
+            self.nan_bar = bar
+        else:
+            if self.highest:
+                while window and window[-1][1] <= value:
+                    window.pop()
+            else:
+                while window and window[-1][1] >= value:
+                    window.pop()
+            window.append((bar, value))
+        while window and window[0][0] <= bar - self.length:
+            window.popleft()
+        if bar < self.length - 1 or self.nan_bar > bar - self.length or not window:
+            return NA
+        return window[0][1]
+
+
+class HistoryState:
+    """Fixed-size ring of past values for ta.change and expression history"""
+
+    __slots__ = ("size", "buffer", "count")
+
+    def __init__(self, size):
+        self.size = int(size) + 1
+        self.buffer = [NA] * self.size
+        self.count = 0
+
+    def push(self, value):
+        self.buffer[self.count % self.size] = value
+        self.count += 1
+
+    def get(self, offset):
+        if offset >= self.count or offset < 0:
+            return NA
+        return self.buffer[(self.count - 1 - offset) % self.size]
+
+
+class ChangeState:
+    __slots__ = ("length", "history")
+
+    def __init__(self, length):
+        self.length = int(length)
+        self.history = HistoryState(self.length)
+
+    def update(self, value):
+        self.history.push(value)
+        previous = self.history.get(self.length)
+        if isinstance(value, bool):
+            return previous is not NA and value != previous
+        return value - previous
+
+
+class StdevState:
+    """ta.stdev (population) with running sums"""
+
+    __slots__ = ("mean", "square")
+
+    def __init__(self, length):
+        self.mean = SmaState(length)
+        self.square = SmaState(length)
+
+    def update(self, value):
+        mean = self.mean.update(value)
+        square = self.square.update(value * value)
+        if mean != mean:
+            return NA
+        return math.sqrt(max(square - mean * mean, 0.0))
+
+
+class RsiState:
+    __slots__ = ("prev", "up", "down")
+
+    def __init__(self, length):
+        self.prev = NA
+        self.up = RmaState(length)
+        self.down = RmaState(length)
+
+    def update(self, value):
+        delta = value - self.prev
+        self.prev = value
+        up = self.up.update(max(delta, 0.0) if delta == delta else NA)
+        down = self.down.update(max(-delta, 0.0) if delta == delta else NA)
+        if up != up or down != down:
+            return NA
+        if down == 0:
+            return 100.0
+        if up == 0:
+            return 0.0
+        return 100.0 - 100.0 / (1.0 + up / down)
+
+
+TA_STATES = {
+    "ta.sma": SmaState,
+    "ta.ema": EmaState,
+    "ta.rma": RmaState,
+    "ta.stdev": StdevState,
+    "ta.rsi": RsiState,
+    "ta.change": ChangeState,
+    "math.sum": RollingSumState,
+}
+
+
+# ---------------------------------------------------------------------------
+# Arrays, strings and tables
+# ---------------------------------------------------------------------------
+
+class Table:
+    """Records the cells a script writes with table.cell()"""
+
+    def __init__(self, position, columns, rows):
+        self.position = position
+        self.columns = int(columns)
+        self.rows = int(rows)
+        self.cells = {}
+
+    def cell(self, column, row, text="", options=None):
+        self.cells[(int(column), int(row))] = dict(options or {}, text=text)
+
+    def clear(self, start_column=0, start_row=0, end_column=None, end_row=None):
+        end_column = start_column if end_column is None else end_column
+        end_row = start_row if end_row is None else end_row
+        for key in list(self.cells):
+            if start_column <= key[0] <= end_column and start_row <= key[1] <= end_row:
+                del self.cells[key]
+
+    def grid(self):
+        """Cell texts as a list of rows"""
+        return [[self.cells.get((column, row), {}).get("text", "") for column in range(self.columns)]
+                for row in range(self.rows)]
+
+
+def _java_number(value, pattern):
+    if is_na(value):
+        return "NaN"
+    if "." in pattern:
+        decimals = pattern.split(".", 1)[1]
+        required = decimals.count("0")
+        text = f"{value:.{len(decimals)}f}"
+        if len(decimals) > required:
+            whole, frac = text.split(".")
+            frac = frac.rstrip("0")
+            frac = frac + "0" * max(0, required - len(frac))
+            text = whole + ("." + frac if frac else "")
+        return text
+    return f"{value:.0f}"
+
+
+def str_format(pattern, *args):
+    """str.format with the `{0}` and `{0,number,#.##}` forms"""
+    def replace(match):
+        index = int(match.group(1))
+        value = args[index] if index < len(args) else NA
+        style = match.group(2)
+        if style and style.startswith("number"):
+            number_pattern = style.split(",", 1)[1] if "," in style else "#.###"
+            return _java_number(value, number_pattern)
+        return tostring(value)
+    return re.sub(r"\{(\d+)(?:,([^}]*))?\}", replace, pattern)
+
+
+def tostring(value, format=None):
+    if isinstance(value, str):
+        return value
+    if value is True or value is False:
+        return "true" if value else "false"
+    if is_na(value):
+        return "NaN"
+    if format is not None and format not in ("format.mintick", "format.price"):
+        return _java_number(value, format)
+    if isinstance(value, float):
+        return _java_number(value, "#.##########")
+    return str(value)
+
+
+def _str_split(text, separator):
+    return text.split(separator) if separator else list(text)
+
+
+STRING_FUNCTIONS = {
+    "str.contains": lambda s, sub: sub in s if isinstance(s, str) else False,
+    "str.split": _str_split,
+    "str.replace_all": lambda s, old, new: s.replace(old, new) if isinstance(s, str) else s,
+    "str.replace": lambda s, old, new, occurrence=0: s.replace(old, new, 1) if isinstance(s, str) else s,
+    "str.tostring": tostring,
+    "str.format": str_format,
+    "str.length": lambda s: len(s) if isinstance(s, str) else NA,
+    "str.upper": lambda s: s.upper(),
+    "str.lower": lambda s: s.lower(),
+    "str.startswith": lambda s, sub: s.startswith(sub),
+    "str.endswith": lambda s, sub: s.endswith(sub),
+    "str.substring": lambda s, begin, end=None: s[int(begin):None if end is None else int(end)],
+    "str.tonumber": lambda s: float(s) if re.fullmatch(r"\s*-?\d+(\.\d*)?\s*", s or "") else NA,
+    "str.pos": lambda s, sub: s.find(sub) if sub in s else NA,
+}
+
+
+def _array_get(array, index):
+    index = int(index)
+    if index < 0:
+        index += len(array)
+    if not 0 <= index < len(array):
+        raise PineRuntimeError(f"array index {index} is out of bounds (size {len(array)})")
+    return array[index]
+
+
+def _array_set(array, index, value):
+    index = int(index)
+    if index < 0:
+        index += len(array)
+    if not 0 <= index < len(array):
+        raise PineRuntimeError(f"array index {index} is out of bounds (size {len(array)})")
+    array[index] = value
+
+
+def _numeric(array):
+    return [value for value in array if not is_na(value)]
+
+
+ARRAY_FUNCTIONS = {
+    "array.get": _array_get,
+    "array.set": _array_set,
+    "array.push": lambda a, v: a.append(v),
+    "array.pop": lambda a: a.pop(),
+    "array.shift": lambda a: a.pop(0),
+    "array.unshift": lambda a, v: a.insert(0, v),
+    "array.insert": lambda a, i, v: a.insert(int(i), v),
+    "array.remove": lambda a, i: a.pop(int(i)),
+    "array.size": len,
+    "array.clear": lambda a: a.clear(),
+    "array.includes": lambda a, v: v in a,
+    "array.indexof": lambda a, v: a.index(v) if v in a else -1,
+    "array.first": lambda a: a[0],
+    "array.last": lambda a: a[-1],
+    "array.sum": lambda a: math.fsum(_numeric(a)),
+    "array.avg": lambda a: math.fsum(_numeric(a)) / len(_numeric(a)) if _numeric(a) else NA,
+    "array.max": lambda a: max(_numeric(a)) if _numeric(a) else NA,
+    "array.min": lambda a: min(_numeric(a)) if _numeric(a) else NA,
+    "array.copy": lambda a: list(a),
+    "array.fill": lambda a, v: a.__setitem__(slice(None), [v] * len(a)),
+    "array.join": lambda a, sep="": sep.join(tostring(v) for v in a),
+    "array.reverse": lambda a: a.reverse(),
+    "array.sort": lambda a, order=None: a.sort(reverse=order == "order.descending"),
+}
+
+ARRAY_DEFAULTS = {"float": NA, "int": NA, "bool": False, "string": None, "color": None}
+
+
+# ---------------------------------------------------------------------------
+# Static analysis
+# ---------------------------------------------------------------------------
+
+def max_lookback(script, inputs=None, max_bars_back=DEFAULT_MAX_BARS_BACK):
+    """Largest history offset used for each name, resolved through inputs and loop bounds"""
+    constants = {}
+    for stmt in script.body:
+        if isinstance(stmt, ast.Assign) and isinstance(stmt.value, ast.Call) and stmt.value.func.startswith("input"):
+            try:
+                value = resolve_input(stmt.value, stmt.target, inputs)
+            except PineEvalError:
+                continue
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                constants[stmt.target] = value
+        elif isinstance(stmt, ast.Assign) and isinstance(stmt.value, ast.Num) and stmt.mode is None:
+            constants[stmt.target] = stmt.value.value
+
+    def bound(node, loops):
+        if isinstance(node, ast.Num):
+            return node.value
+        if isinstance(node, ast.Name):
+            if node.id in loops:
+                return loops[node.id]
+            return constants.get(node.id)
+        if isinstance(node, ast.BinOp) and node.op in "+-*":
+            left, right = bound(node.left, loops), bound(node.right, loops)
+            if left is None or right is None:
+                return None
+            return {"+": left + right, "-": left - right, "*": left * right}[node.op]
+        return None
+
+    lookback = {}
+
+    def visit(node, loops):
+        if isinstance(node, ast.For):
+            start, end = bound(node.start, loops), bound(node.end, loops)
+            inner = dict(loops)
+            inner[node.var] = max(start, end) if start is not None and end is not None else None
+            for child in ast.iter_child_nodes(node):
+                visit(child, inner)
+            return
+        if isinstance(node, ast.Index):
+            offset = bound(node.offset, loops)
+            offset = max_bars_back if offset is None else int(offset)
+            key = node.value.id if isinstance(node.value, ast.Name) else id(node)
+            lookback[key] = max(lookback.get(key, 0), min(offset, max_bars_back))
+        for child in ast.iter_child_nodes(node):
+            visit(child, loops)
+
+    visit(script, {})
+    return lookback
+
+
+# ---------------------------------------------------------------------------
+# Compiler
+# ---------------------------------------------------------------------------
+
+class _CompileScope:
+    def __init__(self, parent=None):
+        self.names = {}
+        self.parent = parent
+
+    def lookup(self, name):
+        scope = self
+        while scope is not None:
+            if name in scope.names:
+                return scope.names[name]
+            scope = scope.parent
+        return None
+
+
+class _Const:
+    """Marker wrapper for compile-time constant values"""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+def same_bars_security(runtime, node, scope, compiled):
+    """request.security provider serving every symbol and timeframe from the chart's own bars
+
+    For checks and benchmarks that run screeners on synthetic data; a real run needs
+    a provider with the requested symbol's data (see screener_sim.py).
+    """
+    return _callable(compiled["expression"])
+
+
+def _same_timeframe(timeframe, chart):
+    """True when a request.security timeframe ('' = chart's) names the chart's timeframe"""
+    if timeframe in ("", None):
+        return True
+    try:
+        return ohlcv_resample.parse_timeframe(timeframe) == ohlcv_resample.parse_timeframe(chart)
+    except ValueError:
+        return str(timeframe).strip().upper() == str(chart).strip().upper()
+
+
+class Runtime:
+    """Compile a parsed script once and run it bar by bar"""
+
+    def __init__(self, script, inputs=None, timeframe="1", max_bars_back=None, record=True,
+                 security=None, broker=None, cache=None):
+        self.script = script if isinstance(script, ast.Script) else ast.parse(script)
+        self.inputs = dict(inputs or {})
+        self.timeframe = timeframe
+        self.record = record
+        self.security = security
+        self.broker = broker
+        self.cache = cache
+        self.max_bars_back = max_bars_back or self._declared_max_bars_back() or DEFAULT_MAX_BARS_BACK
+        self.lookback = max_lookback(self.script, self.inputs, self.max_bars_back)
+        self._compile()
+
+    def _declared_max_bars_back(self):
+        for stmt in self.script.body:
+            if isinstance(stmt, ast.ExprStmt) and isinstance(stmt.value, ast.Call) \
+                    and stmt.value.func in ("indicator", "strategy"):
+                for key, value in stmt.value.kwargs:
+                    if key == "max_bars_back" and isinstance(value, ast.Num):
+                        return int(value.value)
+        return None
+
+    # -- compilation ------------------------------------------------------
+
+    def _compile(self):
+        self.values = []            # slot values for the current bar
+        self.histories = []         # (slot, ring buffer list, size) committed after each bar
+        self.history_sites = []     # HistoryState objects for expression history
+        self.functions = {}
+        self.globals = {}
+        self.meta = {"kind": None, "title": None, "declaration": {}, "inputs": {}}
+        self.plots = {}
+        self.shapes = {}
+        self.alerts = {}
+        self.orders = []
+        self.tables = []
+        self.requests = []
+        self.bar = [0]
+        self.bar_slots = {}
+        self.ta_sites = []          # _CachedTa sites that can replay cached indicator columns
+        self.states = []            # mutable per-bar state objects restored by rollback()
+        self.varip_slots = set()    # slots rollback() leaves alone
+        self._every_bar = True      # False while compiling code that may be skipped on some bars
+        self._constants = {}       # slot -> value for inputs folded at compile time
+        self._columns = {}         # bar series read with a history offset
+        self._reassigned = {node.target for node in ast.walk(self.script) if isinstance(node, ast.Reassign)}
+        scope = _CompileScope()
+        self.scope = scope
+        self.body = self._compile_block(ast.strip_trivia(self.script.body), scope, top=True)
+
+    def _new_slot(self, name, scope, initial=NA):
+        slot = len(self.values)
+        self.values.append(initial)
+        scope.names[name] = slot
+        size = self.lookback.get(name)
+        if size:
+            self.histories.append((slot, [NA] * (size + 1), size + 1))
+        return slot
+
+    def _bar_slot(self, name):
+        """Slot holding the current value of a built-in bar series"""
+        if name not in self.bar_slots:
+            slot = len(self.values)
+            self.values.append(NA)
+            self.bar_slots[name] = slot
+        return self.bar_slots[name]
+
+    def _compile_block(self, body, scope, top=False):
+        steps = []
+        for stmt in body:
+            if isinstance(stmt, (ast.Comment, ast.Blank)):
+                continue
+            step = self._compile_stmt(stmt, scope, top)
+            if step is not None:
+                steps.append(step)
+        return _sequence(steps)
+
+    def _compile_stmt(self, stmt, scope, top=False):
+        values = self.values
+        if isinstance(stmt, ast.Assign):
+            if isinstance(stmt.value, ast.Call) and stmt.value.func.startswith("input"):
+                value = resolve_input(stmt.value, stmt.target, self.inputs)
+                self.meta["inputs"][stmt.target] = value[1] if isinstance(value, tuple) else value
+                if isinstance(value, tuple):
+                    getter = self._compile_name(value[1], scope, stmt.line)
+                    slot = self._new_slot(stmt.target, scope)
+                    if top:
+                        self.globals[stmt.target] = slot
+                    return _assign(values, slot, getter)
+                slot = self._new_slot(stmt.target, scope, value)
+                self._constants[slot] = value
+                if top:
+                    self.globals[stmt.target] = slot
+                return None
+            compiled = None
+            if not isinstance(stmt.value, ast.BLOCK_EXPRESSIONS):
+                if stmt.mode is not None:
+                    compiled = self._conditionally(self._compile_expr, stmt.value, scope)
+                else:
+                    compiled = self._compile_expr(stmt.value, scope)
+            slot = self._new_slot(stmt.target, scope)
+            if top:
+                self.globals[stmt.target] = slot
+            if isinstance(compiled, _Const) and stmt.target not in self._reassigned:
+                # Never reassigned: fold it like an input so lengths stay static
+                self._constants[slot] = compiled.value
+                values[slot] = compiled.value
+                return None
+            getter = _callable(compiled) if compiled is not None else self._compile_value(stmt.value, scope)
+            if stmt.mode == "varip":
+                self.varip_slots.add(slot)
+                return _assign_once(values, slot, getter)
+            if stmt.mode is not None:
+                return _assign_once(values, slot, getter, self.states)
+            return _assign(values, slot, getter)
+        if isinstance(stmt, ast.Reassign):
+            slot = scope.lookup(stmt.target)
+            if slot is None:
+                raise PineEvalError(f"line {stmt.line}: '{stmt.target}' is not declared")
+            self._constants.pop(slot, None)
+            getter = self._compile_value(stmt.value, scope)
+            if stmt.op == ":=":
+                return _assign(values, slot, getter)
+            return _compound(values, slot, stmt.op[0], getter)
+        if isinstance(stmt, ast.TupleAssign):
+            getter = self._compile_value(stmt.value, scope)
+            slots = [self._new_slot(name, scope) for name in stmt.targets]
+            if top:
+                self.globals.update(zip(stmt.targets, slots))
+
+            def assign_tuple():
+                result = getter()
+                for slot, item in zip(slots, result):
+                    values[slot] = item
+            return assign_tuple
+        if isinstance(stmt, ast.ExprStmt):
+            getter = self._compile_expr(stmt.value, scope)
+            if isinstance(getter, _Const):
+                return None
+
+            def run_expr():
+                getter()
+            return run_expr
+        if isinstance(stmt, ast.FunctionDef):
+            self.functions[stmt.name] = stmt
+            return None
+        if isinstance(stmt, ast.Break):
+            return lambda: _BREAK
+        if isinstance(stmt, ast.Continue):
+            return lambda: _CONTINUE
+        if isinstance(stmt, ast.BLOCK_EXPRESSIONS):
+            block = self._compile_block_expr(stmt, scope)
+
+            def run_block():
+                return block(False)
+            return run_block
+        raise PineEvalError(f"line {stmt.line}: unsupported statement {type(stmt).__name__}")
+
+    def _compile_value(self, node, scope):
+        if isinstance(node, ast.BLOCK_EXPRESSIONS):
+            block = self._compile_block_expr(node, scope)
+            return lambda: block(True)
+        return _callable(self._compile_expr(node, scope))
+
+    def _compile_body_value(self, body, scope):
+        """Compile a block; returns fn(want_value) running it and giving its value"""
+        code = ast.strip_trivia(body)
+        local = _CompileScope(scope)
+        last = code[-1] if code else None
+        if isinstance(last, ast.ExprStmt):
+            run = self._compile_block(code[:-1], local)
+            value = _callable(self._compile_expr(last.value, local))
+
+            def run_value(want):
+                signal = run()
+                if signal is not None:
+                    return signal
+                return value()
+            return run_value
+        if isinstance(last, ast.BLOCK_EXPRESSIONS):
+            run = self._compile_block(code[:-1], local)
+            inner = self._compile_block_expr(last, local)
+
+            def run_nested(want):
+                signal = run()
+                if signal is not None:
+                    return signal
+                return inner(want)
+            return run_nested
+        run = self._compile_block(code, local)
+        return lambda want: run()
+
+    def _conditionally(self, compile, *args):
+        """Compile code that does not run on every bar (branches, loops, `var` initialisers)"""
+        every_bar, self._every_bar = self._every_bar, False
+        try:
+            return compile(*args)
+        finally:
+            self._every_bar = every_bar
+
+    def _compile_block_expr(self, node, scope):
+        """Compile if/for/while/switch; returns fn(want_value)"""
+        return self._conditionally(self._compile_branches, node, scope)
+
+    def _compile_branches(self, node, scope):
+        if isinstance(node, ast.If):
+            test = _callable(self._compile_expr(node.test, scope))
+            body = self._compile_body_value(node.body, scope)
+            orelse = self._compile_body_value(node.orelse, scope) if node.orelse else None
+
+            def run_if(want):
+                if truth(test()):
+                    result = body(want)
+                elif orelse is not None:
+                    result = orelse(want)
+                else:
+                    return NA if want else None
+                if result is _BREAK or result is _CONTINUE:
+                    return result
+                return result if want else None
+            return run_if
+
+        if isinstance(node, ast.For):
+            start = _callable(self._compile_expr(node.start, scope))
+            end = _callable(self._compile_expr(node.end, scope))
+            step = _callable(self._compile_expr(node.step, scope)) if node.step is not None else None
+            loop_scope = _CompileScope(scope)
+            slot = self._new_slot(node.var, loop_scope)
+            body = self._compile_body_value(node.body, loop_scope)
+            values = self.values
+
+            def run_for(want):
+                first, last = start(), end()
+                if is_na(first) or is_na(last):
+                    return NA if want else None
+                first, last = int(first), int(last)
+                stride = abs(int(step())) if step is not None else 1
+                stop = last + 1 if last >= first else last - 1
+                result = NA
+                for index in range(first, stop, stride if last >= first else -stride):
+                    values[slot] = index
+                    result = body(want)
+                    if result is _BREAK:
+                        break
+                return result if want and result is not _BREAK and result is not _CONTINUE else None
+            return run_for
+
+        if isinstance(node, ast.ForIn):
+            iterable = _callable(self._compile_expr(node.iterable, scope))
+            loop_scope = _CompileScope(scope)
+            slots = [self._new_slot(name, loop_scope) for name in node.targets]
+            body = self._compile_body_value(node.body, loop_scope)
+            values = self.values
+
+            def run_for_in(want):
+                result = NA
+                for index, item in enumerate(list(iterable())):
+                    if len(slots) == 2:
+                        values[slots[0]] = index
+                        values[slots[1]] = item
+                    else:
+                        values[slots[0]] = item
+                    result = body(want)
+                    if result is _BREAK:
+                        break
+                return result if want and result is not _BREAK and result is not _CONTINUE else None
+            return run_for_in
+
+        if isinstance(node, ast.While):
+            test = _callable(self._compile_expr(node.test, scope))
+            body = self._compile_body_value(node.body, scope)
+            limit = self.max_bars_back * 100
+
+            def run_while(want):
+                result = NA
+                iterations = 0
+                while truth(test()):
+                    result = body(want)
+                    if result is _BREAK:
+                        break
+                    iterations += 1
+                    if iterations > limit:
+                        raise PineRuntimeError(f"line {node.line}: loop takes too long to execute")
+                return result if want and result is not _BREAK and result is not _CONTINUE else None
+            return run_while
+
+        if isinstance(node, ast.Switch):
+            subject = _callable(self._compile_expr(node.subject, scope)) if node.subject is not None else None
+            cases = []
+            for condition, body in node.cases:
+                test = _callable(self._compile_expr(condition, scope)) if condition is not None else None
+                cases.append((test, self._compile_body_value(body, scope)))
+
+            def run_switch(want):
+                key = subject() if subject is not None else None
+                for test, body in cases:
+                    if test is None or (test() == key if subject is not None else truth(test())):
+                        result = body(want)
+                        return result if want else None
+                return NA if want else None
+            return run_switch
+        raise PineEvalError(f"line {node.line}: unsupported statement {type(node).__name__}")
+
+    def _compile_expr(self, node, scope):
+        """Compile an expression to a zero-argument closure (or a _Const)"""
+        if isinstance(node, (ast.Num, ast.Str, ast.Bool)):
+            return _Const(node.value)
+        if isinstance(node, ast.Na):
+            return _Const(NA)
+        if isinstance(node, ast.Color):
+            return _Const(node.value)
+        if isinstance(node, ast.Placeholder):
+            raise PineEvalError(f"line {node.line}: unfilled template placeholder {{{{{node.name}}}}}")
+        if isinstance(node, ast.Name):
+            return self._compile_name(node.id, scope, node.line)
+        if isinstance(node, ast.Index):
+            return self._compile_index(node, scope)
+        if isinstance(node, ast.BinOp):
+            return self._compile_binop(node, scope)
+        if isinstance(node, ast.UnaryOp):
+            operand = self._compile_expr(node.operand, scope)
+            if node.op == "not":
+                if isinstance(operand, _Const):
+                    return _Const(not truth(operand.value))
+                return lambda: not truth(operand())
+            if node.op == "-":
+                if isinstance(operand, _Const):
+                    return _Const(-operand.value)
+                return lambda: -operand()
+            return operand
+        if isinstance(node, ast.Ternary):
+            test = self._compile_expr(node.test, scope)
+            body = _callable(self._conditionally(self._compile_expr, node.body, scope))
+            orelse = _callable(self._conditionally(self._compile_expr, node.orelse, scope))
+            if isinstance(test, _Const):
+                return body if truth(test.value) else orelse
+            return lambda: body() if truth(test()) else orelse()
+        if isinstance(node, ast.Tuple):
+            items = [_callable(self._compile_expr(elt, scope)) for elt in node.elts]
+            return lambda: tuple(item() for item in items)
+        if isinstance(node, ast.Call):
+            return self._compile_call(node, scope)
+        raise PineEvalError(f"line {node.line}: unsupported expression {type(node).__name__}")
+
+    def _compile_name(self, name, scope, line):
+        slot = scope.lookup(name)
+        values = self.values
+        if slot is not None:
+            if slot in self._constants:
+                return _Const(self._constants[slot])
+            return lambda: values[slot]
+        if name in BAR_SERIES or name in DERIVED_SERIES:
+            slot = self._bar_slot(name)
+            return lambda: values[slot]
+        if name == "bar_index":
+            bar = self.bar
+            return lambda: bar[0]
+        if name == "last_bar_index":
+            slot = self._bar_slot("last_bar_index")
+            return lambda: values[slot]
+        if name.startswith("barstate."):
+            slot = self._bar_slot(name)
+            return lambda: values[slot]
+        if name == "timeframe.period":
+            return _Const(self.timeframe)
+        if name in ("syminfo.tickerid", "syminfo.ticker"):
+            slot = self._bar_slot(name)
+            return lambda: values[slot]
+        if name in STRATEGY_CONSTANTS:
+            return _Const(STRATEGY_CONSTANTS[name])
+        if name.startswith("strategy."):
+            return self._compile_strategy_value(name, line)
+        namespace = name.split(".", 1)[0]
+        if "." in name and namespace in CONSTANT_NAMESPACES:
+            return _Const(name)
+        raise PineEvalError(f"line {line}: undefined name '{name}'")
+
+    def _compile_strategy_value(self, name, line):
+        broker = self.broker
+        if broker is None:
+            raise PineEvalError(f"line {line}: '{name}' needs the strategy backtester")
+        attribute = name.split(".", 1)[1]
+        return lambda: broker.value(attribute)
+
+    def _compile_index(self, node, scope):
+        offset = self._compile_expr(node.offset, scope)
+        target = node.value
+        bar = self.bar
+        if isinstance(target, ast.Name):
+            name = target.id
+            slot = scope.lookup(name)
+            if slot is None and (name in BAR_SERIES or name in DERIVED_SERIES):
+                column = self._history_column(name)
+                if isinstance(offset, _Const):
+                    n = int(offset.value)
+                    return lambda: column[bar[0] - n] if bar[0] >= n else NA
+                return lambda: _column_at(column, bar[0], offset())
+            if slot is not None:
+                history = self._history_for(slot, name)
+                values = self.values
+                if history is None:
+                    if isinstance(offset, _Const) and int(offset.value) == 0:
+                        return lambda: values[slot]
+                    raise PineEvalError(f"line {node.line}: no history kept for '{name}'")
+                buffer, size = history
+                if isinstance(offset, _Const):
+                    n = int(offset.value)
+                    if n == 0:
+                        return lambda: values[slot]
+                    return lambda: buffer[(bar[0] - n) % size] if bar[0] >= n else NA
+                return lambda: _ring_at(buffer, size, bar[0], offset(), values[slot])
+        inner = _callable(self._compile_expr(target, scope))
+        site = self._state(HistoryState(self.lookback.get(id(node), self.max_bars_back)))
+        offset_fn = _callable(offset)
+
+        def expression_history():
+            site.push(inner())
+            return site.get(int(offset_fn()))
+        return expression_history
+
+    def _history_for(self, slot, name):
+        for entry_slot, buffer, size in self.histories:
+            if entry_slot == slot:
+                return buffer, size
+        return None
+
+    def _history_column(self, name):
+        if name not in self._columns:
+            self._columns[name] = None
+        return _ColumnRef(self._columns, name)
+
+    def _compile_binop(self, node, scope):
+        left = self._compile_expr(node.left, scope)
+        if node.op in ("and", "or"):
+            right = self._conditionally(self._compile_expr, node.right, scope)
+        else:
+            right = self._compile_expr(node.right, scope)
+        op = node.op
+        if isinstance(left, _Const) and isinstance(right, _Const):
+            value = _apply(op, left.value, right.value)
+            return _Const(value)
+        l = _callable(left)
+        r = _callable(right)
+        if op == "and":
+            return lambda: truth(l()) and truth(r())
+        if op == "or":
+            return lambda: truth(l()) or truth(r())
+        if isinstance(right, _Const):
+            c = right.value
+            if op == "+":
+                return (lambda: _add(l(), c)) if isinstance(c, str) else (lambda: l() + c)
+            if op == "-":
+                return lambda: l() - c
+            if op == "*":
+                return lambda: l() * c
+            if op == ">":
+                return lambda: l() > c
+            if op == "<":
+                return lambda: l() < c
+            if op == ">=":
+                return lambda: l() >= c
+            if op == "<=":
+                return lambda: l() <= c
+            if op == "==":
+                return lambda: l() == c
+            if op == "!=":
+                return lambda: l() != c
+        if op == "+":
+            return lambda: _add(l(), r())
+        if op == "-":
+            return lambda: l() - r()
+        if op == "*":
+            return lambda: l() * r()
+        if op == "/":
+            return lambda: _div(l(), r())
+        if op == "%":
+            return lambda: _mod(l(), r())
+        if op == ">":
+            return lambda: l() > r()
+        if op == "<":
+            return lambda: l() < r()
+        if op == ">=":
+            return lambda: l() >= r()
+        if op == "<=":
+            return lambda: l() <= r()
+        if op == "==":
+            return lambda: l() == r()
+        if op == "!=":
+            return lambda: l() != r()
+        raise PineEvalError(f"line {node.line}: unsupported operator '{op}'")
+
+    # -- calls ------------------------------------------------------------
+
+    def _arguments(self, node, scope, names):
+        """Compile call arguments into a dict of name -> closure/_Const"""
+        compiled = {}
+        for name, arg in zip(names, node.args):
+            compiled[name] = self._compile_expr(arg, scope)
+        for key, arg in node.kwargs:
+            compiled[key] = self._compile_expr(arg, scope)
+        return compiled
+
+    def _constant_arg(self, compiled, name, default=None, line=0):
+        value = compiled.get(name)
+        if value is None:
+            return default
+        if not isinstance(value, _Const):
+            raise PineEvalError(f"line {line}: '{name}' must be a constant or input value")
+        return value.value
+
+    def _compile_call(self, node, scope):
+        func = node.func
+        if func in self.functions:
+            return self._compile_user_call(self.functions[func], node, scope)
+        if func in ("indicator", "strategy", "study"):
+            compiled = self._arguments(node, scope, ["title", "shorttitle", "overlay"])
+            self.meta["kind"] = "indicator" if func == "study" else func
+            self.meta["declaration"] = {key: value.value for key, value in compiled.items() if isinstance(value, _Const)}
+            self.meta["title"] = self.meta["declaration"].get("title")
+            return _Const(None)
+        if func.startswith("ta.") or func == "math.sum":
+            return self._compile_ta(node, scope)
+        if func.startswith("math."):
+            return self._compile_math(node, scope)
+        if func in ("na", "nz", "fixnan", "int", "float", "bool", "string"):
+            return self._compile_conversion(node, scope)
+        if func in ("plot", "plotshape", "plotchar", "plotarrow"):
+            return self._compile_plot(node, scope)
+        if func in ("alertcondition", "alert", "strategy.alert"):
+            return self._compile_alert(node, scope)
+        if func.startswith("strategy."):
+            return self._compile_order(node, scope)
+        if func.startswith("array."):
+            return self._compile_array(node, scope)
+        if func in STRING_FUNCTIONS:
+            return self._compile_plain(node, scope, STRING_FUNCTIONS[func])
+        if func.startswith("table."):
+            return self._compile_table(node, scope)
+        if func == "request.security":
+            return self._compile_security(node, scope)
+        if func in IGNORED_CALLS or func.startswith(("label.", "line.", "box.", "linefill.", "polyline.", "log.")):
+            args = [_callable(self._compile_expr(arg, scope)) for arg in node.args]
+            first = args[0] if args and func in ("color.new", "color.rgb") else None
+            if first is not None:
+                return first
+            return lambda: [arg() for arg in args] and None
+        if func.startswith("input"):
+            return _Const(resolve_input(node, None, None))
+        raise PineEvalError(f"line {node.line}: unsupported function {func}()")
+
+    def _compile_plain(self, node, scope, function):
+        args = [_callable(self._compile_expr(arg, scope)) for arg in node.args]
+        kwargs = [(key, _callable(self._compile_expr(value, scope))) for key, value in node.kwargs]
+        if kwargs:
+            return lambda: function(*[arg() for arg in args], **{key: value() for key, value in kwargs})
+        if len(args) == 1:
+            a, = args
+            return lambda: function(a())
+        if len(args) == 2:
+            a, b = args
+            return lambda: function(a(), b())
+        return lambda: function(*[arg() for arg in args])
+
+    def _compile_user_call(self, definition, node, scope):
+        local = _CompileScope(self.scope)
+        values = self.values
+        setters = []
+        keyword = dict(node.kwargs)
+        for index, (name, _type, default) in enumerate(definition.params):
+            if index < len(node.args):
+                argument = node.args[index]
+            elif name in keyword:
+                argument = keyword[name]
+            elif default is not None:
+                argument = default
+            else:
+                raise PineEvalError(f"line {node.line}: missing argument '{name}' for {definition.name}()")
+            compiled = self._compile_expr(argument, scope)
+            if isinstance(compiled, _Const) and name not in self._reassigned:
+                # Const/input argument: bind it into the inlined body so ta.* lengths stay static
+                slot = self._new_slot(name, local, compiled.value)
+                self._constants[slot] = compiled.value
+                continue
+            setters.append((self._new_slot(name, local), _callable(compiled)))
+        body = self._compile_body_value(definition.body, local)
+
+        def call_user():
+            for slot, getter in setters:
+                values[slot] = getter()
+            return body(True)
+        return call_user
+
+    def _compile_ta(self, node, scope):
+        func = node.func
+        values = self.values
+        if func == "ta.atr":
+            compiled = self._arguments(node, scope, ["length"])
+            length = self._constant_arg(compiled, "length", line=node.line)
+            state = self._state(AtrState(length))
+            h, l, c = self._bar_slot("high"), self._bar_slot("low"), self._bar_slot("close")
+            return self._cacheable("atr", ("high", "low", "close"), (int(length),),
+                                   lambda: state.update(values[h], values[l], values[c]))
+        if func == "ta.tr":
+            compiled = self._arguments(node, scope, ["handle_na"])
+            handle_na = bool(self._constant_arg(compiled, "handle_na", False, node.line))
+            state = self._state(TrState(handle_na))
+            h, l, c = self._bar_slot("high"), self._bar_slot("low"), self._bar_slot("close")
+            return self._cacheable("tr", ("high", "low", "close"), (handle_na,),
+                                   lambda: state.update(values[h], values[l], values[c]))
+        if func in ("ta.crossover", "ta.crossunder", "ta.cross"):
+            compiled = self._arguments(node, scope, ["source1", "source2"])
+            a = _callable(compiled["source1"])
+            b = _callable(compiled["source2"])
+            state = self._state(CrossState(func[3:]))
+            return lambda: state.update(a(), b())
+        if func in ("ta.highest", "ta.lowest"):
+            compiled = self._arguments(node, scope, ["source", "length"])
+            source_name = self._bar_source(node, scope)
+            if "length" not in compiled:
+                source_name = "high" if func == "ta.highest" else "low"
+                compiled = {"source": self._compile_name(source_name, scope, node.line), "length": compiled["source"]}
+            source = _callable(compiled["source"])
+            length = self._constant_arg(compiled, "length", line=node.line)
+            state = self._state(ExtremeState(length, func == "ta.highest"))
+            return self._cacheable(func[3:], (source_name,), (int(length),), lambda: state.update(source()))
+        if func in TA_STATES:
+            compiled = self._arguments(node, scope, ["source", "length"])
+            source = _callable(compiled["source"])
+            length = self._constant_arg(compiled, "length", 1, node.line)
+            state = self._state(TA_STATES[func](length))
+            update = state.update
+            name = "rolling_sum" if func == "math.sum" else func[3:]
+            return self._cacheable(name, (self._bar_source(node, scope),), (int(length),), lambda: update(source()))
+        raise PineEvalError(f"line {node.line}: unsupported function {func}()")
+
+    def _state(self, state):
+        self.states.append(state)
+        return state
+
+    def _bar_source(self, node, scope):
+        """Name of the bar series passed as a call's source, or None for any other expression"""
+        arg = node.args[0] if node.args else dict(node.kwargs).get("source")
+        if isinstance(arg, ast.Name) and arg.id in BUILTIN_SOURCES and scope.lookup(arg.id) is None:
+            return arg.id
+        return None
+
+    def _cacheable(self, name, sources, params, update):
+        """Wrap a ta.* update so it can replay a cached column (only for calls on bar series run every bar)"""
+        if self.cache is None or not self._every_bar or None in sources:
+            return update
+        site = _CachedTa(name, sources, params)
+        self.ta_sites.append(site)
+        bar = self.bar
+
+        def cached():
+            column = site.column
+            if column is not None:
+                return column[bar[0]]
+            value = update()
+            site.record.append(value)
+            return value
+        return cached
+
+    def _compile_math(self, node, scope):
+        name = node.func[5:]
+        args = [_callable(self._compile_expr(arg, scope)) for arg in node.args]
+        if name == "abs":
+            a, = args
+            return lambda: abs(a())
+        if name in ("max", "min"):
+            pick = max if name == "max" else min
+
+            def extreme():
+                items = [arg() for arg in args]
+                if any(is_na(item) for item in items):
+                    return NA
+                return pick(items)
+            return extreme
+        if name == "round":
+            a = args[0]
+            precision = args[1] if len(args) > 1 else (lambda: 0)
+            return lambda: _round(a(), precision())
+        if name in ("sqrt", "log", "log10", "exp", "floor", "ceil", "sin", "cos", "tan"):
+            function = getattr(math, name)
+            a, = args
+
+            def unary():
+                value = a()
+                if is_na(value):
+                    return NA
+                try:
+                    return function(value)
+                except ValueError:
+                    return NA
+            return unary
+        if name == "pow":
+            a, b = args
+            return lambda: _pow(a(), b())
+        if name == "sign":
+            a, = args
+            return lambda: NA if is_na(a()) else float((a() > 0) - (a() < 0))
+        if name == "avg":
+            return lambda: sum(arg() for arg in args) / len(args)
+        raise PineEvalError(f"line {node.line}: unsupported function {node.func}()")
+
+    def _compile_conversion(self, node, scope):
+        args = [_callable(self._compile_expr(arg, scope)) for arg in node.args]
+        func = node.func
+        if func == "na":
+            a, = args
+            return lambda: is_na(a())
+        if func == "nz":
+            a = args[0]
+            replacement = args[1] if len(args) > 1 else (lambda: 0.0)
+
+            def nz():
+                value = a()
+                return replacement() if is_na(value) else value
+            return nz
+        if func == "fixnan":
+            a, = args
+            last = self._state([NA])
+
+            def fixnan():
+                value = a()
+                if not is_na(value):
+                    last[0] = value
+                return last[0]
+            return fixnan
+        if func == "int":
+            a, = args
+            return lambda: NA if is_na(a()) else int(a())
+        if func == "float":
+            a, = args
+            return lambda: NA if is_na(a()) else float(a())
+        if func == "string":
+            a, = args
+            return a
+        a, = args
+        return lambda: truth(a())
+
+    # -- recorded outputs -------------------------------------------------
+
+    def _compile_plot(self, node, scope):
+        compiled = self._arguments(node, scope, ["series", "title"])
+        title = self._constant_arg(compiled, "title", None, node.line) or f"{node.func}_{node.line}"
+        series = _callable(compiled["series"])
+        bar = self.bar
+        if node.func == "plot":
+            column = self.plots.setdefault(title, [])
+        else:
+            column = self.shapes.setdefault(title, [])
+            return lambda: column.append((bar[0], truth(series())))
+        return lambda: column.append((bar[0], series()))
+
+    def _compile_alert(self, node, scope):
+        bar = self.bar
+        if node.func == "alertcondition":
+            compiled = self._arguments(node, scope, ["condition", "title", "message"])
+            title = self._constant_arg(compiled, "title", None, node.line) or f"alert_{node.line}"
+            condition = _callable(compiled["condition"])
+            fired = self.alerts.setdefault(title, [])
+
+            def alert_condition():
+                if truth(condition()):
+                    fired.append(bar[0])
+            return alert_condition
+        compiled = self._arguments(node, scope, ["message"])
+        message = compiled.get("message")
+        title = message.value if isinstance(message, _Const) else f"alert_{node.line}"
+        fired = self.alerts.setdefault(title, [])
+        return lambda: fired.append(bar[0])
+
+    def _compile_order(self, node, scope):
+        action = node.func.split(".", 1)[1]
+        names = {
+            "entry": ["id", "direction", "qty", "limit", "stop"],
+            "order": ["id", "direction", "qty", "limit", "stop"],
+            "close": ["id", "comment", "qty"],
+            "exit": ["id", "from_entry", "qty", "qty_percent", "profit", "limit", "loss", "stop"],
+        }.get(action)
+        if names is None:
+            names = ["id"]
+        arguments = self._arguments(node, scope, names)
+        compiled = {key: _callable(value) for key, value in arguments.items()}
+        bar = self.bar
+        broker = self.broker
+        site = {"action": action, "line": node.line, "bars": []}
+        site.update((key, value.value) for key, value in arguments.items() if isinstance(value, _Const))
+        self.orders.append(site)
+        fired = site["bars"]
+
+        def place_order():
+            order = {key: value() for key, value in compiled.items()}
+            site.update(order)
+            fired.append(bar[0])
+            if broker is not None:
+                order["action"] = action
+                order["bar"] = bar[0]
+                broker.submit(order)
+        return place_order
+
+    def _compile_array(self, node, scope):
+        func = node.func
+        if func.startswith("array.new"):
+            element = node.type_args[0] if node.type_args else func[len("array.new_"):]
+            default = ARRAY_DEFAULTS.get(element, NA)
+            compiled = self._arguments(node, scope, ["size", "initial_value"])
+            size = _callable(compiled.get("size", _Const(0)))
+            initial = _callable(compiled["initial_value"]) if "initial_value" in compiled else (lambda: default)
+            return lambda: [initial()] * int(size())
+        if func == "array.from":
+            items = [_callable(self._compile_expr(arg, scope)) for arg in node.args]
+            return lambda: [item() for item in items]
+        function = ARRAY_FUNCTIONS.get(func)
+        if function is None:
+            raise PineEvalError(f"line {node.line}: unsupported function {func}()")
+        return self._compile_plain(node, scope, function)
+
+    def _compile_table(self, node, scope):
+        func = node.func
+        if func == "table.new":
+            compiled = self._arguments(node, scope, ["position", "columns", "rows"])
+            position = _callable(compiled["position"])
+            columns = _callable(compiled["columns"])
+            rows = _callable(compiled["rows"])
+            tables = self.tables
+
+            def new_table():
+                table = Table(position(), columns(), rows())
+                tables.append(table)
+                return table
+            return new_table
+        if func == "table.cell":
+            compiled = self._arguments(node, scope, ["table_id", "column", "row", "text"])
+            table = _callable(compiled.pop("table_id"))
+            column = _callable(compiled.pop("column"))
+            row = _callable(compiled.pop("row"))
+            text = _callable(compiled.pop("text", _Const("")))
+            options = [(key, _callable(value)) for key, value in compiled.items()]
+            return lambda: table().cell(column(), row(), text(), {key: value() for key, value in options})
+        if func == "table.clear":
+            compiled = self._arguments(node, scope, ["table_id", "start_column", "start_row", "end_column", "end_row"])
+            getters = [_callable(compiled[key]) if key in compiled else (lambda: None)
+                       for key in ("table_id", "start_column", "start_row", "end_column", "end_row")]
+            return lambda: getters[0]().clear(*[int(getter()) if getter() is not None else None for getter in getters[1:]])
+        args = [_callable(self._compile_expr(arg, scope)) for arg in node.args]
+        return lambda: [arg() for arg in args] and None
+
+    def _compile_security(self, node, scope):
+        compiled = self._arguments(node, scope, ["symbol", "timeframe", "expression", "gaps", "lookahead"])
+        self.requests.append({"line": node.line, "symbol": compiled.get("symbol")})
+        if self.security is not None:
+            return self.security(self, node, scope, compiled)
+        # Without a provider the expression is evaluated on the chart's own data, which only
+        # matches request.security when it asks for the chart's symbol and timeframe
+        timeframe = self._constant_arg(compiled, "timeframe", "", node.line)
+        if not _same_timeframe(timeframe, self.timeframe):
+            raise PineEvalError(f"line {node.line}: request.security on timeframe {timeframe!r} needs a "
+                                f"security provider (chart timeframe is {self.timeframe!r})")
+        expression = _callable(compiled["expression"])
+        if "symbol" not in compiled:
+            return expression
+        requested = _callable(compiled["symbol"])
+        values = self.values
+        chart = self._bar_slot("syminfo.tickerid")
+        line = node.line
+
+        def evaluate():
+            symbol = requested()
+            if symbol != values[chart] and symbol != values[chart].rpartition(":")[2]:
+                raise PineEvalError(f"line {line}: request.security on symbol {symbol!r} needs a "
+                                    f"security provider (chart symbol is {values[chart]!r})")
+            return expression()
+        return evaluate
+
+    # -- running ----------------------------------------------------------
+
+    def run(self, data, symbol=""):
+        """Run the compiled script over every bar of `data`; returns a result dict"""
+        count = ohlcv.bar_count(data)
+        return self._run_bars(data, range(count), count, symbol)
+
+    def _prepare(self, data, count, symbol):
+        columns = {name: data[name].tolist() for name in BAR_SERIES if name in data}
+        o, h, l, c = columns["open"], columns["high"], columns["low"], columns["close"]
+        for name, function in DERIVED_SERIES.items():
+            if name in self._columns or name in self.bar_slots:
+                columns[name] = [function(*bar) for bar in zip(o, h, l, c)]
+        for name in self._columns:
+            self._columns[name] = columns[name]
+        feeds = [(slot, columns[name]) for name, slot in self.bar_slots.items() if name in columns]
+        values = self.values
+        if self.ta_sites:
+            self._attach_cached_columns(data, count)
+        for name, slot in self.bar_slots.items():
+            if name == "last_bar_index":
+                values[slot] = count - 1
+            elif name in ("syminfo.tickerid", "syminfo.ticker"):
+                values[slot] = symbol
+        return feeds
+
+    def _run_bars(self, data, bars, count, symbol):
+        feeds = self._prepare(data, count, symbol)
+        values = self.values
+        bar = self.bar
+        body = self.body
+        histories = self.histories
+        first_slot = self.bar_slots.get("barstate.isfirst")
+        last_slot = self.bar_slots.get("barstate.islast")
+        for name in ("barstate.isconfirmed", "barstate.ishistory", "barstate.isnew"):
+            if name in self.bar_slots:
+                values[self.bar_slots[name]] = True
+        if "barstate.isrealtime" in self.bar_slots:
+            values[self.bar_slots["barstate.isrealtime"]] = False
+        recorded = self._recorders(count)
+        on_bar = self.broker.advance if self.broker is not None else None
+
+        for index in bars:
+            bar[0] = index
+            if on_bar is not None:
+                on_bar(index)
+            for slot, column in feeds:
+                values[slot] = column[index]
+            if first_slot is not None:
+                values[first_slot] = index == 0
+            if last_slot is not None:
+                values[last_slot] = index == count - 1
+            body()
+            for slot, buffer, size in histories:
+                buffer[index % size] = values[slot]
+            for slot, column in recorded:
+                column[index] = values[slot]
+        if self.ta_sites:
+            self._store_cached_columns(count)
+        return self._result(count, recorded)
+
+    def checkpoint(self):
+        """Snapshot of the per-bar state, taken before running an unconfirmed bar"""
+        memo = {}
+        values = [_copy_value(value, memo) for value in self.values]
+        return values, [_copy_state(state) for state in self.states]
+
+    def rollback(self, checkpoint):
+        """Restore a checkpoint(); it can be rolled back to again"""
+        saved_values, saved_states = checkpoint
+        values = self.values
+        varip = self.varip_slots
+        memo = {}
+        for slot, value in enumerate(saved_values):
+            if slot not in varip:
+                values[slot] = _copy_value(value, memo)
+        for state, saved in zip(self.states, saved_states):
+            _restore_state(state, saved)
+
+    def _attach_cached_columns(self, data, count):
+        source = data_fingerprint(data)
+        for site in self.ta_sites:
+            site.key = (site.name,) + tuple((name, source) for name in site.sources) + site.params
+            column = self.cache.get(site.key)
+            if column is not None and len(column) == count:
+                site.column, site.record = column.tolist(), None
+            else:
+                site.column, site.record = None, []
+
+    def _store_cached_columns(self, count):
+        for site in self.ta_sites:
+            if site.record is not None and len(site.record) == count:
+                self.cache[site.key] = np.array(site.record, dtype=np.float64)
+            site.record = None
+
+    def _recorders(self, count):
+        if not self.record:
+            return []
+        names = self.globals if self.record is True else {name: self.globals[name] for name in self.record}
+        recorded = []
+        self._recorded_names = []
+        for name, slot in names.items():
+            if slot in self._constants:
+                continue
+            recorded.append((slot, [NA] * count))
+            self._recorded_names.append(name)
+        return recorded
+
+    def _result(self, count, recorded):
+        result = dict(self.meta)
+        result["bars"] = count
+        result["series"] = {}
+        for name, (slot, column) in zip(getattr(self, "_recorded_names", []), recorded):
+            result["series"][name] = _to_array(column)
+        for name, slot in self.globals.items():
+            if slot in self._constants:
+                result["series"][name] = self._constants[slot]
+        result["plots"] = {title: _points_to_array(points, count, NA) for title, points in self.plots.items()}
+        result["shapes"] = {title: _points_to_array(points, count, False) for title, points in self.shapes.items()}
+        alerts = {title: _bars_to_mask(bars, count) for title, bars in self.alerts.items()}
+        result["alerts"] = alerts
+        result["orders"] = []
+        for site in self.orders:
+            order = {key: value for key, value in site.items() if key != "bars"}
+            order["when"] = _bars_to_mask(site["bars"], count)
+            result["orders"].append(order)
+        result["tables"] = [table.grid() for table in self.tables]
+        return result
+
+
+class _CachedTa:
+    """A ta.* call site keyed like VectorEngine._ta(): function name, source series and constant parameters"""
+
+    __slots__ = ("name", "sources", "params", "key", "column", "record")
+
+    def __init__(self, name, sources, params):
+        self.name = name
+        self.sources = sources
+        self.params = params
+        self.key = None
+        self.column = None
+        self.record = None
+
+
+class _ColumnRef:
+    """Late-bound reference to a bar column, filled in when a run starts"""
+
+    __slots__ = ("columns", "name")
+
+    def __init__(self, columns, name):
+        self.columns = columns
+        self.name = name
+
+    def __getitem__(self, index):
+        return self.columns[self.name][index]
+
+
+def _column_at(column, bar, offset):
+    offset = int(offset)
+    return column[bar - offset] if 0 <= offset <= bar else NA
+
+
+def _ring_at(buffer, size, bar, offset, current):
+    offset = int(offset)
+    if offset == 0:
+        return current
+    if offset < 0 or offset > bar or offset >= size:
+        return NA
+    return buffer[(bar - offset) % size]
+
+
+def _copy_value(value, memo):
+    """Copy of a slot value for checkpoints (arrays are copied once, keeping shared references shared)"""
+    if type(value) is not list:
+        return value
+    copied = memo.get(id(value))
+    if copied is None:
+        copied = memo[id(value)] = list(value)
+    return copied
+
+
+def _copy_state(state):
+    if isinstance(state, list):
+        return list(state)
+    saved = {}
+    for cls in type(state).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            value = getattr(state, name)
+            if isinstance(value, (list, deque)):
+                value = type(value)(value)
+            elif hasattr(type(value), "__slots__") and not isinstance(value, (str, int, float, bool, tuple)):
+                value = _copy_state(value)
+            saved[name] = value
+    return saved
+
+
+def _restore_state(state, saved):
+    if isinstance(state, list):
+        state[:] = saved
+        return
+    for name, value in saved.items():
+        if isinstance(value, dict):
+            _restore_state(getattr(state, name), value)
+        elif isinstance(value, (list, deque)):
+            setattr(state, name, type(value)(value))
+        else:
+            setattr(state, name, value)
+
+
+def _callable(compiled):
+    if isinstance(compiled, _Const):
+        value = compiled.value
+        return lambda: value
+    return compiled
+
+
+def _sequence(steps):
+    if not steps:
+        return lambda: None
+    if len(steps) == 1:
+        return steps[0]
+    steps = tuple(steps)
+
+    def run_steps():
+        for step in steps:
+            signal = step()
+            if signal is not None:
+                return signal
+        return None
+    return run_steps
+
+
+def _assign(values, slot, getter):
+    def assign():
+        values[slot] = getter()
+    return assign
+
+
+def _assign_once(values, slot, getter, states=None):
+    done = [False]
+    if states is not None:
+        states.append(done)
+
+    def assign_once():
+        if not done[0]:
+            values[slot] = getter()
+            done[0] = True
+    return assign_once
+
+
+def _compound(values, slot, op, getter):
+    def compound():
+        values[slot] = _apply(op, values[slot], getter())
+    return compound
+
+
+def _add(a, b):
+    if isinstance(a, str) or isinstance(b, str):
+        if a is None or b is None:
+            return None
+        return tostring(a) + tostring(b)
+    return a + b
+
+
+def _apply(op, a, b):
+    if op == "+":
+        return _add(a, b)
+    if op == "-":
+        return a - b
+    if op == "*":
+        return a * b
+    if op == "/":
+        return _div(a, b)
+    if op == "%":
+        return _mod(a, b)
+    if op == "and":
+        return truth(a) and truth(b)
+    if op == "or":
+        return truth(a) or truth(b)
+    return {"==": a == b, "!=": a != b, "<": a < b, ">": a > b, "<=": a <= b, ">=": a >= b}[op]
+
+
+def _round(value, precision):
+    if is_na(value):
+        return NA
+    precision = int(precision or 0)
+    scaled = math.floor(value * 10 ** precision + 0.5)
+    return scaled / 10 ** precision if precision else int(scaled)
+
+
+def _pow(a, b):
+    try:
+        return math.pow(a, b)
+    except (ValueError, OverflowError):
+        return NA
+
+
+def _to_array(column):
+    try:
+        return np.asarray(column, dtype=np.float64) if not any(isinstance(v, (str, list, Table)) or v is None for v in column[:1]) else np.asarray(column, dtype=object)
+    except (TypeError, ValueError):
+        return np.asarray(column, dtype=object)
+
+
+def _bars_to_mask(bars, count):
+    mask = np.zeros(count, dtype=bool)
+    if bars:
+        mask[np.asarray(bars)] = True
+    return mask
+
+
+def _points_to_array(points, count, fill):
+    dtype = bool if fill is False else np.float64
+    out = np.full(count, fill, dtype=dtype)
+    for index, value in points:
+        out[index] = value
+    return out
+
+
+def run_script(script, data, inputs=None, timeframe="1", **options):
+    """Parse (if needed), compile and run a script bar by bar"""
+    if isinstance(script, str) and os.path.exists(script):
+        script = ast.parse_file(script)
+    return Runtime(script, inputs, timeframe, **options).run(data)
+
+
+def benchmark(paths, bars, repeat=1):
+    data = ohlcv.synthetic(bars)
+    print(f"Benchmark: {bars:,} synthetic bars")
+    for path in paths:
+        script = ast.parse_file(path)
+        start = time.perf_counter()
+        runtime = Runtime(script, record=False)
+        compiled = time.perf_counter()
+        runtime.run(data)
+        elapsed = time.perf_counter() - compiled
+        print(f"  {path}: compile {1000 * (compiled - start):.1f} ms, run {elapsed:.2f} s, "
+              f"{bars / elapsed:,.0f} bars/s ({60 * bars / elapsed / 1e6:.1f}M bars/min)")
+
+
+# Scripts and snippets --check runs; each must compile and run on synthetic bars
+CHECK_SCRIPTS = (
+    "atr_retracement_ema_signals.pine",
+    "atr_retracement_ema_strategy.pine",
+    "screeners/example_screener/final/example_screener.pine",
+    "templates/kurutoga_screener_template.pine",
+    "templates/strategy_template.pine",
+)
+CHECK_SNIPPETS = {
+    "input length through a helper": 'indicator("t")\nf(src, n) => ta.sma(src, n)\nplot(f(close, input.int(14)))\n',
+    "literal length through a nested helper": 'indicator("t")\ng(n) => ta.rsi(close, n)\nf(n) => g(n)\nplot(f(7))\n',
+    "request.security on the chart itself": 'indicator("t")\n'
+        'plot(request.security(syminfo.tickerid, timeframe.period, ta.sma(close, 5)))\n',
+}
+
+# Snippets that must be rejected (run as chart symbol NSE:RELIANCE, timeframe "60")
+CHECK_ERRORS = {
+    "request.security on a foreign symbol": 'indicator("t")\nplot(request.security("NSE:ABB", timeframe.period, close))\n',
+    "request.security on another timeframe": 'indicator("t")\nplot(request.security(syminfo.tickerid, "D", close))\n',
+}
+
+# Snippets whose series must match between the vector engine and the bar-by-bar runtime
+PARITY_SNIPPETS = {
+    "ta.ema over interior na": 'indicator("t")\nx = bar_index % 100 == 50 ? na : close\ny = ta.ema(x, 10)\n',
+    "ta.rma/ta.rsi over na in the seed window and later": 'indicator("t")\n'
+        'x = bar_index == 3 or bar_index % 100 == 50 ? na : close\ny = ta.rma(x, 10)\nz = ta.rsi(x, 14)\n',
+    "ta.atr (rma of the true range)": 'indicator("t")\ny = ta.atr(14)\n',
+}
+
+
+def check_parity(data):
+    """Run PARITY_SNIPPETS on both engines; returns the number of mismatching snippets"""
+    from pine_vector_engine import VectorEngine
+
+    failed = 0
+    for label, source in PARITY_SNIPPETS.items():
+        script = ast.parse(source, cache=False)
+        vector = VectorEngine(script).run(data)["series"]
+        runtime = run_script(script, data)["series"]
+        differing = [name for name, column in vector.items()
+                     if not np.allclose(np.asarray(runtime[name], dtype=np.float64),
+                                        np.asarray(column, dtype=np.float64), rtol=1e-9, equal_nan=True)]
+        if differing:
+            failed += 1
+            print(f"  FAIL {label}: engines differ on {', '.join(differing)}")
+        else:
+            print(f"  ok   {label}")
+    return failed
+
+
+def check(root, bars=2000):
+    """Run CHECK_SCRIPTS and CHECK_SNIPPETS, reject CHECK_ERRORS and run PARITY_SNIPPETS on both engines;
+    True if all pass"""
+    data = ohlcv.synthetic(bars, seed=7)
+    cases = [(path, os.path.join(root, path)) for path in CHECK_SCRIPTS]
+    cases += [(label, ast.parse(source, cache=False)) for label, source in CHECK_SNIPPETS.items()]
+    failed = 0
+    for label, script in cases:
+        try:
+            run_script(script, data, security=same_bars_security)
+        except (OSError, ast.PineSyntaxError, PineEvalError) as e:
+            failed += 1
+            print(f"  FAIL {label}: {e}")
+        else:
+            print(f"  ok   {label}")
+    for label, source in CHECK_ERRORS.items():
+        try:
+            Runtime(ast.parse(source, cache=False), timeframe="60").run(data, symbol="NSE:RELIANCE")
+        except PineEvalError:
+            print(f"  ok   {label} (rejected)")
+        else:
+            failed += 1
+            print(f"  FAIL {label}: ran without a security provider")
+    failed += check_parity(data)
+    total = len(cases) + len(CHECK_ERRORS) + len(PARITY_SNIPPETS)
+    print(f"{total - failed}/{total} passed")
+    return not failed
+
+
+def main():
+    from pine_vector_engine import _parse_overrides, summarize
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Run Pine Script bar by bar")
+    parser.add_argument("scripts", nargs="*", help="Pine scripts to run")
+    parser.add_argument("--data", help="OHLCV CSV or Parquet file (default: synthetic random walk)")
+    parser.add_argument("--bars", type=int, default=1_000_000, help="Synthetic bars for --benchmark or when no data is given")
+    parser.add_argument("--input", action="append", metavar="NAME=VALUE", help="Override an input by variable name or title")
+    parser.add_argument("--benchmark", action="store_true", help="Report bars per second")
+    parser.add_argument("--check", action="store_true", help="Run the regression scripts, snippets and engine parity checks on synthetic bars")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if check(root) else 1)
+
+    paths = args.scripts or [os.path.join(root, "atr_retracement_ema_strategy.pine")]
+    if args.benchmark:
+        benchmark(paths, args.bars)
+        return
+    data = ohlcv.load(args.data) if args.data else ohlcv.synthetic(args.bars)
+    for path in paths:
+        try:
+            result = run_script(path, data, _parse_overrides(args.input))
+        except PineEvalError as e:
+            print(f"{path}: {e}")
+            sys.exit(1)
+        summarize(result)
+        for table in result["tables"]:
+            for row in table:
+                if any(row):
+                    print("  | " + " | ".join(row))
+
+
+if __name__ == "__main__":
+    main()
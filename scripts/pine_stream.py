@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Streaming bar-by-bar evaluation of Pine Script
+
+Runs a compiled pine_runtime.Runtime one bar at a time as bars arrive,
+instead of over a whole OHLCV history. The runtime already keeps every
+`ta.*` call as an O(1) incremental state (EMA/RMA accumulators, Wilder ATR,
+rolling windows, the previous values of `ta.crossover`) and every `x[n]` as
+a fixed-size ring, so a stream only has to feed one bar, run the compiled
+body once and report what happened on that bar:
+
+- plot/plotshape values, alerts (`alert`, `alertcondition`,
+  `strategy.alert`) and `strategy.*` orders placed on the bar
+- current values of the script's global variables via `stream[name]`
+
+Bar series read with a history offset (`close[2]`) are kept in rings sized
+by the script's largest offset, so memory does not grow with the stream.
+Closed bars go through `step()`. The forming real-time bar can also be
+evaluated on every tick with `tick()`: as on TradingView, the runtime rolls
+back to its state before the bar's first tick (Runtime.checkpoint()) ahead
+of each execution, with `barstate.isconfirmed` false, and the bar's close
+commits it. Bars pushed through `warmup()` are historical
+(`barstate.ishistory`), later ones are real-time (`barstate.isrealtime`,
+`barstate.islast`). `last_bar_index` is the current bar. Orders are reported, not filled: scripts that read broker state
+(`strategy.position_size`, ...) need pine_backtest.py.
+
+Bars can be pushed one at a time, fed from any iterable (`feed()`) or
+consumed from an asyncio queue (`consume()`). `--check` verifies that a
+stream reproduces the batch run bar for bar.
+
+Usage:
+    python scripts/pine_stream.py atr_retracement_ema_strategy.pine --data prices.csv --check
+    python scripts/pine_stream.py atr_retracement_ema_strategy.pine --warmup history.csv < live_bars.csv
+    python scripts/pine_stream.py --benchmark --bars 200000
+"""
+
+import argparse
+import csv
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+import ohlcv
+import pine_parser as ast
+from pine_runtime import BAR_SERIES, DERIVED_SERIES, NA, Runtime
+from pine_vector_engine import PineEvalError, _parse_overrides
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SCRIPT = os.path.join(ROOT, "atr_retracement_ema_strategy.pine")
+
+
+class _BarRing:
+    """History of one bar series indexed by absolute bar number, keeping the last `size` bars"""
+
+    __slots__ = ("size", "buffer")
+
+    def __init__(self, size):
+        self.size = size
+        self.buffer = [NA] * size
+
+    def __getitem__(self, index):
+        return self.buffer[index % self.size]
+
+    def __setitem__(self, index, value):
+        self.buffer[index % self.size] = value
+
+
+class Stream:
+    """A script compiled once and evaluated one closed bar at a time"""
+
+    def __init__(self, script, inputs=None, timeframe="1", symbol="", max_bars_back=None, security=None):
+        if isinstance(script, str) and os.path.exists(script):
+            script = ast.parse_file(script)
+        self.runtime = runtime = Runtime(script, inputs, timeframe, max_bars_back, record=False,
+                                         security=security)
+        self.symbol = symbol
+        self.index = -1
+        self.live = False
+        self._checkpoint = None     # state before the forming bar's first tick
+        self._rings = []
+        for name in runtime._columns:
+            ring = _BarRing(runtime.lookback.get(name, runtime.max_bars_back) + 1)
+            runtime._columns[name] = ring
+            self._rings.append((name, ring))
+        self._feeds = [(slot, name) for name, slot in runtime.bar_slots.items()
+                       if name in BAR_SERIES or name in DERIVED_SERIES]
+        self._derived = [name for name in DERIVED_SERIES
+                         if name in runtime._columns or name in runtime.bar_slots]
+        self._barstate = {name: runtime.bar_slots.get(name) for name in (
+            "barstate.isfirst", "barstate.islast", "barstate.ishistory", "barstate.isrealtime",
+            "barstate.isconfirmed", "barstate.isnew", "last_bar_index")}
+        values = runtime.values
+        for name in ("syminfo.tickerid", "syminfo.ticker"):
+            if name in runtime.bar_slots:
+                values[runtime.bar_slots[name]] = symbol
+        self._set_live(False)
+        self._plots = list(runtime.plots.items())
+        self._shapes = list(runtime.shapes.items())
+        self._alerts = list(runtime.alerts.items())
+        self._orders = runtime.orders
+
+    def _set_live(self, live):
+        self.live = live
+        values = self.runtime.values
+        for name, state in (("barstate.ishistory", not live), ("barstate.isrealtime", live)):
+            slot = self._barstate[name]
+            if slot is not None:
+                values[slot] = state
+
+    def __getitem__(self, name):
+        """Current value of a global variable"""
+        runtime = self.runtime
+        slot = runtime.globals[name]
+        if slot in runtime._constants:
+            return runtime._constants[slot]
+        return runtime.values[slot]
+
+    @property
+    def bars(self):
+        return self.index + 1
+
+    def push(self, bar, confirmed=True):
+        """Evaluate a bar given as a mapping with OHLCV keys or a (time, open, high, low, close, volume) sequence"""
+        if hasattr(bar, "keys"):
+            bar = (bar["time"], bar["open"], bar["high"], bar["low"], bar["close"], bar.get("volume", 0.0))
+        return self._execute(*bar, confirmed)
+
+    def step(self, time, open, high, low, close, volume=0.0):
+        """Evaluate one closed bar given as scalars; returns what the script did on it"""
+        return self._execute(time, open, high, low, close, volume, True)
+
+    def tick(self, time, open, high, low, close, volume=0.0):
+        """Evaluate the forming bar as of one real-time tick; its effects are rolled back before the next execution"""
+        return self._execute(time, open, high, low, close, volume, False)
+
+    def _execute(self, time, open, high, low, close, volume, confirmed):
+        runtime = self.runtime
+        values = runtime.values
+        new = self._checkpoint is None
+        if not new:
+            runtime.rollback(self._checkpoint)
+        elif not confirmed:
+            self._checkpoint = runtime.checkpoint()
+        index = self.index + 1
+        runtime.bar[0] = index
+        series = {"time": time, "open": open, "high": high, "low": low, "close": close, "volume": volume}
+        for name in self._derived:
+            series[name] = DERIVED_SERIES[name](open, high, low, close)
+        for name, ring in self._rings:
+            ring[index] = series[name]
+        for slot, name in self._feeds:
+            values[slot] = series[name]
+        state = self._barstate
+        if state["barstate.isfirst"] is not None:
+            values[state["barstate.isfirst"]] = index == 0
+        if state["barstate.islast"] is not None:
+            values[state["barstate.islast"]] = self.live
+        if state["barstate.isconfirmed"] is not None:
+            values[state["barstate.isconfirmed"]] = confirmed
+        if state["barstate.isnew"] is not None:
+            values[state["barstate.isnew"]] = new
+        if state["last_bar_index"] is not None:
+            values[state["last_bar_index"]] = index
+        runtime.body()
+        if confirmed:
+            self.index = index
+            self._checkpoint = None
+            for slot, buffer, size in runtime.histories:
+                buffer[index % size] = values[slot]
+        return self._collect(index, time)
+
+    def _collect(self, index, time):
+        update = {"bar": index, "time": time, "plots": {}, "shapes": {}, "alerts": [], "orders": []}
+        for title, points in self._plots:
+            if points:
+                update["plots"][title] = points[-1][1]
+                points.clear()
+        for title, points in self._shapes:
+            if points:
+                update["shapes"][title] = points[-1][1]
+                points.clear()
+        for title, fired in self._alerts:
+            if fired:
+                update["alerts"].append(title)
+                fired.clear()
+        for site in self._orders:
+            if site["bars"]:
+                update["orders"].append({key: value for key, value in site.items() if key != "bars"})
+                site["bars"].clear()
+        return update
+
+    def warmup(self, data):
+        """Replay a historical OHLCV dict; returns the number of bars"""
+        self._set_live(False)
+        columns = [data[name].tolist() if name in data else [0.0] * ohlcv.bar_count(data) for name in ohlcv.COLUMNS]
+        step = self.step
+        for bar in zip(*columns):
+            step(*bar)
+        self._set_live(True)
+        return len(columns[0])
+
+    def feed(self, bars):
+        """Evaluate bars from an iterable as they arrive, yielding one update per bar"""
+        push = self.push
+        for bar in bars:
+            yield push(bar)
+
+    async def consume(self, queue):
+        """Evaluate bars taken from an asyncio.Queue until a None arrives, yielding one update per bar"""
+        while True:
+            bar = await queue.get()
+            if bar is None:
+                return
+            yield self.push(bar)
+
+
+def _same(a, b):
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return a == b or (isinstance(a, float) and isinstance(b, float) and math.isclose(a, b, rel_tol=1e-12, abs_tol=1e-12))
+
+
+def parity(script, data, inputs=None, timeframe="1"):
+    """Compare a stream against a batch run over the same bars; returns a list of mismatches"""
+    if isinstance(script, str) and os.path.exists(script):
+        script = ast.parse_file(script)
+    batch = Runtime(script, inputs, timeframe, record=False).run(data)
+    stream = Stream(script, inputs, timeframe)
+    count = ohlcv.bar_count(data)
+    columns = [data[name].tolist() for name in ohlcv.COLUMNS]
+    plots = {title: np.asarray(column).tolist() for title, column in batch["plots"].items()}
+    shapes = {title: np.asarray(column).tolist() for title, column in batch["shapes"].items()}
+    alerts = {title: set(np.flatnonzero(mask).tolist()) for title, mask in batch["alerts"].items()}
+    orders = [set(np.flatnonzero(order["when"]).tolist()) for order in batch["orders"]]
+    mismatches = []
+    for index, bar in enumerate(zip(*columns)):
+        update = stream.step(*bar)
+        for title, column in plots.items():
+            if not _same(update["plots"].get(title, NA), column[index]):
+                mismatches.append(f"bar {index}: plot '{title}' {update['plots'].get(title, NA)} != {column[index]}")
+        for title, column in shapes.items():
+            if bool(update["shapes"].get(title, False)) != bool(column[index]):
+                mismatches.append(f"bar {index}: shape '{title}' differs")
+        fired = set(update["alerts"])
+        for title, bars in alerts.items():
+            if (title in fired) != (index in bars):
+                mismatches.append(f"bar {index}: alert '{title}' differs")
+        placed = {order["line"] for order in update["orders"]}
+        for site, bars in zip(batch["orders"], orders):
+            if (site["line"] in placed) != (index in bars):
+                mismatches.append(f"bar {index}: strategy.{site['action']} on line {site['line']} differs")
+        if len(mismatches) > 20:
+            break
+    if stream.bars != count and len(mismatches) <= 20:
+        mismatches.append(f"stream saw {stream.bars} bars, batch {count}")
+    return mismatches
+
+
+def read_bars(lines):
+    """Parse CSV lines (time,open,high,low,close,volume, with or without a header) into bar tuples"""
+    for row in csv.reader(lines):
+        if not row or not row[0].strip():
+            continue
+        try:
+            values = [float(value) for value in row[1:6]]
+        except ValueError:
+            continue        # header line
+        time_value = ohlcv._parse_time(row[0])
+        yield (time_value, *values, *([0.0] * (5 - len(values))))
+
+
+def describe(update):
+    """One line for a bar on which the script alerted or placed orders (None otherwise)"""
+    events = [f"alert '{title}'" for title in update["alerts"]]
+    events += [f"strategy.{order['action']}({order.get('id', '')!r})" for order in update["orders"]]
+    if not events:
+        return None
+    return f"bar {update['bar']} ({update['time']}): " + ", ".join(events)
+
+
+def benchmark(path, bars):
+    """Microseconds per streamed bar, plus a parity check against the batch run"""
+    script = ast.parse_file(path)
+    data = ohlcv.synthetic(bars)
+    columns = [data[name].tolist() for name in ohlcv.COLUMNS]
+    stream = Stream(script)
+    step = stream.step
+    start = time.perf_counter()
+    for bar in zip(*columns):
+        step(*bar)
+    elapsed = time.perf_counter() - start
+    batch_start = time.perf_counter()
+    Runtime(script, record=False).run(data)
+    batch = time.perf_counter() - batch_start
+    print(f"Benchmark: {os.path.basename(path)} on {bars:,} synthetic bars")
+    print(f"  stream: {1e6 * elapsed / bars:.1f} us/bar ({bars / elapsed:,.0f} bars/s)")
+    print(f"  batch:  {1e6 * batch / bars:.1f} us/bar")
+    mismatches = parity(script, ohlcv.synthetic(min(bars, 20_000), seed=1))
+    print(f"  parity on {min(bars, 20_000):,} bars: {'OK' if not mismatches else f'{len(mismatches)} mismatches'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate a Pine script one bar at a time")
+    parser.add_argument("script", nargs="?", default=DEFAULT_SCRIPT, help="Pine script (default: ATR strategy)")
+    parser.add_argument("--data", help="OHLCV file to stream (default: CSV bars from stdin)")
+    parser.add_argument("--warmup", help="OHLCV file replayed as history before streaming")
+    parser.add_argument("--input", action="append", metavar="NAME=VALUE", help="Override an input by variable name or title")
+    parser.add_argument("--symbol", default="", help="Value for syminfo.tickerid")
+    parser.add_argument("--check", action="store_true", help="Compare the stream with the batch run of --data")
+    parser.add_argument("--benchmark", action="store_true", help="Report microseconds per bar on synthetic data")
+    parser.add_argument("--bars", type=int, default=100_000, help="Synthetic bars for --benchmark")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.script, args.bars)
+        return
+    inputs = _parse_overrides(args.input)
+    try:
+        if args.check:
+            data = ohlcv.load(args.data) if args.data else ohlcv.synthetic(args.bars)
+            mismatches = parity(args.script, data, inputs)
+            for line in mismatches:
+                print(f"  {line}")
+            print(f"{args.script}: {'stream matches batch' if not mismatches else 'MISMATCH'} "
+                  f"over {ohlcv.bar_count(data):,} bars")
+            sys.exit(1 if mismatches else 0)
+
+        stream = Stream(args.script, inputs, symbol=args.symbol)
+        if args.warmup:
+            print(f"Warmed up on {stream.warmup(ohlcv.load(args.warmup)):,} historical bars", file=sys.stderr)
+        if args.data:
+            data = ohlcv.load(args.data)
+            bars = zip(*[data[name].tolist() for name in ohlcv.COLUMNS])
+        else:
+            bars = read_bars(sys.stdin)
+        for update in stream.feed(bars):
+            line = describe(update)
+            if line:
+                print(line, flush=True)
+    except (PineEvalError, ast.PineSyntaxError) as e:
+        print(f"{args.script}: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
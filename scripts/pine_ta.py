@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Column implementations of Pine Script `ta.*` and `math.*` built-ins
+
+Every function takes whole NumPy columns and returns a whole column, so a
+script's indicators are computed in a handful of vectorized passes instead
+of a Python loop per bar. `na` is represented by NaN; boolean results are
+plain bool arrays (false where any input is na), matching Pine v5 where
+bools cannot be na.
+
+The recursive averages (`ta.ema`, `ta.rma`) are evaluated block-wise: within
+a block the recurrence is solved in closed form with a cumulative sum, and
+only the last value is carried to the next block. Block length is chosen so
+the scaling factors stay inside float64 range. An na source bar yields na and
+the recursion restarts on the next run of valid values, as the bar-by-bar
+states in pine_runtime.py (and TradingView) do.
+"""
+
+import math
+
+import numpy as np
+
+
+def shift(values, offset):
+    """`x[offset]`: the column delayed by `offset` bars (na/false at the start)"""
+    values = np.asarray(values)
+    if offset == 0:
+        return values
+    if offset < 0:
+        raise ValueError("history reference offset must be non-negative")
+    fill = False if values.dtype == bool else np.nan
+    out = np.empty(values.shape, dtype=values.dtype if values.dtype == bool else np.float64)
+    out[:offset] = fill
+    out[offset:] = values[:-offset] if offset < len(values) else values[:0]
+    return out
+
+
+def _valid_runs(values):
+    """(start, end) of every run of consecutive non-na values"""
+    valid = np.concatenate(([0], ~np.isnan(values), [0])).astype(np.int8)
+    return np.flatnonzero(np.diff(valid)).reshape(-1, 2)
+
+
+def recursive_average(values, alpha, start, seed):
+    """Solve y[t] = alpha * x[t] + (1 - alpha) * y[t - 1] from y[start] = seed"""
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    if start >= len(values) or np.isnan(seed):
+        return out
+    out[start] = seed
+    if alpha >= 1.0:
+        out[start + 1:] = values[start + 1:]
+        return out
+
+    decay = 1.0 - alpha
+    block = max(1, min(4096, int(600.0 / -math.log(decay))))
+    state = seed
+    position = start + 1
+    count = len(values)
+    while position < count:
+        end = min(position + block, count)
+        chunk = values[position:end]
+        k = np.arange(1, len(chunk) + 1, dtype=np.float64)
+        powers = decay ** k
+        # y[j] = decay^(j+1) * state + alpha * sum_{i<=j} decay^(j-i) x[i]
+        result = powers * (state + alpha * np.cumsum(chunk / powers))
+        out[position:end] = result
+        state = result[-1]
+        position = end
+    return out
+
+
+def sma(values, length):
+    """ta.sma: simple moving average"""
+    values = np.asarray(values, dtype=np.float64)
+    length = int(length)
+    out = np.full(len(values), np.nan)
+    if length <= 0 or length > len(values):
+        return out
+    sums = np.cumsum(np.where(np.isnan(values), 0.0, values))
+    counts = np.cumsum(~np.isnan(values))
+    window_sum = sums[length - 1:] - np.concatenate(([0.0], sums[:-length]))
+    window_count = counts[length - 1:] - np.concatenate(([0], counts[:-length]))
+    out[length - 1:] = np.where(window_count == length, window_sum / length, np.nan)
+    return out
+
+
+def rolling_sum(values, length):
+    """math.sum: rolling sum over `length` bars"""
+    return sma(values, length) * int(length)
+
+
+def ema(values, length):
+    """ta.ema: exponential moving average, reseeded with the first value after every na"""
+    values = np.asarray(values, dtype=np.float64)
+    alpha = 2.0 / (float(length) + 1.0)
+    out = np.full(len(values), np.nan)
+    for start, end in _valid_runs(values):
+        out[start:end] = recursive_average(values[start:end], alpha, 0, values[start])
+    return out
+
+
+def rma(values, length):
+    """ta.rma: Wilder moving average, reseeded with an SMA of `length` values after every na"""
+    values = np.asarray(values, dtype=np.float64)
+    length = int(length)
+    out = np.full(len(values), np.nan)
+    if length <= 0:
+        return out
+    # TradingView: na(sum[1]) ? ta.sma(src, length) : alpha * src + (1 - alpha) * sum[1]
+    for start, end in _valid_runs(values):
+        if end - start >= length:
+            seed = float(np.mean(values[start:start + length]))
+            out[start:end] = recursive_average(values[start:end], 1.0 / length, length - 1, seed)
+    return out
+
+
+def tr(high, low, close, handle_na=True):
+    """ta.tr: true range; the first bar uses high - low when `handle_na` is true"""
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    prev_close = shift(np.asarray(close, dtype=np.float64), 1)
+    ranges = np.maximum.reduce([
+        high - low,
+        np.abs(high - prev_close),
+        np.abs(low - prev_close),
+    ])
+    if len(ranges):
+        ranges[0] = high[0] - low[0] if handle_na else np.nan
+    return ranges
+
+
+def atr(high, low, close, length):
+    """ta.atr: RMA of the true range"""
+    return rma(tr(high, low, close, True), length)
+
+
+def crossover(a, b):
+    """ta.crossover: `a` crosses above `b` on this bar"""
+    a = np.asarray(a, dtype=np.float64)
+    b = np.broadcast_to(np.asarray(b, dtype=np.float64), a.shape)
+    with np.errstate(invalid="ignore"):
+        return (a > b) & (shift(a, 1) <= shift(b, 1))
+
+
+def crossunder(a, b):
+    """ta.crossunder: `a` crosses below `b` on this bar"""
+    a = np.asarray(a, dtype=np.float64)
+    b = np.broadcast_to(np.asarray(b, dtype=np.float64), a.shape)
+    with np.errstate(invalid="ignore"):
+        return (a < b) & (shift(a, 1) >= shift(b, 1))
+
+
+def cross(a, b):
+    """ta.cross: either crossover or crossunder"""
+    return crossover(a, b) | crossunder(a, b)
+
+
+def _window(values, length, reducer):
+    values = np.asarray(values, dtype=np.float64)
+    length = int(length)
+    out = np.full(len(values), np.nan)
+    if length <= 0 or length > len(values):
+        return out
+    windows = np.lib.stride_tricks.sliding_window_view(values, length)
+    out[length - 1:] = reducer(windows, axis=1)
+    return out
+
+
+def highest(values, length):
+    """ta.highest: highest value over `length` bars"""
+    return _window(values, length, np.max)
+
+
+def lowest(values, length):
+    """ta.lowest: lowest value over `length` bars"""
+    return _window(values, length, np.min)
+
+
+def stdev(values, length):
+    """ta.stdev: population standard deviation over `length` bars"""
+    return _window(values, length, np.std)
+
+
+def change(values, length=1):
+    """ta.change: difference between the current value and `length` bars ago"""
+    values = np.asarray(values)
+    if values.dtype == bool:
+        return values != shift(values, int(length))
+    return values - shift(values, int(length))
+
+
+def rsi(values, length):
+    """ta.rsi: relative strength index"""
+    delta = change(np.asarray(values, dtype=np.float64), 1)
+    up = rma(np.maximum(delta, 0.0), length)
+    down = rma(np.maximum(-delta, 0.0), length)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = 100.0 - 100.0 / (1.0 + up / down)
+    result = np.where(down == 0, 100.0, np.where(up == 0, 0.0, result))
+    return np.where(np.isnan(up) | np.isnan(down), np.nan, result)
+
+
+def nz(values, replacement=0.0):
+    """nz: replace na with `replacement`"""
+    values = np.asarray(values)
+    if values.dtype == bool:
+        return values
+    return np.where(np.isnan(values), replacement, values)
+
+
+def is_na(values):
+    """na(): true where the value is na"""
+    values = np.asarray(values)
+    if values.dtype.kind != "f":
+        return np.zeros(values.shape, dtype=bool)
+    return np.isnan(values)
@@ -0,0 +1,1249 @@
+#!/usr/bin/env python3
+"""
+Pine Script type and qualifier inference
+
+Infers the type (int, float, bool, string, color, arrays, drawing ids and
+tuples) and the qualifier (const < input < simple < series) of every
+variable, expression and `=>` function call in a script, and reports what
+TradingView would reject:
+
+- built-in calls are resolved against their overloads: arguments of the
+  wrong type (`nz()` on a bool or string, `lookahead=true` instead of
+  `barmerge.lookahead_on`) or with a stronger qualifier than a parameter
+  takes (a series length for `ta.ema`, a series symbol for
+  `request.security`)
+- `request.security` expressions must evaluate to int/float/bool/string/
+  color values (or arrays or tuples of them)
+- declared types against their values, `string + number`, numeric
+  conditions in v6, `x = na` without a declared type
+- `:=` and compound assignments widen a variable's qualifier (to series
+  when the reassignment is conditional, in a loop, or of a `var`/`varip`
+  variable), so a body is inferred until its variables stop widening;
+  globals cannot be modified inside functions, and functions cannot be
+  defined inside functions
+
+Built-in signatures come from pine_reference_db.py's signatures.sqlite for
+the script's version when it has been built, otherwise from the table
+below, which lists the leading parameters of the common built-ins
+(arguments past them are not checked).
+
+User functions are inferred per call: each instantiation (the argument
+types, plus the types of the globals the body reads) is summarized and the
+summary cached on a digest of the function's AST and, transitively, of the
+functions it calls. A TypeInference object kept across edits (an editor
+re-running it on every keystroke) therefore re-infers only the edited
+function and the functions that call it; everything else is a cache hit.
+
+Usage:
+    python scripts/pine_types.py templates/kurutoga_screener_template.pine
+    python scripts/pine_types.py atr_retracement_ema_signals.pine --types
+    python scripts/pine_types.py --lookup nz --lookup request.security --version v5
+    python scripts/pine_types.py --benchmark
+"""
+
+import argparse
+import glob
+import hashlib
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+
+import pine_parser as ast
+import pine_reference_db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_VERSION = 6
+QUALIFIERS = pine_reference_db.QUALIFIERS
+CONST, INPUT, SIMPLE, SERIES = range(4)
+MAX_PASSES = 8
+MAX_SUMMARIES = 4096
+SECURITY_TYPES = {"int", "float", "bool", "string", "color"}
+TYPE_SPLIT_RE = re.compile(r"/(?![^<]*>)")
+SIGNATURE_RE = re.compile(r"^(?P<name>[\w.]+)\((?P<params>.*)\)\s*→\s*(?P<returns>.+)$")
+PARAM_RE = re.compile(r"^(?P<name>[\w.]+|\.\.\.)(?P<optional>\?)?:\s*(?P<type>.+)$")
+
+# name ...: type
+BUILTIN_VARIABLES = """
+open high low close volume hl2 hlc3 ohlc4 hlcc4: series float
+time time_close time_tradingday timenow last_bar_time bar_index last_bar_index: series int
+year month weekofyear dayofmonth dayofweek hour minute second: series int
+barstate.isfirst barstate.islast barstate.ishistory barstate.isrealtime barstate.isnew: series bool
+barstate.isconfirmed barstate.islastconfirmedhistory: series bool
+session.ismarket session.ispremarket session.ispostmarket: series bool
+ta.tr ta.vwap ta.obv ta.accdist ta.nvi ta.pvi ta.pvt ta.wad ta.wvad ta.iii: series float
+strategy.position_size strategy.position_avg_price strategy.equity strategy.netprofit: series float
+strategy.openprofit strategy.grossprofit strategy.grossloss strategy.initial_capital: series float
+strategy.opentrades strategy.closedtrades strategy.wintrades strategy.losstrades: series int
+strategy.long strategy.short: const strategy_direction
+strategy.fixed strategy.cash strategy.percent_of_equity: const string
+syminfo.ticker syminfo.tickerid syminfo.prefix syminfo.root syminfo.description: simple string
+syminfo.currency syminfo.basecurrency syminfo.type syminfo.session syminfo.timezone: simple string
+syminfo.mintick syminfo.pointvalue: simple float
+timeframe.period: simple string
+timeframe.multiplier: simple int
+timeframe.isintraday timeframe.isdaily timeframe.isweekly timeframe.ismonthly timeframe.isdwm: simple bool
+timeframe.isminutes timeframe.isseconds: simple bool
+chart.bg_color chart.fg_color: simple color
+math.pi math.e math.phi math.rphi: const float
+"""
+
+# Members of these namespaces are constants of one type
+NAMESPACE_CONSTANTS = (
+    ("color.", "const color"),
+    ("barmerge.lookahead_", "const barmerge_lookahead"),
+    ("barmerge.gaps_", "const barmerge_gaps"),
+    ("plot.style_", "const plot_style"),
+    ("hline.style_", "const hline_style"),
+    ("display.", "const plot_display"),
+    ("order.", "const sort_order"),
+    ("scale.", "const scale_type"),
+    ("dayofweek.", "const int"),
+    ("shape.", "const string"), ("location.", "const string"), ("size.", "const string"),
+    ("position.", "const string"), ("text.", "const string"), ("extend.", "const string"),
+    ("xloc.", "const string"), ("yloc.", "const string"), ("format.", "const string"),
+    ("currency.", "const string"), ("font.", "const string"), ("alert.", "const string"),
+    ("line.style_", "const string"), ("label.style_", "const string"),
+    ("strategy.direction.", "const string"), ("strategy.commission.", "const string"),
+    ("strategy.oca.", "const string"),
+)
+
+# name(param[?]: [qualifier] type[/type], ...) → [qualifier] type; a parameter without a qualifier
+# takes series, a return type without one has the strongest qualifier of the arguments; T is generic,
+# `any` takes anything, `...` repeats
+BUILTIN_FUNCTIONS = """
+nz(source: int, replacement?: int) → int
+nz(source: float, replacement?: float) → float
+nz(source: color, replacement?: color) → color
+na(x: T) → bool
+fixnan(source: T) → series T
+int(x: int/float) → int
+float(x: int/float) → float
+bool(x: int/float/bool) → bool
+input(defval: const T, title?: const string) → input T
+input.int(defval: const int, title?: const string, minval?: const int, maxval?: const int, step?: const int, tooltip?: const string, inline?: const string, group?: const string, confirm?: const bool) → input int
+input.float(defval: const int/float, title?: const string, minval?: const int/float, maxval?: const int/float, step?: const int/float, tooltip?: const string, inline?: const string, group?: const string, confirm?: const bool) → input float
+input.bool(defval: const bool, title?: const string, tooltip?: const string, inline?: const string, group?: const string, confirm?: const bool) → input bool
+input.string(defval: const string, title?: const string, options?: any, tooltip?: const string, inline?: const string, group?: const string, confirm?: const bool) → input string
+input.color(defval: const color, title?: const string, tooltip?: const string, inline?: const string, group?: const string, confirm?: const bool) → input color
+input.source(defval: int/float, title?: const string, tooltip?: const string, inline?: const string, group?: const string) → series float
+input.symbol(defval: const string, title?: const string, tooltip?: const string, inline?: const string, group?: const string, confirm?: const bool) → input string
+input.timeframe(defval: const string, title?: const string, options?: any, tooltip?: const string, inline?: const string, group?: const string, confirm?: const bool) → input string
+input.session(defval: const string, title?: const string, options?: any, tooltip?: const string, inline?: const string, group?: const string, confirm?: const bool) → input string
+input.time(defval: const int, title?: const string, tooltip?: const string, inline?: const string, group?: const string, confirm?: const bool) → input int
+input.price(defval: const int/float, title?: const string, tooltip?: const string, inline?: const string, group?: const string, confirm?: const bool) → input float
+input.text_area(defval: const string, title?: const string, tooltip?: const string, group?: const string, confirm?: const bool) → input string
+ta.sma(source: int/float, length: int) → series float
+ta.wma(source: int/float, length: int) → series float
+ta.vwma(source: int/float, length: int) → series float
+ta.ema(source: int/float, length: simple int) → series float
+ta.rma(source: int/float, length: simple int) → series float
+ta.hma(source: int/float, length: simple int) → series float
+ta.swma(source: int/float) → series float
+ta.alma(series: int/float, length: int, offset: simple int/float, sigma: simple int/float, floor?: simple bool) → series float
+ta.rsi(source: int/float, length: simple int) → series float
+ta.atr(length: simple int) → series float
+ta.tr(handle_na?: simple bool) → series float
+ta.stdev(source: int/float, length: int, biased?: bool) → series float
+ta.dev(source: int/float, length: int) → series float
+ta.variance(source: int/float, length: int, biased?: bool) → series float
+ta.highest(source: int/float, length: int) → series float
+ta.highest(length: int) → series float
+ta.lowest(source: int/float, length: int) → series float
+ta.lowest(length: int) → series float
+ta.highestbars(source: int/float, length: int) → series int
+ta.highestbars(length: int) → series int
+ta.lowestbars(source: int/float, length: int) → series int
+ta.lowestbars(length: int) → series int
+ta.change(source: int, length?: int) → series int
+ta.change(source: float, length?: int) → series float
+ta.change(source: bool/string, length?: int) → series bool
+ta.crossover(source1: int/float, source2: int/float) → series bool
+ta.crossunder(source1: int/float, source2: int/float) → series bool
+ta.cross(source1: int/float, source2: int/float) → series bool
+ta.rising(source: int/float, length: int) → series bool
+ta.falling(source: int/float, length: int) → series bool
+ta.mom(source: int/float, length: int) → series float
+ta.roc(source: int/float, length: int) → series float
+ta.cci(source: int/float, length: int) → series float
+ta.cmo(series: int/float, length: int) → series float
+ta.mfi(series: int/float, length: int) → series float
+ta.wpr(length: int) → series float
+ta.cum(source: int/float) → series float
+ta.median(source: int/float, length: int) → series float
+ta.percentrank(source: int/float, length: int) → series float
+ta.linreg(source: int/float, length: int, offset: simple int) → series float
+ta.correlation(source1: int/float, source2: int/float, length: int) → series float
+ta.stoch(source: int/float, high: int/float, low: int/float, length: int) → series float
+ta.vwap(source: int/float) → series float
+ta.sar(start: simple int/float, inc: simple int/float, max: simple int/float) → series float
+ta.valuewhen(condition: bool, source: T, occurrence: simple int) → series T
+ta.barssince(condition: bool) → series int
+ta.pivothigh(source: int/float, leftbars: int/float, rightbars: int/float) → series float
+ta.pivothigh(leftbars: int/float, rightbars: int/float) → series float
+ta.pivotlow(source: int/float, leftbars: int/float, rightbars: int/float) → series float
+ta.pivotlow(leftbars: int/float, rightbars: int/float) → series float
+ta.macd(source: int/float, fastlen: simple int, slowlen: simple int, siglen: simple int) → [series float, series float, series float]
+ta.bb(series: int/float, length: int, mult: simple int/float) → [series float, series float, series float]
+ta.kc(series: int/float, length: simple int, mult: simple int/float, useTrueRange?: simple bool) → [series float, series float, series float]
+ta.dmi(diLength: simple int, adxSmoothing: simple int) → [series float, series float, series float]
+ta.supertrend(factor: int/float, atrPeriod: simple int) → [series float, series int]
+math.abs(number: int) → int
+math.abs(number: float) → float
+math.round(number: int/float, precision: int) → float
+math.round(number: int/float) → int
+math.floor(number: int/float) → int
+math.ceil(number: int/float) → int
+math.max(number0: int, number1: int, ...: int) → int
+math.max(number0: float, number1: float, ...: float) → float
+math.min(number0: int, number1: int, ...: int) → int
+math.min(number0: float, number1: float, ...: float) → float
+math.avg(number0: int/float, number1: int/float, ...: int/float) → float
+math.sqrt(number: int/float) → float
+math.log(number: int/float) → float
+math.log10(number: int/float) → float
+math.exp(number: int/float) → float
+math.pow(base: int/float, exponent: int/float) → float
+math.sign(number: int/float) → float
+math.sin(angle: int/float) → float
+math.cos(angle: int/float) → float
+math.tan(angle: int/float) → float
+math.atan(angle: int/float) → float
+math.todegrees(radians: int/float) → float
+math.toradians(degrees: int/float) → float
+math.round_to_mintick(number: int/float) → float
+math.sum(source: int/float, length: int) → series float
+math.random(min?: int/float, max?: int/float, seed?: simple int) → series float
+str.tostring(value: any, format?: string) → string
+str.format(formatString: string, ...: any) → string
+str.contains(source: string, str: string) → bool
+str.startswith(source: string, str: string) → bool
+str.endswith(source: string, str: string) → bool
+str.pos(source: string, str: string) → int
+str.replace_all(source: string, target: string, replacement: string) → string
+str.replace(source: string, target: string, replacement: string, occurrence?: int) → string
+str.split(string: string, separator: string) → series array<string>
+str.length(string: string) → int
+str.lower(source: string) → string
+str.upper(source: string) → string
+str.trim(source: string) → string
+str.substring(source: string, begin_pos: int, end_pos?: int) → string
+str.tonumber(string: string) → float
+str.repeat(source: string, repeat: int, separator?: string) → string
+str.match(source: string, regex: string) → string
+color.new(color: color, transp: int/float) → color
+color.rgb(red: int/float, green: int/float, blue: int/float, transp?: int/float) → color
+color.from_gradient(value: int/float, bottom_value: int/float, top_value: int/float, bottom_color: color, top_color: color) → color
+color.r(color: color) → float
+color.g(color: color) → float
+color.b(color: color) → float
+color.t(color: color) → float
+time(timeframe: string, session?: string, timezone?: string) → series int
+time_close(timeframe: string, session?: string, timezone?: string) → series int
+timestamp(year: int, month: int, day: int, hour?: int, minute?: int, second?: int) → int
+timestamp(timezone: string, year: int, month: int, day: int, hour?: int, minute?: int, second?: int) → int
+timestamp(dateString: string) → int
+year(time: int, timezone?: string) → series int
+month(time: int, timezone?: string) → series int
+dayofmonth(time: int, timezone?: string) → series int
+dayofweek(time: int, timezone?: string) → series int
+hour(time: int, timezone?: string) → series int
+minute(time: int, timezone?: string) → series int
+second(time: int, timezone?: string) → series int
+timeframe.in_seconds(timeframe?: simple string) → simple int
+timeframe.change(timeframe: simple string) → series bool
+request.security(symbol: simple string, timeframe: simple string, expression: T, gaps?: simple barmerge_gaps, lookahead?: simple barmerge_lookahead, ignore_invalid_symbol?: input bool, currency?: simple string) → series T
+request.security_lower_tf(symbol: simple string, timeframe: simple string, expression: T, ignore_invalid_symbol?: input bool, currency?: simple string) → series array<T>
+ticker.new(prefix: simple string, ticker: simple string, session?: simple string, adjustment?: simple string) → simple string
+ticker.modify(tickerid: simple string, session?: simple string, adjustment?: simple string) → simple string
+ticker.heikinashi(symbol: simple string) → simple string
+indicator(title: const string, shorttitle?: const string, overlay?: const bool, format?: const string, precision?: const int, scale?: const scale_type, max_bars_back?: const int, timeframe?: const string, timeframe_gaps?: const bool, explicit_plot_zorder?: const bool, max_lines_count?: const int, max_labels_count?: const int, max_boxes_count?: const int) → void
+strategy(title: const string, shorttitle?: const string, overlay?: const bool, format?: const string, precision?: const int) → void
+library(title: const string, overlay?: const bool) → void
+plot(series: int/float, title?: const string, color?: color, linewidth?: input int, style?: input plot_style) → series plot
+plotshape(series: int/float/bool, title?: const string, style?: input string, location?: input string, color?: color, offset?: simple int, text?: const string, textcolor?: color, editable?: const bool, size?: const string) → void
+plotchar(series: int/float/bool, title?: const string, char?: input string, location?: input string, color?: color, offset?: simple int, text?: const string, textcolor?: color, editable?: const bool, size?: const string) → void
+plotarrow(series: int/float, title?: const string) → void
+plotcandle(open: int/float, high: int/float, low: int/float, close: int/float, title?: const string) → void
+plotbar(open: int/float, high: int/float, low: int/float, close: int/float, title?: const string) → void
+bgcolor(color: color, offset?: simple int) → void
+barcolor(color: color, offset?: simple int) → void
+hline(price: input int/float, title?: const string, color?: input color) → series hline
+fill(hline1: plot/hline, hline2: plot/hline, color?: color) → void
+alert(message: string, freq?: input string) → void
+alertcondition(condition: bool, title?: const string, message?: const string) → void
+runtime.error(message: string) → void
+max_bars_back(var: T, num: const int) → void
+strategy.entry(id: string, direction: strategy_direction, qty?: int/float, limit?: int/float, stop?: int/float, oca_name?: string, oca_type?: input string, comment?: string, alert_message?: string) → void
+strategy.order(id: string, direction: strategy_direction, qty?: int/float, limit?: int/float, stop?: int/float, oca_name?: string, oca_type?: input string, comment?: string, alert_message?: string) → void
+strategy.exit(id: string, from_entry?: string, qty?: int/float, qty_percent?: int/float, profit?: int/float, limit?: int/float, loss?: int/float, stop?: int/float, trail_price?: int/float, trail_points?: int/float, trail_offset?: int/float, oca_name?: string, comment?: string) → void
+strategy.close(id: string, comment?: string, qty?: int/float, qty_percent?: int/float) → void
+strategy.close_all(comment?: string) → void
+strategy.cancel(id: string) → void
+strategy.cancel_all() → void
+array.new(size?: int, initial_value?: T) → series array<T>
+array.new_float(size?: int, initial_value?: float) → series array<float>
+array.new_int(size?: int, initial_value?: int) → series array<int>
+array.new_bool(size?: int, initial_value?: bool) → series array<bool>
+array.new_string(size?: int, initial_value?: string) → series array<string>
+array.new_color(size?: int, initial_value?: color) → series array<color>
+array.new_label(size?: int, initial_value?: label) → series array<label>
+array.new_line(size?: int, initial_value?: line) → series array<line>
+array.new_box(size?: int, initial_value?: box) → series array<box>
+array.from(arg0: T, ...: T) → series array<T>
+array.get(id: array<T>, index: int) → series T
+array.set(id: array<T>, index: int, value: T) → void
+array.push(id: array<T>, value: T) → void
+array.unshift(id: array<T>, value: T) → void
+array.insert(id: array<T>, index: int, value: T) → void
+array.pop(id: array<T>) → series T
+array.shift(id: array<T>) → series T
+array.first(id: array<T>) → series T
+array.last(id: array<T>) → series T
+array.remove(id: array<T>, index: int) → series T
+array.size(id: array<T>) → series int
+array.clear(id: array<T>) → void
+array.reverse(id: array<T>) → void
+array.sort(id: array<T>, order?: sort_order) → void
+array.fill(id: array<T>, value: T, index_from?: int, index_to?: int) → void
+array.includes(id: array<T>, value: T) → series bool
+array.indexof(id: array<T>, value: T) → series int
+array.lastindexof(id: array<T>, value: T) → series int
+array.join(id: array<T>, separator?: string) → series string
+array.copy(id: array<T>) → series array<T>
+array.slice(id: array<T>, index_from: int, index_to: int) → series array<T>
+array.concat(id1: array<T>, id2: array<T>) → series array<T>
+array.sum(id: array<int>) → series int
+array.sum(id: array<float>) → series float
+array.avg(id: array<int/float>) → series float
+array.max(id: array<int>, nth?: int) → series int
+array.max(id: array<float>, nth?: int) → series float
+array.min(id: array<int>, nth?: int) → series int
+array.min(id: array<float>, nth?: int) → series float
+array.median(id: array<int/float>) → series float
+array.stdev(id: array<int/float>, biased?: bool) → series float
+table.new(position: string, columns: int, rows: int, bgcolor?: color, frame_color?: color, frame_width?: int, border_color?: color, border_width?: int) → series table
+table.cell(table_id: table, column: int, row: int, text?: string, width?: int/float, height?: int/float, text_color?: color, text_halign?: string, text_valign?: string, text_size?: string, bgcolor?: color, tooltip?: string) → void
+table.cell_set_text(table_id: table, column: int, row: int, text: string) → void
+table.cell_set_bgcolor(table_id: table, column: int, row: int, bgcolor: color) → void
+table.cell_set_text_color(table_id: table, column: int, row: int, text_color: color) → void
+table.clear(table_id: table, start_column: int, start_row: int, end_column?: int, end_row?: int) → void
+table.delete(table_id: table) → void
+label.new(x: int, y: int/float, text?: string, xloc?: string, yloc?: string, color?: color, style?: string, textcolor?: color, size?: string, textalign?: string, tooltip?: string) → series label
+label.delete(id: label) → void
+label.set_text(id: label, text: string) → void
+label.set_xy(id: label, x: int, y: int/float) → void
+label.set_x(id: label, x: int) → void
+label.set_y(id: label, y: int/float) → void
+label.set_color(id: label, color: color) → void
+line.new(x1: int, y1: int/float, x2: int, y2: int/float, xloc?: string, extend?: string, color?: color, style?: string, width?: int) → series line
+line.delete(id: line) → void
+line.set_xy1(id: line, x: int, y: int/float) → void
+line.set_xy2(id: line, x: int, y: int/float) → void
+line.get_price(id: line, x: int) → series float
+box.new(left: int, top: int/float, right: int, bottom: int/float, border_color?: color, border_width?: int, border_style?: string, extend?: string, xloc?: string, bgcolor?: color) → series box
+box.delete(id: box) → void
+"""
+
+
+class Type(namedtuple("Type", "qualifier name")):
+    """A qualified type; `name` is None when unknown and a tuple of Types for tuple results"""
+
+    __slots__ = ()
+
+    def __str__(self):
+        if isinstance(self.name, tuple):
+            return f"[{', '.join(map(str, self.name))}]"
+        return f"{QUALIFIERS[self.qualifier]} {self.name or '?'}"
+
+    def at_least(self, qualifier):
+        if isinstance(self.name, tuple):
+            return Type(max(self.qualifier, qualifier), tuple(e.at_least(qualifier) for e in self.name))
+        return Type(max(self.qualifier, qualifier), self.name)
+
+
+UNKNOWN = Type(SERIES, None)
+VOID = Type(CONST, "void")
+NA = Type(CONST, "na")
+
+Param = namedtuple("Param", "name qualifier types optional")
+Overload = namedtuple("Overload", "name params returns")
+Summary = namedtuple("Summary", "returns findings callees")
+
+
+def join_names(a, b):
+    """(name holding both a and b, whether they fit together)"""
+    if a == b or b == "na":
+        return a, True
+    if a == "na":
+        return b, True
+    if a is None or b is None:
+        return None, True
+    if {a, b} == {"int", "float"}:
+        return "float", True
+    if isinstance(a, tuple) and isinstance(b, tuple) and len(a) == len(b):
+        pairs = [join(x, y) for x, y in zip(a, b)]
+        return tuple(t for t, _ in pairs), all(ok for _, ok in pairs)
+    return None, False
+
+
+def join(a, b):
+    """(least Type holding both a and b, whether their types fit together)"""
+    name, ok = join_names(a.name, b.name)
+    return Type(max(a.qualifier, b.qualifier), name), ok
+
+
+def fits(name, wanted):
+    """True if a value of type `name` can be stored where `wanted` is expected"""
+    return name is None or wanted is None or name == wanted or name == "na" or (name, wanted) == ("int", "float")
+
+
+def parse_type(text, default=SERIES):
+    """Type of a declaration such as 'simple int', 'float' or 'array<float>' (None if empty)"""
+    if not text:
+        return None
+    qualifier, name = pine_reference_db.split_type(text)
+    return Type(QUALIFIERS.index(qualifier) if qualifier else default, name)
+
+
+# ---------------------------------------------------------------------------
+# Built-in signatures
+# ---------------------------------------------------------------------------
+
+def _param(name, text, optional):
+    qualifier, types = pine_reference_db.split_type(text.strip())
+    known = tuple(t if t in ("any", "T") or _known_type(t) else "any" for t in TYPE_SPLIT_RE.split(types))
+    return Param(name, QUALIFIERS.index(qualifier) if qualifier else SERIES, known, optional)
+
+
+def _known_type(name):
+    return (name.isidentifier() or name.startswith("array<")) and name not in ("type", "simple", "series")
+
+
+def _returns(text):
+    """Return spec: a Type whose qualifier is None for 'strongest argument qualifier'"""
+    text = text.strip()
+    if text.startswith("[") and text.endswith("]"):
+        elements = tuple(_returns(part) for part in text[1:-1].split(","))
+        return Type(None, elements)
+    qualifier, name = pine_reference_db.split_type(text)
+    if not name or not _known_type(name) and name != "T" or "/" in name:
+        name = None
+    return Type(QUALIFIERS.index(qualifier) if qualifier else None, name)
+
+
+def parse_signature(line):
+    """Overload for one line of the BUILTIN_FUNCTIONS notation, or None"""
+    match = SIGNATURE_RE.match(line.strip())
+    if not match:
+        return None
+    params = []
+    for text in filter(None, (part.strip() for part in match.group("params").split(","))):
+        param = PARAM_RE.match(text)
+        params.append(_param(param.group("name"), param.group("type"), bool(param.group("optional"))))
+    return Overload(match.group("name"), tuple(params), _returns(match.group("returns")))
+
+
+def _fallback_tables():
+    variables, functions = {}, {}
+    for line in BUILTIN_VARIABLES.strip().splitlines():
+        names, _, type_text = line.partition(":")
+        for name in names.split():
+            variables[name] = parse_type(type_text.strip())
+    for line in BUILTIN_FUNCTIONS.strip().splitlines():
+        overload = parse_signature(line)
+        functions.setdefault(overload.name, []).append(overload)
+    return variables, functions
+
+
+FALLBACK_VARIABLES, FALLBACK_FUNCTIONS = _fallback_tables()
+
+
+def overloads_from_record(record):
+    """Overloads of a signatures.sqlite function record"""
+    arguments = {argument["name"]: argument for argument in record["arguments"]}
+    overloads = []
+    for overload in record["overloads"]:
+        params = []
+        for text in overload["params"]:
+            name = text.split("=")[0].strip()
+            argument = arguments.get(name)
+            if argument:
+                params.append(_param(name, argument["type"], argument["optional"]))
+            else:
+                params.append(Param(name, SERIES, ("any",), "=" in text or name == "..."))
+        overloads.append(Overload(record["name"], tuple(params), _returns(overload["returns"])))
+    return overloads
+
+
+class Signatures:
+    """Built-in variables and function overloads of one Pine version
+
+    Entries come from signatures.sqlite when pine_reference_db.py has built
+    it for the version; names it does not know fall back to the built-in
+    tables.
+    """
+
+    def __init__(self, version=f"v{DEFAULT_VERSION}", path=None):
+        path = path or pine_reference_db.db_path(version)
+        self.db = pine_reference_db.SignatureDB(path) if os.path.exists(path) else None
+        self._variables = {}
+        self._functions = {}
+
+    def close(self):
+        if self.db:
+            self.db.close()
+
+    def _records(self, name, kinds):
+        return [record for record in self.db.find(name) if record["kind"] in kinds] if self.db else []
+
+    def variable(self, name):
+        """Type of a built-in variable or constant, or None"""
+        if name not in self._variables:
+            records = self._records(name, ("variable", "constant"))
+            found = None
+            if records and records[0]["type"]:
+                found = parse_type(f"{records[0]['qualifier'] or 'series'} {records[0]['type']}")
+                found = found if found.name and "/" not in found.name else None
+            if found is None:
+                found = FALLBACK_VARIABLES.get(name)
+            if found is None:
+                found = next((parse_type(type_text) for prefix, type_text in NAMESPACE_CONSTANTS
+                              if name.startswith(prefix)), None)
+            self._variables[name] = found
+        return self._variables[name]
+
+    def function(self, name):
+        """Overloads of a built-in function ([] if unknown)"""
+        if name not in self._functions:
+            overloads = []
+            for record in self._records(name, ("function",)):
+                overloads.extend(overloads_from_record(record))
+            self._functions[name] = overloads or FALLBACK_FUNCTIONS.get(name, [])
+        return self._functions[name]
+
+
+def describe_overload(overload):
+    params = []
+    for param in overload.params:
+        optional = "?" if param.optional else ""
+        params.append(f"{param.name}{optional}: {QUALIFIERS[param.qualifier]} {'/'.join(param.types)}")
+    returns = overload.returns
+    if isinstance(returns.name, tuple):
+        result = f"[{', '.join(_describe_spec(e) for e in returns.name)}]"
+    else:
+        result = _describe_spec(returns)
+    return f"{overload.name}({', '.join(params)}) → {result}"
+
+
+def _describe_spec(spec):
+    qualifier = "<strongest argument>" if spec.qualifier is None else QUALIFIERS[spec.qualifier]
+    return f"{qualifier} {spec.name or '?'}"
+
+
+# ---------------------------------------------------------------------------
+# Overload resolution
+# ---------------------------------------------------------------------------
+
+def _accepts(wanted, name, generic, promote=True):
+    if name is None or wanted == "any" or name == "na" and wanted != "T":
+        return True
+    if wanted == "T":
+        if "T" not in generic:
+            generic["T"] = name
+            return True
+        joined, ok = join_names(generic["T"], name)
+        generic["T"] = joined
+        return ok
+    if isinstance(name, tuple):
+        return False
+    if wanted.startswith("array<") and name.startswith("array<"):
+        return any(_accepts(inner, name[6:-1], generic, promote=False) for inner in TYPE_SPLIT_RE.split(wanted[6:-1]))
+    return wanted == name or promote and (wanted, name) == ("float", "int")
+
+
+def _bind(overload, args, kwargs, type_args):
+    """(return Type, generic bindings, [(param, argument)]) for arguments the overload takes,
+    else the name of the first parameter that rejects its argument ("" if the count is wrong)"""
+    params = overload.params
+    variadic = next((index for index, param in enumerate(params) if param.name == "..."), None)
+    pairs, seen = [], set()
+    for index, arg in enumerate(args):
+        if variadic is not None and index >= variadic:
+            pairs.append((params[variadic], arg))
+        elif index < len(params):
+            pairs.append((params[index], arg))
+            seen.add(params[index].name)
+    by_name = {param.name: param for param in params}
+    for key, arg in kwargs:
+        if key in by_name:
+            pairs.append((by_name[key], arg))
+            seen.add(key)
+    if any(not param.optional and param.name not in seen and param.name != "..." for param in params):
+        return ""
+    generic = {"T": type_args[0]} if type_args else {}
+    for param, arg in pairs:
+        if not any(_accepts(wanted, arg.name, generic) for wanted in param.types):
+            return param.name
+    strongest = max((arg.qualifier for arg in args + [arg for _, arg in kwargs]), default=CONST)
+    return _resolve(overload.returns, strongest, generic), generic, pairs
+
+
+def _resolve(spec, strongest, generic):
+    qualifier = strongest if spec.qualifier is None else spec.qualifier
+    if isinstance(spec.name, tuple):
+        elements = tuple(_resolve(element, strongest, generic) for element in spec.name)
+        return Type(max(e.qualifier for e in elements), elements)
+    name = spec.name
+    if name and "T" in name and name != "T" and "<T>" not in name:
+        return Type(qualifier, name)
+    bound = generic.get("T")
+    if name == "T":
+        if isinstance(bound, tuple):
+            return Type(qualifier, tuple(e.at_least(qualifier) for e in bound))
+        return Type(qualifier, bound)
+    if name and "<T>" in name:
+        return Type(qualifier, name.replace("<T>", f"<{bound}>") if isinstance(bound, str) else None)
+    return Type(qualifier, name)
+
+
+def resolve_call(func, overloads, args, kwargs, type_args=()):
+    """(return Type, [(kind, message)]) of a built-in call with arguments of the given Types"""
+    if not overloads:
+        return UNKNOWN, []
+    rejected = []
+    for overload in overloads:
+        bound = _bind(overload, args, kwargs, type_args)
+        if not isinstance(bound, tuple):
+            rejected.append(bound)
+            continue
+        returns, generic, pairs = bound
+        problems = [("qualifier", f"{func}() argument '{param.name}' is {arg} but "
+                     f"{QUALIFIERS[param.qualifier]} {'/'.join(param.types)} is expected")
+                    for param, arg in pairs if arg.qualifier > param.qualifier]
+        if func.startswith("request.security"):
+            problems.extend(_security_problems(func, generic.get("T")))
+        return returns, problems
+    described = ", ".join([str(arg) for arg in args] + [f"{key}={arg}" for key, arg in kwargs])
+    name = next((name for name in rejected if name), None)
+    if name is None:
+        problem = f"{func}() takes no {len(args) + len(kwargs)} arguments ({described})"
+    else:
+        accepted = list(dict.fromkeys(t for overload in overloads for param in overload.params
+                                      if param.name == name for t in param.types))
+        expected = " or ".join(filter(None, (", ".join(accepted[:-1]), accepted[-1])))
+        problem = f"{func}({described}): '{name}' takes {expected}"
+    names = {overload.returns.name for overload in overloads}
+    name = names.pop() if len(names) == 1 else None
+    return Type(SERIES, name if isinstance(name, str) and "T" not in name else None), [("type", problem)]
+
+
+def _security_problems(func, expression):
+    elements = expression if isinstance(expression, tuple) else (Type(SERIES, expression),)
+    problems = []
+    for element in elements:
+        name = element.name
+        if name is None or name in SECURITY_TYPES or name.startswith("array<"):
+            continue
+        if name == "void":
+            problems.append(("security", f"{func}() expression returns no value"))
+        else:
+            problems.append(("security", f"{func}() cannot request a {name}; the expression must be "
+                             "int/float/bool/string/color or a tuple of them"))
+    return problems
+
+
+# ---------------------------------------------------------------------------
+# Inference
+# ---------------------------------------------------------------------------
+
+def _scan(value, base, shape, names, calls):
+    """Append the shape of an AST value to `shape` (lines relative to `base`), collecting the
+    names it reads or reassigns and the functions it calls"""
+    if isinstance(value, ast.Node):
+        kind = type(value)
+        shape.append(kind.__name__)
+        shape.append(value.line - base if value.line else 0)
+        if kind is ast.Name:
+            names.add(value.id)
+        elif kind is ast.Call:
+            calls.add(value.func)
+        elif kind is ast.Reassign:
+            names.add(value.target)
+        for field in value._fields:
+            _scan(getattr(value, field), base, shape, names, calls)
+    elif isinstance(value, (list, tuple)):
+        shape.append("[")
+        for item in value:
+            _scan(item, base, shape, names, calls)
+        shape.append("]")
+    else:
+        shape.append(value)
+
+
+class Function:
+    """A user `=>` function with the digest its summaries are cached on"""
+
+    __slots__ = ("node", "digest", "calls", "free")
+
+    def __init__(self, node, functions):
+        self.node = node
+        shape, names, calls = [], set(), set()
+        _scan(node, node.line, shape, names, calls)
+        self.calls = sorted(calls.intersection(functions))
+        self.free = tuple(sorted(names - {param[0] for param in node.params}))
+        digest = hashlib.sha1(repr(shape).encode())
+        for name in self.calls:
+            digest.update(functions[name].digest.encode())
+        self.digest = digest.hexdigest()
+
+
+class Analysis:
+    """Result of inferring one script"""
+
+    def __init__(self, version, variables, calls, findings, reinferred):
+        self.version = version
+        self.variables = variables        # global name -> Type
+        self.calls = calls                # function name -> {argument Types: return Type}
+        self.findings = findings          # sorted [(line, kind, message)]
+        self.reinferred = reinferred      # functions whose summaries were computed, not cached
+
+
+class _Run:
+    def __init__(self, version, signatures, functions):
+        self.version = version
+        self.signatures = signatures
+        self.functions = functions
+        self.calls = {}
+        self.reinferred = []
+        self.used = set()
+        self.active = set()
+
+
+class _Frame:
+    """Variables of the script or function body being inferred"""
+
+    def __init__(self, run, env, widened, function=None, global_env=None):
+        self.run = run
+        self.env = env
+        self.widened = widened
+        self.function = function
+        self.globals = env if global_env is None else global_env
+        self.declared = {}
+        self.modes = {}
+        self.findings = []
+        self.callees = []
+        self.changed = False
+
+    def report(self, node, kind, message):
+        self.findings.append((node.line, kind, message))
+
+
+class TypeInference:
+    """Infers scripts, caching function summaries across calls to infer()"""
+
+    def __init__(self, db=None):
+        self.db = db
+        self.summaries = {}
+        self._resolved = {}
+        self._signatures = {}
+
+    def signatures(self, version):
+        if version not in self._signatures:
+            self._signatures[version] = Signatures(f"v{version}", self.db)
+        return self._signatures[version]
+
+    def infer(self, script):
+        """Analysis of a parsed Script"""
+        version = script.version or DEFAULT_VERSION
+        functions = {}
+        for stmt in script.body:
+            if isinstance(stmt, ast.FunctionDef):
+                functions[stmt.name] = Function(stmt, functions)
+        run = _Run(version, self.signatures(version), functions)
+        frame, _ = self._body(run, script.body, {})
+        findings, seen = list(frame.findings), set()
+        for name, key in frame.callees:
+            self._collect(run, name, key, seen, findings)
+        for name, function in functions.items():
+            if name not in run.calls:
+                types = tuple(parse_type(declared) or UNKNOWN for _, declared, _ in function.node.params)
+                key = self._summary(run, function, types, frame.env)
+                if key is not None:
+                    self._collect(run, name, key, seen, findings)
+        if len(self.summaries) > MAX_SUMMARIES:
+            self.summaries = {key: value for key, value in self.summaries.items() if key in run.used}
+        if len(self._resolved) > MAX_SUMMARIES:
+            self._resolved.clear()
+        return Analysis(version, frame.env, run.calls, sorted(set(findings)), run.reinferred)
+
+    def _collect(self, run, name, key, seen, findings):
+        if key in seen:
+            return
+        seen.add(key)
+        run.used.add(key)
+        summary = self.summaries[key]
+        run.calls.setdefault(name, {})[key[1]] = summary.returns
+        base = run.functions[name].node.line
+        findings.extend((base + line, kind, message) for line, kind, message in summary.findings)
+        for callee, callee_key in summary.callees:
+            self._collect(run, callee, callee_key, seen, findings)
+
+    def _summary(self, run, function, types, global_env):
+        """Cache key of a function's instantiation for argument `types`, inferring it on a miss"""
+        name = function.node.name
+        key = (function.digest, types, tuple((free, global_env.get(free)) for free in function.free))
+        run.used.add(key)
+        if key not in self.summaries:
+            if name in run.active:
+                return None
+            run.active.add(name)
+            env = {free: t for free, t in key[2] if t is not None}
+            env.update(zip((param[0] for param in function.node.params), types))
+            frame, value = self._body(run, function.node.body, env, function, global_env)
+            findings = [(line - function.node.line, kind, message) for line, kind, message in frame.findings]
+            self.summaries[key] = Summary(value, findings, frame.callees)
+            run.active.discard(name)
+            run.reinferred.append(name)
+        return key
+
+    def _body(self, run, body, env, function=None, global_env=None):
+        """Infer a body until no reassignment widens a variable; (final frame, value Type)"""
+        widened = {}
+        for _ in range(MAX_PASSES):
+            frame = _Frame(run, dict(env), widened, function, global_env)
+            if function:
+                frame.declared = {param[0]: function.node.line for param in function.node.params}
+            value = self._block(body, frame, local=False)
+            if not frame.changed:
+                break
+            widened = frame.widened
+        return frame, value
+
+    # -- statements -------------------------------------------------------
+
+    def _block(self, body, frame, local=True):
+        """Type of the value a block evaluates to; names declared inside go out of scope after it"""
+        outer = set(frame.env), set(frame.declared)
+        value = VOID
+        for stmt in body:
+            if not isinstance(stmt, (ast.Comment, ast.Blank)):
+                value = self._statement(stmt, frame, local)
+        if local:
+            for name in set(frame.env) - outer[0]:
+                del frame.env[name]
+            for name in set(frame.declared) - outer[1]:
+                del frame.declared[name]
+        return value
+
+    def _statement(self, stmt, frame, local):
+        if isinstance(stmt, ast.Assign):
+            return self._assign(stmt, frame)
+        if isinstance(stmt, ast.TupleAssign):
+            value = self._expr(stmt.value, frame)
+            if value.name is not None and not (isinstance(value.name, tuple) and len(value.name) == len(stmt.targets)):
+                frame.report(stmt, "type", f"[{', '.join(stmt.targets)}] = ... needs a tuple of "
+                             f"{len(stmt.targets)} values, not {value}")
+            elements = value.name if isinstance(value.name, tuple) else ()
+            for index, target in enumerate(stmt.targets):
+                self._declare(stmt, target, elements[index] if index < len(elements) else UNKNOWN, frame)
+            return value
+        if isinstance(stmt, ast.Reassign):
+            return self._reassign(stmt, frame, local)
+        if isinstance(stmt, ast.ExprStmt):
+            return self._expr(stmt.value, frame)
+        if isinstance(stmt, ast.If):
+            test = self._condition(stmt.test, frame, "if")
+            value = self._block(stmt.body, frame)
+            other = self._block(stmt.orelse, frame) if stmt.orelse else NA
+            joined, _ = join(value, other)
+            return joined.at_least(test.qualifier)
+        if isinstance(stmt, ast.Switch):
+            return self._switch(stmt, frame)
+        if isinstance(stmt, ast.For):
+            bounds = [self._expr(node, frame) for node in (stmt.start, stmt.end, stmt.step) if node is not None]
+            for node, bound in zip((stmt.start, stmt.end, stmt.step), bounds):
+                if not fits(bound.name, "float"):
+                    frame.report(node, "type", f"for loop bound is {bound}, not a number")
+            frame.env[stmt.var] = Type(SERIES, "int")
+            frame.declared[stmt.var] = stmt.line
+            value = self._block(stmt.body, frame)
+            frame.env.pop(stmt.var, None)
+            frame.declared.pop(stmt.var, None)
+            return value.at_least(SERIES)
+        if isinstance(stmt, ast.ForIn):
+            iterable = self._expr(stmt.iterable, frame)
+            name = iterable.name
+            element = name[6:-1] if isinstance(name, str) and name.startswith("array<") else None
+            if isinstance(name, str) and element is None and name != "na":
+                frame.report(stmt, "type", f"for ... in iterates over arrays, not {iterable}")
+            targets = stmt.targets if isinstance(stmt.targets, list) else [stmt.targets]
+            types = [Type(SERIES, element)] if len(targets) == 1 else [Type(SERIES, "int"), Type(SERIES, element)]
+            for target, t in zip(targets, types):
+                frame.env[target] = t
+                frame.declared[target] = stmt.line
+            value = self._block(stmt.body, frame)
+            for target in targets:
+                frame.env.pop(target, None)
+                frame.declared.pop(target, None)
+            return value.at_least(SERIES)
+        if isinstance(stmt, ast.While):
+            self._condition(stmt.test, frame, "while")
+            return self._block(stmt.body, frame).at_least(SERIES)
+        if isinstance(stmt, ast.FunctionDef):
+            if frame.function:
+                frame.report(stmt, "scope", f"{stmt.name}() is defined inside {frame.function.node.name}(); "
+                             "define helper functions at the top level")
+            return VOID
+        return VOID
+
+    def _declare(self, stmt, target, value, frame, mode=None):
+        if target in frame.declared:
+            frame.report(stmt, "scope", f"'{target}' is already declared on line {frame.declared[target]}; "
+                         "use := to reassign it")
+        if target in frame.widened:
+            value, _ = join(value, frame.widened[target])
+            value = Type(value.qualifier, value.name if value.name != "na" else None)
+        frame.env[target] = value
+        frame.declared[target] = stmt.line
+        frame.modes[target] = mode
+        return value
+
+    def _assign(self, stmt, frame):
+        value = self._expr(stmt.value, frame)
+        declared = parse_type(stmt.type)
+        if declared:
+            if isinstance(value.name, tuple) or not fits(value.name, declared.name):
+                frame.report(stmt, "type", f"{stmt.type} {stmt.target} cannot hold {value}")
+            explicit = stmt.type.split(None, 1)[0] in QUALIFIERS
+            if explicit and value.qualifier > declared.qualifier:
+                frame.report(stmt, "qualifier", f"{stmt.type} {stmt.target} cannot hold {value}")
+            value = Type(declared.qualifier if explicit else value.qualifier, declared.name)
+        elif isinstance(value.name, tuple):
+            frame.report(stmt, "type", f"{stmt.target} is assigned a tuple; destructure it with [a, b] = ...")
+            value = Type(value.qualifier, None)
+        elif value.name == "na":
+            frame.report(stmt, "type", f"cannot determine the type of {stmt.target} from na; "
+                         f"declare it (float {stmt.target} = na)")
+            value = Type(value.qualifier, None)
+        elif value.name == "void":
+            frame.report(stmt, "type", f"{stmt.target} is assigned a call that returns no value")
+            value = Type(value.qualifier, None)
+        return self._declare(stmt, stmt.target, value, frame, stmt.mode)
+
+    def _reassign(self, stmt, frame, local):
+        target = stmt.target
+        value = self._expr(stmt.value, frame)
+        current = frame.env.get(target)
+        if target not in frame.declared:
+            if frame.function and target in frame.globals:
+                frame.report(stmt, "scope", f"cannot modify global variable '{target}' in function "
+                             f"{frame.function.node.name}()")
+            else:
+                frame.report(stmt, "scope", f"'{target}' is reassigned before it is declared")
+            return value
+        if stmt.op != ":=":
+            value = self._arithmetic(stmt, stmt.op[0], current, value, frame)
+        if isinstance(value.name, tuple) or not fits(value.name, current.name):
+            frame.report(stmt, "type", f"{target} is {current} and cannot be assigned {value}")
+        qualifier = max(current.qualifier, value.qualifier)
+        if local or frame.modes.get(target):
+            qualifier = SERIES
+        widened = Type(qualifier, current.name if current.name is not None else value.name)
+        if widened != current:
+            frame.env[target] = widened
+            if frame.widened.get(target) != widened:
+                frame.widened = dict(frame.widened, **{target: widened})
+                frame.changed = True
+        return widened
+
+    def _switch(self, stmt, frame):
+        subject = self._expr(stmt.subject, frame) if stmt.subject is not None else None
+        value, qualifier = None, subject.qualifier if subject else CONST
+        for condition, body in stmt.cases:
+            if condition is not None:
+                if subject is None:
+                    qualifier = max(qualifier, self._condition(condition, frame, "switch case").qualifier)
+                else:
+                    case = self._expr(condition, frame)
+                    if not join(subject, case)[1]:
+                        frame.report(condition, "type", f"switch case is {case}, the subject is {subject}")
+                    qualifier = max(qualifier, case.qualifier)
+            result = self._block(body, frame)
+            value = result if value is None else join(value, result)[0]
+        if value is None or all(condition is not None for condition, _ in stmt.cases):
+            value = join(value or NA, NA)[0]
+        return value.at_least(qualifier)
+
+    def _condition(self, node, frame, where):
+        test = self._expr(node, frame)
+        if test.name in ("int", "float") and frame.run.version >= 6:
+            frame.report(node, "type", f"{where} condition is {test}; Pine v6 no longer casts numbers to bool")
+        elif test.name not in (None, "bool", "int", "float", "na"):
+            frame.report(node, "type", f"{where} condition is {test}, not bool")
+        return test
+
+    # -- expressions ------------------------------------------------------
+
+    def _expr(self, node, frame):
+        if isinstance(node, ast.Num):
+            return Type(CONST, "float" if isinstance(node.value, float) else "int")
+        if isinstance(node, ast.Str):
+            return Type(CONST, "string")
+        if isinstance(node, ast.Bool):
+            return Type(CONST, "bool")
+        if isinstance(node, ast.Na):
+            return NA
+        if isinstance(node, ast.Color):
+            return Type(CONST, "color")
+        if isinstance(node, ast.Placeholder):
+            return Type(CONST, None)
+        if isinstance(node, ast.Name):
+            found = frame.env.get(node.id)
+            if found is None:
+                found = frame.run.signatures.variable(node.id) or UNKNOWN
+            return found
+        if isinstance(node, ast.Call):
+            if node.func in frame.run.functions:
+                return self._call_user(node, frame)
+            return self._call_builtin(node, frame)
+        if isinstance(node, ast.Index):
+            value = self._expr(node.value, frame)
+            offset = self._expr(node.offset, frame)
+            if not fits(offset.name, "int"):
+                frame.report(node, "type", f"history offset is {offset}, not int")
+            return value.at_least(SERIES)
+        if isinstance(node, ast.UnaryOp):
+            operand = self._expr(node.operand, frame)
+            if node.op == "not":
+                if operand.name not in (None, "bool", "na") and not (operand.name in ("int", "float")
+                                                                     and frame.run.version < 6):
+                    frame.report(node, "type", f"'not' takes bool, not {operand}")
+                return Type(operand.qualifier, "bool")
+            if operand.name not in (None, "int", "float", "na"):
+                frame.report(node, "type", f"unary '{node.op}' takes a number, not {operand}")
+            return operand
+        if isinstance(node, ast.BinOp):
+            return self._binop(node, frame)
+        if isinstance(node, ast.Ternary):
+            test = self._condition(node.test, frame, "?:")
+            body, orelse = self._expr(node.body, frame), self._expr(node.orelse, frame)
+            value, ok = join(body, orelse)
+            if not ok:
+                frame.report(node, "type", f"?: branches are {body} and {orelse}")
+            return value.at_least(test.qualifier)
+        if isinstance(node, ast.Tuple):
+            elements = tuple(self._expr(element, frame) for element in node.elts)
+            return Type(max((e.qualifier for e in elements), default=CONST), elements)
+        if isinstance(node, ast.BLOCK_EXPRESSIONS):
+            return self._statement(node, frame, local=True)
+        return UNKNOWN
+
+    def _binop(self, node, frame):
+        left, right = self._expr(node.left, frame), self._expr(node.right, frame)
+        qualifier = max(left.qualifier, right.qualifier)
+        op = node.op
+        if op in ("and", "or"):
+            for operand in (left, right):
+                if operand.name not in (None, "bool", "na") and not (operand.name in ("int", "float")
+                                                                     and frame.run.version < 6):
+                    frame.report(node, "type", f"'{op}' takes bool, not {operand}")
+            return Type(qualifier, "bool")
+        if op in ("==", "!="):
+            if not join(left, right)[1]:
+                frame.report(node, "type", f"cannot compare {left} with {right}")
+            return Type(qualifier, "bool")
+        if op in ("<", ">", "<=", ">="):
+            for operand in (left, right):
+                if operand.name not in (None, "int", "float", "na"):
+                    frame.report(node, "type", f"'{op}' compares numbers, not {operand}")
+            return Type(qualifier, "bool")
+        return self._arithmetic(node, op, left, right, frame)
+
+    def _arithmetic(self, node, op, left, right, frame):
+        qualifier = max(left.qualifier, right.qualifier)
+        names = {left.name, right.name} - {None, "na"}
+        if op == "+" and "string" in names:
+            if names != {"string"}:
+                other = left if left.name != "string" else right
+                frame.report(node, "type", f"cannot add string and {other.name}; convert it with str.tostring()")
+            return Type(qualifier, "string")
+        bad = names - {"int", "float"}
+        if bad:
+            frame.report(node, "type", f"'{op}' takes numbers, not {' and '.join(sorted(map(str, bad)))}")
+            return Type(qualifier, None)
+        if None in (left.name, right.name):
+            return Type(qualifier, None)
+        if names == {"int"} and (op != "/" or frame.run.version < 6 and qualifier == CONST):
+            return Type(qualifier, "int")
+        return Type(qualifier, "float" if names else "na")
+
+    def _call_builtin(self, node, frame):
+        args = tuple(self._expr(arg, frame) for arg in node.args)
+        kwargs = tuple((key, self._expr(value, frame)) for key, value in node.kwargs)
+        key = (frame.run.version, node.func, args, kwargs, tuple(node.type_args or ()))
+        resolved = self._resolved.get(key)
+        if resolved is None:
+            overloads = frame.run.signatures.function(node.func)
+            type_args = [parse_type(t).name for t in node.type_args] if node.type_args else []
+            resolved = resolve_call(node.func, overloads, list(args), list(kwargs), type_args)
+            self._resolved[key] = resolved
+        returns, problems = resolved
+        for kind, message in problems:
+            frame.report(node, kind, message)
+        return returns
+
+    def _call_user(self, node, frame):
+        function = frame.run.functions[node.func]
+        params = function.node.params
+        args = [self._expr(arg, frame) for arg in node.args]
+        kwargs = {key: self._expr(value, frame) for key, value in node.kwargs}
+        if len(args) > len(params):
+            frame.report(node, "type", f"{node.func}() takes {len(params)} arguments, not {len(args)}")
+        types = []
+        for index, (name, declared, default) in enumerate(params):
+            if index < len(args):
+                arg = args[index]
+            elif name in kwargs:
+                arg = kwargs[name]
+            elif default is not None:
+                arg = self._expr(default, frame)
+            else:
+                frame.report(node, "type", f"{node.func}() is missing argument '{name}'")
+                arg = UNKNOWN
+            wanted = parse_type(declared)
+            if wanted:
+                if isinstance(arg.name, tuple) or not fits(arg.name, wanted.name):
+                    frame.report(node, "type", f"{node.func}() argument '{name}' is {arg}, not {declared}")
+                explicit = declared.split(None, 1)[0] in QUALIFIERS
+                if explicit and arg.qualifier > wanted.qualifier:
+                    frame.report(node, "qualifier", f"{node.func}() argument '{name}' is {arg} but "
+                                 f"{declared} is expected")
+                arg = Type(wanted.qualifier if explicit else arg.qualifier, wanted.name)
+            elif arg.name == "na":
+                arg = Type(arg.qualifier, None)
+            types.append(arg)
+        key = self._summary(frame.run, function, tuple(types), frame.globals)
+        if key is None:
+            frame.report(node, "scope", f"{node.func}() cannot call itself")
+            return UNKNOWN
+        frame.callees.append((node.func, key))
+        return self.summaries[key].returns
+
+
+def infer_file(path, inference=None):
+    """Analysis of a .pine file"""
+    return (inference or TypeInference()).infer(ast.parse_file(path))
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def _edits(source, script):
+    """(function name, source with one line typed into that function's body) per block function"""
+    lines = source.splitlines(True)
+    for stmt in script.body:
+        if isinstance(stmt, ast.FunctionDef) and not stmt.inline:
+            edited = lines[:stmt.line] + ["    _keystroke = 0\n"] + lines[stmt.line:]
+            yield stmt.name, "".join(edited)
+
+
+def synthetic_script(helpers):
+    """A script with `helpers` independent functions, each called from the top level"""
+    lines = ["//@version=5", 'indicator("Synthetic")', 'length = input.int(14, "Length")']
+    for index in range(helpers):
+        lines += [f"helper{index}(src, len) =>", "    base = ta.sma(src, len)",
+                  f"    spread = (src - base) / base * {index + 1}", "    spread > 0 ? spread : nz(spread[1])"]
+    for index in range(helpers):
+        lines.append(f"value{index} = helper{index}(close, length)")
+    return "\n".join(lines) + "\n"
+
+
+def benchmark(paths, rounds=20, helpers=200):
+    """Time a cold inference and per-keystroke re-inference after editing each function"""
+    sources = [(os.path.relpath(path, ROOT), open(path, encoding="utf-8").read()) for path in paths]
+    sources.append((f"synthetic ({helpers} helpers)", synthetic_script(helpers)))
+    print(f"{'script':<52} {'functions':>9} {'cold ms':>8} {'parse ms':>9} {'infer ms':>9} {'re-inferred':>12}")
+    for label, source in sources:
+        script = ast.parse(source, cache=False)
+        total = sum(isinstance(stmt, ast.FunctionDef) for stmt in script.body)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            TypeInference().infer(script)
+        cold = (time.perf_counter() - start) / rounds * 1000
+        inference = TypeInference()
+        inference.infer(script)
+        edits = list(_edits(source, script)) or [("(top level)", source + "_keystroke = 0\n")]
+        edits = edits[:: max(1, len(edits) // 10)]
+        parse_time = infer_time = reinferred = 0
+        for _, edited in edits:
+            for text in (edited, source):
+                start = time.perf_counter()
+                changed = ast.parse(text, cache=False)
+                parsed = time.perf_counter()
+                analysis = inference.infer(changed)
+                parse_time += parsed - start
+                infer_time += time.perf_counter() - parsed
+                reinferred += len(set(analysis.reinferred))
+        count = len(edits) * 2
+        print(f"{label:<52} {total:>9} {cold:>8.2f} {parse_time / count * 1000:>9.2f} "
+              f"{infer_time / count * 1000:>9.2f} {reinferred / len(edits):>12.1f}")
+    print("cold: fresh TypeInference; parse/infer: per keystroke (a line typed into one function, then "
+          "removed); re-inferred: functions per edit")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Infer Pine Script types and qualifiers and report type errors")
+    parser.add_argument("scripts", nargs="*", help="Pine scripts or templates (default: every template)")
+    parser.add_argument("--types", action="store_true", help="Print the inferred types of globals and function calls")
+    parser.add_argument("--db", help="signatures.sqlite to read built-ins from (default: the script version's)")
+    parser.add_argument("--lookup", action="append", metavar="NAME", help="Show the signature used for a built-in")
+    parser.add_argument("--version", default=f"v{DEFAULT_VERSION}", help="Version for --lookup (default: v6)")
+    parser.add_argument("--benchmark", action="store_true", help="Time cold and per-keystroke inference")
+    parser.add_argument("--rounds", type=int, default=20, help="Cold inference rounds for --benchmark")
+    args = parser.parse_args()
+
+    paths = args.scripts or sorted(glob.glob(os.path.join(ROOT, "templates", "*.pine")))
+    if args.lookup:
+        signatures = Signatures(args.version, args.db)
+        print(f"Signatures: {signatures.db.path if signatures.db else 'built-in table'}")
+        for name in args.lookup:
+            overloads = signatures.function(name)
+            variable = signatures.variable(name)
+            for overload in overloads:
+                print(f"  {describe_overload(overload)}")
+            if variable:
+                print(f"  {name}: {variable}")
+            if not overloads and not variable:
+                print(f"  {name}: unknown")
+        return
+    if args.benchmark:
+        benchmark(paths, args.rounds)
+        return
+
+    inference = TypeInference(args.db)
+    failed = False
+    for path in paths:
+        try:
+            analysis = infer_file(path, inference)
+        except (OSError, ast.PineSyntaxError) as e:
+            print(f"{path}: {e}")
+            failed = True
+            continue
+        print(f"{os.path.relpath(path, ROOT)}: {len(analysis.findings) or 'no'} type findings")
+        for line, kind, message in analysis.findings:
+            print(f"  line {line}: {kind}: {message}")
+        if args.types:
+            for name, t in analysis.variables.items():
+                print(f"    {name}: {t}")
+            for name, calls in analysis.calls.items():
+                for types, returns in calls.items():
+                    print(f"    {name}({', '.join(map(str, types))}) → {returns}")
+        failed = failed or bool(analysis.findings)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,848 @@
+#!/usr/bin/env python3
+"""
+Vectorized execution engine for indicator-style Pine Script
+
+Runs a parsed script over OHLCV columns with whole-column NumPy operations
+instead of a loop per bar. Every top-level variable becomes a column;
+`ta.*` calls, comparisons, arithmetic and `x[n]` history references are
+evaluated once for the whole series (see pine_ta.py).
+
+Statements whose effect depends on the bar are handled with masks:
+
+- `if <series condition>` bodies run once with the condition as a mask, so
+  `x := value` becomes `x = where(mask, value, x)` and `strategy.entry`/
+  `alert` calls record the bars on which they fire
+- `for i = a to b` loops with input/constant bounds are unrolled over `i`,
+  each iteration still operating on whole columns
+
+Scripts that need per-bar state (`var`, `while`, series loop bounds,
+`request.security`, arrays or drawings, self-referencing history) raise
+VectorizationError; run those with the bar-by-bar runtime instead.
+
+Usage:
+    python scripts/pine_vector_engine.py atr_retracement_ema_signals.pine --data prices.csv
+    python scripts/pine_vector_engine.py --benchmark --bars 1000000
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+
+import numpy as np
+
+import ohlcv
+import pine_parser as ast
+import pine_ta as ta
+
+# Namespaces whose members are plain constants (colors, styles, positions...)
+CONSTANT_NAMESPACES = {
+    "color", "shape", "location", "size", "position", "text", "display",
+    "extend", "xloc", "yloc", "plot", "hline", "barmerge", "format", "scale",
+    "currency", "font", "alert", "order", "dayofweek", "line", "label",
+}
+
+STRATEGY_CONSTANTS = {
+    "strategy.long": "long",
+    "strategy.short": "short",
+    "strategy.fixed": "fixed",
+    "strategy.cash": "cash",
+    "strategy.percent_of_equity": "percent_of_equity",
+    "strategy.commission.percent": "percent",
+    "strategy.commission.cash_per_contract": "cash_per_contract",
+    "strategy.commission.cash_per_order": "cash_per_order",
+    "strategy.direction.all": "all",
+    "strategy.direction.long": "long",
+    "strategy.direction.short": "short",
+}
+
+# Calls that only declare or draw something and are ignored by the engines
+IGNORED_CALLS = {
+    "hline", "bgcolor", "barcolor", "fill", "color.new", "color.rgb",
+}
+
+# Bar columns that identify an indicator's source when columns are reused
+BUILTIN_SOURCES = ("open", "high", "low", "close", "volume", "time", "hl2", "hlc3", "ohlc4", "hlcc4")
+
+# Calls with per-bar side effects that cannot run on whole columns
+UNSUPPORTED_PREFIXES = ("request.", "array.", "matrix.", "map.", "table.", "label.", "line.", "box.", "polyline.", "str.")
+
+
+class PineEvalError(Exception):
+    """Raised when a script cannot be evaluated"""
+
+
+class VectorizationError(PineEvalError):
+    """Raised when a script needs bar-by-bar execution"""
+
+
+def input_default(call):
+    """Return the default value of an `input.*()` call"""
+    if call.args:
+        value = call.args[0]
+    else:
+        value = dict(call.kwargs).get("defval")
+    if value is None:
+        return None
+    return literal_value(value)
+
+
+def literal_value(node):
+    """Evaluate a literal expression node (number, string, bool, na, constant name)"""
+    if isinstance(node, (ast.Num, ast.Str, ast.Bool)):
+        return node.value
+    if isinstance(node, ast.Na):
+        return np.nan
+    if isinstance(node, ast.Color):
+        return node.value
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.UnaryOp) and node.op == "-":
+        return -literal_value(node.operand)
+    if isinstance(node, ast.Placeholder):
+        raise PineEvalError(f"line {node.line}: unfilled template placeholder {{{{{node.name}}}}}")
+    raise PineEvalError(f"line {node.line}: not a literal value")
+
+
+def input_title(call):
+    """Return the title of an `input.*()` call, if any"""
+    kwargs = dict(call.kwargs)
+    if "title" in kwargs and isinstance(kwargs["title"], ast.Str):
+        return kwargs["title"].value
+    if len(call.args) > 1 and isinstance(call.args[1], ast.Str):
+        return call.args[1].value
+    return None
+
+
+def resolve_input(call, target, overrides):
+    """Value of an input declaration, honouring overrides by variable name or title"""
+    if overrides:
+        if target in overrides:
+            return overrides[target]
+        title = input_title(call)
+        if title is not None and title in overrides:
+            return overrides[title]
+    value = input_default(call)
+    if call.func == "input.source" and isinstance(value, str):
+        return ("source", value)
+    return value
+
+
+def is_series(value):
+    return isinstance(value, np.ndarray)
+
+
+def to_bool(value):
+    """Pine bool conversion: na and 0 are false"""
+    if isinstance(value, np.ndarray):
+        if value.dtype == bool:
+            return value
+        if value.dtype.kind == "f":
+            return ~np.isnan(value) & (value != 0)
+        return value.astype(bool)
+    if value is None:
+        return False
+    if isinstance(value, float) and np.isnan(value):
+        return False
+    return bool(value)
+
+
+def _bar_values(data):
+    count = ohlcv.bar_count(data)
+    values = {
+        "open": data["open"],
+        "high": data["high"],
+        "low": data["low"],
+        "close": data["close"],
+        "volume": data["volume"],
+        "time": data["time"],
+        "bar_index": np.arange(count, dtype=np.int64),
+        "last_bar_index": count - 1,
+    }
+    values["hl2"] = (data["high"] + data["low"]) / 2.0
+    values["hlc3"] = (data["high"] + data["low"] + data["close"]) / 3.0
+    values["ohlc4"] = (data["open"] + data["high"] + data["low"] + data["close"]) / 4.0
+    values["hlcc4"] = (data["high"] + data["low"] + 2.0 * data["close"]) / 4.0
+    first = np.zeros(count, dtype=bool)
+    last = np.zeros(count, dtype=bool)
+    if count:
+        first[0] = True
+        last[-1] = True
+    values["barstate.isfirst"] = first
+    values["barstate.islast"] = last
+    values["barstate.isconfirmed"] = np.ones(count, dtype=bool)
+    values["barstate.ishistory"] = ~last
+    values["barstate.isrealtime"] = np.zeros(count, dtype=bool)
+    return values
+
+
+class _Scope:
+    def __init__(self, parent=None):
+        self.values = {}
+        self.parent = parent
+
+    def lookup(self, name):
+        scope = self
+        while scope is not None:
+            if name in scope.values:
+                return scope, scope.values[name]
+            scope = scope.parent
+        return None, None
+
+
+class VectorEngine:
+    """Evaluate a parsed Pine script over OHLCV columns"""
+
+    def __init__(self, script, inputs=None, timeframe="1", cache=None):
+        self.script = script if isinstance(script, ast.Script) else ast.parse(script)
+        self.inputs = dict(inputs or {})
+        self.timeframe = timeframe
+        self.cache = cache
+
+    # -- running ----------------------------------------------------------
+
+    def run(self, data):
+        """Run the script; returns a result dict of columns and recorded events"""
+        self.count = ohlcv.bar_count(data)
+        self.data = data
+        self.builtins = _bar_values(data)
+        self.builtins["timeframe.period"] = self.timeframe
+        self._fingerprints = {}
+        if self.cache is not None:
+            source = data_fingerprint(data)
+            for name in BUILTIN_SOURCES:
+                self._remember(self.builtins[name], (name, source))
+        self.functions = {}
+        self.result = {
+            "kind": None,
+            "title": None,
+            "declaration": {},
+            "inputs": {},
+            "series": {},
+            "plots": {},
+            "shapes": {},
+            "alerts": {},
+            "orders": [],
+            "bars": self.count,
+        }
+        self.globals = _Scope()
+        self.exec_block(ast.strip_trivia(self.script.body), self.globals, None)
+        for name, value in self.globals.values.items():
+            self.result["series"][name] = value
+        return self.result
+
+    # -- statements -------------------------------------------------------
+
+    def exec_block(self, body, scope, mask):
+        for stmt in body:
+            if isinstance(stmt, (ast.Comment, ast.Blank)):
+                continue
+            self.exec_stmt(stmt, scope, mask)
+
+    def exec_stmt(self, stmt, scope, mask):
+        if isinstance(stmt, ast.Assign):
+            if stmt.mode is not None:
+                raise VectorizationError(f"line {stmt.line}: '{stmt.mode}' declarations need the bar-by-bar runtime")
+            value = self.eval_value(stmt.value, scope, mask, target=stmt.target)
+            scope.values[stmt.target] = value
+        elif isinstance(stmt, ast.Reassign):
+            self._reassign(stmt, scope, mask)
+        elif isinstance(stmt, ast.TupleAssign):
+            value = self.eval_value(stmt.value, scope, mask)
+            if not isinstance(value, tuple) or len(value) != len(stmt.targets):
+                raise PineEvalError(f"line {stmt.line}: tuple assignment needs {len(stmt.targets)} values")
+            for name, item in zip(stmt.targets, value):
+                if name != "_":
+                    scope.values[name] = item
+        elif isinstance(stmt, ast.ExprStmt):
+            self.eval(stmt.value, scope, mask)
+        elif isinstance(stmt, ast.If):
+            self._exec_if(stmt, scope, mask)
+        elif isinstance(stmt, ast.For):
+            self._exec_for(stmt, scope, mask)
+        elif isinstance(stmt, ast.FunctionDef):
+            self.functions[stmt.name] = stmt
+        elif isinstance(stmt, ast.Switch):
+            self._exec_switch(stmt, scope, mask)
+        else:
+            raise VectorizationError(
+                f"line {stmt.line}: {type(stmt).__name__} statements need the bar-by-bar runtime")
+
+    def _reassign(self, stmt, scope, mask):
+        owner, current = scope.lookup(stmt.target)
+        if owner is None:
+            raise PineEvalError(f"line {stmt.line}: '{stmt.target}' is not declared")
+        for node in ast.walk(stmt.value):
+            if isinstance(node, ast.Index) and isinstance(node.value, ast.Name) and node.value.id == stmt.target:
+                raise VectorizationError(
+                    f"line {stmt.line}: '{stmt.target}' refers to its own history and needs the bar-by-bar runtime")
+        value = self.eval(stmt.value, scope, mask)
+        if stmt.op != ":=":
+            value = self.binop(stmt.op[0], current, value, stmt.line)
+        owner.values[stmt.target] = self.masked(mask, value, current)
+
+    def masked(self, mask, value, current):
+        """Take `value` where `mask` is set and keep `current` elsewhere"""
+        if mask is None:
+            return value
+        if isinstance(value, str) or isinstance(current, str):
+            raise VectorizationError("conditional string assignment needs the bar-by-bar runtime")
+        return np.where(mask, value, current)
+
+    def _exec_if(self, stmt, scope, mask):
+        test = to_bool(self.eval(stmt.test, scope, mask))
+        if not is_series(test):
+            branch = stmt.body if test else stmt.orelse
+            self.exec_block(branch, _Scope(scope), mask)
+            return
+        body_mask = test if mask is None else mask & test
+        else_mask = ~test if mask is None else mask & ~test
+        self.exec_block(stmt.body, _Scope(scope), body_mask)
+        if stmt.orelse:
+            self.exec_block(stmt.orelse, _Scope(scope), else_mask)
+
+    def _exec_for(self, stmt, scope, mask):
+        start = self.eval(stmt.start, scope, mask)
+        end = self.eval(stmt.end, scope, mask)
+        step = self.eval(stmt.step, scope, mask) if stmt.step is not None else None
+        if any(is_series(value) for value in (start, end, step)):
+            raise VectorizationError(f"line {stmt.line}: loop bounds that change per bar need the bar-by-bar runtime")
+        for node in ast.walk(stmt):
+            if isinstance(node, (ast.Break, ast.Continue)):
+                raise VectorizationError(f"line {stmt.line}: 'break'/'continue' need the bar-by-bar runtime")
+        start, end = int(start), int(end)
+        step = abs(int(step)) if step is not None else 1
+        direction = 1 if end >= start else -1
+        loop_scope = _Scope(scope)
+        index = start
+        while (index <= end) if direction > 0 else (index >= end):
+            loop_scope.values[stmt.var] = index
+            self.exec_block(stmt.body, _Scope(loop_scope), mask)
+            index += step * direction
+
+    def _exec_switch(self, stmt, scope, mask):
+        remaining = mask
+        subject = self.eval(stmt.subject, scope, mask) if stmt.subject is not None else None
+        for condition, body in stmt.cases:
+            if condition is None:
+                self.exec_block(body, _Scope(scope), remaining)
+                return
+            value = self.eval(condition, scope, mask)
+            test = to_bool(self.binop("==", subject, value, stmt.line) if subject is not None else value)
+            if not is_series(test):
+                if remaining is None and test:
+                    self.exec_block(body, _Scope(scope), None)
+                    return
+                test = np.full(self.count, bool(test))
+            case_mask = test if remaining is None else remaining & test
+            self.exec_block(body, _Scope(scope), case_mask)
+            remaining = ~test if remaining is None else remaining & ~test
+
+    # -- expressions ------------------------------------------------------
+
+    def eval_value(self, node, scope, mask, target=None):
+        """Evaluate an assignment right-hand side"""
+        if isinstance(node, ast.Call) and node.func.startswith("input") and target is not None:
+            value = resolve_input(node, target, self.inputs)
+            if isinstance(value, tuple) and value[0] == "source":
+                self.result["inputs"][target] = value[1]
+                return self.builtins[value[1]]
+            self.result["inputs"][target] = value
+            return value
+        if isinstance(node, ast.If):
+            return self._if_value(node, scope, mask)
+        if isinstance(node, ast.Switch):
+            return self._switch_value(node, scope, mask)
+        if isinstance(node, ast.BLOCK_EXPRESSIONS):
+            raise VectorizationError(f"line {node.line}: loop expressions need the bar-by-bar runtime")
+        return self.eval(node, scope, mask)
+
+    def _block_result(self, body, scope, mask):
+        local = _Scope(scope)
+        code = ast.strip_trivia(body)
+        self.exec_block(code[:-1], local, mask)
+        last = code[-1] if code else None
+        if isinstance(last, ast.ExprStmt):
+            return self.eval(last.value, local, mask)
+        if last is not None:
+            self.exec_stmt(last, local, mask)
+        return np.nan
+
+    def _if_value(self, node, scope, mask):
+        test = to_bool(self.eval(node.test, scope, mask))
+        if not is_series(test):
+            if test:
+                return self._block_result(node.body, scope, mask)
+            return self._block_result(node.orelse, scope, mask) if node.orelse else np.nan
+        inner = self._branch_mask(mask)
+        body = self._block_result(node.body, scope, inner)
+        orelse = self._block_result(node.orelse, scope, inner) if node.orelse else np.nan
+        return np.where(test, body, orelse)
+
+    def _switch_value(self, node, scope, mask):
+        subject = self.eval(node.subject, scope, mask) if node.subject is not None else None
+        inner = self._branch_mask(mask)
+        conditions = []
+        choices = []
+        default = np.nan
+        for condition, body in node.cases:
+            value = self._block_result(body, scope, inner)
+            if condition is None:
+                default = value
+                continue
+            test = self.eval(condition, scope, mask)
+            test = to_bool(self.binop("==", subject, test, node.line) if subject is not None else test)
+            conditions.append(np.broadcast_to(test, (self.count,)))
+            choices.append(np.broadcast_to(value, (self.count,)))
+        if not conditions:
+            return default
+        return np.select(conditions, choices, default)
+
+    def _branch_mask(self, mask):
+        """Mask for evaluating both branches of an `if`/`switch` expression
+
+        Branches are computed for every bar and combined afterwards, so the
+        mask is never None there; that keeps stateful `ta.*` calls (which
+        would only update on the bars taking the branch) out of branches.
+        """
+        return mask if mask is not None else np.ones(self.count, dtype=bool)
+
+    def eval(self, node, scope, mask):
+        if isinstance(node, ast.Num):
+            return node.value
+        if isinstance(node, (ast.Str, ast.Bool)):
+            return node.value
+        if isinstance(node, ast.Na):
+            return np.nan
+        if isinstance(node, ast.Color):
+            return node.value
+        if isinstance(node, ast.Name):
+            return self.lookup(node, scope)
+        if isinstance(node, ast.Index):
+            value = self.eval(node.value, scope, mask)
+            offset = self.eval(node.offset, scope, mask)
+            if is_series(offset):
+                raise VectorizationError(f"line {node.line}: series history offsets need the bar-by-bar runtime")
+            if not is_series(value):
+                return value
+            return self._ta("shift", value, int(offset))
+        if isinstance(node, ast.BinOp):
+            if node.op in ("and", "or"):
+                left = to_bool(self.eval(node.left, scope, mask))
+                right = to_bool(self.eval(node.right, scope, mask))
+                return (left & right) if node.op == "and" else (left | right)
+            left = self.eval(node.left, scope, mask)
+            right = self.eval(node.right, scope, mask)
+            return self.binop(node.op, left, right, node.line)
+        if isinstance(node, ast.UnaryOp):
+            operand = self.eval(node.operand, scope, mask)
+            if node.op == "not":
+                value = to_bool(operand)
+                return ~value if is_series(value) else not value
+            return -operand if node.op == "-" else operand
+        if isinstance(node, ast.Ternary):
+            test = to_bool(self.eval(node.test, scope, mask))
+            if not is_series(test):
+                return self.eval(node.body if test else node.orelse, scope, mask)
+            body = self.eval(node.body, scope, mask)
+            orelse = self.eval(node.orelse, scope, mask)
+            return np.where(test, body, orelse)
+        if isinstance(node, ast.Tuple):
+            return tuple(self.eval(elt, scope, mask) for elt in node.elts)
+        if isinstance(node, ast.Call):
+            return self.call(node, scope, mask)
+        if isinstance(node, ast.Placeholder):
+            raise PineEvalError(f"line {node.line}: unfilled template placeholder {{{{{node.name}}}}}")
+        raise VectorizationError(f"line {node.line}: {type(node).__name__} needs the bar-by-bar runtime")
+
+    def lookup(self, node, scope):
+        owner, value = scope.lookup(node.id)
+        if owner is not None:
+            return value
+        if node.id in self.builtins:
+            return self.builtins[node.id]
+        if node.id in STRATEGY_CONSTANTS:
+            return STRATEGY_CONSTANTS[node.id]
+        namespace = node.id.split(".", 1)[0]
+        if "." in node.id and namespace in CONSTANT_NAMESPACES:
+            return node.id
+        if node.id.startswith(("strategy.", "syminfo.", "barstate.")):
+            raise VectorizationError(f"line {node.line}: '{node.id}' needs the bar-by-bar runtime")
+        raise PineEvalError(f"line {node.line}: undefined name '{node.id}'")
+
+    def binop(self, op, left, right, line=0):
+        result = self._binop(op, left, right, line)
+        if self.cache is not None and is_series(result):
+            self._remember(result, (op, self._fingerprint(left), self._fingerprint(right)))
+        return result
+
+    def _binop(self, op, left, right, line=0):
+        if isinstance(left, str) or isinstance(right, str):
+            if is_series(left) or is_series(right):
+                raise VectorizationError(f"line {line}: series strings need the bar-by-bar runtime")
+            if op == "+":
+                return str(left) + str(right)
+            if op == "==":
+                return left == right
+            if op == "!=":
+                return left != right
+            raise PineEvalError(f"line {line}: unsupported string operator '{op}'")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if op == "+":
+                return left + right
+            if op == "-":
+                return left - right
+            if op == "*":
+                return left * right
+            if op == "/":
+                if not is_series(left) and not is_series(right):
+                    return left / right if right != 0 else np.nan
+                return np.true_divide(left, right)
+            if op == "%":
+                return np.fmod(left, right)
+            if op == "==":
+                return np.equal(left, right) if is_series(left) or is_series(right) else left == right
+            if op == "!=":
+                return np.not_equal(left, right) if is_series(left) or is_series(right) else left != right
+            if op == "<":
+                return np.less(left, right)
+            if op == ">":
+                return np.greater(left, right)
+            if op == "<=":
+                return np.less_equal(left, right)
+            if op == ">=":
+                return np.greater_equal(left, right)
+        raise PineEvalError(f"line {line}: unsupported operator '{op}'")
+
+    # -- calls ------------------------------------------------------------
+
+    def _args(self, node, scope, mask, names):
+        """Bind positional and keyword arguments of a call to `names`"""
+        values = {}
+        for name, arg in zip(names, node.args):
+            values[name] = self.eval(arg, scope, mask)
+        for key, arg in node.kwargs:
+            values[key] = self.eval(arg, scope, mask)
+        return values
+
+    def _series(self, value):
+        if is_series(value):
+            return value
+        return np.full(self.count, np.nan if value is None else value, dtype=np.float64)
+
+    def call(self, node, scope, mask):
+        func = node.func
+        if func in self.functions:
+            return self._call_user(self.functions[func], node, scope, mask)
+        if func.startswith("ta."):
+            if mask is not None:
+                raise VectorizationError(
+                    f"line {node.line}: {func}() inside a conditional block needs the bar-by-bar runtime")
+            return self._call_ta(node, scope, mask)
+        if func.startswith("math."):
+            return self._call_math(node, scope, mask)
+        if func in ("indicator", "strategy", "study"):
+            self.result["kind"] = "indicator" if func == "study" else func
+            arguments = self._args(node, scope, mask, ["title", "shorttitle", "overlay"])
+            self.result["title"] = arguments.get("title")
+            self.result["declaration"] = arguments
+            return None
+        if func.startswith("input"):
+            return resolve_input(node, None, None)
+        if func in ("nz", "na", "fixnan", "int", "float", "bool"):
+            return self._call_conversion(node, scope, mask)
+        if func in ("plot", "plotshape", "plotchar", "plotarrow", "plotcandle", "plotbar"):
+            return self._record_plot(node, scope, mask)
+        if func in ("alertcondition", "alert", "strategy.alert"):
+            return self._record_alert(node, scope, mask)
+        if func.startswith("strategy."):
+            return self._record_order(node, scope, mask)
+        if func in IGNORED_CALLS:
+            return self.eval(node.args[0], scope, mask) if node.args else None
+        if func.startswith(UNSUPPORTED_PREFIXES):
+            raise VectorizationError(f"line {node.line}: {func}() needs the bar-by-bar runtime")
+        raise PineEvalError(f"line {node.line}: unsupported function {func}()")
+
+    def _call_user(self, definition, node, scope, mask):
+        local = _Scope(self.globals)
+        for index, (name, _type, default) in enumerate(definition.params):
+            if index < len(node.args):
+                local.values[name] = self.eval(node.args[index], scope, mask)
+            elif name in dict(node.kwargs):
+                local.values[name] = self.eval(dict(node.kwargs)[name], scope, mask)
+            elif default is not None:
+                local.values[name] = self.eval(default, scope, mask)
+            else:
+                raise PineEvalError(f"line {node.line}: missing argument '{name}' for {definition.name}()")
+        return self._block_result(definition.body, local, mask)
+
+    def _call_ta(self, node, scope, mask):
+        func = node.func
+        data = self.builtins
+        if func == "ta.atr":
+            length = int(self._args(node, scope, mask, ["length"])["length"])
+            return self._ta("atr", data["high"], data["low"], data["close"], length)
+        if func == "ta.tr":
+            handle_na = bool(self._args(node, scope, mask, ["handle_na"]).get("handle_na", False))
+            return self._ta("tr", data["high"], data["low"], data["close"], handle_na)
+        if func in ("ta.crossover", "ta.crossunder", "ta.cross"):
+            arguments = self._args(node, scope, mask, ["source1", "source2"])
+            a = self._series(arguments["source1"])
+            b = self._series(arguments["source2"])
+            return self._ta(func[3:], a, b)
+        if func in ("ta.sma", "ta.ema", "ta.rma", "ta.highest", "ta.lowest", "ta.stdev", "ta.rsi", "ta.change"):
+            arguments = self._args(node, scope, mask, ["source", "length"])
+            if func in ("ta.highest", "ta.lowest") and "length" not in arguments and not is_series(arguments.get("source")):
+                arguments = {"source": data["high" if func == "ta.highest" else "low"], "length": arguments["source"]}
+            source = self._series(arguments["source"])
+            return self._ta(func[3:], source, int(arguments.get("length", 1)))
+        raise VectorizationError(f"line {node.line}: {func}() is not available in the vectorized engine")
+
+    # -- indicator reuse ---------------------------------------------------
+
+    def _fingerprint(self, value):
+        """Identity of a value for indicator reuse: scalars by value, columns by how they were made"""
+        if is_series(value):
+            entry = self._fingerprints.get(id(value))
+            return entry[0] if entry is not None else None
+        if isinstance(value, (bool, int, float, str)) or value is None:
+            return value
+        return None
+
+    def _remember(self, column, key):
+        if key is None or _incomplete(key):
+            return
+        # Keep the column alive so its id() cannot be reused during the run
+        self._fingerprints[id(column)] = (key, column)
+
+    def _ta(self, name, *args):
+        """Call pine_ta.<name>, reusing a cached column computed from identical inputs"""
+        function = getattr(ta, name)
+        if self.cache is None:
+            return function(*args)
+        key = (name,) + tuple(self._fingerprint(arg) for arg in args)
+        if _incomplete(key):
+            return function(*args)
+        column = self.cache.get(key)
+        if column is None:
+            column = function(*args)
+            self.cache[key] = column
+        self._remember(column, key)
+        return column
+
+    def _call_math(self, node, scope, mask):
+        func = node.func[5:]
+        args = [self.eval(arg, scope, mask) for arg in node.args]
+        kwargs = {key: self.eval(value, scope, mask) for key, value in node.kwargs}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if func == "abs":
+                return np.abs(args[0])
+            if func == "max":
+                return _reduce(np.fmax if len(args) > 2 else np.maximum, args)
+            if func == "min":
+                return _reduce(np.fmin if len(args) > 2 else np.minimum, args)
+            if func == "round":
+                precision = int(args[1]) if len(args) > 1 else int(kwargs.get("precision", 0))
+                rounded = np.floor(np.asarray(args[0], dtype=np.float64) * 10 ** precision + 0.5) / 10 ** precision
+                return rounded if is_series(args[0]) else float(rounded)
+            if func in ("sqrt", "log", "log10", "exp", "floor", "ceil", "sign", "sin", "cos", "tan"):
+                result = getattr(np, func)(args[0])
+                return result if is_series(args[0]) else float(result)
+            if func == "pow":
+                return np.power(args[0], args[1])
+            if func == "sum":
+                if mask is not None:
+                    raise VectorizationError(f"line {node.line}: math.sum() inside a conditional block needs the bar-by-bar runtime")
+                return self._ta("rolling_sum", self._series(args[0]), int(args[1]))
+            if func == "avg":
+                return sum(args) / len(args)
+        raise VectorizationError(f"line {node.line}: math.{func}() is not available in the vectorized engine")
+
+    def _call_conversion(self, node, scope, mask):
+        args = [self.eval(arg, scope, mask) for arg in node.args]
+        func = node.func
+        if func == "na":
+            if is_series(args[0]):
+                return ta.is_na(args[0])
+            return args[0] is None or (isinstance(args[0], float) and np.isnan(args[0]))
+        if func == "nz":
+            replacement = args[1] if len(args) > 1 else 0.0
+            if is_series(args[0]):
+                return ta.nz(args[0], replacement)
+            return replacement if args[0] is None or (isinstance(args[0], float) and np.isnan(args[0])) else args[0]
+        if func == "fixnan":
+            if mask is not None:
+                raise VectorizationError(f"line {node.line}: fixnan() inside a conditional block needs the bar-by-bar runtime")
+            values = self._series(args[0])
+            index = np.where(np.isnan(values), 0, np.arange(len(values)))
+            np.maximum.accumulate(index, out=index)
+            filled = values[index]
+            return filled
+        if func == "int":
+            value = args[0]
+            return np.trunc(value) if is_series(value) else (int(value) if not np.isnan(value) else np.nan)
+        if func == "float":
+            return np.asarray(args[0], dtype=np.float64) if is_series(args[0]) else float(args[0])
+        return to_bool(args[0])
+
+    def _when(self, mask):
+        return np.ones(self.count, dtype=bool) if mask is None else mask.copy()
+
+    def _record_plot(self, node, scope, mask):
+        if mask is not None:
+            raise PineEvalError(f"line {node.line}: {node.func}() cannot be used in local scope")
+        arguments = self._args(node, scope, mask, ["series", "title"])
+        title = arguments.get("title") or f"{node.func}_{node.line}"
+        series = arguments["series"]
+        if node.func in ("plotshape", "plotchar", "plotarrow"):
+            self.result["shapes"][title] = np.broadcast_to(to_bool(series), (self.count,))
+        else:
+            self.result["plots"][title] = self._series(series)
+        return None
+
+    def _record_alert(self, node, scope, mask):
+        if node.func == "alertcondition":
+            arguments = self._args(node, scope, mask, ["condition", "title", "message"])
+            title = arguments.get("title") or f"alert_{node.line}"
+            condition = np.broadcast_to(to_bool(arguments["condition"]), (self.count,))
+            when = condition if mask is None else condition & mask
+        else:
+            arguments = self._args(node, scope, mask, ["message"])
+            title = arguments.get("message") or f"alert_{node.line}"
+            when = self._when(mask)
+        previous = self.result["alerts"].get(title)
+        self.result["alerts"][title] = when if previous is None else previous | when
+        return None
+
+    def _record_order(self, node, scope, mask):
+        action = node.func.split(".", 1)[1]
+        if action not in ("entry", "close", "close_all", "exit", "order", "cancel", "cancel_all"):
+            raise VectorizationError(f"line {node.line}: {node.func}() needs the bar-by-bar runtime")
+        names = {
+            "entry": ["id", "direction", "qty", "limit", "stop"],
+            "order": ["id", "direction", "qty", "limit", "stop"],
+            "close": ["id", "comment", "qty"],
+            "exit": ["id", "from_entry", "qty", "qty_percent", "profit", "limit", "loss", "stop"],
+        }.get(action, ["id"])
+        order = self._args(node, scope, mask, names)
+        order["action"] = action
+        order["when"] = self._when(mask)
+        order["line"] = node.line
+        self.result["orders"].append(order)
+        return None
+
+
+def data_fingerprint(data):
+    """Content-derived identity of an OHLCV dict, used to scope cached indicator columns"""
+    if "key" in data:
+        return data["key"]
+    # Every bar series a cached column can read from, hashed in full: a sampled key lets two
+    # datasets that differ only mid-series share each other's indicator columns
+    digest = hashlib.blake2b(digest_size=16)
+    for name in ohlcv.COLUMNS:
+        if name in data:
+            column = np.ascontiguousarray(data[name])
+            digest.update(name.encode() + str(column.dtype).encode() + len(column).to_bytes(8, "little"))
+            digest.update(column.view(np.uint8))
+    return (ohlcv.bar_count(data), digest.hexdigest())
+
+
+def _incomplete(key):
+    if key is None:
+        return True
+    if isinstance(key, tuple):
+        return any(_incomplete(part) if isinstance(part, tuple) or part is None else False for part in key)
+    return False
+
+
+def _reduce(function, values):
+    result = values[0]
+    for value in values[1:]:
+        result = function(result, value)
+    return result
+
+
+def run_script(script, data, inputs=None, timeframe="1"):
+    """Parse (if needed) and run a script over OHLCV columns"""
+    if isinstance(script, str) and os.path.exists(script):
+        script = ast.parse_file(script)
+    return VectorEngine(script, inputs, timeframe).run(data)
+
+
+def summarize(result):
+    """Print a short summary of a run"""
+    print(f"{result['kind'] or 'script'}: {result['title']} ({result['bars']} bars)")
+    if result["inputs"]:
+        print("Inputs: " + ", ".join(f"{name}={value}" for name, value in result["inputs"].items()))
+    for title, values in result["plots"].items():
+        print(f"  plot  {title}: last={values[-1]:.6g}")
+    for title, values in result["shapes"].items():
+        print(f"  shape {title}: {int(np.count_nonzero(values))} bars")
+    for title, values in result["alerts"].items():
+        print(f"  alert {title}: {int(np.count_nonzero(values))} bars")
+    for order in result["orders"]:
+        print(f"  order strategy.{order['action']}({order.get('id')!r}): {int(np.count_nonzero(order['when']))} bars")
+
+
+def benchmark(paths, bars, repeat=3):
+    """Time the engine on a synthetic series and report bars per second"""
+    data = ohlcv.synthetic(bars)
+    print(f"Benchmark: {bars:,} synthetic bars, best of {repeat}")
+    for path in paths:
+        script = ast.parse_file(path)
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            VectorEngine(script).run(data)
+            best = min(best, time.perf_counter() - start)
+        print(f"  {path}: {best * 1000:.1f} ms, {bars / best:,.0f} bars/s")
+
+
+def _parse_overrides(pairs):
+    overrides = {}
+    for pair in pairs or []:
+        name, _, value = pair.partition("=")
+        for convert in (int, float):
+            try:
+                value = convert(value)
+                break
+            except ValueError:
+                continue
+        if value in ("true", "false"):
+            value = value == "true"
+        overrides[name] = value
+    return overrides
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    default_scripts = [
+        os.path.join(root, "atr_retracement_ema_signals.pine"),
+        os.path.join(root, "atr_retracement_ema_strategy.pine"),
+    ]
+    parser = argparse.ArgumentParser(description="Run Pine Script over OHLCV data with NumPy columns")
+    parser.add_argument("scripts", nargs="*", help="Pine scripts to run")
+    parser.add_argument("--data", help="OHLCV CSV or Parquet file (default: synthetic random walk)")
+    parser.add_argument("--bars", type=int, default=1_000_000, help="Synthetic bars for --benchmark or when no data is given")
+    parser.add_argument("--input", action="append", metavar="NAME=VALUE", help="Override an input by variable name or title")
+    parser.add_argument("--benchmark", action="store_true", help="Report bars per second")
+    args = parser.parse_args()
+
+    paths = args.scripts or default_scripts
+    if args.benchmark:
+        benchmark(paths, args.bars)
+        return
+
+    data = ohlcv.load(args.data) if args.data else ohlcv.synthetic(args.bars)
+    overrides = _parse_overrides(args.input)
+    for path in paths:
+        try:
+            summarize(run_script(path, data, overrides))
+        except PineEvalError as e:
+            print(f"{path}: {e}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
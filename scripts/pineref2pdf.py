@@ -15,12 +15,12 @@ __copyright__   = "Copyright 2023, Planet Earth (I think)"
 import logging
 import pdfkit
 
-import requests
 import lxml
 from bs4 import BeautifulSoup
 import os
 import sys
 import re
+from request_scheduler import scheduler
 
 
 class Constant:
@@ -63,7 +63,7 @@ def prune_subchapters(chapters):
     return ch
 
 def find_chapters(start_url):
-    f = requests.get(start_url, headers=Constant.HEADERS)
+    f = scheduler().get(start_url, headers=Constant.HEADERS)
 
     soup = BeautifulSoup(f.content, 'lxml')
     chapters = soup.find('div', {
@@ -81,7 +81,7 @@ def save_html_as_pdf(anchor, pdf_name):
     url = Constant.DOMAIN_NAME + anchor
 
     try:
-        pdfkit.from_url(url, pdf_name)
+        scheduler().call(url, pdfkit.from_url, url, pdf_name)
         logging.info(f"- Downloaded {pdf_name}")
 
     except Exception as ex:
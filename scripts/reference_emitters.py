@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Single-pass output emitters for the organized Pine Script reference
+
+parse_all_versions.py used to build each category file and the version
+README by filtering every category four times per file (functions, variables,
+properties, constants) and growing whole files with string concatenation.
+Here the items of organized_content.json are grouped by category and type in
+one pass, and each group is handed to a set of emitters that write straight
+to buffered files:
+
+- markdown  README.md and categories/<category>.md (the existing layout)
+- jsonl     items.jsonl, one item per line with its category
+- html      index.html, every category with linked items
+- sqlite    reference.sqlite, items and per-category counts
+
+Any number of formats are produced in the same traversal. New formats
+subclass `Emitter` and register in EMITTERS.
+
+Usage:
+    python scripts/reference_emitters.py                          # markdown, all versions
+    python scripts/reference_emitters.py --version v6 --format markdown jsonl html sqlite
+    python scripts/reference_emitters.py --benchmark              # against the concatenating implementation
+"""
+
+import argparse
+import contextlib
+import html
+import io
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+REFERENCES = "pine_script_references"
+VERSIONS = ["v3", "v4", "v5", "v6"]
+BUFFER_SIZE = io.DEFAULT_BUFFER_SIZE
+
+# Item types in section order, with their headings
+SECTIONS = [("function", "Functions"), ("variable", "Variables"),
+            ("property", "Properties"), ("constant", "Constants")]
+
+
+def safe_name(category_name):
+    """File name stem used for a category"""
+    name = re.sub(r'[^\w\s-]', '', category_name).strip().lower()
+    return re.sub(r'[-\s]+', '_', name)
+
+
+def open_buffered(path):
+    """Open a text file for writing through a fixed-size buffer"""
+    return open(path, "w", encoding="utf-8", buffering=BUFFER_SIZE)
+
+
+class Emitter:
+    """One output format; receives each category once, already grouped by type"""
+
+    def begin(self, version, base_dir):
+        """Start writing the output for one version"""
+
+    def category(self, name, safe, groups):
+        """Write one category; groups maps item type to its items in order"""
+
+    def end(self, total_items, type_counts):
+        """Finish the version with overall totals"""
+
+
+class MarkdownEmitter(Emitter):
+    """README.md and categories/*.md, byte-identical to the previous output"""
+
+    def begin(self, version, base_dir):
+        self.categories_dir = os.path.join(base_dir, "categories")
+        os.makedirs(self.categories_dir, exist_ok=True)
+        self.readme_path = os.path.join(base_dir, "README.md")
+        self.count = 0
+        self.readme = open_buffered(self.readme_path)
+        self.readme.write(f"# Pine Script {version} Reference Manual\n\n")
+        self.readme.write(f"This is an organized reference for Pine Script {version} functions, variables, and constants.\n\n")
+        self.readme.write("## Categories\n\n")
+
+    def category(self, name, safe, groups):
+        with open_buffered(os.path.join(self.categories_dir, safe + ".md")) as f:
+            f.write(f"# {name}\n\n")
+            for item_type, heading in SECTIONS:
+                items = groups.get(item_type)
+                if items:
+                    f.write(f"## {heading}\n\n")
+                    for item in items:
+                        f.write(f"- `{item['name']}`\n")
+                    f.write("\n")
+        self.count += 1
+
+        self.readme.write(f"- [{name}](categories/{safe}.md)\n")
+        parts = [f"{len(groups[item_type])} {heading.lower()}"
+                 for item_type, heading in SECTIONS if groups.get(item_type)]
+        if parts:
+            self.readme.write(f"  - {', '.join(parts)}\n")
+
+    def end(self, total_items, type_counts):
+        self.readme.write("\n## Total Items\n\n")
+        self.readme.write(f"- **Total items:** {total_items}\n\n")
+        self.readme.write("### By Type\n\n")
+        for item_type, count in sorted(type_counts.items()):
+            self.readme.write(f"- **{item_type.capitalize()}s:** {count}\n")
+        self.readme.close()
+        print(f"  Created {self.count} markdown files in {self.categories_dir}")
+        print(f"  Created main README at {self.readme_path}")
+
+
+class JsonLinesEmitter(Emitter):
+    """items.jsonl: one JSON object per item, tagged with its category"""
+
+    def begin(self, version, base_dir):
+        self.path = os.path.join(base_dir, "items.jsonl")
+        self.f = open_buffered(self.path)
+
+    def category(self, name, safe, groups):
+        for items in groups.values():
+            for item in items:
+                self.f.write(json.dumps({"category": name, **item}, ensure_ascii=False))
+                self.f.write("\n")
+
+    def end(self, total_items, type_counts):
+        self.f.close()
+        print(f"  Created {self.path}")
+
+
+class HtmlEmitter(Emitter):
+    """index.html: categories with their items linked into full_reference.html"""
+
+    def begin(self, version, base_dir):
+        self.path = os.path.join(base_dir, "index.html")
+        self.f = open_buffered(self.path)
+        self.f.write("<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n")
+        self.f.write(f"<title>Pine Script {version} Reference</title>\n</head>\n<body>\n")
+        self.f.write(f"<h1>Pine Script {version} Reference</h1>\n")
+
+    def category(self, name, safe, groups):
+        self.f.write(f"<section id=\"{safe}\">\n<h2>{html.escape(name)}</h2>\n")
+        for item_type, heading in SECTIONS:
+            items = groups.get(item_type)
+            if items:
+                self.f.write(f"<h3>{heading}</h3>\n<ul>\n")
+                for item in items:
+                    self.f.write(f"<li><a href=\"full_reference.html#{html.escape(item['href'])}\">"
+                                 f"<code>{html.escape(item['name'])}</code></a></li>\n")
+                self.f.write("</ul>\n")
+        self.f.write("</section>\n")
+
+    def end(self, total_items, type_counts):
+        counts = ", ".join(f"{count} {item_type}s" for item_type, count in sorted(type_counts.items()))
+        self.f.write(f"<footer>{total_items} items: {counts}</footer>\n</body>\n</html>\n")
+        self.f.close()
+        print(f"  Created {self.path}")
+
+
+class SqliteEmitter(Emitter):
+    """reference.sqlite: items(category, name, type, href, data_name) and categories counts"""
+
+    def begin(self, version, base_dir):
+        self.path = os.path.join(base_dir, "reference.sqlite")
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript("""
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            CREATE TABLE items (category TEXT, name TEXT, type TEXT, href TEXT, data_name TEXT);
+            CREATE TABLE categories (name TEXT PRIMARY KEY, file TEXT, functions INTEGER,
+                                     variables INTEGER, properties INTEGER, constants INTEGER);
+        """)
+
+    def category(self, name, safe, groups):
+        self.db.executemany("INSERT INTO items VALUES (?, ?, ?, ?, ?)",
+                            ((name, item["name"], item["type"], item["href"], item["data_name"])
+                             for items in groups.values() for item in items))
+        self.db.execute("INSERT INTO categories VALUES (?, ?, ?, ?, ?, ?)",
+                        (name, f"categories/{safe}.md",
+                         *(len(groups.get(item_type, ())) for item_type, _ in SECTIONS)))
+
+    def end(self, total_items, type_counts):
+        self.db.execute("CREATE INDEX items_name ON items (name)")
+        self.db.commit()
+        self.db.close()
+        print(f"  Created {self.path}")
+
+
+EMITTERS = {
+    "markdown": MarkdownEmitter,
+    "jsonl": JsonLinesEmitter,
+    "html": HtmlEmitter,
+    "sqlite": SqliteEmitter,
+}
+
+
+def emit(organized_content, version, formats=("markdown",), base_dir=None):
+    """Group the items once and feed every category to the emitters of the given formats"""
+    base_dir = base_dir or f"{REFERENCES}/{version}"
+    emitters = [EMITTERS[name]() for name in formats]
+    for emitter in emitters:
+        emitter.begin(version, base_dir)
+
+    type_counts = {}
+    for name, items in organized_content["categories"].items():
+        groups = {}
+        for item in items:
+            groups.setdefault(item["type"], []).append(item)
+        for item_type, group in groups.items():
+            type_counts[item_type] = type_counts.get(item_type, 0) + len(group)
+        safe = safe_name(name)
+        for emitter in emitters:
+            emitter.category(name, safe, groups)
+
+    for emitter in emitters:
+        emitter.end(len(organized_content["all_items"]), type_counts)
+
+
+def _concatenated_markdown(organized_content, base_dir, version):
+    """The previous implementation (filter per type, string concatenation), kept as the benchmark baseline"""
+    categories_dir = os.path.join(base_dir, "categories")
+    os.makedirs(categories_dir, exist_ok=True)
+    for category_name, items in organized_content["categories"].items():
+        markdown_content = f"# {category_name}\n\n"
+        for item_type, heading in SECTIONS:
+            group = [item for item in items if item["type"] == item_type]
+            if group:
+                markdown_content += f"## {heading}\n\n"
+                for item in group:
+                    markdown_content += f"- `{item['name']}`\n"
+                markdown_content += "\n"
+        with open(os.path.join(categories_dir, safe_name(category_name) + ".md"), "w", encoding="utf-8") as f:
+            f.write(markdown_content)
+
+    content = f"# Pine Script {version} Reference Manual\n\n"
+    content += f"This is an organized reference for Pine Script {version} functions, variables, and constants.\n\n"
+    content += "## Categories\n\n"
+    for category_name, items in organized_content["categories"].items():
+        content += f"- [{category_name}](categories/{safe_name(category_name)}.md)\n"
+        summary_parts = []
+        for item_type, heading in SECTIONS:
+            count = len([item for item in items if item["type"] == item_type])
+            if count > 0:
+                summary_parts.append(f"{count} {heading.lower()}")
+        if summary_parts:
+            content += f"  - {', '.join(summary_parts)}\n"
+    content += "\n## Total Items\n\n"
+    content += f"- **Total items:** {len(organized_content['all_items'])}\n\n"
+    type_counts = {}
+    for item in organized_content["all_items"]:
+        type_counts[item["type"]] = type_counts.get(item["type"], 0) + 1
+    content += "### By Type\n\n"
+    for item_type, count in sorted(type_counts.items()):
+        content += f"- **{item_type.capitalize()}s:** {count}\n"
+    with open(os.path.join(base_dir, "README.md"), "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def _tree(directory):
+    """Relative path -> bytes for every file under a directory"""
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                files[os.path.relpath(path, directory)] = f.read()
+    return files
+
+
+def _measure(func, runs):
+    """Best wall time over runs, then peak traced memory of one more run"""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def benchmark(versions=VERSIONS, runs=20, scale=1):
+    """Compare the concatenating implementation with the emitters on every version"""
+    print(f"{'version':<8} {'items':>7} {'implementation':<24} {'time':>9} {'peak':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for version in versions:
+            with open(f"{REFERENCES}/{version}/organized_content.json", encoding="utf-8") as f:
+                content = json.load(f)
+            if scale > 1:
+                content = {"categories": {name: items * scale for name, items in content["categories"].items()},
+                           "all_items": content["all_items"] * scale}
+            old_dir = os.path.join(tmp, version, "old")
+            new_dir = os.path.join(tmp, version, "new")
+            all_dir = os.path.join(tmp, version, "all")
+            for directory in (old_dir, new_dir, all_dir):
+                os.makedirs(directory)
+
+            cases = [
+                ("concatenation", lambda: _concatenated_markdown(content, old_dir, version)),
+                ("emitters: markdown", lambda: emit(content, version, ["markdown"], new_dir)),
+                ("emitters: all formats", lambda: emit(content, version, list(EMITTERS), all_dir)),
+            ]
+            for label, func in cases:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    seconds, peak = _measure(func, runs)
+                print(f"{version:<8} {len(content['all_items']):>7} {label:<24} "
+                      f"{seconds * 1000:>7.2f}ms {peak / 1024:>7.1f}KB")
+
+            same = _tree(old_dir) == _tree(new_dir)
+            print(f"{version:<8} markdown output identical: {same}")
+            shutil.rmtree(os.path.join(tmp, version))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the organized reference in one or more formats")
+    parser.add_argument("--version", nargs="+", default=VERSIONS, help="Versions to write (default: all)")
+    parser.add_argument("--format", nargs="+", default=["markdown"], choices=list(EMITTERS),
+                        help="Output formats, produced in a single pass (default: markdown)")
+    parser.add_argument("--benchmark", action="store_true", help="Time and peak memory against the previous implementation")
+    parser.add_argument("--runs", type=int, default=20, help="Benchmark runs per case (best time is reported)")
+    parser.add_argument("--scale", type=int, default=1, help="Repeat every category's items N times in the benchmark")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.version, args.runs, args.scale)
+        return
+
+    for version in args.version:
+        path = f"{REFERENCES}/{version}/organized_content.json"
+        if not os.path.exists(path):
+            print(f"File {path} not found")
+            continue
+        with open(path, encoding="utf-8") as f:
+            content = json.load(f)
+        print(f"Writing Pine Script {version} ({', '.join(args.format)})")
+        emit(content, version, args.format)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,712 @@
+#!/usr/bin/env python3
+"""
+Full-text search over the reference, the guidelines and the templates
+
+Indexes three kinds of documents:
+
+- reference  every item of pine_script_references/<v>/organized_content.json,
+             with its description, syntax, arguments, returns and remarks
+             when pine_reference_db.py has built signatures.sqlite
+- guideline  sections (under headings, or paragraphs) of guidelines/*.md and
+             guidelines/*.txt
+- template   comment blocks of templates/*.pine
+
+and ranks them with BM25 ("which function gives the highest value over N
+bars", "nz bool", "ta.highest").
+
+The index lives in .cache/search_index/ as immutable segment files. Each
+segment holds the document lengths, a sorted lexicon, delta- and
+varint-encoded posting lists (document numbers and term frequencies) and the
+document metadata, zlib-compressed in blocks of 64 documents. Segments are
+memory-mapped and read with NumPy, so opening the index reads only the
+manifest and a query touches only the postings of its terms and the
+metadata blocks of its results.
+
+Updates are incremental: sources are compared by (mtime, size) and content
+hash, documents of changed or removed sources are marked deleted, and the
+new versions go into a new segment. Segments are merged in tiers (whenever
+MERGE_FACTOR segments of a similar size exist, or half of a segment is
+deleted), which also drops deleted documents.
+
+Usage:
+    python scripts/reference_search.py "highest value over N bars"
+    python scripts/reference_search.py nz --kind guideline
+    python scripts/reference_search.py "ta.highest" --version v6 --limit 5
+    python scripts/reference_search.py --stats
+    python scripts/reference_search.py --rebuild
+    python scripts/reference_search.py --benchmark
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import shutil
+import sqlite3
+import statistics
+import struct
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+import pine_parser
+from reference_emitters import safe_name
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INDEX_DIR = os.path.join(ROOT, ".cache", "search_index")
+MANIFEST = "manifest.json"
+
+K1, B = 1.2, 0.75
+MERGE_FACTOR = 4
+TITLE_BOOST = 2
+MAX_TEXT = 2000
+META_BLOCK = 64
+
+TOKEN_RE = re.compile(r"[a-z0-9_]+(?:\.[a-z0-9_]+)*")
+HEADING_RE = re.compile(r"^#{1,6}\s+(.*)$")
+STOPWORDS = set("a an and are as at be but by for from has have if in into is it its of on or over so such that the "
+                "their then there these this to was were which will with what when where who why how can do does "
+                "don not no than too very".split())
+
+MAGIC = b"PSRSEG1\0"
+HEADER = struct.Struct("<8sIIQQQQQQ")
+LEXICON = np.dtype([("term_start", "<u4"), ("term_end", "<u4"), ("postings", "<u8"),
+                    ("docs_bytes", "<u4"), ("freqs_bytes", "<u4"), ("df", "<u4")])
+
+
+def stem(word):
+    """Light plural folding: bars -> bar, indices -> index, series stays"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is", "series")):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Index terms of a text: words and dotted names, plus the segments of dotted names"""
+    for token in TOKEN_RE.findall(text.lower()):
+        if "." in token:
+            yield token
+            for part in token.split("."):
+                if part and part not in STOPWORDS:
+                    yield stem(part)
+        elif len(token) > 1 and token not in STOPWORDS:
+            yield stem(token)
+
+
+def encode_varints(values):
+    """LEB128 bytes of non-negative integers"""
+    out = bytearray()
+    for value in values:
+        value = int(value)
+        while value >= 0x80:
+            out.append(value & 0x7F | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+
+def decode_varints(buffer):
+    """Integers of a LEB128 byte string, decoded with whole-array operations"""
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    if not len(data):
+        return np.zeros(0, dtype=np.int64)
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    if len(ends) == len(data):
+        return data.astype(np.int64)
+    shifts = (np.arange(len(data)) - np.repeat(starts, ends - starts + 1)) * 7
+    values = (data & 0x7F).astype(np.int64) << shifts
+    return np.add.reduceat(values, starts)
+
+
+# Sources and documents
+
+META_FIELDS = ("key", "title", "kind", "location", "version", "text")
+
+
+def _document(key, title, kind, location, text, version=None):
+    return {"key": key, "title": title, "kind": kind, "location": location,
+            "version": version, "text": " ".join(text.split())[:MAX_TEXT]}
+
+
+def _signature_text(record):
+    parts = [" ".join(record["syntax"]), record["description"]]
+    parts += [f"{arg['name']} {arg['type'] or ''} {arg['description']}" for arg in record["arguments"]]
+    parts += [record["returns"], record["remarks"]]
+    return " ".join(filter(None, parts))
+
+
+def reference_documents(root, version):
+    """One document per organized_content.json item, with its extracted signature when available"""
+    base = os.path.join(root, "pine_script_references", version)
+    with open(os.path.join(base, "organized_content.json"), encoding="utf-8") as f:
+        content = json.load(f)
+    records = {}
+    if os.path.exists(os.path.join(base, "signatures.sqlite")):
+        conn = sqlite3.connect(os.path.join(base, "signatures.sqlite"))
+        try:
+            records = {entry_id: json.loads(data) for entry_id, data in conn.execute("SELECT id, data FROM entries")}
+        except sqlite3.OperationalError:
+            pass
+        finally:
+            conn.close()
+    documents = []
+    for category, items in content["categories"].items():
+        for item in items:
+            record = records.get(item["href"])
+            text = f"{item['name']} {category} {record['kind'] if record else item['type']}"
+            if record:
+                text += " " + _signature_text(record)
+            documents.append(_document(f"{version}:{item['href']}", item["name"], "reference",
+                                       f"pine_script_references/{version}/categories/{safe_name(category)}.md#{item['href']}",
+                                       text, version))
+    return documents
+
+
+def guideline_documents(root, path):
+    """Sections of a guideline file: split at headings, or at blank lines when there are none"""
+    relative = os.path.relpath(path, root)
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    sections = []
+    if any(HEADING_RE.match(line) for line in lines):
+        for number, line in enumerate(lines, 1):
+            heading = HEADING_RE.match(line)
+            if heading or not sections:
+                sections.append([number, heading.group(1).strip() if heading else os.path.basename(path), []])
+            if not heading:
+                sections[-1][2].append(line)
+    else:
+        start = None
+        for number, line in enumerate(lines + [""], 1):
+            if line.strip() and start is None:
+                start = number
+                sections.append([number, None, []])
+            if line.strip():
+                sections[-1][2].append(line)
+            else:
+                start = None
+    documents = []
+    for number, title, body in sections:
+        text = "\n".join(body).strip()
+        if not text and not title:
+            continue
+        title = title or " ".join(text.split()[:8])
+        documents.append(_document(f"{relative}:{number}", title, "guideline", f"{relative}:{number}",
+                                   f"{title} {text}"))
+    return documents
+
+
+def _comments(lines):
+    """(line number, comment text) of every comment, using the Pine tokenizer when the file parses"""
+    try:
+        found = []
+        for line in pine_parser.iter_logical_lines(lines):
+            if line.kind == "comment":
+                found.append((line.line, line.text[2:].strip()))
+            elif line.kind == "code" and line.comment:
+                found.append((line.line, line.comment))
+            elif line.kind == "blank":
+                found.append((line.line, None))
+        return found
+    except pine_parser.PineSyntaxError:
+        return [(number, line.split("//", 1)[1].strip() if "//" in line else None)
+                for number, line in enumerate(lines, 1)]
+
+
+def template_documents(root, path):
+    """Blocks of consecutive comments of a template"""
+    relative = os.path.relpath(path, root)
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    blocks = []
+    previous = None
+    for number, comment in _comments(lines):
+        if comment is None or comment.startswith("@version"):
+            previous = None
+            continue
+        if previous is None or number != previous + 1:
+            blocks.append((number, []))
+        blocks[-1][1].append(comment)
+        previous = number
+    return [_document(f"{relative}:{number}", f"{os.path.basename(path)}: {comments[0]}"[:120], "template",
+                      f"{relative}:{number}", " ".join(comments))
+            for number, comments in blocks]
+
+
+def collect_sources(root=ROOT):
+    """Source key -> (files it is read from, function returning its documents)"""
+    sources = {}
+    for path in sorted(glob.glob(os.path.join(root, "pine_script_references", "v*", "organized_content.json"))):
+        version = os.path.basename(os.path.dirname(path))
+        key = os.path.relpath(path, root)
+        sources[key] = ([path, os.path.join(os.path.dirname(path), "signatures.sqlite")],
+                        lambda version=version: reference_documents(root, version))
+    for pattern in ("*.md", "*.txt"):
+        for path in sorted(glob.glob(os.path.join(root, "guidelines", pattern))):
+            sources[os.path.relpath(path, root)] = ([path], lambda path=path: guideline_documents(root, path))
+    for path in sorted(glob.glob(os.path.join(root, "templates", "*.pine"))):
+        sources[os.path.relpath(path, root)] = ([path], lambda path=path: template_documents(root, path))
+    return sources
+
+
+def _stamp(paths):
+    stamp = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            stamp.append([stat.st_mtime_ns, stat.st_size])
+        except FileNotFoundError:
+            stamp.append(None)
+    return stamp
+
+
+def _content_hash(paths):
+    digest = hashlib.sha1()
+    for path in paths:
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+# Segments
+
+def write_segment(path, metas, lengths, postings):
+    """Write a segment; postings maps term -> (sorted document numbers, term frequencies)"""
+    terms = sorted(postings, key=lambda term: term.encode("utf-8"))
+    lexicon = np.zeros(len(terms), dtype=LEXICON)
+    term_bytes, posting_bytes = bytearray(), bytearray()
+    for i, term in enumerate(terms):
+        docs, freqs = postings[term]
+        docs = np.asarray(docs, dtype=np.int64)
+        encoded_docs = encode_varints(np.diff(docs, prepend=0))
+        encoded_freqs = encode_varints(freqs)
+        encoded_term = term.encode("utf-8")
+        lexicon[i] = (len(term_bytes), len(term_bytes) + len(encoded_term), len(posting_bytes),
+                      len(encoded_docs), len(encoded_freqs), len(docs))
+        term_bytes += encoded_term
+        posting_bytes += encoded_docs + encoded_freqs
+    meta_blobs = [zlib.compress(json.dumps([[meta[field] for field in META_FIELDS] for meta in metas[i:i + META_BLOCK]],
+                                           ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+                  for i in range(0, len(metas), META_BLOCK)]
+    meta_offsets = np.zeros(len(meta_blobs) + 1, dtype="<u8")
+    meta_offsets[1:] = np.cumsum([len(blob) for blob in meta_blobs])
+
+    sections = [np.asarray(lengths, dtype="<u4").tobytes(), lexicon.tobytes(), bytes(term_bytes),
+                bytes(posting_bytes), meta_offsets.tobytes(), b"".join(meta_blobs)]
+    offsets, position = [], HEADER.size
+    for section in sections:
+        position += (-position) % 8
+        offsets.append(position)
+        position += len(section)
+    with open(path + ".tmp", "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(metas), len(terms), *offsets))
+        for offset, section in zip(offsets, sections):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(section)
+    os.replace(path + ".tmp", path)
+
+
+class Segment:
+    """A memory-mapped segment file"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.docs, terms, *offsets = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a search segment")
+        lengths_at, lexicon_at, self.terms_at, self.postings_at, meta_offsets_at, self.meta_at = offsets
+        self.lengths = np.frombuffer(self.map, dtype="<u4", count=self.docs, offset=lengths_at)
+        self.lexicon = np.frombuffer(self.map, dtype=LEXICON, count=terms, offset=lexicon_at)
+        blocks = -(-self.docs // META_BLOCK)
+        self.meta_offsets = np.frombuffer(self.map, dtype="<u8", count=blocks + 1, offset=meta_offsets_at)
+        self.blocks = {}
+
+    def close(self):
+        self.lengths = self.lexicon = self.meta_offsets = None
+        self.map.close()
+
+    def term(self, i):
+        entry = self.lexicon[i]
+        return self.map[self.terms_at + int(entry["term_start"]):self.terms_at + int(entry["term_end"])]
+
+    def find(self, term):
+        """Lexicon index of a term, or None"""
+        key = term.encode("utf-8")
+        lo, hi = 0, len(self.lexicon)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.term(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < len(self.lexicon) and self.term(lo) == key else None
+
+    def postings(self, i):
+        """(document numbers, term frequencies) of lexicon entry i"""
+        entry = self.lexicon[i]
+        start = self.postings_at + int(entry["postings"])
+        middle = start + int(entry["docs_bytes"])
+        docs = np.cumsum(decode_varints(self.map[start:middle]))
+        return docs, decode_varints(self.map[middle:middle + int(entry["freqs_bytes"])])
+
+    def meta(self, doc):
+        """Metadata of a document, decompressing its block on first use"""
+        number = doc // META_BLOCK
+        if number not in self.blocks:
+            start, end = int(self.meta_offsets[number]), int(self.meta_offsets[number + 1])
+            self.blocks[number] = json.loads(zlib.decompress(self.map[self.meta_at + start:self.meta_at + end]))
+        return dict(zip(META_FIELDS, self.blocks[number][doc % META_BLOCK]))
+
+    def items(self):
+        """(term, docs, freqs) for every term"""
+        for i in range(len(self.lexicon)):
+            yield self.term(i).decode("utf-8"), *self.postings(i)
+
+
+def _invert(documents, first=0):
+    """Metadata, lengths and postings of documents numbered from `first`"""
+    postings, lengths = {}, []
+    for number, document in enumerate(documents, first):
+        counts = {}
+        for term in [*tokenize(document["title"])] * TITLE_BOOST + [*tokenize(document["text"])]:
+            counts[term] = counts.get(term, 0) + 1
+        lengths.append(sum(counts.values()))
+        for term, count in counts.items():
+            entry = postings.setdefault(term, ([], []))
+            entry[0].append(number)
+            entry[1].append(count)
+    return documents, lengths, postings
+
+
+class SearchIndex:
+    """Segmented BM25 index with incremental updates"""
+
+    def __init__(self, path=INDEX_DIR, root=ROOT):
+        self.path = path
+        self.root = root
+        os.makedirs(path, exist_ok=True)
+        try:
+            with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.manifest = {"segments": [], "sources": {}, "next": 0}
+        self._segments = {}
+        self._stats = None
+
+    def close(self):
+        for segment in self._segments.values():
+            segment.close()
+        self._segments = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def segment(self, name):
+        if name not in self._segments:
+            self._segments[name] = Segment(os.path.join(self.path, name))
+        return self._segments[name]
+
+    def _save(self):
+        with open(os.path.join(self.path, MANIFEST + ".tmp"), "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f)
+        os.replace(os.path.join(self.path, MANIFEST + ".tmp"), os.path.join(self.path, MANIFEST))
+        self._stats = None
+
+    def _live(self, info):
+        """Boolean mask of the segment's documents that are not deleted"""
+        live = np.ones(info["docs"], dtype=bool)
+        for start, end in info["deleted"]:
+            live[start:end] = False
+        return live
+
+    def _new_name(self):
+        self.manifest["next"] += 1
+        return f"segment_{self.manifest['next']:06d}.seg"
+
+    def _drop(self, name):
+        if name in self._segments:
+            self._segments.pop(name).close()
+        os.remove(os.path.join(self.path, name))
+
+    def update(self):
+        """Reindex added and changed sources, drop removed ones and merge; returns counts"""
+        sources = collect_sources(self.root)
+        known = self.manifest["sources"]
+        segments = {info["name"]: info for info in self.manifest["segments"]}
+        changed, counts = [], {"added": 0, "changed": 0, "unchanged": 0, "removed": 0}
+        for key, (paths, _) in sources.items():
+            entry = known.get(key)
+            stamp = _stamp(paths)
+            if entry and entry["stamp"] == stamp:
+                counts["unchanged"] += 1
+                continue
+            digest = _content_hash(paths)
+            if entry and entry["hash"] == digest:
+                entry["stamp"] = stamp
+                counts["unchanged"] += 1
+                continue
+            changed.append((key, stamp, digest))
+            counts["changed" if entry else "added"] += 1
+        removed = [key for key in known if key not in sources]
+        counts["removed"] = len(removed)
+
+        for key in removed + [key for key, _, _ in changed if key in known]:
+            entry = known.pop(key)
+            if entry["end"] > entry["start"]:
+                segments[entry["segment"]]["deleted"].append([entry["start"], entry["end"]])
+        if changed:
+            documents = []
+            name = self._new_name()
+            for key, stamp, digest in changed:
+                start = len(documents)
+                documents += sources[key][1]()
+                known[key] = {"stamp": stamp, "hash": digest, "segment": name, "start": start, "end": len(documents)}
+            write_segment(os.path.join(self.path, name), *_invert(documents))
+            self.manifest["segments"].append({"name": name, "docs": len(documents), "deleted": []})
+        if changed or removed:
+            self._merge()
+        self._save()
+        return counts
+
+    def _merge(self):
+        """Merge tiers of MERGE_FACTOR similar-sized segments and segments that are half deleted"""
+        while True:
+            infos = self.manifest["segments"]
+            for info in [info for info in infos if self._live(info).sum() == 0]:
+                infos.remove(info)
+                self._drop(info["name"])
+            tiers = {}
+            for info in infos:
+                tiers.setdefault(int(math.log(max(int(self._live(info).sum()), 1), MERGE_FACTOR)), []).append(info)
+            group = next((group for group in tiers.values() if len(group) >= MERGE_FACTOR), None)
+            if group is None:
+                group = next(([info] for info in infos if sum(end - start for start, end in info["deleted"]) * 2 > info["docs"]), None)
+            if group is None:
+                return
+            self._merge_segments(group)
+
+    def _merge_segments(self, group):
+        """Rewrite a group of segments as one without their deleted documents"""
+        name = self._new_name()
+        metas, lengths, postings, remap = [], [], {}, {}
+        for info in group:
+            segment = self.segment(info["name"])
+            live = self._live(info)
+            numbers = np.cumsum(live) - 1 + len(metas)
+            remap[info["name"]] = numbers
+            metas += [segment.meta(doc) for doc in np.flatnonzero(live)]
+            lengths += segment.lengths[live].tolist()
+            for term, docs, freqs in segment.items():
+                keep = live[docs]
+                if keep.any():
+                    entry = postings.setdefault(term, ([], []))
+                    entry[0].append(numbers[docs[keep]])
+                    entry[1].append(freqs[keep])
+        write_segment(os.path.join(self.path, name), metas, lengths,
+                      {term: (np.concatenate(docs), np.concatenate(freqs)) for term, (docs, freqs) in postings.items()})
+        merged = {info["name"] for info in group}
+        for entry in self.manifest["sources"].values():
+            if entry["segment"] in merged:
+                numbers = remap[entry["segment"]]
+                start = int(numbers[entry["start"]]) if entry["end"] > entry["start"] else 0
+                entry.update(segment=name, start=start, end=start + entry["end"] - entry["start"])
+        position = self.manifest["segments"].index(group[0])
+        for info in group:
+            self.manifest["segments"].remove(info)
+            self._drop(info["name"])
+        self.manifest["segments"].insert(position, {"name": name, "docs": len(metas), "deleted": []})
+
+    def stats(self):
+        """Live documents, average length and per-segment live masks"""
+        if self._stats is None:
+            masks, documents, total = {}, 0, 0
+            for info in self.manifest["segments"]:
+                live = self._live(info)
+                masks[info["name"]] = live
+                documents += int(live.sum())
+                total += int(self.segment(info["name"]).lengths[live].sum())
+            self._stats = {"documents": documents, "average_length": total / documents if documents else 0, "live": masks}
+        return self._stats
+
+    def search(self, query, limit=10, kind=None, version=None):
+        """Best BM25 matches as dicts (score, key, title, kind, location, version, snippet)"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        stats = self.stats()
+        if not terms or not stats["documents"]:
+            return []
+        found = {}
+        for info in self.manifest["segments"]:
+            segment = self.segment(info["name"])
+            found[info["name"]] = [(term, i) for term in terms for i in [segment.find(term)] if i is not None]
+        df = {term: 0 for term in terms}
+        for name, entries in found.items():
+            for term, i in entries:
+                df[term] += int(self.segment(name).lexicon[i]["df"])
+        n, average = stats["documents"], stats["average_length"]
+        candidates = []
+        for name, entries in found.items():
+            if not entries:
+                continue
+            segment = self.segment(name)
+            scores = np.zeros(segment.docs)
+            for term, i in entries:
+                idf = math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5))
+                docs, freqs = segment.postings(i)
+                norm = K1 * (1 - B + B * segment.lengths[docs] / average)
+                scores[docs] += idf * freqs * (K1 + 1) / (freqs + norm)
+            scores[~stats["live"][name]] = 0
+            hits = np.flatnonzero(scores)
+            candidates += [(float(scores[doc]), name, int(doc)) for doc in hits]
+        candidates.sort(key=lambda hit: -hit[0])
+        results = []
+        for score, name, doc in candidates:
+            meta = self.segment(name).meta(doc)
+            if (kind and meta["kind"] != kind) or (version and meta["version"] != version):
+                continue
+            results.append({"score": round(score, 3), **{k: meta[k] for k in META_FIELDS if k != "text"},
+                            "snippet": snippet(meta["text"], terms)})
+            if len(results) == limit:
+                break
+        return results
+
+    def describe(self):
+        """Per-segment document counts and file sizes"""
+        return [(info["name"], info["docs"], sum(end - start for start, end in info["deleted"]),
+                 os.path.getsize(os.path.join(self.path, info["name"]))) for info in self.manifest["segments"]]
+
+
+def snippet(text, terms, width=160):
+    """Part of a document's text around the first query term"""
+    lowered = text.lower()
+    positions = [lowered.find(term) for term in terms if lowered.find(term) >= 0]
+    start = max(0, min(positions) - width // 4) if positions else 0
+    part = text[start:start + width]
+    return ("…" if start else "") + part + ("…" if start + width < len(text) else "")
+
+
+def benchmark(index_dir=None):
+    """Index size and build time, cold and warm query latency, and incremental updates with merges"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "repo")
+        for pattern in ("guidelines/*.md", "guidelines/*.txt", "templates/*.pine",
+                        "pine_script_references/v*/organized_content.json", "pine_script_references/v*/signatures.sqlite"):
+            for path in glob.glob(os.path.join(ROOT, pattern)):
+                target = os.path.join(root, os.path.relpath(path, ROOT))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copy(path, target)
+        path = index_dir or os.path.join(tmp, "index")
+
+        start = time.perf_counter()
+        with SearchIndex(path, root) as index:
+            index.update()
+            elapsed = time.perf_counter() - start
+            segments = index.describe()
+            stats = index.stats()
+            segment = index.segment(segments[0][0])
+            postings = int(segment.lexicon["df"].sum())
+            posting_bytes = int(segment.lexicon["docs_bytes"].sum() + segment.lexicon["freqs_bytes"].sum())
+            text_bytes = sum(len(segment.meta(doc)["text"].encode("utf-8")) for doc in range(segment.docs))
+            print(f"Full build: {stats['documents']} documents, {len(segment.lexicon)} terms in {elapsed * 1000:.0f} ms")
+            print(f"Postings: {postings} in {posting_bytes / 1024:.0f} KB ({posting_bytes / postings:.2f} bytes each, "
+                  f"{postings * 8 / 1024:.0f} KB as 32-bit pairs); segment {segments[0][3] / 1024:.0f} KB "
+                  f"for {text_bytes / 1024:.0f} KB of text")
+
+            names = [segment.meta(doc)["title"] for doc in range(0, segment.docs, max(1, segment.docs // 100))]
+            queries = ["which function gives the highest value over N bars", "nz bool", "alert instead of alertcondition",
+                       "indentation if else", "request security timeframe", "moving average length"]
+            queries += [name.rstrip("()") for name in names] + [" ".join(name.split(".")[-1:]) + " series" for name in names]
+
+        for label, cold in (("cold (open per query)", True), ("warm", False)):
+            times = []
+            index = SearchIndex(path, root)
+            for query in queries:
+                if cold:
+                    index.close()
+                    index = SearchIndex(path, root)
+                begin = time.perf_counter()
+                index.search(query)
+                times.append(time.perf_counter() - begin)
+            index.close()
+            times.sort()
+            print(f"Queries {label}: {len(times)}, mean {statistics.mean(times) * 1000:.2f} ms, "
+                  f"p50 {times[len(times) // 2] * 1000:.2f} ms, p95 {times[int(len(times) * .95)] * 1000:.2f} ms")
+
+        guideline = os.path.join(root, "guidelines", "pine_script_guidelines.md")
+        with SearchIndex(path, root) as index:
+            begin = time.perf_counter()
+            index.update()
+            print(f"Update with no changes: {(time.perf_counter() - begin) * 1000:.1f} ms")
+            times = []
+            for edit in range(12):
+                with open(guideline, "a", encoding="utf-8") as f:
+                    f.write(f"\n## Benchmark note {edit}\nPrefer ta.highest over manual loops for lookback maxima {edit}.\n")
+                begin = time.perf_counter()
+                index.update()
+                times.append(time.perf_counter() - begin)
+            sizes = [docs - deleted for _, docs, deleted, _ in index.describe()]
+            print(f"12 edits of one guideline: mean update {statistics.mean(times) * 1000:.1f} ms, "
+                  f"max {max(times) * 1000:.1f} ms; segments now {len(sizes)} (live documents {sizes})")
+            hit = index.search("benchmark note 11", limit=1)
+            print(f"Latest edit found: {bool(hit) and hit[0]['title'] == 'Benchmark note 11'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BM25 search over the reference, guidelines and templates")
+    parser.add_argument("query", nargs="*", help="Search terms")
+    parser.add_argument("--limit", type=int, default=10, help="Number of results (default: 10)")
+    parser.add_argument("--kind", choices=["reference", "guideline", "template"], help="Only this kind of document")
+    parser.add_argument("--version", help="Only reference entries of this version (e.g. v6)")
+    parser.add_argument("--index", default=INDEX_DIR, help="Index directory (default: .cache/search_index)")
+    parser.add_argument("--no-update", action="store_true", help="Search without checking sources for changes")
+    parser.add_argument("--rebuild", action="store_true", help="Discard the index and build it again")
+    parser.add_argument("--stats", action="store_true", help="Show segments and document counts")
+    parser.add_argument("--benchmark", action="store_true", help="Build, query and update timings on a copy of the sources")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+        return
+    if not (args.query or args.rebuild or args.stats):
+        parser.print_help()
+        return
+    if args.rebuild and os.path.isdir(args.index):
+        shutil.rmtree(args.index)
+    with SearchIndex(args.index) as index:
+        if not args.no_update or args.rebuild:
+            counts = index.update()
+            if counts["added"] or counts["changed"] or counts["removed"]:
+                print(f"Index updated: {counts['added']} added, {counts['changed']} changed, {counts['removed']} removed sources")
+        if args.stats:
+            stats = index.stats()
+            print(f"{stats['documents']} documents, average length {stats['average_length']:.1f} terms")
+            for name, docs, deleted, size in index.describe():
+                print(f"  {name}  {docs} documents, {deleted} deleted, {size / 1024:.0f} KB")
+        if args.query:
+            results = index.search(" ".join(args.query), args.limit, args.kind, args.version)
+            if not results:
+                print("No matches")
+            for hit in results:
+                print(f"{hit['score']:7.2f}  {hit['title']}  [{hit['kind']}{' ' + hit['version'] if hit['version'] else ''}]  {hit['location']}")
+                print(f"         {hit['snippet']}")
+
+
+if __name__ == "__main__":
+    main()
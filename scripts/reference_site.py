@@ -0,0 +1,573 @@
+#!/usr/bin/env python3
+"""
+Static, searchable HTML site for the Pine Script reference
+
+convert_to_pdf.py's combined reference is one markdown string for every
+version: it cannot be searched and it is rebuilt whole. This generator
+writes pine_script_references/site/ from each version's
+organized_content.json plus, when pine_reference_db.py has built it, the
+extracted signatures (signatures.sqlite): syntax, arguments, returns,
+remarks, examples and "See also" links.
+
+    site/index.html               versions and search
+    site/<v>/index.html           categories
+    site/<v>/<category>.html      every item of the category, anchored by its id
+    site/<v>/search/<shard>.json  prebuilt inverted index
+    site/search.js, site/style.css
+
+The search index is precomputed and sharded by namespace prefix: terms of
+dotted names ("ta.sma") go to their namespace's shard (ns_ta.json), plain
+words and name segments ("sma", "close") to a shard per first two letters
+(w_sm.json). A query loads only the shards of its own words, so a cold search
+reads a few kilobytes instead of the whole index. Terms in a shard are
+sorted, so prefixes are matched with a binary search.
+
+Rebuilds are incremental: each page and shard is written only when its
+content hash changed, pages of removed categories are deleted, and a
+version whose inputs and generator are unchanged is skipped after a stat.
+
+Usage:
+    python scripts/reference_site.py                        # build or update every version
+    python scripts/reference_site.py --version v6 --force
+    python scripts/reference_site.py --search "ta.s" --search "array push"
+    python scripts/reference_site.py --benchmark
+"""
+
+import argparse
+import bisect
+import hashlib
+import html
+import json
+import os
+import re
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from reference_emitters import SECTIONS, VERSIONS, safe_name
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REFERENCES_DIR = os.path.join(ROOT, "pine_script_references")
+SITE_DIR = os.path.join(REFERENCES_DIR, "site")
+MANIFEST = ".manifest.json"
+
+NAME_RE = re.compile(r"[a-z_][a-z0-9_]*(?:\.[a-z_][a-z0-9_]*)*")
+WORD_RE = re.compile(r"[a-z][a-z0-9_]{2,}")
+STOPWORDS = set("the and for with that this from are was were has have not but its into when which will "
+                "can all any one more than then also been only such other used use uses".split())
+SUMMARY_LENGTH = 120
+
+# Term weights: whole name, dotted/underscore segment of a name, word of the description
+NAME_SCORE, SEGMENT_SCORE, PART_SCORE, TEXT_SCORE = 10, 5, 2, 1
+
+STYLE = """body { font-family: sans-serif; margin: 0 auto; max-width: 60em; padding: 0 1em; }
+header { position: sticky; top: 0; background: #fff; padding: .5em 0; border-bottom: 1px solid #ddd; }
+header input { width: 20em; padding: .3em; }
+#results { position: absolute; background: #fff; border: 1px solid #ddd; margin: 0; padding: .3em 1.5em;
+           max-height: 70vh; overflow: auto; }
+#results:empty { display: none; }
+.kind { color: #777; font-size: .8em; }
+.item { border-top: 1px solid #eee; padding: .3em 0; }
+pre { background: #f6f6f6; padding: .5em; overflow: auto; }
+"""
+
+SEARCH_JS = r"""(function () {
+  "use strict";
+  var NAME = /[a-z_][a-z0-9_]*(?:\.[a-z_][a-z0-9_]*)*/g;
+  var EMPTY = {terms: [], postings: [], docs: {}};
+  var cache = {};
+
+  function shardName(token) {
+    var dot = token.indexOf(".");
+    return dot >= 0 ? "ns_" + token.slice(0, dot) : "w_" + token.slice(0, 2);
+  }
+
+  function loadShard(base, name) {
+    var url = base + "search/" + name + ".json";
+    if (!cache[url]) {
+      cache[url] = fetch(url)
+        .then(function (response) { return response.ok ? response.json() : EMPTY; })
+        .catch(function () { return EMPTY; });
+    }
+    return cache[url];
+  }
+
+  function lowerBound(terms, token) {
+    var lo = 0, hi = terms.length;
+    while (lo < hi) {
+      var mid = (lo + hi) >> 1;
+      if (terms[mid] < token) lo = mid + 1; else hi = mid;
+    }
+    return lo;
+  }
+
+  function search(base, query, limit) {
+    var tokens = query.toLowerCase().match(NAME) || [];
+    if (!tokens.length) return Promise.resolve([]);
+    return Promise.all(tokens.map(function (token) { return loadShard(base, shardName(token)); }))
+      .then(function (shards) {
+        var totals = null, docs = {};
+        tokens.forEach(function (token, i) {
+          var shard = shards[i], scores = {};
+          for (var j = lowerBound(shard.terms, token);
+               j < shard.terms.length && shard.terms[j].lastIndexOf(token, 0) === 0; j++) {
+            var boost = shard.terms[j] === token ? 2 : 1, postings = shard.postings[j];
+            for (var k = 0; k < postings.length; k += 2) {
+              var score = postings[k + 1] * boost;
+              if (!(scores[postings[k]] >= score)) scores[postings[k]] = score;
+            }
+          }
+          for (var id in shard.docs) docs[id] = shard.docs[id];
+          if (totals === null) {
+            totals = scores;
+          } else {
+            var next = {};
+            for (var doc in totals) if (doc in scores) next[doc] = totals[doc] + scores[doc];
+            totals = next;
+          }
+        });
+        return Object.keys(totals).map(function (id) {
+          var doc = docs[id];
+          return {name: doc[0], url: base + doc[1], kind: doc[2], summary: doc[3], score: totals[id]};
+        }).sort(function (a, b) {
+          return b.score - a.score || a.name.length - b.name.length || (a.name < b.name ? -1 : a.name > b.name);
+        }).slice(0, limit || 50);
+      });
+  }
+
+  function escape(text) {
+    return String(text).replace(/[&<>"]/g, function (c) {
+      return {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"}[c];
+    });
+  }
+
+  function attach(input) {
+    var results = document.getElementById("results");
+    var version = document.getElementById("version");
+    var latest = 0;
+    function run() {
+      var base = version ? version.value + "/" : input.getAttribute("data-base");
+      var ticket = ++latest;
+      search(base, input.value, 50).then(function (hits) {
+        if (ticket !== latest) return;
+        results.innerHTML = hits.map(function (hit) {
+          return '<li><a href="' + escape(hit.url) + '"><code>' + escape(hit.name) + "</code></a> " +
+                 '<span class="kind">' + escape(hit.kind) + "</span> " + escape(hit.summary) + "</li>";
+        }).join("");
+      });
+    }
+    input.addEventListener("input", run);
+    if (version) version.addEventListener("change", run);
+  }
+
+  var root = typeof window !== "undefined" ? window : globalThis;
+  root.pineSearch = search;
+  if (typeof document !== "undefined") {
+    document.addEventListener("DOMContentLoaded", function () {
+      var input = document.getElementById("search");
+      if (input) attach(input);
+    });
+  }
+})();
+"""
+
+
+def _generator_hash():
+    """Hash of this script (templates, CSS and search.js included), so editing it rebuilds everything"""
+    with open(os.path.abspath(__file__), "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _digest(data):
+    return hashlib.sha1(json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def load_records(version, references_dir=REFERENCES_DIR):
+    """Extracted entries by id from signatures.sqlite, or {} if it was not built"""
+    path = os.path.join(references_dir, version, "signatures.sqlite")
+    if not os.path.exists(path):
+        return {}
+    conn = sqlite3.connect(path)
+    try:
+        return {entry_id: json.loads(data) for entry_id, data in conn.execute("SELECT id, data FROM entries")}
+    except sqlite3.OperationalError:
+        return {}
+    finally:
+        conn.close()
+
+
+def summary(item, record):
+    """One-line description for search results"""
+    if record and record.get("description"):
+        text = record["description"]
+        return text if len(text) <= SUMMARY_LENGTH else text[:SUMMARY_LENGTH - 1].rsplit(" ", 1)[0] + "…"
+    if record and record.get("type"):
+        return " ".join(filter(None, (record.get("qualifier"), record["type"])))
+    return ""
+
+
+def name_terms(name):
+    """Index terms of an item name with their scores"""
+    terms = {}
+    for token in NAME_RE.findall(name.lower()):
+        terms[token] = NAME_SCORE
+        for segment in token.split("."):
+            terms.setdefault(segment, SEGMENT_SCORE)
+            for part in segment.split("_"):
+                if len(part) > 1:
+                    terms.setdefault(part, PART_SCORE)
+    return terms
+
+
+def shard_name(term):
+    """Shard holding a term: its namespace for dotted names, else its first two letters"""
+    namespace, dot, _ = term.partition(".")
+    return f"ns_{namespace}" if dot else f"w_{term[:2]}"
+
+
+def build_index(content, records):
+    """Shard name -> {terms, postings, docs} for one version"""
+    shards = {}
+    doc_id = 0
+    for category, items in content["categories"].items():
+        page = safe_name(category) + ".html"
+        for item in items:
+            record = records.get(item["href"])
+            terms = name_terms(item["name"])
+            if record:
+                for word in WORD_RE.findall(record.get("description", "").lower()):
+                    if word not in STOPWORDS:
+                        terms.setdefault(word, TEXT_SCORE)
+            doc = [item["name"], f"{page}#{item['href']}", record["kind"] if record else item["type"],
+                   summary(item, record)]
+            for term, score in terms.items():
+                shard = shards.setdefault(shard_name(term), {"terms": {}, "docs": {}})
+                shard["terms"].setdefault(term, []).extend((doc_id, score))
+                shard["docs"][str(doc_id)] = doc
+            doc_id += 1
+    return {name: {"terms": sorted(shard["terms"]),
+                   "postings": [shard["terms"][term] for term in sorted(shard["terms"])],
+                   "docs": shard["docs"]}
+            for name, shard in shards.items()}
+
+
+def _header(title, base, depth):
+    up = "../" * depth
+    return (f'<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<title>{html.escape(title)}</title>\n'
+            f'<link rel="stylesheet" href="{up}style.css">\n<script src="{up}search.js"></script>\n</head>\n<body>\n'
+            f'<header><a href="{up}index.html">Pine Script Reference</a> '
+            f'<input id="search" data-base="{base}" placeholder="Search: ta.sma, close, array push" autocomplete="off">'
+            f'\n<ol id="results"></ol></header>\n<h1>{html.escape(title)}</h1>\n')
+
+
+FOOTER = "</body>\n</html>\n"
+
+
+def render_item(item, record, links):
+    """HTML section for one item"""
+    e = html.escape
+    kind = record["kind"] if record else item["type"]
+    parts = [f'<section class="item" id="{e(item["href"])}">\n'
+             f'<h2><code>{e(item["name"])}</code> <span class="kind">{e(kind)}</span></h2>\n']
+    if record:
+        if record["syntax"]:
+            parts.append(f'<pre>{e(chr(10).join(record["syntax"]))}</pre>\n')
+        elif record.get("type"):
+            parts.append(f'<p>Type: <code>{e(" ".join(filter(None, (record["qualifier"], record["type"]))))}</code></p>\n')
+        if record["description"]:
+            parts.append(f'<p>{e(record["description"])}</p>\n')
+        if record["arguments"]:
+            parts.append("<h3>Arguments</h3>\n<dl>\n")
+            for arg in record["arguments"]:
+                parts.append(f'<dt><code>{e(arg["name"])}</code> <span class="kind">{e(arg["type"] or "")}</span></dt>'
+                             f'<dd>{e(arg["description"])}</dd>\n')
+            parts.append("</dl>\n")
+        for label, key in (("Returns", "returns"), ("Remarks", "remarks")):
+            if record[key]:
+                parts.append(f'<h3>{label}</h3>\n<p>{e(record[key])}</p>\n')
+        for example in record["examples"]:
+            parts.append(f'<h3>Example</h3>\n<pre>{e(example)}</pre>\n')
+        if record["see_also"]:
+            see_also = ", ".join(f'<a href="{e(links[name])}"><code>{e(name)}</code></a>' if name in links
+                                 else f"<code>{e(name)}</code>" for name in record["see_also"])
+            parts.append(f"<p>See also: {see_also}</p>\n")
+    parts.append("</section>\n")
+    return "".join(parts)
+
+
+def _write(path, render, digest, manifest, written):
+    """Render and write a file unless the manifest shows the same content is already there"""
+    relative = os.path.relpath(path, manifest["root"])
+    written.add(relative)
+    if manifest["files"].get(relative) == digest and os.path.exists(path):
+        return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(render())
+    manifest["files"][relative] = digest
+    return True
+
+
+def build_version(version, content, records, site_dir, manifest, generator):
+    """Write one version's pages and index shards; returns (written, unchanged, removed) counts"""
+    out = os.path.join(site_dir, version)
+    written, before = set(), {path for path in manifest["files"] if path.startswith(version + os.sep)}
+    counts = [0, 0, 0]
+
+    def emit(path, data, render):
+        counts[0 if _write(path, render, _digest([generator, data]), manifest, written) else 1] += 1
+
+    links = {}
+    for category, items in content["categories"].items():
+        for item in items:
+            links.setdefault(item["name"].rstrip("()"), f"{safe_name(category)}.html#{item['href']}")
+
+    index = []
+    for category, items in content["categories"].items():
+        safe = safe_name(category)
+        page_records = [records.get(item["href"]) for item in items]
+        see_also = sorted({name for record in page_records if record for name in record["see_also"]})
+        page_links = {name: links[name] for name in see_also if name in links}
+        emit(os.path.join(out, safe + ".html"), [version, category, items, page_records, page_links],
+             lambda: _header(f"{category} — Pine Script {version}", "", 1)
+             + "".join(render_item(item, record, page_links) for item, record in zip(items, page_records)) + FOOTER)
+        counted = [(heading.lower(), sum(item["type"] == item_type for item in items)) for item_type, heading in SECTIONS]
+        index.append((category, safe, ", ".join(f"{count} {label}" for label, count in counted if count)))
+
+    emit(os.path.join(out, "index.html"), [version, index],
+         lambda: _header(f"Pine Script {version} Reference", "", 1) + "<ul>\n"
+         + "".join(f'<li><a href="{safe}.html">{html.escape(category)}</a> <span class="kind">{sizes}</span></li>\n'
+                   for category, safe, sizes in index) + "</ul>\n" + FOOTER)
+
+    for name, shard in build_index(content, records).items():
+        text = json.dumps(shard, ensure_ascii=False, separators=(",", ":"))
+        emit(os.path.join(out, "search", name + ".json"), text, lambda text=text: text)
+
+    for relative in before - written:
+        path = os.path.join(site_dir, relative)
+        if os.path.exists(path):
+            os.remove(path)
+        del manifest["files"][relative]
+        counts[2] += 1
+    return tuple(counts)
+
+
+def _load_manifest(site_dir):
+    try:
+        with open(os.path.join(site_dir, MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        manifest = {"files": {}, "inputs": {}}
+    manifest["root"] = site_dir
+    return manifest
+
+
+def _save_manifest(manifest):
+    site_dir = manifest.pop("root")
+    with open(os.path.join(site_dir, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    manifest["root"] = site_dir
+
+
+def _stamp(paths, generator):
+    """(mtime, size) of the inputs, plus the generator hash"""
+    stamp = [generator]
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            stamp.append([path, stat.st_mtime_ns, stat.st_size])
+        except FileNotFoundError:
+            stamp.append([path, None])
+    return stamp
+
+
+def build(versions=VERSIONS, site_dir=SITE_DIR, force=False, quiet=False, references_dir=REFERENCES_DIR):
+    """Build or update the site; returns {version: (written, unchanged, removed)} for versions not skipped"""
+    os.makedirs(site_dir, exist_ok=True)
+    manifest = _load_manifest(site_dir)
+    if force:
+        manifest["files"], manifest["inputs"] = {}, {}
+    generator = _generator_hash()
+    results = {}
+    written = set()
+    for name, text in (("style.css", STYLE), ("search.js", SEARCH_JS)):
+        _write(os.path.join(site_dir, name), lambda text=text: text, _digest([generator, name]), manifest, written)
+
+    available = []
+    for version in versions:
+        organized = os.path.join(references_dir, version, "organized_content.json")
+        if not os.path.exists(organized):
+            print(f"File {organized} not found")
+            continue
+        available.append(version)
+        stamp = _stamp([organized, os.path.join(references_dir, version, "signatures.sqlite")], generator)
+        if manifest["inputs"].get(version) == stamp and os.path.exists(os.path.join(site_dir, version, "index.html")):
+            continue
+        with open(organized, encoding="utf-8") as f:
+            content = json.load(f)
+        results[version] = build_version(version, content, load_records(version, references_dir), site_dir, manifest, generator)
+        manifest["inputs"][version] = stamp
+        if not quiet:
+            print(f"{version}: {results[version][0]} written, {results[version][1]} unchanged, {results[version][2]} removed")
+
+    options = "".join(f'<option value="{version}"{" selected" if version == available[-1] else ""}>{version}</option>'
+                      for version in available) if available else ""
+    _write(os.path.join(site_dir, "index.html"),
+           lambda: _header("Pine Script Reference", "", 0).replace('<input id="search"', f'<select id="version">{options}</select> <input id="search"')
+           + "<ul>\n" + "".join(f'<li><a href="{version}/index.html">Pine Script {version}</a></li>\n' for version in available)
+           + "</ul>\n" + FOOTER, _digest([generator, available]), manifest, written)
+    _save_manifest(manifest)
+    return results
+
+
+class Searcher:
+    """Python mirror of search.js, reading shards from a version directory"""
+
+    def __init__(self, version_dir):
+        self.version_dir = version_dir
+        self.shards = {}
+        self.bytes_read = 0
+
+    def shard(self, name):
+        if name not in self.shards:
+            path = os.path.join(self.version_dir, "search", name + ".json")
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                data = b'{"terms":[],"postings":[],"docs":{}}'
+            self.bytes_read += len(data)
+            self.shards[name] = json.loads(data)
+        return self.shards[name]
+
+    def search(self, query, limit=50):
+        totals, docs = None, {}
+        for token in NAME_RE.findall(query.lower()):
+            shard = self.shard(shard_name(token))
+            scores = {}
+            terms = shard["terms"]
+            j = bisect.bisect_left(terms, token)
+            while j < len(terms) and terms[j].startswith(token):
+                boost = 2 if terms[j] == token else 1
+                postings = shard["postings"][j]
+                for k in range(0, len(postings), 2):
+                    doc, score = str(postings[k]), postings[k + 1] * boost
+                    if scores.get(doc, 0) < score:
+                        scores[doc] = score
+                j += 1
+            docs.update(shard["docs"])
+            totals = scores if totals is None else {doc: totals[doc] + scores[doc] for doc in totals if doc in scores}
+        hits = [{"name": docs[doc][0], "url": docs[doc][1], "kind": docs[doc][2], "summary": docs[doc][3], "score": score}
+                for doc, score in (totals or {}).items()]
+        hits.sort(key=lambda hit: (-hit["score"], len(hit["name"]), hit["name"]))
+        return hits[:limit]
+
+
+def _queries(content, count=300):
+    """Benchmark queries: whole names, prefixes of their last segment and two-word queries"""
+    names = [item["name"].rstrip("()") for item in content["all_items"]]
+    step = max(1, len(names) // (count // 3))
+    queries = []
+    for name in names[::step]:
+        last = name.rsplit(".", 1)[-1]
+        queries += [name, last[:3], f"{name.split('.')[0]} {last[:2]}"]
+    return queries[:count]
+
+
+def benchmark(versions=VERSIONS):
+    """Full build, no-op and one-category rebuilds, and cold searches on every version"""
+    import pine_reference_db
+
+    with tempfile.TemporaryDirectory() as tmp:
+        references = os.path.join(tmp, "references")
+        site_dir = os.path.join(tmp, "site")
+        for version in versions:
+            source = os.path.join(REFERENCES_DIR, version)
+            os.makedirs(os.path.join(references, version))
+            shutil.copy(os.path.join(source, "organized_content.json"), os.path.join(references, version))
+            if os.path.exists(os.path.join(source, "signatures.sqlite")):
+                shutil.copy(os.path.join(source, "signatures.sqlite"), os.path.join(references, version))
+            else:
+                page = os.path.join(tmp, f"{version}.html")
+                with open(page, "wb") as f:
+                    f.write(pine_reference_db.synthetic_page(version))
+                db = pine_reference_db.SignatureDB(os.path.join(references, version, "signatures.sqlite"))
+                pine_reference_db.build(db, page)
+                db.close()
+        print("Signatures from synthetic pages where no signatures.sqlite was built")
+        start = time.perf_counter()
+        results = build(versions, site_dir, quiet=True, references_dir=references)
+        elapsed = time.perf_counter() - start
+        files = sum(sum(counts[:2]) for counts in results.values())
+        print(f"Full build: {files} files in {elapsed * 1000:.0f} ms")
+
+        start = time.perf_counter()
+        build(versions, site_dir, quiet=True, references_dir=references)
+        print(f"Rebuild with no changes: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        version = versions[-1]
+        path = os.path.join(references, version, "organized_content.json")
+        with open(path, encoding="utf-8") as f:
+            content = json.load(f)
+        category = next(iter(content["categories"]))
+        content["categories"][category][0]["name"] += "_renamed"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(content, f)
+        start = time.perf_counter()
+        written, unchanged, _ = build([version], site_dir, quiet=True, references_dir=references)[version]
+        print(f"Rebuild after renaming one {version} item: {written} written, {unchanged} unchanged "
+              f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        print(f"{'version':<8} {'queries':>7} {'mean':>8} {'p95':>8} {'max':>8} {'read/query':>11} {'index':>9}")
+        for version in versions:
+            version_dir = os.path.join(site_dir, version)
+            with open(os.path.join(REFERENCES_DIR, version, "organized_content.json"), encoding="utf-8") as f:
+                queries = _queries(json.load(f))
+            times, read = [], 0
+            for query in queries:
+                searcher = Searcher(version_dir)
+                start = time.perf_counter()
+                searcher.search(query)
+                times.append(time.perf_counter() - start)
+                read += searcher.bytes_read
+            index_size = sum(os.path.getsize(os.path.join(version_dir, "search", name))
+                             for name in os.listdir(os.path.join(version_dir, "search")))
+            times.sort()
+            print(f"{version:<8} {len(queries):>7} {statistics.mean(times) * 1000:>6.2f}ms "
+                  f"{times[int(len(times) * .95)] * 1000:>6.2f}ms {times[-1] * 1000:>6.2f}ms "
+                  f"{read / len(queries) / 1024:>9.1f}KB {index_size / 1024:>7.0f}KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Static searchable site for the Pine Script reference")
+    parser.add_argument("--version", nargs="+", default=VERSIONS, help="Versions to build (default: all)")
+    parser.add_argument("--site", default=SITE_DIR, help="Output directory (default: pine_script_references/site)")
+    parser.add_argument("--force", action="store_true", help="Regenerate every page")
+    parser.add_argument("--search", action="append", metavar="QUERY", help="Query the built index (repeatable)")
+    parser.add_argument("--benchmark", action="store_true", help="Time builds, rebuilds and cold searches")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.version)
+        return
+    if args.search:
+        version_dir = os.path.join(args.site, args.version[-1])
+        if not os.path.isdir(os.path.join(version_dir, "search")):
+            print(f"Error: no index in {version_dir}; build the site first")
+            sys.exit(1)
+        for query in args.search:
+            print(f"{query}:")
+            for hit in Searcher(version_dir).search(query, 10):
+                print(f"  {hit['name']:<40} {hit['kind']:<10} {hit['url']}")
+        return
+
+    start = time.perf_counter()
+    build(args.version, args.site, args.force)
+    print(f"Site at {args.site} ({(time.perf_counter() - start) * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""
+Repaint and lookahead detector
+
+Checks whether a script shows the same thing live as it does on history,
+statically and by replay. Built for screeners such as
+templates/kurutoga_screener_template.pine and its timing fix, but plain
+indicators and strategies work too.
+
+Static checks (no data needed), per `request.security` call and per script:
+
+- `lookahead=barmerge.lookahead_on` on a higher timeframe without a `[1]`
+  offset: historical bars read the final values of a bar that had not closed
+  yet (future leak)
+- a higher timeframe with lookahead_off and no offset: real-time bars see the
+  developing higher-timeframe bar, historical bars only closed ones (repaint)
+- `barstate.isrealtime`/`islast`/`isnew`, `timenow` and `varip`, which
+  behave differently on historical and real-time bars
+
+Replay, per symbol: the script (for screeners, the signal expression their
+`request.security` calls evaluate, split off as screener_sim.py does) runs
+once as history (pine_runtime.Runtime over all bars) and once as real time
+(pine_stream.Stream: history up to the last `--realtime` bars, then every
+remaining bar replayed as ticks along an open-high/low-close path with
+rollback, then confirmed). Higher-timeframe signals are resampled with
+ohlcv_resample.py; on history they are aligned with the call's lookahead, in
+real time each chart bar sees the developing higher-timeframe bar as of its
+close. Two things are counted:
+
+    history    confirmed real-time value differs from the historical one
+               (future leak with lookahead_on, repaint otherwise)
+    intrabar   a tick showed a signal/alert the confirmed bar does not have
+               (an alert would have fired and then disappeared)
+
+Signals are compared by kind: strings without their numbers ("BUY 1.2%" and
+"BUY 0.8%" are the same signal), numbers by sign; the most common historical
+value counts as "no signal". Symbols are checked in
+parallel over a process pool, from the same data directories as
+screener_sim.py.
+
+Usage:
+    python scripts/repaint_check.py templates/kurutoga_screener_template.pine templates/kurutoga_screener_timing_fix.pine
+    python scripts/repaint_check.py templates/kurutoga_screener_timing_fix.pine --data prices/us --market us
+    python scripts/repaint_check.py atr_retracement_ema_signals.pine --data prices/us --realtime 500
+    python scripts/repaint_check.py templates/kurutoga_screener_template.pine --benchmark 480
+"""
+
+import argparse
+import math
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import generate_screeners
+import ohlcv
+import ohlcv_resample
+import pine_parser as ast
+import ticker_universe
+from pine_runtime import Runtime, truth
+from pine_stream import Stream
+from pine_vector_engine import PineEvalError
+from screener_sim import SIGNAL, _series, find_files, load_mapped, signal_script
+
+REALTIME_BARS = 200
+CHUNK_SIZE = 8
+REALTIME_NAMES = ("barstate.isrealtime", "barstate.ishistory", "timenow")
+DRAWING_NAMES = ("barstate.islast", "barstate.isnew")      # usually only gate drawing
+NUMBER_RE = re.compile(r"[-+]?\d[\d.,]*%?")
+
+
+# ---------------------------------------------------------------------------
+# Static checks
+# ---------------------------------------------------------------------------
+
+def _argument(call, index, name):
+    kwargs = dict(call.kwargs)
+    if name in kwargs:
+        return kwargs[name]
+    return call.args[index] if len(call.args) > index else None
+
+
+def _offset(node, assignments):
+    """True if `node` reads history (`x[1]`, or a name assigned from one)"""
+    if isinstance(node, ast.Name) and node.id in assignments:
+        node = assignments[node.id]
+    return isinstance(node, ast.Index) and not (isinstance(node.offset, ast.Num) and node.offset.value == 0)
+
+
+def security_calls(script):
+    """(call, timeframe literal or None for the chart's, lookahead_on, reads history) per request.security call"""
+    assignments = {stmt.target: stmt.value for stmt in script.body if isinstance(stmt, ast.Assign)}
+    calls = []
+    for node in ast.walk(script):
+        if not (isinstance(node, ast.Call) and node.func == "request.security"):
+            continue
+        timeframe = _argument(node, 1, "timeframe")
+        lookahead = _argument(node, 4, "lookahead")
+        literal = timeframe.value if isinstance(timeframe, ast.Str) and timeframe.value else None
+        if timeframe is not None and not isinstance(timeframe, (ast.Str, ast.Name)):
+            literal = "?"
+        if isinstance(timeframe, ast.Name) and timeframe.id != "timeframe.period":
+            literal = assignments[timeframe.id].value if isinstance(assignments.get(timeframe.id), ast.Str) else "?"
+        lookahead_on = isinstance(lookahead, ast.Name) and lookahead.id == "barmerge.lookahead_on"
+        calls.append((node, literal, lookahead_on, _offset(_argument(node, 2, "expression"), assignments)))
+    return calls
+
+
+def scan(script):
+    """[(line, kind, message)] for constructs that behave differently on historical and real-time bars"""
+    findings = []
+    for call, timeframe, lookahead_on, offset in security_calls(script):
+        if timeframe is None:
+            if lookahead_on and not offset:
+                findings.append((call.line, "note", "lookahead_on on the chart's own timeframe has no effect"))
+            continue
+        where = f"request.security(..., {timeframe!r}, ...)"
+        if lookahead_on and not offset:
+            findings.append((call.line, "future leak", f"{where} with lookahead_on reads the higher-timeframe "
+                             "bar's final values on history; use expression[1]"))
+        elif not lookahead_on and not offset:
+            findings.append((call.line, "repaint", f"{where} sees the developing bar in real time but only "
+                             "closed bars on history; use expression[1] with lookahead_on"))
+    seen = set()
+    for node in ast.walk(script):
+        name = node.id if isinstance(node, ast.Name) else None
+        if name in REALTIME_NAMES + DRAWING_NAMES and name not in seen:
+            seen.add(name)
+            kind = "realtime" if name in REALTIME_NAMES else "note"
+            findings.append((node.line, kind, f"{name} differs between historical and real-time bars"))
+        if isinstance(node, ast.Assign) and node.mode == "varip":
+            findings.append((node.line, "realtime", f"varip {node.target} keeps intrabar updates in real time only"))
+        if isinstance(node, ast.Call) and node.func == "strategy":
+            for key, value in node.kwargs:
+                if key == "calc_on_every_tick" and isinstance(value, ast.Bool) and value.value:
+                    findings.append((node.line, "realtime", "calc_on_every_tick=true: orders fill intrabar in real time"))
+    return sorted(findings, key=lambda finding: finding[0])
+
+
+# ---------------------------------------------------------------------------
+# Replay
+# ---------------------------------------------------------------------------
+
+def subject(script):
+    """(script to replay, signal timeframe or None, lookahead_on) - the signal script for screeners"""
+    calls = security_calls(script)
+    if not calls:
+        return script, None, False
+    _, timeframe, lookahead_on, _ = calls[0]
+    if timeframe == "?":
+        raise PineEvalError("request.security timeframe is not a literal; cannot replay it")
+    return signal_script(script), timeframe, lookahead_on
+
+
+def signal_kind(value):
+    """What a signal shows, ignoring its numbers ("BUY 1.2%" -> "BUY #"; numbers by sign)"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return NUMBER_RE.sub("#", value)
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return (value > 0) - (value < 0)
+
+
+def _same(a, b):
+    a = None if isinstance(a, float) and math.isnan(a) else a
+    b = None if isinstance(b, float) and math.isnan(b) else b
+    if isinstance(a, float) and isinstance(b, float):
+        return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-12)
+    return a == b
+
+
+def tick_path(open, high, low, close):
+    """Prices a bar is assumed to trade through: open, the nearer extreme, the other one, close"""
+    if high - open <= open - low:
+        return (open, high, low, close)
+    return (open, low, high, close)
+
+
+def _events(update):
+    """Discrete outputs of one plain-script execution"""
+    events = {f"alert {title}" for title in update["alerts"]}
+    events.update(f"shape {title}" for title, value in update["shapes"].items() if truth(value))
+    events.update(f"strategy.{order['action']} line {order['line']}" for order in update["orders"])
+    return events
+
+
+def _history_events(result, start):
+    events = {}
+    for title, mask in result["alerts"].items():
+        for bar in np.flatnonzero(mask[start:]).tolist():
+            events.setdefault(bar + start, set()).add(f"alert {title}")
+    for title, column in result["shapes"].items():
+        for bar in np.flatnonzero(np.asarray(column[start:], dtype=bool)).tolist():
+            events.setdefault(bar + start, set()).add(f"shape {title}")
+    for order in result["orders"]:
+        for bar in np.flatnonzero(order["when"][start:]).tolist():
+            events.setdefault(bar + start, set()).add(f"strategy.{order['action']} line {order['line']}")
+    return events
+
+
+class Report:
+    """Replay outcome for one symbol"""
+
+    def __init__(self, symbol, bars, realtime):
+        self.symbol = symbol
+        self.bars = bars
+        self.realtime = realtime
+        self.history = []       # (bar, historical, real-time confirmed)
+        self.intrabar = []      # (bar, shown on a tick, confirmed)
+
+    @property
+    def clean(self):
+        return not self.history and not self.intrabar
+
+    def describe(self, limit=3):
+        lines = [f"{self.symbol}: {len(self.history)} history mismatches, {len(self.intrabar)} intrabar "
+                 f"repaints in the last {self.realtime} of {self.bars:,} bars"]
+        for bar, historical, live in self.history[:limit]:
+            lines.append(f"    bar {bar}: history {historical!r}, real time {live!r}")
+        for bar, shown, confirmed in self.intrabar[:limit]:
+            lines.append(f"    bar {bar}: a tick showed {shown!r}, the close {confirmed!r}")
+        return "\n".join(lines)
+
+
+def replay_plain(script, data, inputs=None, realtime=REALTIME_BARS, symbol=""):
+    """Replay a script without request.security; compares alerts, shapes and orders"""
+    count = ohlcv.bar_count(data)
+    start = max(count - realtime, 0)
+    report = Report(symbol, count, count - start)
+    history = _history_events(Runtime(script, inputs, record=False).run(data, symbol=symbol), start)
+    stream = Stream(script, inputs, symbol=symbol)
+    stream.warmup({name: data[name][:start] for name in ohlcv.COLUMNS})
+    columns = [np.asarray(data[name][start:]).tolist() for name in ohlcv.COLUMNS]
+    for offset, (t, o, h, l, c, v) in enumerate(zip(*columns)):
+        bar = start + offset
+        shown = set()
+        high = low = o
+        path = tick_path(o, h, l, c)
+        for step, price in enumerate(path[:-1]):
+            high, low = max(high, price), min(low, price)
+            shown |= _events(stream.tick(t, o, high, low, price, v * (step + 1) / len(path)))
+        confirmed = _events(stream.step(t, o, h, l, c, v))
+        if confirmed != history.get(bar, set()):
+            report.history.append((bar, sorted(history.get(bar, set())), sorted(confirmed)))
+        if shown - confirmed:
+            report.intrabar.append((bar, sorted(shown - confirmed), sorted(confirmed)))
+    return report
+
+
+def replay_signal(script, data, timeframe=None, lookahead_on=False, inputs=None, realtime=REALTIME_BARS, symbol=""):
+    """Replay a signal script (SIGNAL global) on the symbol's data, optionally on a higher timeframe"""
+    count = ohlcv.bar_count(data)
+    start = max(count - realtime, 0)
+    report = Report(symbol, count, count - start)
+    chart_times = np.asarray(data["time"], dtype=np.int64)
+    period = ohlcv_resample.bar_period_ms(chart_times)
+    higher = timeframe is not None and ohlcv_resample.timeframe_ms(timeframe) > period
+    source = ohlcv_resample.resample(data, timeframe, source_period_ms=period) if higher else data
+
+    values = Runtime(script, inputs, record=[SIGNAL]).run(source, symbol=symbol)["series"][SIGNAL]
+    values = _series(values if isinstance(values, np.ndarray) else [values] * ohlcv.bar_count(source))
+    if higher:
+        positions = ohlcv_resample.align(source, chart_times, period, lookahead=lookahead_on).tolist()
+        historical = [values[position] if position >= 0 else None for position in positions]
+        buckets = ohlcv_resample.bucket_ids(chart_times, timeframe)
+        first = int(np.searchsorted(source["time"], chart_times[start], side="right")) - 1
+    else:
+        historical = values
+        first = start
+
+    stream = Stream(script, inputs, symbol=symbol)
+    stream.warmup({name: source[name][:first] for name in ohlcv.COLUMNS})
+    columns = [np.asarray(data[name]).tolist() for name in ohlcv.COLUMNS]
+    if higher:
+        bar = int(np.searchsorted(chart_times, source["time"][first])) if first < ohlcv.bar_count(source) else count
+        partial = None
+        while bar < count:
+            t, o, h, l, c, v = (column[bar] for column in columns)
+            if partial is None:
+                partial = [t, o, h, l, c, v]
+            else:
+                partial = [partial[0], partial[1], max(partial[2], h), min(partial[3], l), c, partial[5] + v]
+            closes = bar + 1 == count or buckets[bar + 1] != buckets[bar]
+            if closes and bar + 1 < count:
+                stream.step(*partial)
+                partial = None
+            else:
+                stream.tick(*partial)
+            if bar >= start:
+                live = _series([stream[SIGNAL]])[0]
+                if not _same(live, historical[bar]):
+                    report.history.append((bar, historical[bar], live))
+            bar += 1
+        return report
+
+    # The most common signal is the "nothing to show" value ('---' in the screener templates)
+    neutral = Counter(signal_kind(value) for value in historical).most_common(1)[0][0] if historical else None
+    for bar in range(start, count):
+        t, o, h, l, c, v = (column[bar] for column in columns)
+        shown = []
+        high = low = o
+        path = tick_path(o, h, l, c)
+        for step, price in enumerate(path[:-1]):
+            high, low = max(high, price), min(low, price)
+            stream.tick(t, o, high, low, price, v * (step + 1) / len(path))
+            shown.append(_series([stream[SIGNAL]])[0])
+        stream.step(t, o, h, l, c, v)
+        live = _series([stream[SIGNAL]])[0]
+        if not _same(live, historical[bar]):
+            report.history.append((bar, historical[bar], live))
+        final = signal_kind(live)
+        flicker = [value for value in shown if signal_kind(value) not in (final, neutral) and truth(signal_kind(value))]
+        if flicker:
+            report.intrabar.append((bar, flicker[0], live))
+    return report
+
+
+def replay(script, data, inputs=None, realtime=REALTIME_BARS, symbol="", timeframe=None):
+    """Replay `script` (a screener or any script) on one symbol; returns a Report"""
+    replayed, call_timeframe, lookahead_on = subject(script)
+    if replayed is script:
+        return replay_plain(script, data, inputs, realtime, symbol)
+    return replay_signal(replayed, data, timeframe or call_timeframe, lookahead_on, inputs, realtime, symbol)
+
+
+_worker = {}
+
+
+def _init_worker(script, inputs, realtime, timeframe):
+    _worker.update(script=script, inputs=inputs, realtime=realtime, timeframe=timeframe)
+
+
+def _check_chunk(items):
+    results = []
+    for symbol, path in items:
+        try:
+            report = replay(_worker["script"], load_mapped(path), _worker["inputs"], _worker["realtime"],
+                            symbol, _worker["timeframe"])
+            results.append((symbol, report, None))
+        except (PineEvalError, OSError, ValueError, KeyError) as e:
+            results.append((symbol, None, str(e)))
+    return results
+
+
+def check(script, files, inputs=None, realtime=REALTIME_BARS, jobs=None, timeframe=None):
+    """{symbol: Report} and {symbol: error} for every data file, in parallel"""
+    items = sorted(files.items())
+    chunks = [items[i:i + CHUNK_SIZE] for i in range(0, len(items), CHUNK_SIZE)]
+    reports, errors = {}, {}
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(script, inputs or {}, realtime, timeframe)) as pool:
+        for chunk in pool.map(_check_chunk, chunks):
+            for symbol, report, error in chunk:
+                if error:
+                    errors[symbol] = error
+                else:
+                    reports[symbol] = report
+    return reports, errors
+
+
+def load_script(path, name="Repaint Check"):
+    """Parse a script, filling template placeholders the way generate_screeners.py does"""
+    source = open(path, encoding="utf-8").read()
+    if "{{" in source:
+        plan = generate_screeners.RenderPlan(path)
+        source = plan.render({"SCRIPT_NAME": name, "SCREEN_NUMBER": 1},
+                             *generate_screeners.screen_slots([], plan.symbol_slots))
+    return ast.parse(source)
+
+
+def summarize(reports, errors, verbose=False):
+    dirty = [report for _, report in sorted(reports.items()) if not report.clean]
+    history = sum(len(report.history) for report in reports.values())
+    intrabar = sum(len(report.intrabar) for report in reports.values())
+    print(f"  {len(reports)} symbols replayed: {len(dirty)} repaint ({history} history mismatches, "
+          f"{intrabar} intrabar repaints)" + (f", {len(errors)} errors" if errors else ""))
+    for report in dirty if verbose else dirty[:5]:
+        print("  " + report.describe().replace("\n", "\n  "))
+    for symbol, error in sorted(errors.items())[:5]:
+        print(f"  error: {symbol}: {error}")
+
+
+def benchmark(script, symbols, bars, realtime, jobs=None):
+    """Time a universe check on synthetic symbols"""
+    workdir = tempfile.mkdtemp(prefix="repaint_check_")
+    try:
+        for index in range(symbols):
+            ohlcv.write_csv(ohlcv.synthetic(bars, seed=index), os.path.join(workdir, f"SYM{index:04d}.csv"))
+        files = find_files(workdir)
+        for symbol, path in files.items():
+            load_mapped(path)
+        start = time.perf_counter()
+        reports, errors = check(script, files, realtime=realtime, jobs=jobs)
+        elapsed = time.perf_counter() - start
+        print(f"  {len(reports)} symbols x {bars:,} bars ({realtime} replayed as real time) in {elapsed:.2f} s "
+              f"({len(reports) / elapsed:,.1f} symbols/s)")
+        summarize(reports, errors)
+    finally:
+        shutil.rmtree(workdir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flag repainting signals and future-leaking request.security calls")
+    parser.add_argument("scripts", nargs="*", help="Pine scripts or templates (default: both Kurutoga templates)")
+    parser.add_argument("--data", help="Directory of per-symbol OHLCV files to replay (default: static checks only)")
+    parser.add_argument("--timeframe", help="Read --data as an ohlcv_store directory at this timeframe")
+    parser.add_argument("--market", choices=sorted(ticker_universe.MARKET_PREFIXES),
+                        help="Only symbols of this market's ticker lists (default: every file in --data)")
+    parser.add_argument("--expr", default="all_tickers", help="Ticker set expression with --market (default: all_tickers)")
+    parser.add_argument("--signal-timeframe", metavar="TF", help="Replay signals on this timeframe instead of the call's")
+    parser.add_argument("--realtime", type=int, default=REALTIME_BARS,
+                        help=f"Last bars replayed as real time, tick by tick (default: {REALTIME_BARS})")
+    parser.add_argument("--jobs", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--verbose", action="store_true", help="Describe every repainting symbol")
+    parser.add_argument("--benchmark", type=int, nargs="?", const=480, metavar="SYMBOLS",
+                        help="Replay synthetic symbols (default: 480)")
+    parser.add_argument("--bars", type=int, default=2000, help="Bars per synthetic symbol for --benchmark")
+    args = parser.parse_args()
+
+    templates = os.path.join(generate_screeners.ROOT, "templates")
+    paths = args.scripts or [os.path.join(templates, "kurutoga_screener_template.pine"),
+                             os.path.join(templates, "kurutoga_screener_timing_fix.pine")]
+    files = None
+    if args.data:
+        wanted = None
+        if args.market:
+            universe = ticker_universe.load_market(os.path.join(ticker_universe.TICKERS_DIR, args.market), args.market)
+            try:
+                wanted = [ticker_universe.qualify(symbol, args.market)
+                          for symbol in universe.evaluate(args.expr).sorted()]
+            except (KeyError, ValueError) as e:
+                print(f"Error: {e.args[0]}")
+                sys.exit(1)
+        files = find_files(args.data, wanted, args.timeframe)
+        if not files:
+            print(f"No OHLCV files for the requested symbols in {args.data}")
+            sys.exit(1)
+
+    failed = False
+    for path in paths:
+        try:
+            script = load_script(path)
+        except (OSError, ast.PineSyntaxError) as e:
+            print(f"{path}: {e}")
+            sys.exit(1)
+        findings = scan(script)
+        print(f"{os.path.relpath(path, generate_screeners.ROOT)}: "
+              f"{len([f for f in findings if f[1] != 'note']) or 'no'} static findings")
+        for line, kind, message in findings:
+            print(f"  line {line}: {kind}: {message}")
+        failed = failed or any(kind in ("future leak", "repaint") for _, kind, _ in findings)
+        if args.benchmark:
+            benchmark(script, args.benchmark, args.bars, args.realtime, args.jobs)
+        elif files:
+            reports, errors = check(script, files, realtime=args.realtime, jobs=args.jobs,
+                                    timeframe=args.signal_timeframe)
+            summarize(reports, errors, args.verbose)
+            failed = failed or any(not report.clean for report in reports.values())
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Polite request scheduler shared by the scrapers
+
+Every fetcher (scrape_pine_reference.py, scrape_all_versions.py,
+scrape_pine_reference_selenium.py, pineref2pdf.py) sends its requests through
+one process-wide Scheduler instead of pacing itself with fixed sleeps:
+
+- per-host token buckets: requests to a host start at `rate` per second and
+  speed up geometrically after successes (up to `max_rate`) until the host
+  throttles. Only a 429, or a 503 with Retry-After, to a request sent since
+  the last back-off slows the host, to `decrease` times the throttled rate;
+  successes then close `recovery` of the gap back to that rate and probe
+  gently above it
+- bounded concurrency, overall and per host
+- retries with exponential backoff and full jitter on 429, 5xx and connection
+  errors; a Retry-After header holds back every request to that host
+- circuit breaking: after `failure_threshold` consecutive failures (429s do
+  not count) a host is refused for `cooldown` seconds, then a single trial
+  request decides whether it reopens
+
+`Scheduler.call(url, func, ...)` runs any fetch (a requests call, a Selenium
+`driver.get`, a pdfkit conversion) under those rules; `Scheduler.get(url)`
+performs an HTTP GET with requests when installed, urllib otherwise.
+
+`--check` verifies the behavior against a local server that enforces its own
+rate limit with 429 + Retry-After (and must reach 70% of that rate), injects
+random 503s and can go down entirely.
+
+Usage:
+    python scripts/request_scheduler.py --check
+    python scripts/request_scheduler.py --check --requests 60 --server-rate 20
+"""
+
+import argparse
+import email.utils
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MIN_UTILIZATION = 0.7       # share of a rate-limited host's allowed rate --check must reach
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised without contacting a host whose circuit is open"""
+
+
+class Response:
+    """Minimal requests-like response returned by the urllib fallback"""
+
+    def __init__(self, url, status_code, headers, content):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", "replace")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise urllib.error.HTTPError(self.url, self.status_code, f"HTTP {self.status_code}", self.headers, None)
+
+
+def urllib_get(url, headers=None, timeout=30):
+    """GET with urllib, returning a Response for every HTTP status"""
+    request = urllib.request.Request(url, headers=headers or DEFAULT_HEADERS)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as reply:
+            return Response(url, reply.status, reply.headers, reply.read())
+    except urllib.error.HTTPError as e:
+        return Response(url, e.code, e.headers, e.read())
+
+
+def http_get(url, **kwargs):
+    """GET with requests if installed, urllib otherwise"""
+    try:
+        import requests
+    except ImportError:
+        return urllib_get(url, kwargs.get("headers"), kwargs.get("timeout", 30))
+    kwargs.setdefault("timeout", 30)
+    return requests.get(url, **kwargs)
+
+
+def _status(result):
+    status = getattr(result, "status_code", None)
+    return status if status is not None else getattr(result, "status", None)
+
+
+def retry_after(result, now=None):
+    """Seconds requested by a Retry-After header (delta or HTTP date), or None"""
+    headers = getattr(result, "headers", None)
+    value = headers.get("Retry-After") if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when - (now or time.time()))
+
+
+class TokenBucket:
+    """Reservation-based token bucket with an adjustable rate"""
+
+    def __init__(self, rate, burst=1, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = burst
+        self.updated = clock()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token; returns how long the caller has to wait before using it"""
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.blocked_until - now)
+
+    def block(self, seconds):
+        """Hold back every reservation for `seconds`"""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, self.clock() + seconds)
+
+
+class Host:
+    """Pacing, concurrency and circuit state for one host"""
+
+    def __init__(self, scheduler):
+        self.bucket = TokenBucket(scheduler.rate, scheduler.burst, scheduler.clock)
+        self.slots = threading.BoundedSemaphore(scheduler.per_host)
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.slowed_at = float("-inf")
+        self.ceiling = None     # rate at which the host last throttled us
+
+
+class Scheduler:
+    """Per-host rate limiting, retries with backoff and circuit breaking for fetch callables"""
+
+    def __init__(self, rate=2.0, max_rate=10.0, min_rate=0.1, burst=2, increase=0.25, decrease=0.8, recovery=0.25,
+                 concurrency=4, per_host=2, retries=5, base_delay=0.5, max_delay=60.0, failure_threshold=5,
+                 cooldown=30.0, clock=time.monotonic, sleep=time.sleep, rng=random.random):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.recovery = recovery
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.hosts = {}
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0, "errors": 0, "rejected": 0}
+
+    def host(self, url):
+        name = urlsplit(url).netloc or url
+        with self.lock:
+            if name not in self.hosts:
+                self.hosts[name] = Host(self)
+            return self.hosts[name]
+
+    def _count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def _admit(self, host, url):
+        """Raise CircuitOpenError unless the host's circuit allows a request"""
+        with host.lock:
+            if host.opened_at is None:
+                return
+            if self.clock() - host.opened_at >= self.cooldown and not host.trial:
+                host.trial = True       # half-open: let one request through
+                return
+        self._count("rejected")
+        raise CircuitOpenError(f"circuit open for {urlsplit(url).netloc or url} after {host.failures} failures")
+
+    def _succeeded(self, host):
+        with host.lock:
+            host.failures = 0
+            host.opened_at = None
+            host.trial = False
+        with host.bucket.lock:
+            bucket = host.bucket
+            if host.ceiling is not None and bucket.rate < host.ceiling:
+                # Close a share of the gap to the last throttled rate, so a back-off is brief
+                gap = host.ceiling - bucket.rate
+                bucket.rate = min(host.ceiling, bucket.rate + max(self.increase, gap * self.recovery))
+            elif host.ceiling is None:
+                # Slow start: grow geometrically until the host first throttles
+                bucket.rate = min(self.max_rate, bucket.rate + max(self.increase, bucket.rate * self.recovery))
+            else:
+                # Probe gently above the last throttled rate
+                bucket.rate = min(self.max_rate, bucket.rate + self.increase / 10)
+
+    def _failed(self, host):
+        with host.lock:
+            host.failures += 1
+            if host.trial or host.failures >= self.failure_threshold:
+                host.opened_at = self.clock()
+            host.trial = False
+
+    def _throttled(self, host, sent):
+        """Back off from the rate that was throttled, once per congestion event
+
+        Only responses to requests sent after the last back-off count: the rest were
+        already in flight at the old rate and say nothing about the new one.
+        """
+        with host.bucket.lock:
+            if sent >= host.slowed_at:
+                host.ceiling = host.bucket.rate
+                host.bucket.rate = max(self.min_rate, host.bucket.rate * self.decrease)
+                host.slowed_at = self.clock()
+        with host.lock:
+            host.trial = False
+
+    def backoff(self, attempt):
+        """Full-jitter exponential delay before retry `attempt` (1-based)"""
+        return self.rng() * min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+
+    def call(self, url, func, *args, **kwargs):
+        """Run `func(*args, **kwargs)` for `url` under pacing, retries and circuit breaking"""
+        host = self.host(url)
+        attempt = 0
+        while True:
+            self._admit(host, url)
+            wait = host.bucket.reserve()
+            if wait > 0:
+                self.sleep(wait)
+            error = result = None
+            with self.slots, host.slots:
+                self._count("requests")
+                sent = self.clock()
+                try:
+                    result = func(*args, **kwargs)
+                except CircuitOpenError:
+                    raise
+                except Exception as e:
+                    error = e
+            status = _status(result) if error is None else None
+            if error is None and status not in RETRY_STATUSES:
+                self._succeeded(host)
+                return result
+            requested = retry_after(result) if result is not None else None
+            if status == 429 or (status == 503 and requested is not None):
+                # A throttling host is healthy: slow down without counting towards the circuit
+                self._count("throttled")
+                self._throttled(host, sent)
+            else:
+                self._count("errors")
+                self._failed(host)
+            attempt += 1
+            if attempt > self.retries or host.opened_at is not None:
+                if error is not None:
+                    raise error
+                return result
+            delay = self.backoff(attempt)
+            if requested is not None:
+                host.bucket.block(requested)
+                delay = max(delay, requested)
+            self._count("retries")
+            self.sleep(delay)
+
+    def get(self, url, **kwargs):
+        """Scheduled HTTP GET (requests if installed, urllib otherwise)"""
+        return self.call(url, http_get, url, **kwargs)
+
+    def map(self, urls, func=None):
+        """Results of `func(url)` (default: GET) for every url, fetched concurrently in order"""
+        fetch = func or http_get
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            return list(pool.map(lambda url: self.call(url, fetch, url), urls))
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def scheduler():
+    """The process-wide Scheduler used by every fetcher"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = Scheduler()
+        return _shared
+
+
+class ThrottlingServer(ThreadingHTTPServer):
+    """Local server that enforces its own rate with 429 + Retry-After, injects 503s and can go down"""
+
+    def __init__(self, rate, error_rate=0.0, seed=0):
+        super().__init__(("127.0.0.1", 0), _ThrottlingHandler)
+        self.bucket = TokenBucket(rate, burst=max(1.0, rate / 5))
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.down = False
+        self.counts = {200: 0, 429: 0, 500: 0, 503: 0}
+        self.lock = threading.Lock()
+        self.daemon_threads = True
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def respond(self):
+        with self.lock:
+            if self.down:
+                status = 500
+            elif self.bucket.reserve() > 0:
+                self.bucket.tokens += 1     # a rejected request does not use up capacity
+                status = 429
+            elif self.random.random() < self.error_rate:
+                status = 503
+            else:
+                status = 200
+            self.counts[status] += 1
+            return status
+
+
+class _ThrottlingHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        status = self.server.respond()
+        body = b"ok" if status == 200 else b"slow down" if status == 429 else b"error"
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", f"{1 / self.server.bucket.rate:.2f}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def check(requests=100, server_rate=10.0):
+    """Run the scheduler against throttling, flaky and failing local servers; returns True if all checks pass"""
+    results = {}
+
+    # Fixed one-second sleeps, as the scrapers used to pace themselves
+    server = ThrottlingServer(server_rate)
+    sample = min(requests, 5)
+    start = time.monotonic()
+    for index in range(sample):
+        urllib_get(f"{server.url}/page/{index}")
+        time.sleep(1)
+    fixed_rate = sample / (time.monotonic() - start)
+    server.shutdown()
+
+    # Adaptive pacing against a host that only allows `server_rate` requests per second
+    server = ThrottlingServer(server_rate)
+    pacer = Scheduler(rate=2.0, max_rate=server_rate * 4, burst=1, increase=1.0, concurrency=4, per_host=4,
+                      base_delay=0.05)
+    start = time.monotonic()
+    responses = pacer.map([f"{server.url}/page/{index}" for index in range(requests)], urllib_get)
+    elapsed = time.monotonic() - start
+    server.shutdown()
+    ok = sum(response.status_code == 200 for response in responses)
+    print(f"Rate-limited host ({server_rate:g} req/s): {ok}/{requests} ok in {elapsed:.1f}s "
+          f"({requests / elapsed:.1f} req/s vs {fixed_rate:.1f} req/s with fixed sleeps), "
+          f"{server.counts[429]} throttled responses, {pacer.stats['retries']} retries")
+    results["every request succeeds behind a rate limit"] = ok == requests
+    results["faster than fixed sleeps"] = requests / elapsed > 2 * fixed_rate
+    results[f"at least {MIN_UTILIZATION:.0%} of the allowed rate"] = requests / elapsed >= MIN_UTILIZATION * server_rate
+
+    # Random 503s are retried with backoff
+    server = ThrottlingServer(1000.0, error_rate=0.3, seed=7)
+    pacer = Scheduler(rate=50.0, max_rate=100.0, concurrency=4, per_host=4, base_delay=0.01, retries=8)
+    responses = pacer.map([f"{server.url}/flaky/{index}" for index in range(requests)], urllib_get)
+    server.shutdown()
+    ok = sum(response.status_code == 200 for response in responses)
+    print(f"Flaky host (30% 503): {ok}/{requests} ok after {server.counts[503]} errors, {pacer.stats['retries']} retries")
+    results["transient 5xx are retried"] = ok == requests
+
+    # A host that is down trips the circuit, then recovers through a half-open trial
+    server = ThrottlingServer(1000.0)
+    server.down = True
+    pacer = Scheduler(rate=100.0, max_rate=100.0, concurrency=1, per_host=1, base_delay=0.01, retries=2,
+                      failure_threshold=3, cooldown=0.5)
+    outcomes = []
+    for index in range(10):
+        try:
+            outcomes.append(pacer.get(f"{server.url}/down/{index}").status_code)
+        except CircuitOpenError:
+            outcomes.append("open")
+    reached = server.counts[500]
+    print(f"Failing host: {reached} requests reached it, {outcomes.count('open')} refused by the open circuit")
+    results["open circuit stops requests"] = reached == pacer.failure_threshold and outcomes.count("open") >= 8
+    server.down = False
+    time.sleep(pacer.cooldown)
+    recovered = pacer.get(f"{server.url}/down/again").status_code
+    server.shutdown()
+    results["circuit closes after a successful trial"] = recovered == 200 and pacer.host(server.url).opened_at is None
+
+    for name, passed in results.items():
+        print(f"  {'ok' if passed else 'FAILED'}: {name}")
+    return all(results.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Polite request scheduler shared by the scrapers")
+    parser.add_argument("--check", action="store_true", help="Verify pacing, retries and circuit breaking locally")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per check (default: 100)")
+    parser.add_argument("--server-rate", type=float, default=10.0, help="Rate the local server allows (default: 10/s)")
+    args = parser.parse_args()
+
+    if not args.check:
+        parser.print_help()
+        return
+    if not check(args.requests, args.server_rate):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
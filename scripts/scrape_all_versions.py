@@ -6,6 +6,7 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
+from request_scheduler import scheduler
 
 def setup_driver():
     """Set up Chrome driver with options for headless browsing"""
@@ -20,10 +21,8 @@ def setup_driver():
     driver = webdriver.Chrome(service=service, options=chrome_options)
     return driver
 
-def scrape_all_versions_toc():
+def scrape_all_versions_toc(versions=("v3", "v4", "v5", "v6")):
     """Scrape table of contents for all Pine Script versions"""
-    versions = ["v3", "v4", "v5", "v6"]
-    
     for version in versions:
         url = f"https://www.tradingview.com/pine-script-reference/{version}/"
         
@@ -36,7 +35,7 @@ def scrape_all_versions_toc():
         
         try:
             print(f"Loading {url}...")
-            driver.get(url)
+            scheduler().call(url, driver.get, url)
             
             # Wait for content to load
             time.sleep(5)
@@ -61,8 +60,6 @@ def scrape_all_versions_toc():
             print(f"Error loading {url}: {str(e)}")
         finally:
             driver.quit()
-        
-        time.sleep(2)  # Be respectful to the server
 
 if __name__ == "__main__":
     scrape_all_versions_toc()
\ No newline at end of file
@@ -1,8 +1,7 @@
-import requests
 from bs4 import BeautifulSoup
 import json
-import time
 import os
+from request_scheduler import scheduler
 
 def scrape_pine_script_reference(version="v6"):
     """
@@ -20,7 +19,7 @@ def scrape_pine_script_reference(version="v6"):
     }
     
     try:
-        response = requests.get(url, headers=headers)
+        response = scheduler().get(url, headers=headers)
         response.raise_for_status()
         
         # Parse the HTML
@@ -99,7 +98,6 @@ def organize_by_version():
         categories = scrape_pine_script_reference(version)
         if categories:
             all_versions[version] = categories
-        time.sleep(1)  # Be respectful to the server
     
     # Save overall structure
     with open("pine_script_references/versions.json", "w", encoding="utf-8") as f:
@@ -1,23 +1,68 @@
+import argparse
+import base64
 import time
 import json
 import os
+import re
+import tempfile
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
 from webdriver_manager.chrome import ChromeDriverManager
+from request_scheduler import scheduler
 
-def setup_driver():
+BASE_URL = "https://www.tradingview.com"
+TOC_CLASS = "tv-script-reference__accordion"
+CONTENT_CLASS = "tv-script-reference__content-container"
+
+# Resources the capture mode never downloads
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.css",
+]
+
+# One round trip: TOC categories, TOC HTML and main content HTML
+BULK_EXTRACT_JS = """
+const toc = document.querySelector('.%s');
+if (!toc) return null;
+const content = document.querySelector('.%s');
+const categories = {};
+toc.querySelectorAll('.tv-accordion__section-header').forEach((header, i) => {
+    const body = header.nextElementSibling;
+    const items = body ? body.querySelectorAll('.tv-pine-reference-toc-item') : [];
+    categories['category_' + i] = {
+        name: header.textContent.trim(),
+        functions: Array.from(items, item => ({name: item.textContent.trim(), link: item.href || ''})),
+    };
+});
+return {categories: categories, toc_html: toc.outerHTML, content_html: content ? content.outerHTML : null};
+""" % (TOC_CLASS, CONTENT_CLASS)
+
+def setup_driver(capture=False):
     """Set up Chrome driver with options for headless browsing"""
     chrome_options = Options()
     chrome_options.add_argument("--headless")  # Run in background
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
+    if capture:
+        # Network events are read back from the performance log
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
     
     # Set up the Chrome driver
     service = Service(ChromeDriverManager().install())
     driver = webdriver.Chrome(service=service, options=chrome_options)
+    if capture:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
     return driver
 
 def scrape_pine_script_reference_with_selenium(version="v6"):
@@ -33,7 +78,7 @@ def scrape_pine_script_reference_with_selenium(version="v6"):
     
     try:
         print(f"Loading {url}...")
-        driver.get(url)
+        scheduler().call(url, driver.get, url)
         
         # Wait for content to load
         time.sleep(5)
@@ -155,17 +200,199 @@ def extract_toc_categories(driver, toc_element):
     
     return categories
 
-def organize_references_with_selenium():
+def drain_network_events(driver, events):
+    """Append pending DevTools network events from the performance log to `events`"""
+    for entry in driver.get_log("performance"):
+        message = json.loads(entry["message"])["message"]
+        if message["method"].startswith("Network."):
+            events.append(message)
+
+def wait_for_network_idle(driver, events, idle=0.5, timeout=15):
+    """Collect network events until no request has been in flight for `idle` seconds"""
+    in_flight = set()
+    processed = 0
+    quiet_since = time.monotonic()
+    deadline = quiet_since + timeout
+    while time.monotonic() < deadline:
+        drain_network_events(driver, events)
+        for message in events[processed:]:
+            request_id = message["params"].get("requestId")
+            if message["method"] == "Network.requestWillBeSent":
+                in_flight.add(request_id)
+            elif message["method"] in ("Network.loadingFinished", "Network.loadingFailed"):
+                in_flight.discard(request_id)
+        if len(events) > processed:
+            processed = len(events)
+            quiet_since = time.monotonic()
+        elif not in_flight and time.monotonic() - quiet_since >= idle:
+            return True
+        time.sleep(0.05)
+    return False
+
+def save_data_responses(driver, events, network_dir):
+    """Save the bodies of XHR/fetch/JSON responses; returns (saved responses, blocked request count)"""
+    finished = {message["params"]["requestId"] for message in events if message["method"] == "Network.loadingFinished"}
+    blocked = sum(1 for message in events
+                  if message["method"] == "Network.loadingFailed" and message["params"].get("blockedReason"))
+    saved = []
+    for message in events:
+        if message["method"] != "Network.responseReceived":
+            continue
+        params = message["params"]
+        response = params["response"]
+        is_data = params.get("type") in ("XHR", "Fetch") or "json" in response.get("mimeType", "")
+        if not is_data or params["requestId"] not in finished:
+            continue
+        try:
+            body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": params["requestId"]})
+        except Exception as e:
+            print(f"Could not read response body for {response['url']}: {e}")
+            continue
+        os.makedirs(network_dir, exist_ok=True)
+        name = re.sub(r"[^A-Za-z0-9._-]+", "_", response["url"].split("://", 1)[-1])[:120]
+        filename = f"{len(saved):03d}_{name}"
+        content = base64.b64decode(body["body"]) if body.get("base64Encoded") else body["body"].encode("utf-8")
+        with open(os.path.join(network_dir, filename), "wb") as f:
+            f.write(content)
+        saved.append({"url": response["url"], "status": response.get("status"),
+                      "mime_type": response.get("mimeType"), "file": filename})
+    if saved:
+        with open(os.path.join(network_dir, "index.json"), "w", encoding="utf-8") as f:
+            json.dump(saved, f, indent=2, ensure_ascii=False)
+    return saved, blocked
+
+def capture_pine_script_reference(version="v6", base_url=BASE_URL, output_root="pine_script_references", timeout=30):
+    """Fetch a reference version through the DevTools network layer with one bulk DOM read"""
+    url = f"{base_url}/pine-script-reference/{version}/"
+    base_dir = os.path.join(output_root, version)
+    os.makedirs(base_dir, exist_ok=True)
+    
+    driver = setup_driver(capture=True)
+    events = []
+    start = time.monotonic()
+    try:
+        print(f"Capturing {url}...")
+        scheduler().call(url, driver.get, url)
+        
+        # Wait for the table of contents instead of a fixed delay, then for data requests to settle
+        WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.CLASS_NAME, TOC_CLASS)))
+        if not wait_for_network_idle(driver, events, timeout=timeout):
+            print("Network did not go idle; saving what has arrived")
+        
+        page = driver.execute_script(BULK_EXTRACT_JS)
+        if not page:
+            print(f"No table of contents found at {url}")
+            return None
+        
+        with open(os.path.join(base_dir, "table_of_contents.html"), "w", encoding="utf-8") as f:
+            f.write(page["toc_html"])
+        with open(os.path.join(base_dir, "categories_detailed.json"), "w", encoding="utf-8") as f:
+            json.dump(page["categories"], f, indent=2, ensure_ascii=False)
+        if page["content_html"]:
+            with open(os.path.join(base_dir, "main_content.html"), "w", encoding="utf-8") as f:
+                f.write(page["content_html"])
+        
+        drain_network_events(driver, events)
+        saved, blocked = save_data_responses(driver, events, os.path.join(base_dir, "network"))
+        items = sum(len(category["functions"]) for category in page["categories"].values())
+        print(f"Captured {len(page['categories'])} categories, {items} items and {len(saved)} data responses "
+              f"({blocked} image/font/CSS requests blocked) in {time.monotonic() - start:.1f}s")
+        return page["categories"]
+    except Exception as e:
+        print(f"Error capturing {url}: {str(e)}")
+        return None
+    finally:
+        driver.quit()
+
+class _FixtureHandler(SimpleHTTPRequestHandler):
+    """Static file handler that records requested paths on its server"""
+
+    def do_GET(self):
+        self.server.requested.append(self.path)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+def build_fixture(directory, version="v6", toc_path=None):
+    """Write a local reference page whose content is loaded from a JSON endpoint, plus assets to block"""
+    toc_path = toc_path or os.path.join("pine_script_references", version, "table_of_contents.html")
+    with open(toc_path, "r", encoding="utf-8") as f:
+        toc_html = f.read()
+    items = re.findall(r'href="#([^"]+)"[^>]*>([^<]*)</a>', toc_html)
+    page_dir = os.path.join(directory, "pine-script-reference", version)
+    os.makedirs(page_dir, exist_ok=True)
+    with open(os.path.join(page_dir, "reference.json"), "w", encoding="utf-8") as f:
+        json.dump([{"id": href, "name": name} for href, name in items], f)
+    with open(os.path.join(page_dir, "style.css"), "w", encoding="utf-8") as f:
+        f.write("@font-face { font-family: Fixture; src: url(font.woff2); }\nbody { font-family: Fixture; }\n")
+    for asset in ("logo.png", "font.woff2"):
+        with open(os.path.join(page_dir, asset), "wb") as f:
+            f.write(b"\0" * 1024)
+    with open(os.path.join(page_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write(f"""<html><head><link rel="stylesheet" href="style.css"></head><body>
+<img src="logo.png">
+<div class="{CONTENT_CLASS}"></div>
+<script>
+fetch('reference.json').then(response => response.json()).then(entries => {{
+    document.querySelector('.{CONTENT_CLASS}').innerHTML = entries.map(entry =>
+        `<div class="tv-pine-reference-item" id="${{entry.id}}"><div class="tv-pine-reference-item__header">${{entry.name}}</div></div>`).join('');
+    document.body.insertAdjacentHTML('afterbegin', {json.dumps(toc_html)});
+}});
+</script></body></html>""")
+    return len(items)
+
+def serve_fixture(directory):
+    """Serve `directory` on a free local port from a background thread; returns (server, base URL)"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_FixtureHandler, directory=directory))
+    server.requested = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def check_capture_against_fixture(version="v6"):
+    """Run the capture mode against a local fixture server and check what it fetched and saved"""
+    with tempfile.TemporaryDirectory() as directory:
+        site_dir = os.path.join(directory, "site")
+        output_root = os.path.join(directory, "output")
+        expected = build_fixture(site_dir, version)
+        server, base_url = serve_fixture(site_dir)
+        try:
+            categories = capture_pine_script_reference(version, base_url, output_root)
+        finally:
+            server.shutdown()
+        items = sum(len(category["functions"]) for category in (categories or {}).values())
+        fetched_assets = [path for path in server.requested if path.endswith((".css", ".png", ".woff2"))]
+        network_index = os.path.join(output_root, version, "network", "index.json")
+        captured = json.load(open(network_index, encoding="utf-8")) if os.path.exists(network_index) else []
+        checks = {
+            f"{expected} TOC items extracted": items == expected,
+            "main content saved": os.path.exists(os.path.join(output_root, version, "main_content.html")),
+            "reference.json response captured": any(entry["url"].endswith("reference.json") for entry in captured),
+            "no image/font/CSS requests reached the server": not fetched_assets,
+        }
+        for name, passed in checks.items():
+            print(f"  {'ok' if passed else 'FAILED'}: {name}")
+        return all(checks.values())
+
+def organize_references_with_selenium(versions=("v6",), capture=False, base_url=BASE_URL, snapshot=False):
     """Organize all Pine Script references using Selenium"""
-    versions = ["v6"]  # Start with v6, can add others later
     all_versions = {}
+    store = None
+    if snapshot:
+        from snapshot_store import SnapshotStore
+        store = SnapshotStore()
     
     for version in versions:
         print(f"Scraping Pine Script {version} with Selenium...")
-        categories = scrape_pine_script_reference_with_selenium(version)
+        if capture:
+            categories = capture_pine_script_reference(version, base_url)
+        else:
+            categories = scrape_pine_script_reference_with_selenium(version)
         if categories:
             all_versions[version] = categories
-        time.sleep(2)  # Be respectful to the server
+            if store:
+                manifest = store.take(f"pine_script_references/{version}")
+                print(f"Saved snapshot {manifest['id']} ({manifest['new_chunks']} new chunks)")
     
     # Save overall structure
     with open("pine_script_references/versions_detailed.json", "w", encoding="utf-8") as f:
@@ -173,5 +400,22 @@ def organize_references_with_selenium():
     
     print("Saved detailed version structure to pine_script_references/versions_detailed.json")
 
+def main():
+    parser = argparse.ArgumentParser(description="Scrape the Pine Script reference with Selenium")
+    parser.add_argument("versions", nargs="*", default=["v6"], help="Versions to scrape (default: v6)")
+    parser.add_argument("--capture", action="store_true",
+                        help="Capture through the DevTools network layer with blocked assets and one bulk DOM read")
+    parser.add_argument("--base-url", default=BASE_URL, help="Site to scrape (default: %(default)s)")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="Keep each scraped version in the snapshot store (snapshot_store.py)")
+    parser.add_argument("--fixture", action="store_true", help="Check the capture mode against a local fixture server")
+    args = parser.parse_args()
+
+    if args.fixture:
+        if not check_capture_against_fixture(args.versions[0]):
+            raise SystemExit(1)
+        return
+    organize_references_with_selenium(args.versions, args.capture, args.base_url, args.snapshot)
+
 if __name__ == "__main__":
-    organize_references_with_selenium()
\ No newline at end of file
+    main()
\ No newline at end of file
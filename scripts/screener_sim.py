@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Offline multi-symbol screener simulator
+
+Previews what a screener would show for every ticker of a universe without
+loading chart instances. The screener template is rendered for each screen
+(as generate_screeners.py does) and the signal expression its
+`request.security` calls evaluate (`s_expr = calculateSignal()` in the
+templates) is split off into a small signal script. That script is run bar by
+bar on every symbol's own OHLCV history over a process pool. Each screen is
+then run with a `request.security` provider that returns the precomputed
+signals, aligned to the chart's bar times, and renders the script's own table.
+
+Per-symbol data comes from a directory of OHLCV files named after the symbol
+(`AAPL.csv`, `NSE_ABB.csv` or bare `ABB.csv`, CSV or Parquet). On first use
+each file is converted to a `.cache/<name>.npy` column block next to it; later
+runs memory-map those blocks instead of re-parsing the files. With
+`--timeframe`, `--data` is an ohlcv_store.py directory instead.
+
+`--signal-timeframe` previews a higher-timeframe variant (e.g. daily signals
+on an intraday chart): symbols are resampled with ohlcv_resample.py and the
+signals are aligned to the chart with lookahead_off semantics.
+
+Usage:
+    python scripts/screener_sim.py --data prices/us --market us
+    python scripts/screener_sim.py --data prices/india --market india --expr popular_30_active --chart NSE:NIFTY
+    python scripts/screener_sim.py --data data/ohlcv --timeframe 1D --market us
+    python scripts/screener_sim.py --data prices/us --template templates/kurutoga_screener_template.pine --signals-only
+    python scripts/screener_sim.py --benchmark 480 --bars 5000
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import generate_screeners
+import ohlcv
+import ohlcv_resample
+import ohlcv_store
+import pine_parser as ast
+import ticker_universe
+from pine_runtime import Runtime
+from pine_vector_engine import PineEvalError
+
+DATA_EXTENSIONS = (".csv", ".parquet")
+CACHE_DIR = ".cache"
+SIGNAL = "__screener_signal"
+CHUNK_SIZE = 8
+
+
+def find_files(data_dir, symbols=None, timeframe=None):
+    """{symbol: path} for the data files of `symbols` (default: every file in the directory)
+
+    With a timeframe, `data_dir` is an ohlcv_store directory and the paths are its series directories.
+    """
+    if timeframe:
+        store = ohlcv_store.Store(data_dir)
+        wanted = store.symbols() if symbols is None else symbols
+        return {symbol: store.path(symbol, timeframe) for symbol in wanted
+                if ohlcv_store.is_series_dir(store.path(symbol, timeframe))}
+    files = {}
+    for filename in os.listdir(data_dir):
+        stem, ext = os.path.splitext(filename)
+        if ext.lower() in DATA_EXTENSIONS:
+            files[stem] = os.path.join(data_dir, filename)
+    if symbols is None:
+        return {ticker_universe.filename_symbol(stem): path for stem, path in sorted(files.items())}
+    found = {}
+    for symbol in symbols:
+        path = files.get(ticker_universe.symbol_filename(symbol)) or files.get(ticker_universe.strip_prefix(symbol))
+        if path:
+            found[symbol] = path
+    return found
+
+
+def cache_path(path):
+    return os.path.join(os.path.dirname(path), CACHE_DIR, os.path.splitext(os.path.basename(path))[0] + ".npy")
+
+
+def load_mapped(path):
+    """OHLCV columns of a data file, memory-mapped from its .npy cache (built on first use)"""
+    if os.path.isdir(path):
+        return ohlcv.load(path)
+    cached = cache_path(path)
+    try:
+        fresh = os.path.getmtime(cached) >= os.path.getmtime(path)
+    except OSError:
+        fresh = False
+    if not fresh:
+        data = ohlcv.load(path)
+        block = np.vstack([np.asarray(data[name], dtype=np.float64) for name in ohlcv.COLUMNS])
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        partial = cached + f".{os.getpid()}.tmp"
+        with open(partial, "wb") as f:
+            np.save(f, block)
+        os.replace(partial, cached)
+    block = np.load(cached, mmap_mode="r")
+    data = {name: block[row] for row, name in enumerate(ohlcv.COLUMNS)}
+    data["time"] = data["time"].astype(np.int64)
+    return data
+
+
+def _contains_request(stmt):
+    return any(isinstance(node, ast.Call) and node.func.startswith("request.") for node in ast.walk(stmt))
+
+
+def signal_script(script):
+    """Script computing the expression the screener's request.security calls evaluate, as `SIGNAL`"""
+    body, expressions = [], set()
+    for stmt in script.body:
+        if _contains_request(stmt):
+            for node in ast.walk(stmt):
+                if isinstance(node, ast.Call) and node.func == "request.security":
+                    expression = dict(node.kwargs).get("expression")
+                    if expression is None and len(node.args) > 2:
+                        expression = node.args[2]
+                    if expression is not None:
+                        expressions.add(expression)
+            continue
+        if not expressions:
+            body.append(stmt)
+    if not expressions:
+        raise PineEvalError("no request.security(symbol, timeframe, expression) calls found")
+    distinct = {repr(expression) for expression in expressions}
+    if len(distinct) > 1:
+        raise PineEvalError("request.security calls evaluate different expressions; cannot split one signal")
+    body.append(ast.Assign(SIGNAL, next(iter(expressions))))
+    return ast.Script(body, script.version)
+
+
+def _series(values):
+    """Recorded runtime series as a plain list (string series stay strings, na is None)"""
+    if isinstance(values, np.ndarray):
+        if values.dtype.kind == "f":
+            return [None if np.isnan(value) else float(value) for value in values]
+        return values.tolist()
+    return list(values) if isinstance(values, (list, tuple)) else [values]
+
+
+_worker = {}
+
+
+def _init_worker(script, inputs, timeframe):
+    _worker.update(script=script, inputs=inputs, timeframe=timeframe)
+
+
+def _evaluate_chunk(items):
+    results = []
+    for symbol, path in items:
+        try:
+            data = load_mapped(path)
+            period = ohlcv_resample.bar_period_ms(data["time"])
+            if _worker["timeframe"]:
+                data = ohlcv_resample.resample(data, _worker["timeframe"], source_period_ms=period)
+                bars = {"time": data["time"], "close_time": data["close_time"]}
+            else:
+                times = np.asarray(data["time"])
+                bars = {"time": times, "close_time": times + period}
+            runtime = Runtime(_worker["script"], _worker["inputs"], record=[SIGNAL])
+            result = runtime.run(data, symbol=symbol)
+            values = result["series"][SIGNAL]
+            if not isinstance(values, np.ndarray) or len(values) != len(data["time"]):
+                values = [values] * len(data["time"])
+            results.append((symbol, bars, _series(values), None))
+        except (PineEvalError, OSError, ValueError, KeyError) as e:
+            results.append((symbol, None, None, str(e)))
+    return results
+
+
+def evaluate(script, files, inputs=None, jobs=None, timeframe=None):
+    """{symbol: (bar times, signal values)} and {symbol: error} for every data file, in parallel
+
+    With a `timeframe`, each symbol's data is first resampled to it (a higher-timeframe request.security).
+    """
+    items = sorted(files.items())
+    chunks = [items[i:i + CHUNK_SIZE] for i in range(0, len(items), CHUNK_SIZE)]
+    signals, errors = {}, {}
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(script, inputs or {}, timeframe)) as pool:
+        for chunk in pool.map(_evaluate_chunk, chunks):
+            for symbol, bars, values, error in chunk:
+                if error:
+                    errors[symbol] = error
+                else:
+                    signals[symbol] = (bars, values)
+    return signals, errors
+
+
+def aligned(signal, chart_times, lookahead=False):
+    """Signal values at each chart bar, as request.security with barmerge.lookahead_off (or _on) returns them"""
+    bars, values = signal
+    positions = ohlcv_resample.align(bars, chart_times, lookahead=lookahead)
+    return [values[position] if position >= 0 else None for position in positions.tolist()]
+
+
+def security_provider(signals, chart_times):
+    """request.security hook for Runtime returning precomputed per-symbol signals"""
+    cache = {}
+
+    def provide(runtime, node, scope, compiled):
+        symbol = getattr(compiled.get("symbol"), "value", None)
+        if symbol not in signals:
+            return lambda: None
+        if symbol not in cache:
+            cache[symbol] = aligned(signals[symbol], chart_times)
+        column, bar = cache[symbol], runtime.bar
+        return lambda: column[bar[0]]
+
+    return provide
+
+
+def render_screens(plan, symbols, signals, chart, name, per_screen, inputs=None):
+    """Run every screen of the template on the chart data; yields (screen, symbols, table rows)"""
+    per_screen = min(per_screen, plan.symbol_slots)
+    provide = security_provider(signals, chart["time"])
+    for screen, start in enumerate(range(0, len(symbols), per_screen), 1):
+        chunk = symbols[start:start + per_screen]
+        slots, enabled = generate_screeners.screen_slots(chunk, plan.symbol_slots)
+        source = plan.render({"SCRIPT_NAME": name, "SCREEN_NUMBER": screen}, slots, enabled)
+        result = Runtime(ast.parse(source), inputs, record=False, security=provide).run(chart, symbol=chunk[0])
+        tables = [[row for row in table if any(row)] for table in result["tables"]]
+        yield screen, chunk, tables
+
+
+def print_table(rows):
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    for row in rows:
+        print("  | " + " | ".join(cell.ljust(width) for cell, width in zip(row, widths)) + " |")
+
+
+def last_signals(signals):
+    """{symbol: signal on the symbol's last bar}"""
+    return {symbol: values[-1] if values else None for symbol, (bars, values) in signals.items()}
+
+
+def benchmark(symbols, bars, template, jobs=None):
+    """Time signal evaluation for `symbols` synthetic symbols of `bars` bars each"""
+    plan = generate_screeners.RenderPlan(template)
+    source = plan.render({"SCRIPT_NAME": "Benchmark", "SCREEN_NUMBER": 1},
+                         *generate_screeners.screen_slots([], plan.symbol_slots))
+    script = signal_script(ast.parse(source))
+    workdir = tempfile.mkdtemp(prefix="screener_sim_")
+    try:
+        for index in range(symbols):
+            ohlcv.write_csv(ohlcv.synthetic(bars, seed=index), os.path.join(workdir, f"SYM{index:04d}.csv"))
+        files = find_files(workdir)
+        for label in ("first run (parse + cache)", "cached run (memory-mapped)"):
+            start = time.perf_counter()
+            signals, errors = evaluate(script, files, jobs=jobs)
+            elapsed = time.perf_counter() - start
+            print(f"  {label}: {len(signals)} symbols x {bars:,} bars in {elapsed:.2f} s "
+                  f"({len(signals) / elapsed:,.1f} symbols/s, {len(signals) * bars / elapsed / 1e6:.1f}M bars/s)")
+            if errors:
+                print(f"  {len(errors)} errors, e.g. {next(iter(errors.values()))}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preview screener signals for a whole ticker universe offline")
+    parser.add_argument("--data", help="Directory of per-symbol OHLCV files (AAPL.csv, NSE_ABB.csv, ...)")
+    parser.add_argument("--timeframe", help="Read --data as an ohlcv_store directory at this timeframe")
+    parser.add_argument("--template", default=generate_screeners.DEFAULT_TEMPLATE, help="Screener template")
+    parser.add_argument("--market", choices=sorted(ticker_universe.MARKET_PREFIXES),
+                        help="Only symbols of this market's ticker lists (default: every file in --data)")
+    parser.add_argument("--expr", default="all_tickers", help="Ticker set expression with --market (default: all_tickers)")
+    parser.add_argument("--signal-timeframe", metavar="TF",
+                        help="Evaluate signals on this higher timeframe (e.g. D), aligned with lookahead_off")
+    parser.add_argument("--chart", help="Chart symbol the screener runs on (default: first symbol)")
+    parser.add_argument("--name", default="Screener", help="Value for {{SCRIPT_NAME}}")
+    parser.add_argument("--per-screen", type=int, default=generate_screeners.ACTIVE_PER_SCREEN,
+                        help="Symbols per screen (default: 30)")
+    parser.add_argument("--signals-only", action="store_true", help="Only list BUY/SELL symbols, no screen tables")
+    parser.add_argument("--jobs", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--benchmark", type=int, nargs="?", const=480, metavar="SYMBOLS",
+                        help="Time signal evaluation on synthetic symbols (default: 480)")
+    parser.add_argument("--bars", type=int, default=5000, help="Bars per synthetic symbol for --benchmark")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(f"Benchmark: {os.path.relpath(args.template, generate_screeners.ROOT)}")
+        benchmark(args.benchmark, args.bars, args.template, args.jobs)
+        return
+    if not args.data:
+        parser.error("--data is required")
+
+    plan = generate_screeners.RenderPlan(args.template)
+    if not plan.symbol_slots:
+        print(f"{args.template}: no sNN = input.symbol(...) lines found")
+        sys.exit(1)
+    if args.market:
+        universe = ticker_universe.load_market(os.path.join(ticker_universe.TICKERS_DIR, args.market), args.market)
+        try:
+            wanted = [ticker_universe.qualify(symbol, args.market) for symbol in universe.evaluate(args.expr).sorted()]
+        except (KeyError, ValueError) as e:
+            print(f"Error: {e.args[0]}")
+            sys.exit(1)
+        files = find_files(args.data, wanted, args.timeframe)
+        missing = len(wanted) - len(files)
+    else:
+        files = find_files(args.data, timeframe=args.timeframe)
+        missing = 0
+    if not files:
+        print(f"No OHLCV files for the requested symbols in {args.data}")
+        sys.exit(1)
+
+    first = plan.render({"SCRIPT_NAME": args.name, "SCREEN_NUMBER": 1},
+                        *generate_screeners.screen_slots([], plan.symbol_slots))
+    try:
+        script = signal_script(ast.parse(first))
+    except (ast.PineSyntaxError, PineEvalError) as e:
+        print(f"{args.template}: {e}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    signals, errors = evaluate(script, files, jobs=args.jobs, timeframe=args.signal_timeframe)
+    elapsed = time.perf_counter() - start
+    print(f"Evaluated {len(signals)} symbols in {elapsed:.2f} s ({len(signals) / elapsed:,.1f} symbols/s)"
+          + (f", {missing} without data" if missing else ""))
+    for symbol, error in sorted(errors.items()):
+        print(f"  error: {symbol}: {error}")
+    if not signals:
+        print("No symbol evaluated successfully")
+        sys.exit(1)
+
+    symbols = sorted(signals)
+    if args.signals_only:
+        active = {symbol: value for symbol, value in last_signals(signals).items()
+                  if isinstance(value, str) and ("BUY" in value or "SELL" in value)}
+        print(f"{len(active)} symbols with a BUY/SELL signal on their last bar")
+        for symbol, value in sorted(active.items()):
+            print(f"  {symbol:<20} {value}")
+        return
+
+    chart_symbol = args.chart or symbols[0]
+    chart_path = find_files(args.data, [chart_symbol], args.timeframe).get(chart_symbol)
+    if not chart_path:
+        print(f"No OHLCV file for chart symbol {chart_symbol}")
+        sys.exit(1)
+    chart = load_mapped(chart_path)
+    try:
+        for screen, chunk, tables in render_screens(plan, symbols, signals, chart, args.name, args.per_screen):
+            print(f"\nScreen {screen} ({len(chunk)} symbols, chart {chart_symbol})")
+            for rows in tables:
+                if rows:
+                    print_table(rows)
+    except PineEvalError as e:
+        print(f"{args.template}: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
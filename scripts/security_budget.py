@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+request.security budget analyzer and screener sharding
+
+TradingView allows a script at most 40 unique `request.*` calls. A screener
+spends one call per symbol slot (`signalNN = request.security(sNN, ...)`),
+so covering a full ticker universe needs several screener instances, each
+showing its own `scr_numb` screen.
+
+The analyzer counts calls statically from the AST. Calls inside user
+functions are counted once per call site of the function (transitively,
+since each call site is a separate request), identical calls at the same
+site are counted once, and every call is attributed to the `input.symbol`
+slots its arguments reference. Calls inside loops are flagged, since their
+count there depends on how many distinct arguments the loop produces.
+
+The planner then packs a ticker universe into the fewest screener instances
+that stay within the budget. Every slot of the template costs calls whether
+or not it is enabled, so a template within budget can carry a real symbol
+in every slot (40 per screen for the gold standard template instead of the
+30 active + 10 dummy convention). Shards are rendered with
+generate_screeners.py.
+
+Usage:
+    python scripts/security_budget.py templates/gold_standard_screener_template.pine
+    python scripts/security_budget.py templates/kurutoga_screener_template.pine --verbose
+    python scripts/security_budget.py --plan --market india --market us
+    python scripts/security_budget.py --plan --market us --expr "all_tickers | popular_30_active" --generate --name "US Gold"
+"""
+
+import argparse
+import os
+import sys
+
+import generate_screeners
+import pine_formatter
+import pine_parser as ast
+import ticker_universe
+
+SECURITY_LIMIT = 40
+LOOPS = (ast.For, ast.ForIn, ast.While)
+
+
+class RequestSite:
+    """One counted request.* call: where it is, how it was reached and which symbol slots it uses"""
+
+    def __init__(self, call, chain, slots, in_loop):
+        self.call = call
+        self.chain = chain          # user function call sites leading to the call, outermost first
+        self.slots = slots
+        self.in_loop = in_loop
+
+    @property
+    def key(self):
+        return tuple(pine_formatter.format_expression(site) for site in self.chain) + (
+            pine_formatter.format_expression(self.call),)
+
+    def describe(self):
+        via = "".join(f" via {site.func}() line {site.line}" for site in reversed(self.chain))
+        loop = " [in loop]" if self.in_loop else ""
+        return f"line {self.call.line}: {self.call.func}{via}{loop}"
+
+
+class Budget:
+    """Static request.* count of a script"""
+
+    def __init__(self, script):
+        self.script = script if isinstance(script, ast.Script) else ast.parse(script)
+        self.functions = {}
+        self.symbol_slots = []
+        top_level = []
+        for stmt in self.script.body:
+            if isinstance(stmt, ast.FunctionDef):
+                self.functions[stmt.name] = stmt
+            else:
+                top_level.append(stmt)
+                if isinstance(stmt, ast.Assign) and _is_symbol_input(stmt.value):
+                    self.symbol_slots.append(stmt.target)
+        self._symbols = set(self.symbol_slots)
+        sites = {}
+        self._collect(top_level, (), False, (), sites)
+        self.sites = list(sites.values())
+
+    def _collect(self, nodes, chain, in_loop, stack, sites):
+        for node in nodes:
+            if isinstance(node, ast.FunctionDef):
+                continue
+            if isinstance(node, ast.Call):
+                if node.func.startswith("request."):
+                    site = RequestSite(node, chain, self._slots_of(node, chain), in_loop)
+                    sites.setdefault(site.key, site)
+                elif node.func in self.functions and node.func not in stack:
+                    function = self.functions[node.func]
+                    self._collect(function.body, chain + (node,), in_loop, stack + (node.func,), sites)
+            self._collect(ast.iter_child_nodes(node), chain, in_loop or isinstance(node, LOOPS), stack, sites)
+
+    def _slots_of(self, call, chain):
+        names = set()
+        for node in (call,) + chain:
+            names.update(child.id for child in ast.walk(node) if isinstance(child, ast.Name))
+        return sorted(names & self._symbols)
+
+    @property
+    def total(self):
+        return len(self.sites)
+
+    def slot_costs(self):
+        """{slot name: calls that reference it} in slot order"""
+        costs = {slot: 0 for slot in self.symbol_slots}
+        for site in self.sites:
+            for slot in site.slots:
+                costs[slot] += 1
+        return costs
+
+    @property
+    def fixed(self):
+        """Calls that reference no symbol slot"""
+        return sum(1 for site in self.sites if not site.slots)
+
+    def loop_sites(self):
+        return [site for site in self.sites if site.in_loop]
+
+
+def _is_symbol_input(value):
+    return isinstance(value, ast.Call) and value.func == "input.symbol"
+
+
+def capacity(budget, limit=SECURITY_LIMIT):
+    """Symbols one screener instance can show within `limit` calls (0 if the script is over budget)"""
+    if budget.total > limit:
+        return 0
+    return len(budget.symbol_slots)
+
+
+def shard(symbols, per_screen):
+    """Split symbols into the fewest screens of at most `per_screen`, keeping the input order"""
+    if per_screen <= 0:
+        raise ValueError("template has no room for symbols within the call budget")
+    return [symbols[start:start + per_screen] for start in range(0, len(symbols), per_screen)]
+
+
+def report(path, budget, limit, verbose=False):
+    """Print the call count of one script"""
+    costs = budget.slot_costs()
+    status = "OK" if budget.total <= limit else f"OVER BUDGET by {budget.total - limit}"
+    print(f"{path}: {budget.total}/{limit} request calls - {status}")
+    if costs:
+        per_slot = sorted(set(costs.values()))
+        print(f"  symbol slots: {len(costs)} (calls per slot: {'/'.join(map(str, per_slot))}), "
+              f"fixed calls: {budget.fixed}")
+    for site in budget.loop_sites():
+        print(f"  warning: {site.describe()} - counted once, but each distinct argument set is a request")
+    if verbose:
+        for site in budget.sites:
+            slots = f" -> {', '.join(site.slots)}" if site.slots else ""
+            print(f"    {site.describe()}{slots}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count request.* calls and shard ticker universes over screeners")
+    parser.add_argument("files", nargs="*", help="Pine files to analyze (default: the gold standard template)")
+    parser.add_argument("--limit", type=int, default=SECURITY_LIMIT, help="request.* call budget (default: 40)")
+    parser.add_argument("--verbose", action="store_true", help="List every counted call")
+    parser.add_argument("--plan", action="store_true", help="Shard a ticker universe over screener instances")
+    parser.add_argument("--tickers", default=ticker_universe.TICKERS_DIR, help="Ticker directory")
+    parser.add_argument("--market", action="append", help="Market to plan (repeatable, default: all)")
+    parser.add_argument("--expr", default="all_tickers", help="Ticker set expression (default: all_tickers)")
+    parser.add_argument("--generate", action="store_true", help="Render one screener script per shard")
+    parser.add_argument("--output", default=generate_screeners.OUTPUT_DIR, help="Output directory for --generate")
+    parser.add_argument("--name", default="Screener", help="Value for {{SCRIPT_NAME}}")
+    args = parser.parse_args()
+
+    files = args.files or [generate_screeners.DEFAULT_TEMPLATE]
+    budgets = []
+    for path in files:
+        try:
+            budget = Budget(ast.parse_file(path))
+        except ast.PineSyntaxError as e:
+            print(f"{path}: {e}")
+            sys.exit(1)
+        report(os.path.relpath(path, generate_screeners.ROOT), budget, args.limit, args.verbose)
+        budgets.append(budget)
+
+    if not args.plan:
+        if any(budget.total > args.limit for budget in budgets):
+            sys.exit(1)
+        return
+
+    template, budget = files[0], budgets[0]
+    per_screen = capacity(budget, args.limit)
+    if not per_screen:
+        print(f"Cannot plan: {os.path.basename(template)} needs {budget.total} calls (limit {args.limit})")
+        sys.exit(1)
+    plan = generate_screeners.RenderPlan(template) if args.generate else None
+    universes = ticker_universe.load(args.tickers)
+    list_name = "shard" if args.expr == "all_tickers" else "custom_shard"
+    for market in args.market or sorted(universes):
+        try:
+            symbols = universes[market].evaluate(args.expr).sorted()
+        except (KeyError, ValueError) as e:
+            print(f"{market}: {e.args[0]}")
+            sys.exit(1)
+        shards = shard(symbols, per_screen)
+        conventional = -(-len(symbols) // generate_screeners.ACTIVE_PER_SCREEN)
+        print(f"\n{market}: {len(symbols)} tickers -> {len(shards)} screener instances of up to {per_screen} "
+              f"({conventional} with {generate_screeners.ACTIVE_PER_SCREEN} active per screen)")
+        for screen, members in enumerate(shards, 1):
+            print(f"  scr_numb {screen:>2}: {len(members):>2} tickers  {members[0]} .. {members[-1]}")
+        if plan:
+            active = [ticker_universe.qualify(symbol, market) for symbol in symbols]
+            written, unchanged, removed = generate_screeners.render_screens(plan, active, market, list_name,
+                                                                            args.name, args.output, per_screen)
+            print(f"  {len(written)} written, {len(unchanged)} unchanged, {len(removed)} removed in "
+                  f"{os.path.relpath(os.path.join(args.output, market), generate_screeners.ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
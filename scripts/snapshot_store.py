@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Content-addressed snapshot store for scraped reference pages
+
+Scrapes overwrite pine_script_references/<version>/ in place (table of
+contents, main content, page source, organized JSON). This store keeps every
+scrape as a snapshot without storing near-duplicate multi-megabyte pages over
+and over:
+
+- files are split with content-defined chunking (a gear rolling hash over a
+  32-byte window, computed for a whole file at once with NumPy, with min/max
+  chunk sizes), so an edit only changes the chunks around it
+- each unique chunk is stored once, zlib-compressed, under objects/ by its
+  SHA-256
+- a snapshot is a small JSON manifest (snapshots/<id>.json) listing each
+  file's size, hash and chunks
+
+Snapshots are rebuilt by concatenating chunks and checked against the file
+hash. `SnapshotStore.open()` returns a seekable binary stream that decompresses
+chunks on demand, so parsers read a past snapshot like a file
+(pine_reference_db.py --snapshot ID).
+
+Usage:
+    python scripts/snapshot_store.py --take                 # every pine_script_references/v*/
+    python scripts/snapshot_store.py --take v6 --label after-fix
+    python scripts/snapshot_store.py --list
+    python scripts/snapshot_store.py --report
+    python scripts/snapshot_store.py --restore 20261018T120000Z-v6-1a2b3c4d --to /tmp/v6
+    python scripts/snapshot_store.py --cat 20261018T120000Z-v6-1a2b3c4d table_of_contents.html
+    python scripts/snapshot_store.py --benchmark --scrapes 10
+"""
+
+import argparse
+import bisect
+import glob
+import hashlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REFERENCES_DIR = os.path.join(ROOT, "pine_script_references")
+STORE_DIR = os.path.join(REFERENCES_DIR, "snapshots")
+
+MIN_CHUNK = 512
+MAX_CHUNK = 32 * 1024
+CUT_MASK = np.uint32(0xFFE00000)     # 11 bits: about 2 KB between cut points
+GEAR = np.random.RandomState(0x5EED).randint(0, 2 ** 32, size=256, dtype=np.uint64).astype(np.uint32)
+COMPRESSION_LEVEL = 6
+
+
+def chunk_boundaries(data, min_size=MIN_CHUNK, max_size=MAX_CHUNK):
+    """End offsets of the content-defined chunks of `data`"""
+    size = len(data)
+    if size == 0:
+        return []
+    gear = GEAR[np.frombuffer(data, dtype=np.uint8)]
+    rolling = gear.copy()
+    for shift in range(1, 32):
+        rolling[shift:] += gear[:size - shift] << np.uint32(shift)
+    candidates = np.flatnonzero((rolling & CUT_MASK) == 0) + 1
+    cuts = []
+    last = 0
+    for cut in candidates.tolist():
+        if cut - last < min_size:
+            continue
+        while cut - last > max_size:
+            last += max_size
+            cuts.append(last)
+        cuts.append(cut)
+        last = cut
+    while size - last > max_size:
+        last += max_size
+        cuts.append(last)
+    if last < size:
+        cuts.append(size)
+    return cuts
+
+
+class SnapshotReader(io.RawIOBase):
+    """Seekable binary stream over one file of a snapshot, decompressing chunks on demand"""
+
+    def __init__(self, store, entry):
+        self.store = store
+        self.hashes = [digest for digest, _ in entry["chunks"]]
+        self.starts = []
+        position = 0
+        for _, length in entry["chunks"]:
+            self.starts.append(position)
+            position += length
+        self.size = position
+        self.position = 0
+        self._chunk = (None, b"")
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: self.size}[whence]
+        self.position = max(0, base + offset)
+        return self.position
+
+    def readinto(self, buffer):
+        if self.position >= self.size:
+            return 0
+        index = bisect.bisect_right(self.starts, self.position) - 1
+        if self._chunk[0] != index:
+            self._chunk = (index, self.store.chunk(self.hashes[index]))
+        data = self._chunk[1]
+        offset = self.position - self.starts[index]
+        count = min(len(buffer), len(data) - offset)
+        buffer[:count] = data[offset:offset + count]
+        self.position += count
+        return count
+
+
+class SnapshotStore:
+    """Deduplicated chunk objects plus one manifest per snapshot"""
+
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        self.objects = os.path.join(root, "objects")
+        self.manifests = os.path.join(root, "snapshots")
+        os.makedirs(self.objects, exist_ok=True)
+        os.makedirs(self.manifests, exist_ok=True)
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects, digest[:2], digest[2:])
+
+    def put(self, data):
+        """Store `data` as chunks; returns [(chunk hash, length)] and the number of new chunks"""
+        chunks = []
+        added = 0
+        start = 0
+        view = memoryview(data)
+        for end in chunk_boundaries(data):
+            piece = view[start:end]
+            digest = hashlib.sha256(piece).hexdigest()
+            path = self._object_path(digest)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                partial = f"{path}.{os.getpid()}.tmp"
+                with open(partial, "wb") as f:
+                    f.write(zlib.compress(piece, COMPRESSION_LEVEL))
+                os.replace(partial, path)
+                added += 1
+            chunks.append((digest, end - start))
+            start = end
+        return chunks, added
+
+    def chunk(self, digest):
+        with open(self._object_path(digest), "rb") as f:
+            return zlib.decompress(f.read())
+
+    def take(self, directory, label=None, names=None):
+        """Snapshot the files of `directory` (all regular files, or `names`); returns the manifest"""
+        label = label or os.path.basename(os.path.normpath(directory))
+        files = {}
+        added = 0
+        for name in sorted(names or os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if not os.path.isfile(path):
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            chunks, new = self.put(data)
+            added += new
+            files[name] = {"size": len(data), "sha256": hashlib.sha256(data).hexdigest(), "chunks": chunks}
+        digest = hashlib.sha256(json.dumps(files, sort_keys=True).encode("utf-8")).hexdigest()[:8]
+        created = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+        manifest = {"id": f"{created}-{label}-{digest}", "label": label, "created": created,
+                    "source": os.path.relpath(os.path.abspath(directory), ROOT), "files": files, "new_chunks": added}
+        path = os.path.join(self.manifests, manifest["id"] + ".json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        return manifest
+
+    def snapshots(self, label=None):
+        """Manifests, oldest first, optionally only those with `label`"""
+        found = []
+        paths = glob.glob(os.path.join(self.manifests, "*.json"))
+        for path in sorted(paths, key=lambda path: (os.path.getmtime(path), path)):
+            with open(path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if label is None or manifest["label"] == label:
+                found.append(manifest)
+        return found
+
+    def manifest(self, snapshot_id):
+        """Manifest by id, unique id prefix or label (latest snapshot with that label)"""
+        path = os.path.join(self.manifests, snapshot_id + ".json")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        manifests = self.snapshots()
+        matches = [m for m in manifests if m["id"].startswith(snapshot_id)] or \
+                  [m for m in manifests if m["label"] == snapshot_id][-1:]
+        if len(matches) != 1:
+            raise KeyError(f"{'ambiguous' if matches else 'no'} snapshot {snapshot_id!r}")
+        return matches[0]
+
+    def open(self, snapshot_id, name):
+        """Buffered binary stream over one file of a snapshot"""
+        files = self.manifest(snapshot_id)["files"]
+        if name not in files:
+            raise KeyError(f"{name} not in snapshot {snapshot_id} (has: {', '.join(files)})")
+        return io.BufferedReader(SnapshotReader(self, files[name]), buffer_size=64 * 1024)
+
+    def read(self, snapshot_id, name):
+        """Rebuild one file, verified against its recorded hash"""
+        entry = self.manifest(snapshot_id)["files"][name]
+        data = b"".join(self.chunk(digest) for digest, _ in entry["chunks"])
+        if hashlib.sha256(data).hexdigest() != entry["sha256"]:
+            raise ValueError(f"{name} in snapshot {snapshot_id} does not match its hash")
+        return data
+
+    def restore(self, snapshot_id, target):
+        """Write every file of a snapshot into `target`; returns the number of bytes written"""
+        manifest = self.manifest(snapshot_id)
+        os.makedirs(target, exist_ok=True)
+        written = 0
+        for name in manifest["files"]:
+            data = self.read(manifest["id"], name)
+            with open(os.path.join(target, name), "wb") as f:
+                f.write(data)
+            written += len(data)
+        return written
+
+    def usage(self, manifests=None):
+        """Logical bytes, unique chunk bytes and compressed bytes for a set of manifests"""
+        manifests = self.snapshots() if manifests is None else manifests
+        logical = 0
+        unique = {}
+        for manifest in manifests:
+            for entry in manifest["files"].values():
+                logical += entry["size"]
+                for digest, length in entry["chunks"]:
+                    unique[digest] = length
+        stored = sum(os.path.getsize(self._object_path(digest)) for digest in unique)
+        return {"snapshots": len(manifests), "logical": logical, "unique": sum(unique.values()),
+                "chunks": len(unique), "stored": stored}
+
+
+def describe_usage(name, usage):
+    dedup = usage["logical"] / usage["unique"] if usage["unique"] else 0.0
+    overall = usage["logical"] / usage["stored"] if usage["stored"] else 0.0
+    return (f"{name}: {usage['snapshots']} snapshots, {usage['logical'] / 1e6:.2f} MB logical, "
+            f"{usage['unique'] / 1e6:.2f} MB unique in {usage['chunks']} chunks ({dedup:.1f}x dedup), "
+            f"{usage['stored'] / 1e6:.2f} MB stored ({overall:.1f}x with compression)")
+
+
+def report(store):
+    manifests = store.snapshots()
+    if not manifests:
+        print(f"No snapshots in {store.root}")
+        return
+    labels = sorted({m["label"] for m in manifests})
+    for label in labels:
+        print(describe_usage(f"{label} (repeated scrapes)", store.usage([m for m in manifests if m["label"] == label])))
+    latest = [store.snapshots(label)[-1] for label in labels]
+    print(describe_usage(f"latest of {', '.join(labels)} (across versions)", store.usage(latest)))
+    print(describe_usage("whole store", store.usage(manifests)))
+
+
+def version_dirs(versions=None):
+    if versions:
+        return [os.path.join(REFERENCES_DIR, version) for version in versions]
+    return sorted(path for path in glob.glob(os.path.join(REFERENCES_DIR, "v*")) if os.path.isdir(path))
+
+
+def rescrape(directory, target, rng, edits=5):
+    """Copy `directory` with a few small edits per file, as a later scrape of a slowly changing page would look"""
+    os.makedirs(target, exist_ok=True)
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path):
+            continue
+        data = bytearray(open(path, "rb").read())
+        for _ in range(edits if data else 0):
+            position = rng.randrange(len(data))
+            data[position:position + rng.randrange(0, 64)] = os.urandom(rng.randrange(0, 64)).hex().encode()
+        with open(os.path.join(target, name), "wb") as f:
+            f.write(data)
+
+
+def benchmark(scrapes, seed=0):
+    """Snapshot v3-v6 plus simulated repeated scrapes into a scratch store and report dedup and rebuild speed"""
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as scratch:
+        store = SnapshotStore(os.path.join(scratch, "store"))
+        start = time.perf_counter()
+        taken = 0
+        for directory in version_dirs():
+            store.take(directory)
+            taken += 1
+            for scrape in range(1, scrapes):
+                copy = os.path.join(scratch, f"{os.path.basename(directory)}-{scrape}")
+                rescrape(directory, copy, rng)
+                store.take(copy, label=os.path.basename(directory))
+                shutil.rmtree(copy)
+                taken += 1
+        elapsed = time.perf_counter() - start
+        usage = store.usage()
+        print(f"Took {taken} snapshots ({usage['logical'] / 1e6:.1f} MB) in {elapsed:.2f} s "
+              f"({usage['logical'] / 1e6 / elapsed:.1f} MB/s)")
+        report(store)
+        manifests = store.snapshots()
+        start = time.perf_counter()
+        rebuilt = sum(store.restore(manifest["id"], os.path.join(scratch, "restore")) for manifest in manifests)
+        elapsed = time.perf_counter() - start
+        print(f"Rebuilt and verified all {len(manifests)} snapshots: {rebuilt / 1e6:.1f} MB in {elapsed:.2f} s "
+              f"({rebuilt / 1e6 / elapsed:.0f} MB/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed snapshot store for scraped reference pages")
+    parser.add_argument("--store", default=STORE_DIR, help="Store directory (default: pine_script_references/snapshots)")
+    parser.add_argument("--take", nargs="*", metavar="VERSION", help="Snapshot pine_script_references/<version>/ (default: all)")
+    parser.add_argument("--label", help="With --take on one version: snapshot label (default: the version)")
+    parser.add_argument("--list", action="store_true", help="List snapshots")
+    parser.add_argument("--report", action="store_true", help="Dedup ratios per version, across versions and overall")
+    parser.add_argument("--restore", metavar="SNAPSHOT", help="Rebuild a snapshot (id, id prefix or label)")
+    parser.add_argument("--to", help="With --restore: target directory (default: the snapshot's source directory)")
+    parser.add_argument("--cat", nargs=2, metavar=("SNAPSHOT", "FILE"), help="Stream one file of a snapshot to stdout")
+    parser.add_argument("--benchmark", action="store_true", help="Snapshot v3-v6 and simulated rescrapes in a scratch store")
+    parser.add_argument("--scrapes", type=int, default=10, help="With --benchmark: scrapes per version (default: 10)")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.scrapes)
+        return
+    store = SnapshotStore(args.store)
+    try:
+        if args.take is not None:
+            for directory in version_dirs(args.take):
+                label = args.label if args.label and len(args.take) == 1 else None
+                manifest = store.take(directory, label)
+                size = sum(entry["size"] for entry in manifest["files"].values())
+                print(f"{manifest['id']}: {len(manifest['files'])} files, {size / 1e6:.2f} MB, "
+                      f"{manifest['new_chunks']} new chunks")
+        if args.list:
+            for manifest in store.snapshots():
+                size = sum(entry["size"] for entry in manifest["files"].values())
+                print(f"{manifest['id']}  {manifest['source']}  {len(manifest['files'])} files  {size / 1e6:.2f} MB")
+        if args.report:
+            report(store)
+        if args.restore:
+            manifest = store.manifest(args.restore)
+            target = args.to or os.path.join(ROOT, manifest["source"])
+            written = store.restore(manifest["id"], target)
+            print(f"Restored {manifest['id']} to {target} ({written / 1e6:.2f} MB)")
+        if args.cat:
+            with store.open(*args.cat) as stream:
+                shutil.copyfileobj(stream, sys.stdout.buffer)
+    except KeyError as e:
+        print(f"Error: {e.args[0]}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Template catalog and spec-driven rendering for templates/
+
+Scans templates/*.pine once into a catalog cached at .cache/template_catalog.pickle
+(entries are rebuilt only for files whose size or mtime changed). Each entry
+holds the template's declaration (kind and title), its description from
+templates/README.md, the `{{PLACEHOLDER}}` set, every `input.*` declaration
+(name, function, default, line), the `sNN`/`uNN` symbol slots and a
+precompiled substitution plan. The plan extends generate_screeners.RenderPlan
+with a slot for each input's default value, and keeps the literal chunks in a
+list with fixed slot positions. Rendering a variant only fills those positions
+and joins.
+
+A spec file (JSON) names the template and the values to fill:
+
+    {
+      "template": "gold_standard_screener_template.pine",
+      "output": "screeners/custom/{SCRIPT_NAME}_{SCREEN_NUMBER}.pine",
+      "placeholders": {"SCRIPT_NAME": "TRIP", "SCREEN_NUMBER": 1},
+      "inputs": {"col_width": 6},
+      "symbols": ["NSE:ABB", "NSE:TCS"],
+      "matrix": {"placeholders": {"SCREEN_NUMBER": [1, 2, 3]}},
+      "variants": [{"inputs": {"col_width": 4}}, {"inputs": {"col_width": 8}}]
+    }
+
+`matrix` expands to every combination of its lists, and `variants` are
+applied on top of each of them. Every variant is validated before anything is
+written:
+
+- all placeholders are given and none is unknown
+- input names exist and their values fit the input's type
+- no `{{...}}` is left in the output (and, with `--parse`, the output parses)
+
+Usage:
+    python scripts/template_catalog.py
+    python scripts/template_catalog.py --show gold_standard_screener_template
+    python scripts/template_catalog.py --spec specs/trip_screens.json --dry-run --parse
+    python scripts/template_catalog.py --benchmark 1000
+"""
+
+import argparse
+import itertools
+import json
+import os
+import pickle
+import re
+import sys
+import time
+
+import generate_screeners
+import pine_parser as ast
+from generate_screeners import ENABLE_RE, PLACEHOLDER_RE, SYMBOL_RE, RenderPlan
+
+ROOT = generate_screeners.ROOT
+TEMPLATES_DIR = os.path.join(ROOT, "templates")
+CACHE_PATH = os.path.join(ROOT, ".cache", "template_catalog.pickle")
+CATALOG_VERSION = 1
+
+INPUT_RE = re.compile(r"^(\s*(?:\w+\s+)?([A-Za-z_]\w*)\s*=\s*(input(?:\.\w+)?)\(\s*)"
+                      r"(\"[^\"]*\"|'[^']*'|[^,()'\"]+?)(\s*[,)].*)$")
+DECLARATION_RE = re.compile(r"^(indicator|strategy|study)\(\s*([\"'])(.*?)\2")
+README_HEADING_RE = re.compile(r"^###\s+\d+\.\s+(.*?)\s+\(`([^`]+)`\)")
+SOURCES = ("open", "high", "low", "close", "volume", "hl2", "hlc3", "ohlc4", "hlcc4")
+
+
+class SpecError(ValueError):
+    """Raised when a spec does not fit its template"""
+
+
+def pine_literal(value, spec):
+    """Pine source text for an input value, checked against the input's function"""
+    func, default = spec["func"], spec["default"]
+    if func == "input.bool" or (func == "input" and default in ("true", "false")):
+        if not isinstance(value, bool):
+            raise SpecError(f"input {spec['name']} needs true/false, got {value!r}")
+        return "true" if value else "false"
+    if func == "input.source":
+        if value not in SOURCES:
+            raise SpecError(f"input {spec['name']} needs one of {', '.join(SOURCES)}, got {value!r}")
+        return value
+    if func in ("input.int", "input.float") or (func == "input" and default[:1].isdigit()):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise SpecError(f"input {spec['name']} needs a number, got {value!r}")
+        if func == "input.int" and value != int(value):
+            raise SpecError(f"input {spec['name']} needs an integer, got {value!r}")
+        return str(int(value)) if func == "input.int" else repr(float(value)) if isinstance(value, float) else str(value)
+    if not isinstance(value, str):
+        raise SpecError(f"input {spec['name']} needs a string, got {value!r}")
+    quote = default[0] if default[:1] in ("'", '"') else '"'
+    return quote + value.replace(quote, "\\" + quote) + quote
+
+
+class TemplatePlan(RenderPlan):
+    """RenderPlan with input-default slots, flattened into fixed part positions"""
+
+    def __init__(self, path):
+        self.inputs = {}
+        self.default_symbols = {}
+        self.default_enabled = {}
+        self.declaration = (None, None)
+        self._line = 0
+        super().__init__(path)
+        self.parts = []
+        self.slots = []         # (position in parts, kind, key)
+        for item in self.items:
+            if isinstance(item, str):
+                self.parts.append(item)
+            else:
+                self.slots.append((len(self.parts), item[0], item[1]))
+                self.parts.append("")
+
+    def _compile_line(self, line):
+        self._line += 1
+        body = line.rstrip("\n")
+        match = DECLARATION_RE.match(body)
+        if match and self.declaration[0] is None:
+            self.declaration = ("indicator" if match.group(1) == "study" else match.group(1), match.group(3))
+        match = SYMBOL_RE.match(body)
+        if match:
+            self.default_symbols[int(match.group(2))] = match.group(4)
+            return super()._compile_line(line)
+        match = ENABLE_RE.match(body)
+        if match:
+            self.default_enabled[int(match.group(2))] = match.group(3) == "true"
+            return super()._compile_line(line)
+        match = INPUT_RE.match(body)
+        if not match or "{{" in match.group(4):
+            return super()._compile_line(line)
+        name = match.group(2)
+        self.inputs[name] = {"name": name, "func": match.group(3), "default": match.group(4).strip(), "line": self._line}
+        self._text(match.group(1))
+        self.items.append(("input", name))
+        self._text(match.group(5) + line[len(body):])
+
+    def render(self, values, symbols=None, enabled=None, inputs=None):
+        """Render with placeholder `values`, optional slot `symbols`/`enabled` lists and input overrides"""
+        parts = self.parts[:]
+        for position, kind, key in self.slots:
+            if kind == "placeholder":
+                if key not in values:
+                    raise KeyError(f"no value for placeholder {{{{{key}}}}}")
+                parts[position] = str(values[key])
+            elif kind == "input":
+                parts[position] = inputs[key] if inputs and key in inputs else self.inputs[key]["default"]
+            elif kind == "symbol":
+                parts[position] = symbols[key - 1] if symbols else self.default_symbols[key]
+            else:
+                flag = enabled[key - 1] if enabled else self.default_enabled.get(key, True)
+                parts[position] = "true" if flag else "false"
+        return "".join(parts)
+
+
+class TemplateEntry:
+    """Catalog entry for one template file"""
+
+    def __init__(self, path, signature, description=None):
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self.path = path
+        self.signature = signature
+        self.description = description
+        self.plan = TemplatePlan(path)
+        self.kind, self.title = self.plan.declaration
+
+    @property
+    def placeholders(self):
+        return sorted(self.plan.placeholders)
+
+    @property
+    def inputs(self):
+        return self.plan.inputs
+
+    @property
+    def symbol_slots(self):
+        return self.plan.symbol_slots
+
+    def check_inputs(self, inputs):
+        """Input overrides as Pine literals; raises SpecError for unknown names or bad values"""
+        unknown = sorted(set(inputs) - set(self.inputs))
+        if unknown:
+            raise SpecError(f"{self.name} has no input {', '.join(unknown)} (inputs: {', '.join(self.inputs)})")
+        return {name: pine_literal(value, self.inputs[name]) for name, value in inputs.items()}
+
+    def check_placeholders(self, values):
+        missing = sorted(set(self.plan.placeholders) - set(values))
+        unknown = sorted(set(values) - set(self.plan.placeholders))
+        if missing:
+            raise SpecError(f"{self.name} needs {', '.join('{{' + key + '}}' for key in missing)}")
+        if unknown:
+            raise SpecError(f"{self.name} has no placeholder {', '.join('{{' + key + '}}' for key in unknown)}")
+
+    def render(self, placeholders=None, inputs=None, symbols=None):
+        """Validated rendering of one variant"""
+        placeholders = placeholders or {}
+        self.check_placeholders(placeholders)
+        literals = self.check_inputs(inputs or {})
+        slots = enabled = None
+        if symbols is not None:
+            if not self.symbol_slots:
+                raise SpecError(f"{self.name} has no symbol slots")
+            if len(symbols) > self.symbol_slots:
+                raise SpecError(f"{len(symbols)} symbols for {self.symbol_slots} slots in {self.name}")
+            slots, enabled = generate_screeners.screen_slots(list(symbols), self.symbol_slots)
+        content = self.plan.render(placeholders, slots, enabled, literals)
+        leftover = PLACEHOLDER_RE.search(content)
+        if leftover:
+            raise SpecError(f"{self.name}: placeholder {leftover.group(0)} left unfilled")
+        return content
+
+
+def read_readme(directory):
+    """{file name: description} from the numbered template headings of templates/README.md"""
+    descriptions = {}
+    path = os.path.join(directory, "README.md")
+    if not os.path.exists(path):
+        return descriptions
+    current = None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            match = README_HEADING_RE.match(line)
+            if match:
+                current = match.group(2)
+                descriptions[current] = []
+            elif line.startswith("#"):
+                current = None
+            elif current and line.startswith("- "):
+                descriptions[current].append(line[2:].strip())
+    return {name: "; ".join(lines) for name, lines in descriptions.items()}
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class Catalog:
+    """Every template of a directory, loaded from the cache when unchanged"""
+
+    def __init__(self, directory=TEMPLATES_DIR, cache_path=CACHE_PATH):
+        self.directory = directory
+        self.cache_path = cache_path
+        self.entries = {}
+        self.rebuilt = []
+        self.readme = {}
+        self._load()
+
+    def _load(self):
+        cached = {}
+        if self.cache_path and os.path.exists(self.cache_path):
+            try:
+                with open(self.cache_path, "rb") as f:
+                    version, directory, readme_signature, readme, cached = pickle.load(f)
+                if version != CATALOG_VERSION or directory != os.path.abspath(self.directory):
+                    cached = {}
+            except (OSError, pickle.UnpicklingError, EOFError, ValueError, AttributeError):
+                cached = {}
+        readme_path = os.path.join(self.directory, "README.md")
+        signature = _signature(readme_path) if os.path.exists(readme_path) else None
+        if cached and signature == readme_signature:
+            self.readme = readme
+        else:
+            self.readme = read_readme(self.directory)
+            cached = {name: entry for name, entry in cached.items() if entry.description == self.readme.get(
+                os.path.basename(entry.path))}
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith(".pine"):
+                continue
+            path = os.path.join(self.directory, filename)
+            name = os.path.splitext(filename)[0]
+            entry = cached.get(name)
+            if entry is None or entry.signature != _signature(path):
+                entry = TemplateEntry(path, _signature(path), self.readme.get(filename))
+                self.rebuilt.append(name)
+            self.entries[name] = entry
+        if self.rebuilt or len(cached) != len(self.entries):
+            self._save(signature)
+
+    def _save(self, readme_signature):
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        partial = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(partial, "wb") as f:
+            pickle.dump((CATALOG_VERSION, os.path.abspath(self.directory), readme_signature, self.readme, self.entries),
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(partial, self.cache_path)
+
+    def __getitem__(self, name):
+        key = os.path.splitext(os.path.basename(name))[0]
+        if key not in self.entries:
+            raise KeyError(f"no template {name!r} in {self.directory} (have: {', '.join(self.entries)})")
+        return self.entries[key]
+
+    def missing(self):
+        """Templates described in templates/README.md without a file"""
+        return sorted(name for name in self.readme if os.path.splitext(name)[0] not in self.entries)
+
+
+def _merge(base, override):
+    merged = {key: dict(base.get(key) or {}) for key in ("placeholders", "inputs")}
+    for key in ("placeholders", "inputs"):
+        merged[key].update(override.get(key) or {})
+    merged["symbols"] = override.get("symbols", base.get("symbols"))
+    return merged
+
+
+def expand(spec):
+    """Every variant of a spec as {"placeholders", "inputs", "symbols"}"""
+    base = _merge({}, spec)
+    combos = [{}]
+    matrix = spec.get("matrix") or {}
+    axes = [(section, name, values) for section in ("placeholders", "inputs")
+            for name, values in (matrix.get(section) or {}).items()]
+    if axes:
+        combos = []
+        for values in itertools.product(*(axis[2] for axis in axes)):
+            combo = {"placeholders": {}, "inputs": {}}
+            for (section, name, _), value in zip(axes, values):
+                combo[section][name] = value
+            combos.append(combo)
+    variants = spec.get("variants") or [{}]
+    return [_merge(_merge(base, combo), variant) for combo in combos for variant in variants]
+
+
+def output_path(pattern, variant, index):
+    """Output path for a variant: `pattern` formatted with its placeholders, inputs and index"""
+    fields = dict(variant["inputs"], **variant["placeholders"], index=index)
+    path = pattern.format(**fields)
+    return path if os.path.isabs(path) else os.path.join(ROOT, path)
+
+
+def render_spec(catalog, spec, parse=False):
+    """[(output path or None, content)] for every variant of a spec; raises SpecError on the first bad one"""
+    if "template" not in spec:
+        raise SpecError("spec has no 'template'")
+    entry = catalog[spec["template"]]
+    rendered = []
+    for index, variant in enumerate(expand(spec), 1):
+        try:
+            content = entry.render(variant["placeholders"], variant["inputs"], variant["symbols"])
+            if parse:
+                ast.parse(content)
+            path = output_path(spec["output"], variant, index) if spec.get("output") else None
+        except (SpecError, ast.PineSyntaxError, KeyError, IndexError) as e:
+            message = e.args[0] if isinstance(e, KeyError) else e
+            raise SpecError(f"variant {index}: {message}") from None
+        rendered.append((path, content))
+    paths = [path for path, _ in rendered if path]
+    if len(set(paths)) != len(paths):
+        raise SpecError("several variants render to the same output path; add {index} or a varying field to 'output'")
+    return rendered
+
+
+def print_catalog(catalog):
+    for name, entry in catalog.entries.items():
+        placeholders = ", ".join("{{" + key + "}}" for key in entry.placeholders) or "none"
+        slots = f", {entry.symbol_slots} symbol slots" if entry.symbol_slots else ""
+        print(f"{name}: {entry.kind or '?'} '{entry.title or ''}', {len(entry.inputs)} inputs{slots}, "
+              f"placeholders: {placeholders}")
+        if entry.description:
+            print(f"    {entry.description}")
+    for filename in catalog.missing():
+        print(f"warning: templates/README.md describes {filename}, which does not exist")
+
+
+def show(entry):
+    print(f"{entry.name} ({os.path.relpath(entry.path, ROOT)})")
+    print(f"  {entry.kind or '?'}: {entry.title or ''}")
+    print(f"  placeholders: {', '.join(entry.placeholders) or 'none'}")
+    if entry.symbol_slots:
+        print(f"  symbol slots: {entry.symbol_slots}")
+    for name, spec in entry.inputs.items():
+        print(f"  line {spec['line']:>3}: {name} = {spec['func']}({spec['default']}, ...)")
+
+
+def benchmark(catalog, variants):
+    """Time catalog loading and bulk rendering of the gold standard template"""
+    start = time.perf_counter()
+    Catalog(catalog.directory, None)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    Catalog(catalog.directory, catalog.cache_path)
+    warm = time.perf_counter() - start
+    entry = catalog["gold_standard_screener_template"]
+    spec = {"template": entry.name, "placeholders": {"SCRIPT_NAME": "Bench"},
+            "matrix": {"placeholders": {"SCREEN_NUMBER": list(range(1, variants + 1))}},
+            "symbols": [f"NSE:SYM{index}" for index in range(entry.symbol_slots)]}
+    start = time.perf_counter()
+    rendered = render_spec(catalog, spec)
+    elapsed = time.perf_counter() - start
+    print(f"Catalog: {len(catalog.entries)} templates, scan {cold * 1000:.1f} ms, cached load {warm * 1000:.1f} ms")
+    print(f"Rendered {len(rendered)} validated variants of {entry.name} in {elapsed * 1000:.1f} ms "
+          f"({len(rendered) / elapsed:,.0f} variants/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Template catalog and spec-driven rendering")
+    parser.add_argument("--templates", default=TEMPLATES_DIR, help="Template directory (default: templates/)")
+    parser.add_argument("--show", metavar="TEMPLATE", help="Placeholders, inputs and slots of one template")
+    parser.add_argument("--spec", action="append", help="JSON spec file to render (repeatable)")
+    parser.add_argument("--dry-run", action="store_true", help="Validate and list outputs without writing")
+    parser.add_argument("--parse", action="store_true", help="Also check that every variant parses")
+    parser.add_argument("--benchmark", type=int, nargs="?", const=1000, metavar="VARIANTS",
+                        help="Time catalog loading and rendering (default: 1000 variants)")
+    args = parser.parse_args()
+
+    catalog = Catalog(args.templates)
+    if args.benchmark:
+        benchmark(catalog, args.benchmark)
+        return
+    if args.show:
+        try:
+            show(catalog[args.show])
+        except KeyError as e:
+            print(f"Error: {e.args[0]}")
+            sys.exit(1)
+        return
+    if not args.spec:
+        print_catalog(catalog)
+        return
+
+    failed = False
+    for spec_path in args.spec:
+        try:
+            with open(spec_path, encoding="utf-8") as f:
+                spec = json.load(f)
+            rendered = render_spec(catalog, spec, args.parse)
+        except (OSError, json.JSONDecodeError, SpecError, KeyError) as e:
+            print(f"{spec_path}: {e.args[0] if isinstance(e, KeyError) else e}")
+            failed = True
+            continue
+        written = unchanged = 0
+        for path, content in rendered:
+            if path is None:
+                continue
+            if args.dry_run:
+                print(f"  would write {os.path.relpath(path, ROOT)}")
+            elif generate_screeners.write_if_changed(path, content):
+                written += 1
+            else:
+                unchanged += 1
+        print(f"{spec_path}: {len(rendered)} variants valid"
+              + ("" if args.dry_run else f", {written} written, {unchanged} unchanged"))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
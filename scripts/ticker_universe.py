@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Ticker universe store
+
+Loads every ticker list of a market (`tickers/<market>/*.txt`) into one
+universe. Each distinct symbol is interned once to an integer id, and every
+list becomes a bitset over those ids (a Python int, bit i set = symbol i is in
+the list). Union, intersection and exclusion are then single big-int
+operations, which stay fast when the universe grows to tens of thousands of
+symbols; members are only decoded back to names when a set is written out.
+
+Set expressions combine list names with `|` (union), `&` (intersection) and
+`-` (exclusion), evaluated left to right, with parentheses for grouping:
+
+    all_tickers - popular_30_active - alphabetical_30_active
+    (random_01_30_active | random_02_30_active) & popular_30_active
+
+A set can be written in both formats the ticker directory uses: the `.txt`
+list (active tickers alphabetically sorted, padded with CRYPTO:BTCUSD dummies)
+and the `.pine` block of `sNN = input.symbol(...)` lines with the market's
+exchange prefix. Seeded sampling draws deterministic random subsets, so
+`random_NN_30_active` files can be regenerated bit for bit.
+
+Usage:
+    python scripts/ticker_universe.py --market india --stats
+    python scripts/ticker_universe.py --market us --expr "all_tickers - popular_30_active"
+    python scripts/ticker_universe.py --market us --sample 30 --seed 4 --write random_04_30_active
+    python scripts/ticker_universe.py --market india --expr popular_30_active --write popular_30_active --pine
+    python scripts/ticker_universe.py --benchmark 50000
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TICKERS_DIR = os.path.join(ROOT, "tickers")
+
+MARKET_PREFIXES = {"india": "NSE:", "us": ""}
+EXCHANGES = ("NSE", "BSE", "NASDAQ", "NYSE", "AMEX")
+DUMMY_TICKER = "CRYPTO:BTCUSD"
+ACTIVE_PER_LIST = 30
+DUMMIES_PER_LIST = 10
+
+TOKEN_RE = re.compile(r"\s*(\w+|[|&()-])")
+
+
+class Universe:
+    """Interned symbols of one market and the named ticker sets over them"""
+
+    def __init__(self, market=""):
+        self.market = market
+        self.symbols = []
+        self.ids = {}
+        self.sets = {}
+
+    def intern(self, symbol):
+        """Id of `symbol`, adding it to the universe if new"""
+        index = self.ids.get(symbol)
+        if index is not None:
+            return index
+        symbol = sys.intern(strip_prefix(symbol))
+        index = self.ids.get(symbol)
+        if index is None:
+            index = self.ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return index
+
+    def make(self, symbols, name=""):
+        """TickerSet of `symbols` (interning unknown ones); dummy tickers are skipped"""
+        ids = [self.intern(symbol) for symbol in symbols if symbol != DUMMY_TICKER]
+        return TickerSet(self, to_bits(ids), name)
+
+    def add(self, name, symbols):
+        """Register `symbols` under `name` and return the set"""
+        self.sets[name] = self.make(symbols, name)
+        return self.sets[name]
+
+    def everything(self):
+        """Set of every interned symbol"""
+        return TickerSet(self, (1 << len(self.symbols)) - 1, "universe")
+
+    def __getitem__(self, name):
+        if name not in self.sets:
+            raise KeyError(f"no ticker list named {name!r} (have: {', '.join(sorted(self.sets))})")
+        return self.sets[name]
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def evaluate(self, expression):
+        """Evaluate a set expression over list names (see module docstring)"""
+        tokens = tokenize(expression)
+        result, position = self._expression(tokens, 0)
+        if position != len(tokens):
+            raise ValueError(f"unexpected {tokens[position]!r} in {expression!r}")
+        result.name = expression.strip()
+        return result
+
+    def _expression(self, tokens, position):
+        left, position = self._operand(tokens, position)
+        while position < len(tokens) and tokens[position] in ("|", "&", "-"):
+            op = tokens[position]
+            right, position = self._operand(tokens, position + 1)
+            left = left | right if op == "|" else left & right if op == "&" else left - right
+        return left, position
+
+    def _operand(self, tokens, position):
+        if position >= len(tokens):
+            raise ValueError("set expression ends early")
+        token = tokens[position]
+        if token == "(":
+            result, position = self._expression(tokens, position + 1)
+            if position >= len(tokens) or tokens[position] != ")":
+                raise ValueError("missing ')' in set expression")
+            return result, position + 1
+        if token in ("|", "&", "-", ")"):
+            raise ValueError(f"unexpected {token!r} in set expression")
+        return self[token], position + 1
+
+
+class TickerSet:
+    """A bitset of symbol ids within a Universe"""
+
+    __slots__ = ("universe", "bits", "name")
+
+    def __init__(self, universe, bits, name=""):
+        self.universe = universe
+        self.bits = bits
+        self.name = name
+
+    def _check(self, other):
+        if other.universe is not self.universe:
+            raise ValueError("ticker sets belong to different universes")
+
+    def __or__(self, other):
+        self._check(other)
+        return TickerSet(self.universe, self.bits | other.bits)
+
+    def __and__(self, other):
+        self._check(other)
+        return TickerSet(self.universe, self.bits & other.bits)
+
+    def __sub__(self, other):
+        self._check(other)
+        return TickerSet(self.universe, self.bits & ~other.bits)
+
+    def __eq__(self, other):
+        return isinstance(other, TickerSet) and other.universe is self.universe and other.bits == self.bits
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def __len__(self):
+        return self.bits.bit_count()
+
+    def __bool__(self):
+        return self.bits != 0
+
+    def __contains__(self, symbol):
+        index = self.universe.ids.get(strip_prefix(symbol))
+        return index is not None and bool(self.bits >> index & 1)
+
+    def __iter__(self):
+        symbols = self.universe.symbols
+        return (symbols[index] for index in self.indices())
+
+    def __repr__(self):
+        return f"TickerSet({self.name or 'unnamed'}, {len(self)} symbols)"
+
+    def indices(self):
+        """Member ids in ascending order"""
+        if not self.bits:
+            return np.zeros(0, dtype=np.int64)
+        raw = self.bits.to_bytes((self.bits.bit_length() + 7) // 8, "little")
+        return np.flatnonzero(np.unpackbits(np.frombuffer(raw, dtype=np.uint8), bitorder="little"))
+
+    def sorted(self):
+        """Members in alphabetical order"""
+        return sorted(self)
+
+    def sample(self, k, seed=0):
+        """Deterministic subset of `k` members for a given seed"""
+        members = self.sorted()
+        if k > len(members):
+            raise ValueError(f"cannot sample {k} from {len(members)} symbols")
+        return self.universe.make(random.Random(seed).sample(members, k), f"sample({k}, seed={seed})")
+
+
+def to_bits(ids):
+    """Bitset int with the given ids set"""
+    if not len(ids):
+        return 0
+    ids = np.asarray(ids, dtype=np.int64)
+    flags = np.zeros(int(ids.max()) + 1, dtype=bool)
+    flags[ids] = True
+    return int.from_bytes(np.packbits(flags, bitorder="little").tobytes(), "little")
+
+
+def strip_prefix(symbol):
+    """Bare symbol for exchange-prefixed stock tickers (NSE:ABB -> ABB)"""
+    symbol = symbol.strip()
+    if ":" in symbol and symbol != DUMMY_TICKER and symbol.split(":", 1)[0] in EXCHANGES:
+        return symbol.split(":", 1)[1]
+    return symbol
+
+
+def symbol_filename(symbol):
+    """File name stem for a symbol (NSE:ABB -> NSE_ABB)"""
+    return symbol.replace(":", "_")
+
+
+def filename_symbol(stem):
+    """Symbol for a file name stem (NSE_ABB -> NSE:ABB); stems without an exchange prefix are kept"""
+    prefix, _, rest = stem.partition("_")
+    return f"{prefix}:{rest}" if rest and prefix in EXCHANGES else stem
+
+
+def qualify(symbol, market):
+    """Add the market's exchange prefix to bare symbols"""
+    if ":" in symbol:
+        return symbol
+    return MARKET_PREFIXES.get(market, "") + symbol
+
+
+def tokenize(expression):
+    """Split a set expression into list names and operators"""
+    tokens, position = [], 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = TOKEN_RE.match(expression, position)
+        if not match:
+            raise ValueError(f"cannot parse set expression at {expression[position:]!r}")
+        tokens.append(match.group(1))
+        position = match.end()
+    return tokens
+
+
+def read_list(path):
+    """Symbols from a one-per-line ticker .txt file"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith(("#", "//"))]
+
+
+def load_market(market_dir, market=None):
+    """Universe with every `*.txt` list of a market directory; all_tickers is interned first"""
+    market = market or os.path.basename(os.path.normpath(market_dir))
+    universe = Universe(market)
+    names = sorted(os.path.splitext(f)[0] for f in os.listdir(market_dir) if f.endswith(".txt"))
+    if "all_tickers" in names:
+        names.remove("all_tickers")
+        names.insert(0, "all_tickers")
+    for name in names:
+        universe.add(name, read_list(os.path.join(market_dir, name + ".txt")))
+    return universe
+
+
+def load(tickers_dir=TICKERS_DIR):
+    """{market: Universe} for every market directory"""
+    return {market: load_market(os.path.join(tickers_dir, market), market)
+            for market in sorted(os.listdir(tickers_dir)) if os.path.isdir(os.path.join(tickers_dir, market))}
+
+
+def padded(ticker_set, active=ACTIVE_PER_LIST, dummies=DUMMIES_PER_LIST):
+    """Alphabetical active symbols (at most `active`) padded with dummies to `active + dummies`"""
+    symbols = ticker_set.sorted()
+    if len(symbols) > active:
+        raise ValueError(f"{len(symbols)} symbols do not fit in {active} active slots")
+    return symbols + [DUMMY_TICKER] * (active + dummies - len(symbols))
+
+
+def format_txt(ticker_set, active=ACTIVE_PER_LIST, dummies=DUMMIES_PER_LIST):
+    """The `.txt` list format: one symbol per line, dummies last"""
+    return "".join(symbol + "\n" for symbol in padded(ticker_set, active, dummies))
+
+
+def list_title(name):
+    """Header title for a list name (random_04_30_active -> Random 04)"""
+    return re.sub(r"_\d+_active$", "", name).replace("_", " ").title()
+
+
+def format_pine(ticker_set, name, active=ACTIVE_PER_LIST, dummies=DUMMIES_PER_LIST):
+    """The `.pine` format: header comment and one `sNN = input.symbol(...)` line per slot"""
+    market = ticker_set.universe.market
+    symbols = padded(ticker_set, active, dummies)
+    count = len(ticker_set)
+    total = active + dummies
+    lines = [f"// {market.upper()} Market Tickers - {list_title(name)}",
+             f"// Active: {count} tickers, Dummy: {total - count} tickers (s{count + 1:02d}-s{total:02d})",
+             ""]
+    for slot, symbol in enumerate(symbols, 1):
+        lines.append(f's{slot:02d} = input.symbol("{qualify(symbol, market)}", group = \'Symbols\', inline = "s{slot:02d}")')
+    return "\n".join(lines) + "\n"
+
+
+def write_list(ticker_set, market_dir, name, pine=False):
+    """Write `<name>.txt` (and `<name>.pine`) into a market directory; returns the paths"""
+    paths = [os.path.join(market_dir, name + ".txt")]
+    with open(paths[0], "w", encoding="utf-8", newline="") as f:
+        f.write(format_txt(ticker_set))
+    if pine:
+        paths.append(os.path.join(market_dir, name + ".pine"))
+        with open(paths[1], "w", encoding="utf-8", newline="") as f:
+            f.write(format_pine(ticker_set, name))
+    return paths
+
+
+def benchmark(symbols=50000, lists=200, seed=0):
+    """Time set algebra on a synthetic universe of `symbols` tickers and `lists` lists"""
+    rng = random.Random(seed)
+    universe = Universe("us")
+    names = [f"T{index:06d}" for index in range(symbols)]
+    contents = [rng.sample(names, rng.randint(symbols // 100, symbols // 2)) for _ in range(lists)]
+    start = time.perf_counter()
+    universe.add("all_tickers", names)
+    for index, listed in enumerate(contents):
+        universe.add(f"list_{index:03d}", listed)
+    loaded = time.perf_counter() - start
+
+    start = time.perf_counter()
+    combined = universe["all_tickers"]
+    for index in range(lists):
+        current = universe[f"list_{index:03d}"]
+        combined = (combined - current) | (current & universe["list_000"])
+    operations = time.perf_counter() - start
+
+    start = time.perf_counter()
+    members = combined.sorted()
+    decoded = time.perf_counter() - start
+
+    start = time.perf_counter()
+    picked = universe["all_tickers"].sample(ACTIVE_PER_LIST, seed)
+    sampled = time.perf_counter() - start
+
+    print(f"Universe: {symbols:,} symbols, {lists} lists")
+    print(f"  load + intern {sum(map(len, contents)) + symbols:,} entries: {loaded * 1000:8.1f} ms")
+    print(f"  {lists * 3} set ops:     {operations * 1000:8.1f} ms ({operations / (lists * 3) * 1e6:.1f} us/op)")
+    print(f"  decode {len(members):,} members: {decoded * 1000:8.1f} ms")
+    print(f"  sample {len(picked)}:       {sampled * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Set operations over the ticker lists")
+    parser.add_argument("--tickers", default=TICKERS_DIR, help="Ticker directory with <market>/*.txt lists")
+    parser.add_argument("--market", choices=sorted(MARKET_PREFIXES), help="Market to load")
+    parser.add_argument("--expr", help="Set expression over list names, e.g. 'all_tickers - popular_30_active'")
+    parser.add_argument("--sample", type=int, metavar="K", help="Draw K symbols from the expression (default: all_tickers)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for --sample (default: 0)")
+    parser.add_argument("--write", metavar="NAME", help="Write the result as tickers/<market>/NAME.txt")
+    parser.add_argument("--pine", action="store_true", help="Also write NAME.pine with input.symbol lines")
+    parser.add_argument("--stats", action="store_true", help="Show every list with its size and overlap")
+    parser.add_argument("--benchmark", type=int, nargs="?", const=50000, metavar="SYMBOLS",
+                        help="Time set operations on a synthetic universe (default: 50000 symbols)")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+        return
+    if not args.market:
+        parser.error("--market is required")
+
+    market_dir = os.path.join(args.tickers, args.market)
+    universe = load_market(market_dir, args.market)
+
+    if args.stats:
+        everything = universe["all_tickers"] if "all_tickers" in universe.sets else universe.everything()
+        print(f"{args.market}: {len(universe)} symbols, {len(universe.sets)} lists")
+        for name, ticker_set in universe.sets.items():
+            outside = len(ticker_set - everything)
+            note = f", {outside} not in all_tickers" if outside else ""
+            print(f"  {name:<24} {len(ticker_set):>5}{note}")
+        return
+
+    try:
+        result = universe.evaluate(args.expr) if args.expr else universe["all_tickers"]
+        if args.sample:
+            result = result.sample(args.sample, args.seed)
+    except (KeyError, ValueError) as e:
+        print(f"Error: {e.args[0]}")
+        sys.exit(1)
+
+    if args.write:
+        try:
+            paths = write_list(result, market_dir, args.write, args.pine)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        for path in paths:
+            print(f"Wrote {os.path.relpath(path, ROOT)} ({len(result)} active)")
+        return
+
+    for symbol in result.sorted():
+        print(symbol)
+    print(f"# {len(result)} symbols", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()